@@ -78,8 +78,15 @@ async function deployRequirements(spriteName: string): Promise<void> {
 const INIT_DB_SCRIPT = `
 import sqlite3
 
+# Schemas below are migration v1 of TranscriptDB / MemoryDB (sprite/src/database.py).
+# Stamping user_version lets the sprite skip its baseline migration on first connect.
+def mark_baseline(conn):
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+        conn.execute("PRAGMA user_version = 1")
+
 # transcript.db — append-only conversation log
 t_conn = sqlite3.connect("/workspace/.os/memory/transcript.db")
+t_conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
 t_conn.execute("PRAGMA journal_mode=WAL")
 t_conn.execute("PRAGMA foreign_keys=ON")
 t_conn.execute("PRAGMA busy_timeout=5000")
@@ -103,10 +110,12 @@ CREATE TABLE IF NOT EXISTS sessions (
 );
 CREATE INDEX IF NOT EXISTS idx_observations_processed ON observations(processed);
 """)
+mark_baseline(t_conn)
 t_conn.close()
 
 # memory.db — searchable learnings archive with FTS5
 m_conn = sqlite3.connect("/workspace/.os/memory/memory.db")
+m_conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
 m_conn.execute("PRAGMA journal_mode=WAL")
 m_conn.execute("PRAGMA foreign_keys=ON")
 m_conn.execute("PRAGMA busy_timeout=5000")
@@ -142,6 +151,7 @@ CREATE TRIGGER IF NOT EXISTS learnings_au AFTER UPDATE ON learnings BEGIN
     INSERT INTO learnings_fts(learnings_fts, rowid, content, type) VALUES (new.id, new.content, new.type);
 END;
 """)
+mark_baseline(m_conn)
 m_conn.close()
 print("OK")
 `
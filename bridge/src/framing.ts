@@ -0,0 +1,142 @@
+/**
+ * Length-prefixed framing for the Bridge <-> Sprite TCP link.
+ *
+ * The link starts as newline-delimited JSON. The Sprite opens with a
+ * link_offer line listing its codecs; we answer with link_select and frame
+ * everything we send after it, and the Sprite frames its output after its
+ * link_ack line. A Sprite that never offers keeps the line protocol.
+ * See sprite/src/framing.py for the Sprite side.
+ *
+ * Frame: 1-byte codec id, 4-byte big-endian payload length, payload.
+ */
+
+import zlib from 'node:zlib'
+
+export const FRAMING_VERSION = 1
+export const FRAME_HEADER_BYTES = 5
+export const MAX_FRAME_BYTES = 50 * 1024 * 1024
+/** Smaller payloads are sent uncompressed. */
+export const COMPRESS_MIN_BYTES = 1024
+/** Larger payloads are compressed only if this prefix shrinks to COMPRESS_MAX_RATIO (base64 PDFs do not). */
+const COMPRESS_SAMPLE_BYTES = 16 * 1024
+const COMPRESS_MAX_RATIO = 0.7
+
+const RAW = 0
+const DEFLATE = 1
+const ZSTD = 2
+const DEFLATE_LEVEL = 1
+
+export type FrameCodec = 'zstd' | 'deflate'
+
+// zstd landed in node:zlib in Node 22.15; older runtimes only get deflate
+const zstd = zlib as unknown as {
+  zstdCompressSync?: (buf: Buffer) => Buffer
+  zstdDecompressSync?: (buf: Buffer, opts?: { maxOutputLength?: number }) => Buffer
+}
+
+export function supportedCodecs(): FrameCodec[] {
+  return typeof zstd.zstdCompressSync === 'function' ? ['zstd', 'deflate'] : ['deflate']
+}
+
+/** Our preferred codec among those the Sprite offered, or null for uncompressed frames. */
+export function chooseCodec(offered: unknown): FrameCodec | null {
+  if (!Array.isArray(offered)) return null
+  return supportedCodecs().find((c) => offered.includes(c)) ?? null
+}
+
+/** Build one frame, compressing the payload when that makes it smaller. */
+export function encodeFrame(data: Buffer, codec: FrameCodec | null): Buffer {
+  let id = RAW
+  let payload = data
+  if (codec && data.length >= COMPRESS_MIN_BYTES && compressible(data, codec)) {
+    const packed = compress(data, codec)
+    if (packed.length < data.length) {
+      id = codec === 'zstd' ? ZSTD : DEFLATE
+      payload = packed
+    }
+  }
+  const header = Buffer.allocUnsafe(FRAME_HEADER_BYTES)
+  header.writeUInt8(id, 0)
+  header.writeUInt32BE(payload.length, 1)
+  return Buffer.concat([header, payload])
+}
+
+function compress(data: Buffer, codec: FrameCodec): Buffer {
+  return codec === 'zstd' ? zstd.zstdCompressSync!(data) : zlib.deflateSync(data, { level: DEFLATE_LEVEL })
+}
+
+function compressible(data: Buffer, codec: FrameCodec): boolean {
+  if (data.length <= 2 * COMPRESS_SAMPLE_BYTES) return true
+  const sample = compress(data.subarray(0, COMPRESS_SAMPLE_BYTES), codec)
+  return sample.length <= COMPRESS_SAMPLE_BYTES * COMPRESS_MAX_RATIO
+}
+
+/** Decode a frame payload. Throws on corrupt data, an unknown codec or an oversized result. */
+export function decodePayload(codecId: number, payload: Buffer): Buffer {
+  switch (codecId) {
+    case RAW:
+      return payload
+    case DEFLATE:
+      return zlib.inflateSync(payload, { maxOutputLength: MAX_FRAME_BYTES })
+    case ZSTD:
+      if (zstd.zstdDecompressSync) return zstd.zstdDecompressSync(payload, { maxOutputLength: MAX_FRAME_BYTES })
+  }
+  throw new Error(`Unknown frame codec ${codecId}`)
+}
+
+/**
+ * Byte buffer for stream reassembly. Chunks are kept as received and
+ * joined once per message, so a 30 MB frame arriving in 64 KB pieces is
+ * not re-copied on every piece.
+ */
+export class ByteQueue {
+  private chunks: Buffer[] = []
+  length = 0
+
+  push(chunk: Buffer): void {
+    if (chunk.length === 0) return
+    this.chunks.push(chunk)
+    this.length += chunk.length
+  }
+
+  /** Offset of the first `byte` at or after `from`, or -1. */
+  indexOf(byte: number, from = 0): number {
+    let base = 0
+    for (const chunk of this.chunks) {
+      if (from < base + chunk.length) {
+        const i = chunk.indexOf(byte, Math.max(0, from - base))
+        if (i !== -1) return base + i
+      }
+      base += chunk.length
+    }
+    return -1
+  }
+
+  /** The first `n` bytes without consuming them (n must be <= length). */
+  peek(n: number): Buffer {
+    return this.join(n).subarray(0, n)
+  }
+
+  /** Remove and return the first `n` bytes (n must be <= length). */
+  take(n: number): Buffer {
+    const out = this.join(n).subarray(0, n)
+    if (n === 0) return out
+    const rest = this.chunks[0].subarray(n)
+    if (rest.length) this.chunks[0] = rest
+    else this.chunks.shift()
+    this.length -= n
+    return out
+  }
+
+  /** Merge leading chunks until the first one holds at least `n` bytes. */
+  private join(n: number): Buffer {
+    if (n === 0) return Buffer.alloc(0)
+    if (this.chunks[0].length < n) {
+      let count = 0
+      let size = 0
+      while (size < n) size += this.chunks[count++].length
+      this.chunks.splice(0, count, Buffer.concat(this.chunks.slice(0, count), size))
+    }
+    return this.chunks[0]
+  }
+}
@@ -86,12 +86,19 @@ export interface SeparatorBlock {
   type: 'separator'
 }
 
+/**
+ * Document preview. New blocks reference the file in the Sprite's blob store
+ * by `blob` (SHA-256 hex) and `size`, fetched with blob_request; `data`
+ * (inline base64) only appears on blocks written before the blob store.
+ */
 export interface DocumentBlock {
   type: 'document'
   id: string
-  data: string       // base64-encoded file content
   mime_type: string   // e.g. 'application/pdf'
   filename: string
+  blob?: string       // SHA-256 hex of the file content
+  size?: number       // file size in bytes
+  data?: string       // legacy: base64-encoded file content
 }
 
 /** Union of all block types. */
@@ -162,6 +169,39 @@ export interface FileUploadMessage extends WebSocketMessageBase {
   }
 }
 
+/**
+ * Chunked upload, streamed to disk on the Sprite one chunk at a time.
+ * Each step is answered with a file_upload_ack carrying the bytes on disk;
+ * after a reconnect, send begin again with the same upload_id and continue
+ * from the acked offset.
+ */
+export interface FileUploadBegin extends WebSocketMessageBase {
+  type: 'file_upload_begin'
+  payload: {
+    upload_id: string
+    filename: string
+    mime_type: string
+    size: number  // total bytes, max 25MB
+  }
+}
+
+export interface FileUploadChunk extends WebSocketMessageBase {
+  type: 'file_upload_chunk'
+  payload: {
+    upload_id: string
+    offset: number  // byte offset of this chunk in the file
+    data: string    // Base64 encoded, max 1MB decoded
+  }
+}
+
+export interface FileUploadCommit extends WebSocketMessageBase {
+  type: 'file_upload_commit'
+  payload: {
+    upload_id: string
+    sha256?: string  // hex digest of the whole file, checked when present
+  }
+}
+
 /** Canvas interaction (user edited a cell, moved a card, etc.). */
 export type CanvasAction =
   | 'edit_cell' | 'resize' | 'move' | 'close'
@@ -185,6 +225,25 @@ export interface AuthConnect extends WebSocketMessageBase {
   }
 }
 
+/** Browser asks for workspace state (sent on sprite_ready). */
+export interface StateSyncRequest extends WebSocketMessageBase {
+  type: 'state_sync_request'
+  payload: {
+    since_revision?: number  // revision of the last state_sync; omit for a full sync
+    chunked?: boolean        // reply as a first paint frame + state_sync_chunk frames
+  }
+}
+
+/** Browser asks for a byte range of a stored blob (document preview). */
+export interface BlobRequest extends WebSocketMessageBase {
+  type: 'blob_request'
+  payload: {
+    blob: string
+    offset?: number   // default 0
+    length?: number   // capped by the Sprite (512 KiB)
+  }
+}
+
 // =============================================================================
 // Sprite -> Browser Messages
 // =============================================================================
@@ -239,6 +298,7 @@ export interface CanvasUpdate extends WebSocketMessageBase {
 
 /** Document status updates. */
 export type DocumentStatus =
+  | 'queued'
   | 'processing'
   | 'ocr_complete'
   | 'completed'
@@ -295,6 +355,13 @@ export interface ChatMessageInfo {
   timestamp: number
 }
 
+export type SyncMode = 'full' | 'delta'
+
+/**
+ * Workspace state. 'full' replaces the client's cards; 'delta' carries only
+ * cards written after since_revision plus deleted_card_ids. stacks and
+ * chat_history are always complete (chat_history empty when unchanged).
+ */
 export interface StateSyncMessage extends WebSocketMessageBase {
   type: 'state_sync'
   payload: {
@@ -302,6 +369,39 @@ export interface StateSyncMessage extends WebSocketMessageBase {
     active_stack_id: string
     cards: CardInfo[]
     chat_history: ChatMessageInfo[]
+    revision?: number
+    mode?: SyncMode
+    since_revision?: number
+    deleted_card_ids?: string[]
+    sync_id?: string      // chunked sync: state_sync_chunk frames follow
+    total_cards?: number  // chunked sync: cards across all frames
+  }
+}
+
+/** A slice of a document block's data, streamed after its card skeleton. */
+export interface BlockDataPart {
+  card_id: string
+  block_id: string
+  offset: number
+  data: string
+  final: boolean
+}
+
+/**
+ * Follow-up frame of a chunked state_sync: the active stack's document data,
+ * then the other stacks' card skeletons, then their document data.
+ * The last frame has done: true.
+ */
+export interface StateSyncChunk extends WebSocketMessageBase {
+  type: 'state_sync_chunk'
+  payload: {
+    sync_id: string
+    seq: number
+    cards: CardInfo[]
+    cards_sent: number
+    total_cards: number
+    done: boolean
+    block_data?: BlockDataPart[]
   }
 }
 
@@ -312,6 +412,7 @@ export type SystemEvent =
   | 'sprite_ready'
   | 'reconnect_failed'
   | 'error'
+  | 'db_stats' // browser asks; sprite replies with message = JSON query stats snapshot
 
 export interface SystemMessage extends WebSocketMessageBase {
   type: 'system'
@@ -325,12 +426,39 @@ export interface SystemMessage extends WebSocketMessageBase {
 // Union Types
 // =============================================================================
 
+/** One byte range of a blob, in reply to a blob_request (echoes its request_id). */
+export interface BlobData extends WebSocketMessageBase {
+  type: 'blob_data'
+  payload: {
+    blob: string
+    offset: number
+    data: string    // base64-encoded bytes
+    size: number    // total blob size in bytes
+    final: boolean  // range reaches the end of the blob
+  }
+}
+
+/** Reply to file_upload_begin/chunk/commit (echoes its request_id). */
+export interface FileUploadAck extends WebSocketMessageBase {
+  type: 'file_upload_ack'
+  payload: {
+    upload_id: string
+    offset: number  // bytes on disk: send the next chunk from here
+    size: number    // declared file size
+  }
+}
+
 /** Messages sent from Browser to Sprite (via Bridge). */
 export type BrowserToSpriteMessage =
   | MissionMessage
   | FileUploadMessage
   | CanvasInteraction
   | AuthConnect
+  | StateSyncRequest
+  | BlobRequest
+  | FileUploadBegin
+  | FileUploadChunk
+  | FileUploadCommit
 
 /** Messages sent from Sprite to Browser (via Bridge). */
 export type SpriteToBrowserMessage =
@@ -339,6 +467,9 @@ export type SpriteToBrowserMessage =
   | StatusUpdate
   | SystemMessage
   | StateSyncMessage
+  | StateSyncChunk
+  | BlobData
+  | FileUploadAck
 
 /** Any valid WebSocket message in the protocol. */
 export type ProtocolMessage = BrowserToSpriteMessage | SpriteToBrowserMessage
@@ -358,6 +489,13 @@ export const MESSAGE_TYPES = [
   'system',
   'state_sync',
   'state_sync_request',
+  'state_sync_chunk',
+  'blob_request',
+  'blob_data',
+  'file_upload_begin',
+  'file_upload_chunk',
+  'file_upload_commit',
+  'file_upload_ack',
 ] as const
 
 export type MessageType = (typeof MESSAGE_TYPES)[number]
@@ -465,6 +603,7 @@ export function isStatusUpdate(value: unknown): value is StatusUpdate {
   if (!isWebSocketMessage(value) || !hasPayload(value)) return false
   const msg = value as StatusUpdate
   const validStatuses: DocumentStatus[] = [
+    'queued',
     'processing',
     'ocr_complete',
     'completed',
@@ -487,6 +626,7 @@ export function isSystemMessage(value: unknown): value is SystemMessage {
     'sprite_ready',
     'reconnect_failed',
     'error',
+    'db_stats',
   ]
   return (
     msg.type === 'system' &&
@@ -507,6 +647,96 @@ export function isStateSyncMessage(value: unknown): value is StateSyncMessage {
   )
 }
 
+/** Validate a StateSyncChunk. */
+export function isStateSyncChunk(value: unknown): value is StateSyncChunk {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as StateSyncChunk
+  return (
+    msg.type === 'state_sync_chunk' &&
+    typeof msg.payload.sync_id === 'string' &&
+    typeof msg.payload.seq === 'number' &&
+    Array.isArray(msg.payload.cards) &&
+    typeof msg.payload.done === 'boolean'
+  )
+}
+
+/** Validate a BlobRequest. */
+export function isBlobRequest(value: unknown): value is BlobRequest {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as BlobRequest
+  return (
+    msg.type === 'blob_request' &&
+    typeof msg.payload.blob === 'string' &&
+    (msg.payload.offset === undefined || typeof msg.payload.offset === 'number')
+  )
+}
+
+/** Validate a BlobData. */
+export function isBlobData(value: unknown): value is BlobData {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as BlobData
+  return (
+    msg.type === 'blob_data' &&
+    typeof msg.payload.blob === 'string' &&
+    typeof msg.payload.offset === 'number' &&
+    typeof msg.payload.data === 'string' &&
+    typeof msg.payload.size === 'number' &&
+    typeof msg.payload.final === 'boolean'
+  )
+}
+
+function isOffset(value: unknown): value is number {
+  return typeof value === 'number' && Number.isInteger(value) && value >= 0
+}
+
+/** Validate a FileUploadBegin. */
+export function isFileUploadBegin(value: unknown): value is FileUploadBegin {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as FileUploadBegin
+  return (
+    msg.type === 'file_upload_begin' &&
+    typeof msg.payload.upload_id === 'string' &&
+    typeof msg.payload.filename === 'string' &&
+    typeof msg.payload.mime_type === 'string' &&
+    isOffset(msg.payload.size)
+  )
+}
+
+/** Validate a FileUploadChunk. */
+export function isFileUploadChunk(value: unknown): value is FileUploadChunk {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as FileUploadChunk
+  return (
+    msg.type === 'file_upload_chunk' &&
+    typeof msg.payload.upload_id === 'string' &&
+    isOffset(msg.payload.offset) &&
+    typeof msg.payload.data === 'string'
+  )
+}
+
+/** Validate a FileUploadCommit. */
+export function isFileUploadCommit(value: unknown): value is FileUploadCommit {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as FileUploadCommit
+  return (
+    msg.type === 'file_upload_commit' &&
+    typeof msg.payload.upload_id === 'string' &&
+    (msg.payload.sha256 === undefined || typeof msg.payload.sha256 === 'string')
+  )
+}
+
+/** Validate a FileUploadAck. */
+export function isFileUploadAck(value: unknown): value is FileUploadAck {
+  if (!isWebSocketMessage(value) || !hasPayload(value)) return false
+  const msg = value as FileUploadAck
+  return (
+    msg.type === 'file_upload_ack' &&
+    typeof msg.payload.upload_id === 'string' &&
+    isOffset(msg.payload.offset) &&
+    isOffset(msg.payload.size)
+  )
+}
+
 /** Validate any protocol message by dispatching to the correct type guard. */
 export function isProtocolMessage(value: unknown): value is ProtocolMessage {
   if (!isWebSocketMessage(value)) return false
@@ -530,6 +760,20 @@ export function isProtocolMessage(value: unknown): value is ProtocolMessage {
       return isSystemMessage(value)
     case 'state_sync':
       return isStateSyncMessage(value)
+    case 'state_sync_chunk':
+      return isStateSyncChunk(value)
+    case 'blob_request':
+      return isBlobRequest(value)
+    case 'blob_data':
+      return isBlobData(value)
+    case 'file_upload_begin':
+      return isFileUploadBegin(value)
+    case 'file_upload_chunk':
+      return isFileUploadChunk(value)
+    case 'file_upload_commit':
+      return isFileUploadCommit(value)
+    case 'file_upload_ack':
+      return isFileUploadAck(value)
     default:
       return false
   }
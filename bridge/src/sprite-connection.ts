@@ -1,5 +1,9 @@
-import { WebSocket } from 'ws'
+import { WebSocket, type RawData } from 'ws'
 import { buildProxyUrl } from './sprites-client.js'
+import {
+  ByteQueue, FRAMING_VERSION, FRAME_HEADER_BYTES, MAX_FRAME_BYTES,
+  chooseCodec, decodePayload, encodeFrame, type FrameCodec,
+} from './framing.js'
 
 export type SpriteConnectionState = 'connecting' | 'connected' | 'closed'
 
@@ -13,13 +17,27 @@ export interface SpriteConnectionOptions {
 }
 
 const INIT_TIMEOUT_MS = 15_000
+const NEWLINE = 0x0a
+// Link negotiation lines from the Sprite (see framing.ts); never forwarded
+const LINK_OFFER_PREFIX = '{"type": "link_offer"'
+const LINK_ACK_PREFIX = '{"type": "link_ack"'
+
+function toBuffer(raw: RawData): Buffer {
+  if (Buffer.isBuffer(raw)) return raw
+  if (Array.isArray(raw)) return Buffer.concat(raw)
+  return Buffer.from(raw)
+}
 
 export class SpriteConnection {
   readonly spriteName: string
   private ws: WebSocket | null = null
   private _state: SpriteConnectionState = 'connecting'
   private opts: SpriteConnectionOptions
-  private _lineBuffer = ''
+  private _rx = new ByteQueue()
+  private _rxScanned = 0          // bytes of _rx already searched for a newline
+  private _rxFramed = false       // Sprite output is framed (after link_ack)
+  private _txFramed = false       // our output is framed (after link_select)
+  private _codec: FrameCodec | null = null
 
   get state(): SpriteConnectionState {
     return this._state
@@ -76,18 +94,11 @@ export class SpriteConnection {
           return
         }
 
-        // After init, proxy sends binary frames -- decode to string lines.
-        // TCP frames can split mid-line, so buffer incomplete segments.
-        const text = Buffer.isBuffer(raw) ? raw.toString('utf-8') : raw.toString()
-        const combined = this._lineBuffer + text
-        const segments = combined.split('\n')
-        // Last segment is incomplete if text didn't end with newline
-        this._lineBuffer = segments.pop()!
-        for (const line of segments) {
-          if (line.trim()) {
-            this.opts.onMessage(line)
-          }
-        }
+        // After init, the proxy forwards raw TCP bytes: newline-delimited
+        // JSON, or length-prefixed frames once negotiated. TCP segments can
+        // split a message anywhere, so bytes are buffered until it is whole.
+        this._rx.push(toBuffer(raw))
+        this.drain()
       })
 
       this.ws.on('error', (err) => {
@@ -115,6 +126,70 @@ export class SpriteConnection {
     })
   }
 
+  /** Deliver every complete message in the receive buffer. */
+  private drain(): void {
+    while (this._state === 'connected') {
+      if (this._rxFramed) {
+        if (this._rx.length < FRAME_HEADER_BYTES) return
+        const header = this._rx.peek(FRAME_HEADER_BYTES)
+        const length = header.readUInt32BE(1)
+        if (length > MAX_FRAME_BYTES) {
+          this.opts.onError?.(new Error(`Sprite frame of ${length} bytes exceeds limit`))
+          this.close(4002, 'Oversized frame')
+          return
+        }
+        if (this._rx.length < FRAME_HEADER_BYTES + length) return
+        this._rx.take(FRAME_HEADER_BYTES)
+        let text: string
+        try {
+          text = decodePayload(header.readUInt8(0), this._rx.take(length)).toString('utf-8')
+        } catch (err) {
+          this.opts.onError?.(err instanceof Error ? err : new Error(String(err)))
+          this.close(4002, 'Bad frame')
+          return
+        }
+        this.opts.onMessage(text)
+        continue
+      }
+
+      const nl = this._rx.indexOf(NEWLINE, this._rxScanned)
+      if (nl === -1) {
+        this._rxScanned = this._rx.length
+        return
+      }
+      const line = this._rx.take(nl).toString('utf-8')
+      this._rx.take(1)
+      this._rxScanned = 0
+      if (line.trim() && !this.handleLinkLine(line)) {
+        this.opts.onMessage(line)
+      }
+    }
+  }
+
+  /** Negotiate framing from the Sprite's link_offer / link_ack lines. True if consumed. */
+  private handleLinkLine(line: string): boolean {
+    if (line.startsWith(LINK_OFFER_PREFIX) && !this._txFramed) {
+      let offer: { framing?: unknown; codecs?: unknown }
+      try {
+        offer = JSON.parse(line)
+      } catch {
+        return false
+      }
+      if (offer.framing !== FRAMING_VERSION) return true
+      this._codec = chooseCodec(offer.codecs)
+      this.ws!.send(Buffer.from(JSON.stringify({
+        type: 'link_select', framing: FRAMING_VERSION, codec: this._codec,
+      }) + '\n', 'utf-8'))
+      this._txFramed = true
+      return true
+    }
+    if (line.startsWith(LINK_ACK_PREFIX) && this._txFramed) {
+      this._rxFramed = true
+      return true
+    }
+    return false
+  }
+
   /** Swap the onMessage handler. Returns the previous handler for restoration. */
   replaceMessageHandler(handler: (data: string) => void): (data: string) => void {
     const prev = this.opts.onMessage
@@ -122,13 +197,15 @@ export class SpriteConnection {
     return prev
   }
 
-  /** Send a message to the Sprite via TCP proxy as binary (newline-delimited). */
+  /** Send a message to the Sprite via TCP proxy (a line, or a frame once negotiated). */
   send(data: string): boolean {
     if (this._state !== 'connected' || !this.ws || this.ws.readyState !== WebSocket.OPEN) {
       return false
     }
     // TCP proxy only forwards binary frames — send as Buffer
-    this.ws.send(Buffer.from(data + '\n', 'utf-8'))
+    this.ws.send(this._txFramed
+      ? encodeFrame(Buffer.from(data, 'utf-8'), this._codec)
+      : Buffer.from(data + '\n', 'utf-8'))
     return true
   }
 
@@ -1,4 +1,5 @@
 import { describe, it, expect, vi, beforeAll, afterAll, afterEach } from 'vitest'
+import zlib from 'node:zlib'
 import { WebSocket, WebSocketServer } from 'ws'
 import { SpriteConnection } from '../src/sprite-connection.js'
 
@@ -197,3 +198,99 @@ describe('SpriteConnection: post-init error handling', () => {
     expect(onError).toHaveBeenCalled()
   })
 })
+
+describe('SpriteConnection: framing negotiation', () => {
+  beforeAll(async () => {
+    mockPort = 19881
+    await startMockProxy(mockPort)
+  })
+
+  afterAll(async () => {
+    await stopMockProxy()
+  })
+
+  afterEach(() => {
+    vi.restoreAllMocks()
+  })
+
+  function frame(codecId: number, payload: Buffer): Buffer {
+    const header = Buffer.alloc(5)
+    header.writeUInt8(codecId, 0)
+    header.writeUInt32BE(payload.length, 1)
+    return Buffer.concat([header, payload])
+  }
+
+  it('selects a codec on link_offer and switches both directions to frames', async () => {
+    const messages: string[] = []
+    const received: Buffer[] = []
+
+    vi.spyOn(await import('../src/sprites-client.js'), 'buildProxyUrl')
+      .mockReturnValue(`ws://localhost:${mockPort}`)
+
+    const conn = new SpriteConnection({
+      spriteName: 'test-sprite',
+      token: 'test-token',
+      onMessage: (data) => messages.push(data),
+      onClose: vi.fn(),
+    })
+    await conn.connect()
+
+    const spriteWs = mockClients[mockClients.length - 1]
+    spriteWs.on('message', (raw) => received.push(raw as Buffer))
+
+    // A line sent before the offer is still delivered as a line
+    spriteWs.send('{"type":"before","id":"0","timestamp":0}\n')
+    spriteWs.send('{"type": "link_offer", "framing": 1, "codecs": ["deflate"]}\n')
+    await new Promise((r) => setTimeout(r, 50))
+
+    expect(messages).toEqual(['{"type":"before","id":"0","timestamp":0}'])
+    const select = JSON.parse(received[0].toString())
+    expect(select).toEqual({ type: 'link_select', framing: 1, codec: 'deflate' })
+
+    // Sprite acks, then frames: one raw, one deflated, split mid-header
+    const big = JSON.stringify({ type: 'state_sync', id: '1', timestamp: 1, payload: { pad: 'x'.repeat(5000) } })
+    const bytes = Buffer.concat([
+      Buffer.from('{"type": "link_ack", "framing": 1, "codec": "deflate"}\n'),
+      frame(0, Buffer.from('{"type":"small","id":"2","timestamp":2}')),
+      frame(1, zlib.deflateSync(Buffer.from(big))),
+    ])
+    spriteWs.send(bytes.subarray(0, 70))
+    spriteWs.send(bytes.subarray(70))
+    await new Promise((r) => setTimeout(r, 50))
+
+    expect(messages.slice(1)).toEqual(['{"type":"small","id":"2","timestamp":2}', big])
+
+    // Our output after link_select is framed (compressed above the threshold)
+    conn.send(big)
+    await new Promise((r) => setTimeout(r, 50))
+    const out = received[received.length - 1]
+    expect(out.readUInt8(0)).toBe(1)
+    expect(out.readUInt32BE(1)).toBe(out.length - 5)
+    expect(zlib.inflateSync(out.subarray(5)).toString()).toBe(big)
+
+    conn.close()
+  })
+
+  it('stays on lines when the Sprite never offers framing', async () => {
+    const received: Buffer[] = []
+
+    vi.spyOn(await import('../src/sprites-client.js'), 'buildProxyUrl')
+      .mockReturnValue(`ws://localhost:${mockPort}`)
+
+    const conn = new SpriteConnection({
+      spriteName: 'test-sprite',
+      token: 'test-token',
+      onMessage: vi.fn(),
+      onClose: vi.fn(),
+    })
+    await conn.connect()
+
+    const spriteWs = mockClients[mockClients.length - 1]
+    spriteWs.on('message', (raw) => received.push(raw as Buffer))
+    conn.send('{"type":"ping"}')
+    await new Promise((r) => setTimeout(r, 50))
+
+    expect(received.map((b) => b.toString())).toEqual(['{"type":"ping"}\n'])
+    conn.close()
+  })
+})
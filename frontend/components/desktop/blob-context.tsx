@@ -0,0 +1,37 @@
+'use client'
+
+import { createContext, useContext, useEffect, useState } from 'react'
+
+/** Fetches a whole blob from the Sprite's blob store by its SHA-256 hash. */
+export type BlobReader = (blob: string, mimeType: string) => Promise<Blob>
+
+export const BlobReaderContext = createContext<BlobReader | null>(null)
+
+/**
+ * Object URL for a stored blob, or null while loading (or without a reader,
+ * e.g. outside the WebSocketProvider). Pass undefined to skip fetching.
+ */
+export function useBlobUrl(blob: string | undefined, mimeType: string): string | null {
+  const readBlob = useContext(BlobReaderContext)
+  const [url, setUrl] = useState<string | null>(null)
+
+  useEffect(() => {
+    if (!blob || !readBlob) return
+    let cancelled = false
+    let objectUrl: string | null = null
+    readBlob(blob, mimeType)
+      .then((data) => {
+        if (cancelled) return
+        objectUrl = URL.createObjectURL(data)
+        setUrl(objectUrl)
+      })
+      .catch(() => { /* preview stays on the filename fallback */ })
+    return () => {
+      cancelled = true
+      if (objectUrl) URL.revokeObjectURL(objectUrl)
+      setUrl(null)
+    }
+  }, [blob, mimeType, readBlob])
+
+  return url
+}
@@ -10,6 +10,7 @@ import type {
   TextBlock,
   DocumentBlock,
 } from '@/types/ws-protocol'
+import { useBlobUrl } from './blob-context'
 
 type Theme = 'editorial' | 'glass'
 
@@ -198,14 +199,17 @@ function Text({ content, theme }: TextBlock & { theme: Theme }) {
   return <p className="whitespace-pre-wrap text-[13px] leading-relaxed text-white/75">{content}</p>
 }
 
-function Document({ data, mime_type, filename, theme }: DocumentBlock & { theme: Theme }) {
-  const dataUri = `data:${mime_type};base64,${data}`
+function Document({ data, blob, mime_type, filename, theme }: DocumentBlock & { theme: Theme }) {
+  const isPdf = mime_type === 'application/pdf'
+  // Legacy blocks embed base64; newer ones reference the blob store and load on demand
+  const blobUrl = useBlobUrl(isPdf && !data ? blob : undefined, mime_type)
+  const src = data ? `data:${mime_type};base64,${data}` : blobUrl
   const ed = theme === 'editorial'
 
-  if (mime_type === 'application/pdf') {
+  if (isPdf && src) {
     return (
       <div className={`overflow-hidden rounded-lg border ${ed ? 'border-black/12' : 'border-white/10'}`}>
-        <object data={dataUri} type="application/pdf" className="w-full" style={{ height: 480 }}>
+        <object data={src} type="application/pdf" className="w-full" style={{ height: 480 }}>
           <div className={`flex items-center gap-2 p-4 text-[17px] font-semibold ${ed ? 'text-[#1A1A18]' : 'text-white/60'}`}>
             <span>{filename}</span>
           </div>
@@ -13,10 +13,14 @@ import {
 import { useAuth } from '@clerk/nextjs'
 import { toast } from 'sonner'
 import { WebSocketManager, type ConnectionStatus, type SendResult } from '@/lib/websocket'
-import type { SpriteToBrowserMessage, BrowserToSpriteMessage, ChatMessageInfo, CardInfo } from '@/types/ws-protocol'
-import { useDesktopStore, type DesktopCard } from '@/lib/stores/desktop-store'
+import type {
+  SpriteToBrowserMessage, BrowserToSpriteMessage, ChatMessageInfo, CardInfo, BlobData,
+  FileUploadAck, FileUploadBegin, FileUploadChunk, FileUploadCommit,
+} from '@/types/ws-protocol'
+import { useDesktopStore, type DesktopCard, type ViewState } from '@/lib/stores/desktop-store'
 import { useChatStore } from '@/lib/stores/chat-store'
 import { getAutoPosition } from './auto-placer'
+import { BlobReaderContext } from './blob-context'
 import { type DebugLogEntry, DEBUG_LOG_MAX } from '@/components/debug/types'
 
 interface WebSocketContextValue {
@@ -25,11 +29,61 @@ interface WebSocketContextValue {
   connect: () => void
   disconnect: () => void
   send: (msg: Omit<BrowserToSpriteMessage, 'id' | 'timestamp'>) => SendResult
+  /** Stream a file to the Sprite in chunks, resuming across reconnects. */
+  uploadFile: (file: File) => Promise<void>
   debugLog: RefObject<DebugLogEntry[]>
 }
 
 const WebSocketContext = createContext<WebSocketContextValue | null>(null)
 
+const BLOB_RANGE_TIMEOUT_MS = 30_000
+
+interface PendingBlobRange {
+  resolve: (range: BlobData['payload']) => void
+  reject: (err: Error) => void
+  timer: ReturnType<typeof setTimeout>
+}
+
+// Chunked uploads: one chunk per message, each acked with the bytes on disk
+const UPLOAD_CHUNK_BYTES = 256 * 1024
+const UPLOAD_ACK_TIMEOUT_MS = 30_000
+const UPLOAD_ATTEMPTS = 5
+const UPLOAD_RETRY_MS = 3_000
+
+type UploadStep =
+  | Pick<FileUploadBegin, 'type' | 'payload'>
+  | Pick<FileUploadChunk, 'type' | 'payload'>
+  | Pick<FileUploadCommit, 'type' | 'payload'>
+
+interface PendingUploadAck {
+  resolve: (ack: FileUploadAck['payload']) => void
+  reject: (err: Error) => void
+  timer: ReturnType<typeof setTimeout>
+}
+
+/** The Sprite refused an upload step; retrying the same bytes will not help. */
+class UploadRejectedError extends Error {}
+
+function bytesToBase64(bytes: Uint8Array): string {
+  let binary = ''
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    binary += String.fromCharCode(...bytes.subarray(i, i + 0x8000))
+  }
+  return btoa(binary)
+}
+
+async function sha256Hex(file: File): Promise<string> {
+  const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await file.arrayBuffer()))
+  return Array.from(digest, (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+function base64ToBytes(data: string): Uint8Array {
+  const binary = atob(data)
+  const bytes = new Uint8Array(binary.length)
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i)
+  return bytes
+}
+
 export function useWebSocket(): WebSocketContextValue {
   const ctx = useContext(WebSocketContext)
   if (!ctx) throw new Error('useWebSocket must be used within WebSocketProvider')
@@ -59,6 +113,31 @@ function mapCardFields(c: Partial<CardInfo>): Partial<Omit<DesktopCard, 'id' | '
   return mapped
 }
 
+/**
+ * Map CardInfo (snake_case) -> DesktopCard (camelCase) into `record`.
+ * Cards with the default (0,0) position get an auto-placed one; cards without
+ * a z_index stack above `zBase`.
+ */
+function applyCardInfos(
+  record: Record<string, DesktopCard>,
+  cards: CardInfo[],
+  view: ViewState,
+  zBase: number,
+): void {
+  let idx = 0
+  for (const c of cards) {
+    const needsPosition = c.position.x === 0 && c.position.y === 0
+    const position = needsPosition ? getAutoPosition(record, view) : c.position
+    record[c.id] = {
+      id: c.id,
+      position,
+      zIndex: c.z_index || zBase + idx + 1,
+      ...mapCardFields(c),
+    } as DesktopCard
+    idx++
+  }
+}
+
 function summarizeInbound(msg: SpriteToBrowserMessage): string {
   switch (msg.type) {
     case 'agent_event': {
@@ -71,7 +150,13 @@ function summarizeInbound(msg: SpriteToBrowserMessage): string {
     case 'canvas_update':
       return `Canvas: ${msg.payload.command} ${msg.payload.card_id}`
     case 'state_sync':
-      return `Sync: ${msg.payload.stacks.length} stacks, ${msg.payload.cards.length} cards, ${msg.payload.chat_history.length} msgs`
+      return `Sync (${msg.payload.mode ?? 'full'}): ${msg.payload.stacks.length} stacks, ${msg.payload.cards.length} cards, ${msg.payload.chat_history.length} msgs`
+    case 'blob_data':
+      return `Blob ${msg.payload.blob.slice(0, 12)}: ${msg.payload.offset}+${msg.payload.data.length} b64 of ${msg.payload.size} bytes`
+    case 'file_upload_ack':
+      return `Upload ${msg.payload.upload_id.slice(0, 8)}: ${msg.payload.offset}/${msg.payload.size} bytes`
+    case 'state_sync_chunk':
+      return `Sync chunk ${msg.payload.seq}: ${msg.payload.cards_sent}/${msg.payload.total_cards} cards${msg.payload.done ? ' (done)' : ''}`
     case 'status':
       return `Status: ${msg.payload.document_id} ${msg.payload.status}`
     case 'system':
@@ -91,10 +176,20 @@ function summarizeOutbound(msg: Omit<BrowserToSpriteMessage, 'id' | 'timestamp'>
     }
     case 'file_upload':
       return `Upload: ${p.filename}`
+    case 'file_upload_begin':
+      return `Upload begin: ${p.filename} (${p.size} bytes)`
+    case 'file_upload_chunk':
+      return `Upload chunk @ ${p.offset}`
+    case 'file_upload_commit':
+      return `Upload commit ${String(p.upload_id).slice(0, 8)}`
     case 'canvas_interaction':
       return `Canvas: ${p.action} on ${p.card_id}`
     case 'auth':
       return 'Auth: token sent'
+    case 'blob_request':
+      return `Blob request ${String(p.blob).slice(0, 12)} @ ${p.offset ?? 0}`
+    case 'state_sync_request':
+      return `Sync request${p.since_revision !== undefined ? ` since ${p.since_revision}` : ''}`
     default:
       return msg.type
   }
@@ -108,6 +203,15 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
   const getTokenRef = useRef(getToken)
   useEffect(() => { getTokenRef.current = getToken }, [getToken])
   const debugLogRef = useRef<DebugLogEntry[]>([])
+  // Workspace revision of the last applied state_sync (null until the first one)
+  const syncRevisionRef = useRef<number | null>(null)
+  // Chunked sync in progress: revision to adopt on its last frame, partial document data
+  const chunkedSyncRef = useRef<{ syncId: string; revision?: number; blockData: Map<string, string> } | null>(null)
+  // blob_request replies by request_id; fetched blobs by hash (content-addressed, so never stale)
+  const blobRangesRef = useRef(new Map<string, PendingBlobRange>())
+  const blobCacheRef = useRef(new Map<string, Promise<Blob>>())
+  // Chunked upload acks by request_id
+  const uploadAcksRef = useRef(new Map<string, PendingUploadAck>())
 
   const pushDebug = useCallback((
     direction: DebugLogEntry['direction'],
@@ -169,8 +273,9 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
       }
 
       case 'state_sync': {
-        const { stacks, active_stack_id, cards, chat_history } = message.payload
+        const { stacks, active_stack_id, cards, chat_history, revision, mode, since_revision, deleted_card_ids, sync_id } = message.payload
         const store = useDesktopStore.getState()
+        const isDelta = mode === 'delta'
         const chat = useChatStore.getState()
 
         // State sync means fresh server state; any in-flight stream is stale
@@ -184,23 +289,10 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
           archivedStackIds: prev.archivedStackIds.filter((id) => serverStackIds.has(id)),
         }))
 
-        // Map CardInfo (snake_case) -> DesktopCard (camelCase)
-        // Use getAutoPosition for cards with default (0,0) position
-        const cardRecord: Record<string, DesktopCard> = {}
-        let idx = 0
-        for (const c of cards) {
-          const needsPosition = c.position.x === 0 && c.position.y === 0
-          const position = needsPosition
-            ? getAutoPosition(cardRecord, store.view)
-            : c.position
-          cardRecord[c.id] = {
-            id: c.id,
-            position,
-            zIndex: c.z_index || idx + 1,
-            ...mapCardFields(c),
-          } as DesktopCard
-          idx++
-        }
+        // A delta applies on top of the cards we have; a full sync replaces them
+        const cardRecord: Record<string, DesktopCard> = isDelta ? { ...store.cards } : {}
+        for (const id of deleted_card_ids ?? []) delete cardRecord[id]
+        applyCardInfos(cardRecord, cards, store.view, isDelta ? store.maxZIndex : 0)
         store.mergeCards(cardRecord)
 
         // Map chat history — Sprite stores "assistant", frontend uses "agent"
@@ -216,7 +308,71 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
           content: m.content,
           timestamp: m.timestamp,
         }))
-        chat.mergeMessages(mapped, message.timestamp)
+        if (!isDelta || mapped.length > 0) chat.mergeMessages(mapped, message.timestamp)
+
+        // Another tab's delta may start past what we have; keep our older revision then
+        const adopt = revision !== undefined && (!isDelta || (since_revision ?? 0) <= (syncRevisionRef.current ?? -1))
+        if (sync_id) {
+          // Chunked: the revision only holds once the last chunk has arrived
+          chunkedSyncRef.current = { syncId: sync_id, revision: adopt ? revision : undefined, blockData: new Map() }
+        } else if (adopt) {
+          syncRevisionRef.current = revision
+        }
+        break
+      }
+
+      case 'state_sync_chunk': {
+        const { sync_id, cards, block_data, done } = message.payload
+        const pending = chunkedSyncRef.current
+        if (!pending || pending.syncId !== sync_id) break
+        const store = useDesktopStore.getState()
+
+        const cardRecord: Record<string, DesktopCard> = { ...store.cards }
+        applyCardInfos(cardRecord, cards, store.view, store.maxZIndex)
+
+        // Reassemble sliced document data; fill the block once its final slice lands
+        for (const part of block_data ?? []) {
+          const key = `${part.card_id}/${part.block_id}`
+          const data = (pending.blockData.get(key) ?? '') + part.data
+          if (!part.final) {
+            pending.blockData.set(key, data)
+            continue
+          }
+          pending.blockData.delete(key)
+          const card = cardRecord[part.card_id]
+          if (card?.blocks) {
+            cardRecord[part.card_id] = {
+              ...card,
+              blocks: card.blocks.map((b) => (b.id === part.block_id ? { ...b, data } as typeof b : b)),
+            }
+          }
+        }
+        store.mergeCards(cardRecord)
+
+        if (done) {
+          if (pending.revision !== undefined) syncRevisionRef.current = pending.revision
+          chunkedSyncRef.current = null
+        }
+        break
+      }
+
+      case 'blob_data': {
+        const pending = message.request_id ? blobRangesRef.current.get(message.request_id) : undefined
+        if (pending) {
+          blobRangesRef.current.delete(message.request_id!)
+          clearTimeout(pending.timer)
+          pending.resolve(message.payload)
+        }
+        break
+      }
+
+      case 'file_upload_ack': {
+        const pending = message.request_id ? uploadAcksRef.current.get(message.request_id) : undefined
+        if (pending) {
+          uploadAcksRef.current.delete(message.request_id!)
+          clearTimeout(pending.timer)
+          pending.resolve(message.payload)
+        }
         break
       }
 
@@ -230,8 +386,32 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
         break
       }
 
-      case 'system':
+      case 'system': {
+        const pendingBlob = message.request_id ? blobRangesRef.current.get(message.request_id) : undefined
+        if (pendingBlob && message.payload.event === 'error') {
+          blobRangesRef.current.delete(message.request_id!)
+          clearTimeout(pendingBlob.timer)
+          pendingBlob.reject(new Error(message.payload.message ?? 'Blob request failed'))
+        }
+        const pendingUpload = message.request_id ? uploadAcksRef.current.get(message.request_id) : undefined
+        if (pendingUpload && message.payload.event === 'error') {
+          uploadAcksRef.current.delete(message.request_id!)
+          clearTimeout(pendingUpload.timer)
+          pendingUpload.reject(new UploadRejectedError(message.payload.message ?? 'Upload failed'))
+        }
+        // Pull state on every (re)connect; with a known revision the Sprite replies with a delta
+        if (message.payload.event === 'sprite_ready') {
+          const request = {
+            type: 'state_sync_request' as const,
+            payload: syncRevisionRef.current === null
+              ? { chunked: true }
+              : { since_revision: syncRevisionRef.current, chunked: true },
+          }
+          const result = managerRef.current?.send(request) ?? 'dropped'
+          pushDebug('outbound', request.type, `[${result}] ${summarizeOutbound(request)}`, request)
+        }
         break
+      }
     }
   }, [pushDebug])
 
@@ -264,7 +444,10 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
     (msg: Omit<BrowserToSpriteMessage, 'id' | 'timestamp'>): SendResult => {
       const result = managerRef.current?.send(msg) ?? 'dropped'
       if (result !== 'dropped') {
-        const redacted = msg.type === 'auth' ? { ...msg, payload: { token: '[REDACTED]' } } : msg
+        const redacted = msg.type === 'auth' ? { ...msg, payload: { token: '[REDACTED]' } }
+          // Keep 256 KiB chunks out of the debug log
+          : msg.type === 'file_upload_chunk' ? { ...msg, payload: { ...msg.payload, data: '[chunk]' } }
+          : msg
         pushDebug('outbound', msg.type, `[${result}] ${summarizeOutbound(msg)}`, redacted)
       }
       return result
@@ -272,6 +455,87 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
     [pushDebug]
   )
 
+  const requestBlobRange = useCallback((blob: string, offset: number): Promise<BlobData['payload']> => {
+    return new Promise((resolve, reject) => {
+      const requestId = crypto.randomUUID()
+      const timer = setTimeout(() => {
+        blobRangesRef.current.delete(requestId)
+        reject(new Error('Blob request timed out'))
+      }, BLOB_RANGE_TIMEOUT_MS)
+      blobRangesRef.current.set(requestId, { resolve, reject, timer })
+      const result = send({ type: 'blob_request', request_id: requestId, payload: { blob, offset } })
+      if (result === 'dropped') {
+        blobRangesRef.current.delete(requestId)
+        clearTimeout(timer)
+        reject(new Error('Not connected'))
+      }
+    })
+  }, [send])
+
+  const readBlob = useCallback((blob: string, mimeType: string): Promise<Blob> => {
+    const cached = blobCacheRef.current.get(blob)
+    if (cached) return cached
+    const promise = (async () => {
+      const parts: Uint8Array[] = []
+      let offset = 0
+      for (;;) {
+        const range = await requestBlobRange(blob, offset)
+        const bytes = base64ToBytes(range.data)
+        parts.push(bytes)
+        offset += bytes.length
+        if (range.final || bytes.length === 0) break
+      }
+      return new Blob(parts as BlobPart[], { type: mimeType })
+    })()
+    // Drop failures so the next render retries
+    promise.catch(() => blobCacheRef.current.delete(blob))
+    blobCacheRef.current.set(blob, promise)
+    return promise
+  }, [requestBlobRange])
+
+  const sendUploadStep = useCallback((step: UploadStep): Promise<FileUploadAck['payload']> => {
+    return new Promise((resolve, reject) => {
+      const requestId = crypto.randomUUID()
+      const timer = setTimeout(() => {
+        uploadAcksRef.current.delete(requestId)
+        reject(new Error('Upload timed out'))
+      }, UPLOAD_ACK_TIMEOUT_MS)
+      uploadAcksRef.current.set(requestId, { resolve, reject, timer })
+      const result = send({ ...step, request_id: requestId })
+      if (result === 'dropped') {
+        uploadAcksRef.current.delete(requestId)
+        clearTimeout(timer)
+        reject(new Error('Not connected'))
+      }
+    })
+  }, [send])
+
+  const uploadFile = useCallback(async (file: File): Promise<void> => {
+    const uploadId = crypto.randomUUID()
+    const sha256 = await sha256Hex(file)
+    for (let attempt = 1; ; attempt++) {
+      try {
+        // begin answers with the bytes the Sprite already has, so a retry resumes
+        let { offset } = await sendUploadStep({
+          type: 'file_upload_begin',
+          payload: { upload_id: uploadId, filename: file.name, mime_type: file.type, size: file.size },
+        })
+        while (offset < file.size) {
+          const bytes = new Uint8Array(await file.slice(offset, offset + UPLOAD_CHUNK_BYTES).arrayBuffer())
+          ;({ offset } = await sendUploadStep({
+            type: 'file_upload_chunk',
+            payload: { upload_id: uploadId, offset, data: bytesToBase64(bytes) },
+          }))
+        }
+        await sendUploadStep({ type: 'file_upload_commit', payload: { upload_id: uploadId, sha256 } })
+        return
+      } catch (err) {
+        if (err instanceof UploadRejectedError || attempt >= UPLOAD_ATTEMPTS) throw err
+        await new Promise((resolve) => setTimeout(resolve, UPLOAD_RETRY_MS))
+      }
+    }
+  }, [sendUploadStep])
+
   // Auto-connect on mount, destroy on unmount
   useEffect(() => {
     connect()
@@ -279,8 +543,10 @@ export function WebSocketProvider({ children }: { children: ReactNode }) {
   }, [connect])
 
   return (
-    <WebSocketContext.Provider value={{ status, error, connect, disconnect, send, debugLog: debugLogRef }}>
-      {children}
+    <WebSocketContext.Provider value={{ status, error, connect, disconnect, send, uploadFile, debugLog: debugLogRef }}>
+      <BlobReaderContext.Provider value={readBlob}>
+        {children}
+      </BlobReaderContext.Provider>
     </WebSocketContext.Provider>
   )
 }
@@ -9,7 +9,7 @@ const ALLOWED_TYPES = new Set(['application/pdf', 'image/png', 'image/jpeg'])
 const ALLOWED_EXTS = /\.(pdf|png|jpg|jpeg)$/i
 
 export function useFileUpload() {
-  const { send } = useWebSocket()
+  const { uploadFile } = useWebSocket()
 
   const sendUpload = useCallback((file: File): boolean => {
     if (!ALLOWED_TYPES.has(file.type) && !ALLOWED_EXTS.test(file.name)) {
@@ -21,19 +21,12 @@ export function useFileUpload() {
       return false
     }
 
-    const reader = new FileReader()
-    reader.onload = () => {
-      const dataUrl = reader.result as string
-      // Strip data:...;base64, prefix
-      const data = dataUrl.slice(dataUrl.indexOf(',') + 1)
-      send({
-        type: 'file_upload',
-        payload: { filename: file.name, mime_type: file.type, data },
-      })
-    }
-    reader.readAsDataURL(file)
+    // Chunked and resumable: the Sprite never holds the whole file in memory
+    uploadFile(file).catch((err: Error) => {
+      toast.error(`Upload of ${file.name} failed: ${err.message}`)
+    })
     return true
-  }, [send])
+  }, [uploadFile])
 
   return { sendUpload }
 }
@@ -0,0 +1,97 @@
+"""Benchmark: socket writes and CPU per streamed turn, with and without batching.
+
+Replays a streamed agent turn through SpriteLink on loopback: --events
+agent_event text chunks arriving in bursts of --burst (the SDK yields
+several blocks per read), each burst --gap-ms apart, then a canvas_update
+and the complete event. A client playing the Bridge reads until it has
+every message. Reports, per batch window:
+
+  writes     transport write() calls for the turn (one send syscall each)
+  cpu ms     process CPU time for the turn (both ends of the socket)
+  last ms    time from the first send until the client has the last line
+
+Run from sprite/:
+    python -m benchmarks.bench_batching [--events 400] [--burst 8] [--gap-ms 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from src.framing import BATCH_WINDOW, SpriteLink
+
+
+def _turn(events: int) -> list[str]:
+    envelope = {"id": "3f9c2a1e-1111-4c6a-9a57-2f1d3a0b9e77", "timestamp": 1760000000000}
+    out = [json.dumps({"type": "agent_event", "payload": {
+        "event_type": "text", "content": f"chunk {i} of the summary "}, **envelope}) for i in range(events)]
+    out.append(json.dumps({"type": "canvas_update", "payload": {
+        "command": "update_card", "card_id": "c1", "title": "Invoice"}, **envelope}))
+    out.append(json.dumps({"type": "agent_event", "payload": {"event_type": "complete", "content": ""},
+                           **envelope}))
+    return out
+
+
+async def _replay(window: float, turn: list[str], burst: int, gap: float) -> tuple[int, float, float]:
+    done = asyncio.get_running_loop().create_future()
+    links: list[SpriteLink] = []
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        link = SpriteLink(reader, writer, batch_window=window)
+        links.append(link)
+        await done
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+    while not links:
+        await asyncio.sleep(0)
+    link = links[0]
+
+    async def receive() -> float:
+        for _ in turn:
+            await reader.readline()
+        return time.perf_counter()
+
+    receiver = asyncio.create_task(receive())
+    start, cpu = time.perf_counter(), time.process_time()
+    for i, data in enumerate(turn):
+        await link.send(data)
+        if (i + 1) % burst == 0:
+            await asyncio.sleep(gap)
+    await link.flush()  # what the runtime does when the turn completes
+    last = await receiver
+    cpu = time.process_time() - cpu  # sleeps are not CPU time; includes the client reading
+
+    done.set_result(None)
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return link.writes, cpu, last - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--burst", type=int, default=8)
+    parser.add_argument("--gap-ms", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    turn = _turn(args.events)
+    print(f"{'window':>10}{'writes':>10}{'cpu ms':>10}{'last ms':>10}")
+    for window in (0.0, BATCH_WINDOW):
+        runs = [await _replay(window, turn, args.burst, args.gap_ms / 1000) for _ in range(args.repeat)]
+        writes = runs[-1][0]
+        cpu = statistics.median(r[1] for r in runs) * 1000
+        last = statistics.median(r[2] for r in runs) * 1000
+        label = "off" if window == 0 else f"{window * 1000:g} ms"
+        print(f"{label:>10}{writes:>10}{cpu:>10.2f}{last:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""Benchmark: bytes on the wire and latency of the Bridge <-> Sprite link.
+
+Runs an echo server through SpriteLink on loopback and sends
+representative messages from a client playing the Bridge, once over the
+line protocol and once per codec over negotiated frames:
+
+  agent_event    a streamed text chunk (below the compression threshold)
+  canvas_update  create_card with a --rows row table
+  state_sync     full sync of --cards table cards
+  file_upload    a --upload-kb PDF as base64
+
+Each message makes a round trip (client -> Sprite -> client). Loopback
+has no bandwidth limit, so the reported latency adds the time the bytes
+would need on a --mbps link (the Sprites TCP proxy path) to the measured
+round trip, which includes compression and decompression on both sides.
+
+Run from sprite/:
+    python -m benchmarks.bench_framing [--rows 500] [--cards 200] [--upload-kb 2048] [--mbps 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import struct
+import time
+
+from src.framing import SpriteLink, decode_payload, encode_frame, supported_codecs
+
+
+def _table(rows: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    rows_out = []
+    for j in range(rows):
+        qty, unit = rng.randint(1, 40), round(rng.uniform(0.5, 900), 2)
+        rows_out.append({"Item": f"{rng.choice(_ITEMS)} {rng.randint(100, 99999)}", "Qty": qty,
+                         "Unit": unit, "Total": round(qty * unit, 2)})
+    return rows_out
+
+
+_ITEMS = ("Widget", "Bracket", "Cable", "Service fee", "Freight", "Licence", "Consulting hours")
+
+
+def messages(rows: int, cards: int, upload_kb: int) -> dict[str, str]:
+    def card(i: int) -> dict:
+        return {"id": f"card-{i}", "stack_id": "s1", "title": f"Invoice INV-{1000 + i}", "size": "large",
+                "z_index": i, "position": {"x": i * 13.5, "y": i * 7.25}, "blocks": [
+                    {"id": f"t{i}", "type": "table", "columns": ["Item", "Qty", "Unit", "Total"],
+                     "rows": _table(20, seed=i)}]}
+    envelope = {"id": "3f9c2a1e-1111-4c6a-9a57-2f1d3a0b9e77", "timestamp": 1760000000000}
+    return {
+        "agent_event": json.dumps({"type": "agent_event", "payload": {
+            "event_type": "text", "content": "The invoice total is $1,234.56 "}, **envelope}),
+        "canvas_update": json.dumps({"type": "canvas_update", "payload": {
+            "command": "create_card", "card_id": "c1", "title": "Invoice", "blocks": [
+                {"id": "t", "type": "table", "columns": ["Item", "Qty", "Unit", "Total"], "rows": _table(rows)}]},
+            **envelope}),
+        "state_sync": json.dumps({"type": "state_sync", "payload": {
+            "stacks": [{"id": "s1", "name": "Invoices"}], "active_stack_id": "s1",
+            "cards": [card(i) for i in range(cards)], "chat_history": []}, **envelope}),
+        "file_upload": json.dumps({"type": "file_upload", "payload": {
+            "filename": "a.pdf", "mime_type": "application/pdf",
+            # PDF content streams are already deflated: model the file as random bytes
+            "data": base64.b64encode(os.urandom(upload_kb * 1024)).decode(),
+        }, **envelope}),
+    }
+
+
+async def _echo(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    link = SpriteLink(reader, writer)
+    link.offer()
+    try:
+        while (raw := await link.read()) is not None:
+            if raw:
+                await link.send(raw)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _run(port: int, codec: str | None, payloads: dict[str, str], repeat: int) -> dict[str, tuple[int, float]]:
+    """Per message: (bytes on the wire both ways, median round trip seconds)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=64 * 1024 * 1024)
+    await reader.readline()  # link_offer
+    if codec is not None:
+        writer.write(json.dumps({"type": "link_select", "framing": 1, "codec": codec},
+                                separators=(",", ":")).encode() + b"\n")
+        await reader.readline()  # link_ack
+
+    async def round_trip(data: str) -> int:
+        raw = data.encode()
+        if codec is None:
+            writer.write(raw + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+            assert line[:-1] == raw
+            return len(raw) * 2 + 2
+        out = encode_frame(raw, codec)
+        writer.write(out)
+        await writer.drain()
+        codec_id, length = struct.unpack(">BI", await reader.readexactly(5))
+        payload = await reader.readexactly(length)
+        assert decode_payload(codec_id, payload) == raw
+        return len(out) + 5 + length
+
+    results = {}
+    for name, data in payloads.items():
+        wire, samples = 0, []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            wire = await round_trip(data)
+            samples.append(time.perf_counter() - start)
+        results[name] = (wire, statistics.median(samples))
+    writer.close()
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--upload-kb", type=int, default=2048)
+    parser.add_argument("--mbps", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    payloads = messages(args.rows, args.cards, args.upload_kb)
+    server = await asyncio.start_server(_echo, "127.0.0.1", 0, limit=64 * 1024 * 1024)
+    port = server.sockets[0].getsockname()[1]
+
+    modes: list[str | None] = [None, *supported_codecs()]
+    print(f"{'message':<15}{'mode':>10}{'wire KB':>12}{'rtt ms':>10}{f'@{args.mbps:g} Mbit/s ms':>20}")
+    for name in payloads:
+        for mode in modes:
+            wire, rtt = (await _run(port, mode, {name: payloads[name]}, args.repeat))[name]
+            link_ms = (rtt + wire * 8 / (args.mbps * 1e6)) * 1000
+            print(f"{name:<15}{mode or 'lines':>10}{wire / 1024:>12.1f}{rtt * 1000:>10.2f}{link_ms:>20.1f}")
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
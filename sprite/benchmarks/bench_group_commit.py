@@ -0,0 +1,87 @@
+"""Benchmark: per-statement commits vs group commit on WorkspaceDB.
+
+Simulates concurrent agent-turn writers (chat insert + card upsert) and
+reports writes/sec and commits/sec for each mode.
+
+Run from sprite/:
+    python -m benchmarks.bench_group_commit [--writers 8] [--writes 200] [--window-ms 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from src.database import WorkspaceDB
+
+
+def _count_commits(db: WorkspaceDB) -> list[int]:
+    """Wrap the writer connection's commit() so every COMMIT is counted."""
+    counter = [0]
+    conn = db._check_conn()
+    original = conn.commit
+
+    async def counting_commit() -> None:
+        counter[0] += 1
+        await original()
+
+    conn.commit = counting_commit  # type: ignore[method-assign]
+    return counter
+
+
+async def _writer(db: WorkspaceDB, writer_id: int, writes: int) -> None:
+    for i in range(writes):
+        if i % 2:
+            await db.add_chat_message("agent", f"writer {writer_id} message {i}")
+        else:
+            await db.upsert_card(f"card-{writer_id}-{i % 10}", "s1", f"Card {i}", [])
+
+
+async def _run(group_commit_ms: float, writers: int, writes: int, tmp: Path) -> dict:
+    db = WorkspaceDB(db_path=str(tmp / f"bench-{group_commit_ms}.db"), group_commit_ms=group_commit_ms)
+    await db.connect()
+    await db.create_stack("s1", "Bench")
+    commits = _count_commits(db)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_writer(db, w, writes) for w in range(writers)])
+    await db.flush()
+    elapsed = time.perf_counter() - start
+    await db.close()
+
+    total = writers * writes
+    return {
+        "elapsed": elapsed,
+        "writes_per_sec": total / elapsed,
+        "commits": commits[0],
+        "commits_per_sec": commits[0] / elapsed,
+    }
+
+
+async def main(writers: int, writes: int, window_ms: float) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        baseline = await _run(0.0, writers, writes, tmp)
+        grouped = await _run(window_ms, writers, writes, tmp)
+
+    print(f"{writers} writers x {writes} writes ({writers * writes} total)")
+    print(f"{'mode':<22}{'elapsed s':>12}{'writes/s':>12}{'commits':>10}{'commits/s':>12}")
+    for label, r in (("per-statement", baseline), (f"group {window_ms:g} ms", grouped)):
+        print(
+            f"{label:<22}{r['elapsed']:>12.3f}{r['writes_per_sec']:>12.0f}"
+            f"{r['commits']:>10}{r['commits_per_sec']:>12.0f}"
+        )
+    print(f"speedup: {baseline['elapsed'] / grouped['elapsed']:.1f}x, "
+          f"commits reduced {baseline['commits'] / max(grouped['commits'], 1):.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.writers, args.writes, args.window_ms))
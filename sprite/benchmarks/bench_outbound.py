@@ -0,0 +1,104 @@
+"""Benchmark: how long a streamed turn is held up by a slow Bridge link.
+
+Replays --events agent_event chunks (each followed by an update_card of the
+same card, as a tool streaming into a card does) through the link, while
+the client reads only --read-kb every --read-ms (a slow or congested
+Bridge). Sent directly, each send awaits the transport's drain; through
+the OutboundQueue the writer task does. Reports, per path:
+
+  send ms     time the producer spent inside send() for the whole turn
+  max ms      the longest single send() (a stall of the SDK stream)
+  bytes out   bytes written to the socket (superseded updates are merged)
+
+Run from sprite/:
+    python -m benchmarks.bench_outbound [--events 2000] [--read-kb 16] [--read-ms 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+
+from src.framing import BATCH_WINDOW, SpriteLink
+from src.outbound import OutboundQueue
+
+SOCKET_BUFFER = 32 * 1024
+
+
+def _turn(events: int) -> list[str]:
+    envelope = {"id": "3f9c2a1e-1111-4c6a-9a57-2f1d3a0b9e77", "timestamp": 1760000000000}
+    out = []
+    for i in range(events):
+        out.append(json.dumps({"type": "agent_event", "payload": {
+            "event_type": "text", "content": f"chunk {i} of the summary " * 8}, **envelope}))
+        out.append(json.dumps({"type": "canvas_update", "payload": {
+            "command": "update_card", "card_id": "c1",
+            "blocks": [{"type": "text", "content": f"row {j}"} for j in range(i % 50)]}, **envelope}))
+    return out
+
+
+async def _replay(queued: bool, turn: list[str], read_bytes: int, read_gap: float) -> tuple[float, float, int]:
+    done = asyncio.get_running_loop().create_future()
+    links: list[SpriteLink] = []
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Small socket buffers, so a slow reader pushes back within one turn
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+        links.append(SpriteLink(reader, writer, batch_window=BATCH_WINDOW))
+        await done
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+    writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    while not links:
+        await asyncio.sleep(0)
+    link = links[0]
+    outbound = OutboundQueue(link)
+    send = outbound.send if queued else link.send
+
+    async def slow_reader() -> None:
+        while await reader.read(read_bytes):
+            await asyncio.sleep(read_gap)
+
+    client = asyncio.create_task(slow_reader())
+    in_send = longest = 0.0
+    for data in turn:
+        start = time.perf_counter()
+        await send(data)
+        took = time.perf_counter() - start
+        in_send += took
+        longest = max(longest, took)
+        await asyncio.sleep(0)  # the SDK stream yields between events
+    await (outbound.flush() if queued else link.flush())
+
+    await outbound.close()
+    await link.flush()
+    done.set_result(None)
+    writer.close()
+    client.cancel()
+    server.close()
+    await server.wait_closed()
+    return in_send, longest, link.bytes_out
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--read-kb", type=int, default=16)
+    parser.add_argument("--read-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    turn = _turn(args.events)
+    print(f"{'path':>10}{'send ms':>10}{'max ms':>10}{'bytes out':>12}")
+    for queued in (False, True):
+        in_send, longest, out = await _replay(queued, turn, args.read_kb * 1024, args.read_ms / 1000)
+        label = "queue" if queued else "direct"
+        print(f"{label:>10}{in_send * 1000:>10.1f}{longest * 1000:>10.1f}{out:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""Benchmark: serializing outbound protocol messages.
+
+Encodes representative messages with the asdict + _strip_none serializer
+that to_json used to run, and with the compiled per-dataclass encoders
+(stdlib json, then orjson when installed):
+
+  agent_event    one streamed text chunk with meta
+  canvas_update  create_card with heading, key-value and a --rows row table
+  state_sync     full sync of --cards cards with the same blocks
+
+Reports the median time per message.
+
+Run from sprite/:
+    python -m benchmarks.bench_protocol [--rows 50] [--cards 200] [--repeat 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from dataclasses import asdict
+from typing import Any, Callable
+
+from src.protocol import (
+    AgentEvent, AgentEventMeta, AgentEventPayload, BadgeBlock, CanvasUpdate,
+    CanvasUpdatePayload, CardInfo, CardPosition, ChatMessageInfo, HeadingBlock,
+    KeyValueBlock, KeyValuePair, StackInfo, StateSyncMessage, StateSyncPayload,
+    TableBlock, _snake_to_camel, to_json, use_orjson,
+)
+
+
+def _strip_none(d: dict[str, Any]) -> None:
+    for k in [k for k, v in d.items() if v is None]:
+        del d[k]
+    for v in d.values():
+        if isinstance(v, dict):
+            _strip_none(v)
+        elif isinstance(v, list):
+            for item in v:
+                if isinstance(item, dict):
+                    _strip_none(item)
+
+
+def legacy_to_json(message: Any) -> str:
+    result = asdict(message)
+    _strip_none(result)
+    if message.type == "canvas_update" and message.payload.blocks is not None:
+        result["payload"]["blocks"] = [asdict(b) for b in message.payload.blocks]
+    if message.type == "agent_event" and "meta" in result["payload"]:
+        meta = result["payload"]["meta"]
+        converted = {_snake_to_camel(k): v for k, v in meta.items() if v is not None}
+        result["payload"]["meta"] = converted or None
+    _strip_none(result)
+    return json.dumps(result)
+
+
+def _blocks(i: int, rows: int) -> list:
+    return [
+        HeadingBlock(id=f"h{i}", type="heading", text=f"Invoice {i}", subtitle="2026-01-01"),
+        KeyValueBlock(id=f"k{i}", type="key-value", pairs=[
+            KeyValuePair("Vendor", f"Vendor {i}"), KeyValuePair("Total", "$1,234.56"),
+        ]),
+        TableBlock(id=f"t{i}", type="table", columns=["Item", "Qty", "Price"],
+                   rows=[{"Item": f"Line {j}", "Qty": j, "Price": j * 9.99} for j in range(rows)]),
+        BadgeBlock(id=f"b{i}", type="badge", text="Extracted", variant="success"),
+    ]
+
+
+def messages(rows: int, cards: int) -> dict[str, Any]:
+    return {
+        "agent_event": AgentEvent(type="agent_event", payload=AgentEventPayload(
+            event_type="text", content="The invoice total is $1,234.56 ",
+            meta=AgentEventMeta(session_id="sess-1"))),
+        "canvas_update": CanvasUpdate(type="canvas_update", payload=CanvasUpdatePayload(
+            command="create_card", card_id="card-1", title="Invoice", blocks=_blocks(1, rows),
+            size="large", stack_id="s1", card_type="table", tags=["invoice"])),
+        "state_sync": StateSyncMessage(type="state_sync", payload=StateSyncPayload(
+            stacks=[StackInfo(id=f"s{s}", name=f"Stack {s}") for s in range(10)],
+            active_stack_id="s0",
+            cards=[
+                CardInfo(id=f"card-{i}", stack_id=f"s{i % 10}", title=f"Card {i}",
+                         blocks=_blocks(i, rows // 5), size="medium",
+                         position=CardPosition(x=float(i), y=0.0), z_index=i, tags=["invoice"])
+                for i in range(cards)
+            ],
+            chat_history=[ChatMessageInfo(id=f"m{i}", role="user", content="hi", timestamp=i) for i in range(50)],
+            revision=1)),
+    }
+
+
+def _median_us(fn: Callable[[Any], str], message: Any, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(message)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    msgs = messages(args.rows, args.cards)
+    for name, message in msgs.items():
+        assert to_json(message) == legacy_to_json(message), name
+
+    columns = ["asdict + strip", "compiled"]
+    results = {name: [_median_us(legacy_to_json, m, args.repeat), _median_us(to_json, m, args.repeat)]
+               for name, m in msgs.items()}
+    if use_orjson():
+        columns.append("compiled + orjson")
+        for name, m in msgs.items():
+            results[name].append(_median_us(to_json, m, args.repeat))
+        use_orjson(False)
+
+    print(f"{'message':<15}" + "".join(f"{c:>20}" for c in columns) + "    (median µs)")
+    for name, times in results.items():
+        print(f"{name:<15}" + "".join(f"{t:>20.1f}" for t in times))
+
+
+if __name__ == "__main__":
+    main()
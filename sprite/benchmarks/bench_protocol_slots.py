@@ -0,0 +1,114 @@
+"""Benchmark: memory and construction time of the protocol dataclasses.
+
+Builds a 10k-row table card (as canvas_update) with the slotted protocol
+classes and with unslotted copies of the same classes (what protocol.py
+used before), in two shapes:
+
+  key-value   a KeyValueBlock with one KeyValuePair per row
+  table       a TableBlock whose rows are plain dicts, plus heading/badge
+
+Also builds a state_sync with one CardInfo per row (--rows cards).
+Row strings are built once up front. Reports the median construction time
+(GC paused) and the tracemalloc size retained by one built message.
+
+Run from sprite/:
+    python -m benchmarks.bench_protocol_slots [--rows 10000] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+from dataclasses import MISSING, dataclass, field, fields
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from src import protocol
+
+_CLASSES = (
+    "BadgeBlock", "CanvasUpdate", "CanvasUpdatePayload", "CardInfo", "CardPosition",
+    "HeadingBlock", "KeyValueBlock", "KeyValuePair", "StackInfo", "StateSyncMessage",
+    "StateSyncPayload", "TableBlock",
+)
+
+
+def _unslotted(cls: type) -> type:
+    """The same dataclass without slots or frozen (the previous definition)."""
+    namespace: dict[str, Any] = {"__annotations__": {f.name: f.type for f in fields(cls)}}
+    for f in fields(cls):
+        if f.default is not MISSING:
+            namespace[f.name] = f.default
+        elif f.default_factory is not MISSING:
+            namespace[f.name] = field(default_factory=f.default_factory)
+    return dataclass(type(cls.__name__, (), namespace))
+
+
+def _key_value_card(p: Any, rows: list[str]) -> Any:
+    pairs = [p.KeyValuePair(label=label, value=label) for label in rows]
+    return p.CanvasUpdate(type="canvas_update", payload=p.CanvasUpdatePayload(
+        command="create_card", card_id="card-1", title="Invoice lines", size="full",
+        blocks=[p.KeyValueBlock(id="k1", type="key-value", pairs=pairs)]))
+
+
+def _table_card(p: Any, rows: list[str]) -> Any:
+    return p.CanvasUpdate(type="canvas_update", payload=p.CanvasUpdatePayload(
+        command="create_card", card_id="card-1", title="Invoice lines", size="full",
+        blocks=[
+            p.HeadingBlock(id="h1", type="heading", text="Invoice lines"),
+            p.TableBlock(id="t1", type="table", columns=["Item", "Qty", "Price"],
+                         rows=[{"Item": label, "Qty": i, "Price": i * 9.99} for i, label in enumerate(rows)]),
+            p.BadgeBlock(id="b1", type="badge", text="Extracted", variant="success"),
+        ]))
+
+
+def _state_sync(p: Any, rows: list[str]) -> Any:
+    return p.StateSyncMessage(type="state_sync", payload=p.StateSyncPayload(
+        stacks=[p.StackInfo(id="s1", name="Invoices")], active_stack_id="s1", chat_history=[],
+        cards=[
+            p.CardInfo(id=label, stack_id="s1", title=label, size="medium",
+                       blocks=[p.HeadingBlock(id=label, type="heading", text=label)],
+                       position=p.CardPosition(x=float(i), y=0.0), z_index=i)
+            for i, label in enumerate(rows)
+        ]))
+
+
+def _measure(build: Callable[[Any, list[str]], Any], p: Any, rows: list[str], repeat: int) -> tuple[float, int]:
+    build(p, rows)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        build(p, rows)
+        samples.append(time.perf_counter() - start)
+        gc.enable()
+    tracemalloc.start()
+    message = build(p, rows)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del message
+    return statistics.median(samples) * 1000, retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    slotted = SimpleNamespace(**{name: getattr(protocol, name) for name in _CLASSES})
+    rows = [f"Line {i}" for i in range(args.rows)]
+    plain = SimpleNamespace(**{name: _unslotted(getattr(protocol, name)) for name in _CLASSES})
+
+    print(f"{'shape':<12}{'classes':>10}{'build ms':>12}{'retained MB':>14}")
+    for shape, build in (("key-value", _key_value_card), ("table", _table_card), ("state_sync", _state_sync)):
+        for label, p in (("dict", plain), ("slots", slotted)):
+            ms, retained = _measure(build, p, rows, args.repeat)
+            print(f"{shape:<12}{label:>10}{ms:>12.2f}{retained / 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark: RETURNING mutators vs write + SELECT on WorkspaceDB.
+
+Times the hot canvas mutators (upsert_card, update_card_position,
+update_card_content, add_chat_message) with SQLite RETURNING and with
+the pre-3.35 fallback, which is the old two-statement pattern.
+
+Run from sprite/:
+    python -m benchmarks.bench_returning [--iterations 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import src.database as database
+from src.database import WorkspaceDB
+
+
+async def _time_ops(db: WorkspaceDB, iterations: int) -> dict[str, float]:
+    results: dict[str, float] = {}
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        await db.upsert_card(f"c{i % 50}", "s1", f"Card {i}", [{"type": "text", "content": "x"}])
+    results["upsert_card"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        await db.update_card_position(f"c{i % 50}", float(i), float(i), i)
+    results["update_card_position"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        await db.update_card_content(f"c{i % 50}", [{"type": "text", "content": str(i)}])
+    results["update_card_content"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        await db.add_chat_message("agent", f"message {i}")
+    results["add_chat_message"] = time.perf_counter() - start
+
+    return results
+
+
+async def _run(returning: bool, iterations: int, tmp: Path) -> dict[str, float]:
+    database._SUPPORTS_RETURNING = returning
+    db = WorkspaceDB(db_path=str(tmp / f"bench-{returning}.db"))
+    await db.connect()
+    await db.create_stack("s1", "Bench")
+    try:
+        return await _time_ops(db, iterations)
+    finally:
+        await db.close()
+
+
+async def main(iterations: int) -> None:
+    supported = database._SUPPORTS_RETURNING
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        fallback = await _run(False, iterations, tmp)
+        returning = await _run(True, iterations, tmp)
+    database._SUPPORTS_RETURNING = supported
+
+    print(f"{iterations} iterations per mutator (SQLite {database.sqlite3.sqlite_version})")
+    print(f"{'mutator':<24}{'write+SELECT us':>17}{'RETURNING us':>15}{'speedup':>10}")
+    for name in fallback:
+        old = fallback[name] / iterations * 1e6
+        new = returning[name] / iterations * 1e6
+        print(f"{name:<24}{old:>17.1f}{new:>15.1f}{old / new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,80 @@
+"""Benchmark: write latency on WorkspaceDB while an online snapshot runs.
+
+Fills a workspace.db with card blocks up to --mb megabytes, then times
+add_chat_message calls with no snapshot running and again while
+SnapshotManager copies the database.
+
+Run from sprite/:
+    python -m benchmarks.bench_snapshot [--mb 200] [--pages 256]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.database import WorkspaceDB
+from src.snapshot import SnapshotManager
+
+BLOCK_BYTES = 64 * 1024
+
+
+async def _fill(db: WorkspaceDB, mb: int) -> None:
+    await db.create_stack("s1", "Bench")
+    blocks = json.dumps([{"type": "text", "content": "x" * BLOCK_BYTES}])
+    for i in range(mb * 1024 * 1024 // BLOCK_BYTES):
+        await db.upsert_card(f"card-{i}", "s1", f"Card {i}", json.loads(blocks))
+    await db.flush()
+
+
+async def _write_latencies(db: WorkspaceDB, until: asyncio.Future | None, count: int) -> list[float]:
+    latencies: list[float] = []
+    while (until is not None and not until.done()) or (until is None and len(latencies) < count):
+        start = time.perf_counter()
+        await db.add_chat_message("agent", "tick")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.001)
+    return latencies
+
+
+def _summary(latencies: list[float]) -> str:
+    p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) >= 100 else max(latencies)
+    return (f"{len(latencies):>7}{statistics.median(latencies):>10.2f}"
+            f"{p99:>10.2f}{max(latencies):>10.2f}")
+
+
+async def main(mb: int, pages: int) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        db = WorkspaceDB(db_path=str(tmp / "workspace.db"))
+        await db.connect()
+        await _fill(db, mb)
+        size = (tmp / "workspace.db").stat().st_size / 1e6
+
+        idle = await _write_latencies(db, None, 500)
+
+        manager = SnapshotManager([db], directory=tmp / "snapshots", pages_per_step=pages)
+        start = time.perf_counter()
+        snapshot = asyncio.ensure_future(manager.snapshot(db, force=True))
+        during = await _write_latencies(db, snapshot, 0)
+        await snapshot
+        elapsed = time.perf_counter() - start
+        await db.close()
+
+    print(f"workspace.db {size:.0f} MB, snapshot took {elapsed:.2f}s ({pages} pages/step)")
+    print(f"{'add_chat_message':<22}{'writes':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print(f"{'no snapshot':<22}{_summary(idle)}")
+    print(f"{'during snapshot':<22}{_summary(during)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=256)
+    args = parser.parse_args()
+    asyncio.run(main(args.mb, args.pages))
@@ -0,0 +1,127 @@
+"""Benchmark: building the state_sync wire message.
+
+Seeds a workspace.db with --stacks stacks and --cards cards (table-heavy
+blocks), then builds a full state_sync three ways:
+
+  per-stack decode   one get_cards_by_stack query per stack, every JSON
+                     column decoded into CardInfo, re-encoded by to_json
+  joined decode      build_state_sync_message (one joined query) + to_json
+  joined raw         build_state_sync_json: one joined query, stored JSON
+                     spliced into the output without decoding
+  cached             build_state_sync_json with a StateSyncCache and no
+                     writes between syncs (reconnect storm)
+
+Reports median wall time and the tracemalloc peak of one build.
+
+Run from sprite/:
+    python -m benchmarks.bench_state_sync [--cards 1000] [--stacks 50] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from src.database import WorkspaceDB
+from src.protocol import ChatMessageInfo, StackInfo, StateSyncMessage, StateSyncPayload, to_json
+from src.state_sync import (
+    StateSyncCache, _card_info, _chat_info, build_state_sync_json, build_state_sync_message,
+)
+
+
+def _blocks(i: int) -> list[dict]:
+    return [
+        {"id": f"h{i}", "type": "heading", "text": f"Invoice {i}", "subtitle": "2026-01-01"},
+        {"id": f"k{i}", "type": "key-value", "pairs": [
+            {"label": "Vendor", "value": f"Vendor {i}"}, {"label": "Total", "value": "$1,234.56"},
+        ]},
+        {"id": f"t{i}", "type": "table", "columns": ["Item", "Qty", "Price"],
+         "rows": [[f"Line {j}", j, j * 9.99] for j in range(10)]},
+        {"id": f"b{i}", "type": "badge", "text": "Extracted", "variant": "success"},
+    ]
+
+
+async def _seed(db: WorkspaceDB, cards: int, stacks: int) -> None:
+    for s in range(stacks):
+        await db.create_stack(f"s{s}", f"Stack {s}", sort_order=s)
+    for i in range(cards):
+        await db.upsert_card(
+            f"card-{i}", f"s{i % stacks}", f"Card {i}", _blocks(i), "large",
+            position_x=float(i), position_y=float(i), z_index=i,
+            card_type="table", summary="Invoice summary", tags=["invoice", "vendor"],
+            headers=["Item", "Qty", "Price"], preview_rows=[["Line 0", 0, 0.0]],
+        )
+
+
+async def _per_stack_decode(db: WorkspaceDB) -> str:
+    stacks = await db.list_stacks()
+    cards = []
+    for s in stacks:
+        for row in await db.get_cards_by_stack(s["id"]):
+            cards.append(_card_info(row))
+    chat = [ChatMessageInfo(**_chat_info(r)) for r in await db.get_chat_history(limit=50)]
+    return to_json(StateSyncMessage(type="state_sync", payload=StateSyncPayload(
+        stacks=[StackInfo(id=s["id"], name=s["name"], color=s["color"]) for s in stacks],
+        active_stack_id=stacks[0]["id"], cards=cards, chat_history=chat,
+    )))
+
+
+async def _joined_decode(db: WorkspaceDB) -> str:
+    return to_json(await build_state_sync_message(db))
+
+
+async def _joined_raw(db: WorkspaceDB) -> str:
+    return await build_state_sync_json(db)
+
+
+async def _measure(fn, db: WorkspaceDB, repeat: int) -> tuple[float, float, int]:
+    await fn(db)  # warm the page cache and statement cache
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = await fn(db)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    await fn(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1e6, len(data)
+
+
+async def main(cards: int, stacks: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        db = WorkspaceDB(db_path=str(Path(d) / "workspace.db"))
+        await db.connect()
+        await _seed(db, cards, stacks)
+
+        print(f"state_sync: {cards} cards across {stacks} stacks, median of {repeat}")
+        print(f"{'path':<20}{'ms':>10}{'peak MB':>10}{'bytes':>11}")
+        cache = StateSyncCache(db)
+
+        async def _cached(db: WorkspaceDB) -> str:
+            return await build_state_sync_json(db, cache=cache)
+
+        baseline = None
+        for name, fn in (("per-stack decode", _per_stack_decode),
+                         ("joined decode", _joined_decode),
+                         ("joined raw", _joined_raw),
+                         ("cached", _cached)):
+            ms, peak, size = await _measure(fn, db, repeat)
+            baseline = baseline or ms
+            print(f"{name:<20}{ms:>10.2f}{peak:>10.2f}{size:>11}   {baseline / ms:.1f}x")
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--stacks", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.cards, args.stacks, args.repeat))
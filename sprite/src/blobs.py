@@ -0,0 +1,169 @@
+"""Content-addressed blob store for uploaded files.
+
+Document blocks used to carry the whole file as base64, so every
+upload was echoed over the socket, persisted in cards.blocks and re-sent
+on each state sync and badge update. Files now live once under
+/workspace/.os/blobs, named by the SHA-256 of their bytes; a document
+block holds only that hash and the file size, and the browser pulls
+byte ranges on demand with blob_request.
+
+Blobs are immutable: a write goes to a ".partial" file that is renamed
+into place, and writing content that is already stored is a no-op.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import errno
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .database import WorkspaceDB
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = Path("/workspace/.os/blobs")
+BLOB_RANGE_BYTES = 512 * 1024  # largest range served by one blob_data message
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+_PARTIAL = ".partial"
+
+
+def _partial_path(target: Path) -> Path:
+    # Unique per call: concurrent writes of the same content (two tabs, a
+    # retried commit) must not share a temp file
+    return target.with_name(f"{target.name}.{uuid.uuid4().hex}{_PARTIAL}")
+
+
+class BlobStore:
+    """SHA-256 addressed files under `directory`, sharded by the first two hex digits.
+
+    Methods do blocking file I/O; call them through asyncio.to_thread from
+    the event loop.
+    """
+
+    def __init__(self, directory: Path | None = None) -> None:
+        self.directory = Path(directory if directory is not None else BLOB_DIR)
+
+    def path(self, digest: str) -> Path:
+        """Where the blob `digest` lives. Raises ValueError for a malformed digest."""
+        if not isinstance(digest, str) or not _DIGEST.fullmatch(digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return self.directory / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        """Store `data` and return its hex digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest)
+        if target.exists():
+            return digest
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = _partial_path(target)
+        try:
+            partial.write_bytes(data)
+            os.replace(partial, target)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return digest
+
+    def put_file(self, source: Path, digest: str) -> str:
+        """Store the file at `source`, whose SHA-256 is `digest`, without a second copy.
+
+        The blob is a hard link to `source`, so the bytes are on disk once;
+        `source` must not be modified in place afterwards. Across
+        filesystems it falls back to a block copy, which never reads a
+        large upload into memory.
+        """
+        target = self.path(digest)
+        if target.exists():
+            return digest
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = _partial_path(target)
+        try:
+            try:
+                os.link(source, partial)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.copyfile(source, partial)
+            os.replace(partial, target)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def size(self, digest: str) -> int:
+        """Size of a stored blob in bytes. Raises FileNotFoundError if absent."""
+        return self.path(digest).stat().st_size
+
+    def read_range(self, digest: str, offset: int, length: int = BLOB_RANGE_BYTES) -> tuple[bytes, int]:
+        """Up to `length` bytes from `offset` (capped at BLOB_RANGE_BYTES), plus the blob size."""
+        length = max(0, min(length, BLOB_RANGE_BYTES))
+        with open(self.path(digest), "rb") as f:
+            total = os.fstat(f.fileno()).st_size
+            f.seek(offset)
+            return f.read(length), total
+
+
+def document_block(digest: str, size: int, mime_type: str, filename: str, block_id: str) -> dict[str, Any]:
+    """A document block that references a stored blob instead of embedding it."""
+    return {
+        "type": "document", "id": block_id,
+        "blob": digest, "size": size, "mime_type": mime_type, "filename": filename,
+    }
+
+
+async def externalize_document_blocks(db: WorkspaceDB, store: BlobStore) -> int:
+    """Move base64 data embedded in existing document blocks into `store`.
+
+    Runs once at startup for workspaces created before the blob store.
+    Returns the number of cards rewritten.
+    """
+    rewritten = 0
+    for card_id in await db.cards_with_inline_documents():
+        raw = await db.get_card_blocks(card_id)
+        if not raw:
+            continue
+        refs: dict[str, tuple[str, int]] = {}
+        for block in _inline_documents(raw):
+            try:
+                data = base64.b64decode(block["data"])
+            except ValueError:
+                logger.warning("Card %s block %s has undecodable document data", card_id, block.get("id"))
+                continue
+            refs[block["id"]] = (await asyncio.to_thread(store.put, data), len(data))
+        if not refs:
+            continue
+
+        def swap(blocks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+            return [
+                document_block(*refs[b["id"]], b.get("mime_type", ""), b.get("filename", ""), b["id"])
+                if b.get("type") == "document" and b.get("id") in refs else b
+                for b in blocks
+            ]
+
+        await db.transform_card_blocks(card_id, swap)
+        rewritten += 1
+    if rewritten:
+        logger.info("Moved embedded documents of %d cards into the blob store", rewritten)
+    return rewritten
+
+
+def _inline_documents(raw: str) -> list[dict[str, Any]]:
+    return [
+        b for b in json.loads(raw)
+        if isinstance(b, dict) and b.get("type") == "document" and b.get("data") and b.get("id")
+    ]
@@ -10,15 +10,97 @@ Schemas must match bridge/src/bootstrap.ts INIT_DB_SCRIPT exactly.
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import json
 import logging
 import sqlite3
 import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, TypeVar
 
 import aiosqlite
 
+from .query_stats import QueryStats
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Called after a WorkspaceDB write with (entity, stack_id): entity is "stack",
+# "card", "chat" or "all"; stack_id is the affected stack when known
+ChangeListener = Callable[[str, "str | None"], None]
+
+# RETURNING landed in SQLite 3.35 -- older builds fall back to write + SELECT
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Rows pulled per worker-thread hop by _BaseDB.iterate()
+ITERATE_BATCH_SIZE = 256
+
+# Shared no-op timer for databases without QueryStats
+_NO_TIMER = contextlib.nullcontext()
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Keep the newest `keep` ids of `table`, deleting at most `batch_size` rows per pass.
+
+    Expiry uses an id watermark (MAX(id) - keep) instead of a NOT IN scan, so a
+    pass costs O(batch_size) regardless of table size. `where` is an extra SQL
+    predicate an expired row must also match to be deleted.
+    """
+
+    table: str
+    keep: int
+    batch_size: int = 500
+    where: str = ""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema version step, applied when PRAGMA user_version < version.
+
+    `statements` run in order; `add_columns` entries (table, column, typedef)
+    are added only if missing, so steps also upgrade pre-versioning databases.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...] = ()
+    add_columns: tuple[tuple[str, str, str], ...] = ()
+
+
+def _without_none(value):
+    if isinstance(value, dict):
+        return {k: _without_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_without_none(v) for v in value]
+    return value
+
+
+def _json_column(value) -> str:
+    """Encode a JSON column the way protocol.to_json would send it (None keys dropped).
+
+    State sync splices these columns into the wire message without decoding.
+    """
+    return json.dumps(_without_none(value))
+
+
+def _split_sql(script: str) -> tuple[str, ...]:
+    """Split a schema script into statements (trigger bodies stay intact)."""
+    statements: list[str] = []
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            statements.append(buf.strip())
+            buf = ""
+    if buf.strip():
+        statements.append(buf.strip())
+    return tuple(statements)
+
+
 TRANSCRIPT_SCHEMA = """\
 CREATE TABLE IF NOT EXISTS observations (
     id INTEGER PRIMARY KEY,
@@ -40,6 +122,45 @@ CREATE TABLE IF NOT EXISTS sessions (
 CREATE INDEX IF NOT EXISTS idx_observations_processed ON observations(processed);
 """
 
+# Watermark over observations.id: everything <= last_processed_id has been
+# processed. pending_count (ids above the watermark) is maintained by triggers
+# so the per-turn batch-threshold check is a single-row read. Advancing the
+# watermark also sets the legacy processed flag on the covered id range.
+PROCESSING_CURSOR_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS processing_cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_processed_id INTEGER NOT NULL DEFAULT 0,
+    pending_count INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO processing_cursor (id, last_processed_id)
+    SELECT 1, COALESCE(
+        (SELECT MIN(id) - 1 FROM observations WHERE processed = 0),
+        (SELECT MAX(id) FROM observations),
+        0
+    );
+UPDATE processing_cursor SET pending_count = (
+    SELECT COUNT(*) FROM observations WHERE id > processing_cursor.last_processed_id
+) WHERE id = 1;
+CREATE TRIGGER IF NOT EXISTS observations_pending_ai AFTER INSERT ON observations BEGIN
+    UPDATE processing_cursor SET pending_count = pending_count + 1
+        WHERE id = 1 AND new.id > last_processed_id;
+END;
+CREATE TRIGGER IF NOT EXISTS observations_pending_ad AFTER DELETE ON observations BEGIN
+    UPDATE processing_cursor SET pending_count = pending_count - 1
+        WHERE id = 1 AND old.id > last_processed_id;
+END;
+CREATE TRIGGER IF NOT EXISTS processing_cursor_advance AFTER UPDATE OF last_processed_id ON processing_cursor
+WHEN new.last_processed_id > old.last_processed_id BEGIN
+    UPDATE processing_cursor SET pending_count = pending_count - (
+        SELECT COUNT(*) FROM observations
+        WHERE id > old.last_processed_id AND id <= new.last_processed_id
+    ) WHERE id = 1;
+    UPDATE observations SET processed = 1
+        WHERE id > old.last_processed_id AND id <= new.last_processed_id;
+END;
+DROP INDEX IF EXISTS idx_observations_processed;
+"""
+
 MEMORY_SCHEMA = """\
 CREATE TABLE IF NOT EXISTS learnings (
     id INTEGER PRIMARY KEY,
@@ -75,65 +196,370 @@ END;
 
 
 class _BaseDB:
-    """Shared async SQLite wrapper. WAL mode, busy_timeout=5000, foreign_keys=ON."""
+    """Shared async SQLite wrapper. WAL mode, busy_timeout=5000, foreign_keys=ON.
+
+    With read_pool_size > 0 the database runs in pooled mode: one writer
+    connection plus N read-only connections. fetchone/fetchall check out an
+    idle reader so long reads don't queue behind writes on the writer's
+    worker thread (WAL lets readers run concurrently with the writer).
+    Reads inside transaction() stay on the writer to see uncommitted rows.
+
+    With group_commit_ms > 0 the database runs in group-commit mode: writes
+    outside transaction() are not committed per statement. The first write
+    opens a window of group_commit_ms, and every write from any coroutine
+    that lands inside it shares one COMMIT. Call flush() when a write must
+    be durable before continuing. Reads see pending writes because they are
+    routed to the writer until the group commits.
+
+    With a QueryStats attached, every statement, commit and transaction()
+    lock acquisition is timed under this database's name.
+    """
 
-    _schema: str = ""
     _default_path: str = ""
+    _migrations: tuple[Migration, ...] = ()
+    retention_policies: tuple[RetentionPolicy, ...] = ()
 
-    def __init__(self, db_path: str | None = None) -> None:
+    def __init__(
+        self,
+        db_path: str | None = None,
+        read_pool_size: int = 0,
+        group_commit_ms: float = 0.0,
+        stats: QueryStats | None = None,
+    ) -> None:
         self.db_path = db_path or self._default_path
+        self.read_pool_size = read_pool_size
+        self.group_commit_ms = group_commit_ms
+        self.stats = stats
+        self.name = Path(self.db_path).stem
         self._conn: aiosqlite.Connection | None = None
         self._in_transaction: bool = False
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._pending_commit: bool = False
+        self._commit_in_flight: bool = False
+        self._commit_timer: asyncio.TimerHandle | None = None
+        self._commit_lock = asyncio.Lock()
+        self._commit_tasks: set[asyncio.Task] = set()
+        self._last_write: float = time.monotonic()
 
     def _check_conn(self) -> aiosqlite.Connection:
         if self._conn is None:
             raise RuntimeError("Database not connected")
         return self._conn
 
+    def _timed(self, sql: str):
+        """Context manager timing one statement into self.stats (no-op when unset)."""
+        if self.stats is None:
+            return _NO_TIMER
+        return self.stats.time(self.name, sql)
+
     async def connect(self) -> None:
         self._conn = await aiosqlite.connect(self.db_path)
+        _check_aiosqlite_internals(self._conn)
         self._conn.row_factory = sqlite3.Row
+        # Must precede journal_mode=WAL; only takes effect on a new database file
+        await self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
         await self._conn.execute("PRAGMA journal_mode=WAL")
         await self._conn.execute("PRAGMA foreign_keys=ON")
         await self._conn.execute("PRAGMA busy_timeout=5000")
-        await self._conn.executescript(self._schema)
+        await self._migrate()
+        if self.read_pool_size > 0 and self.db_path != ":memory:":
+            await self._open_readers()
         logger.info("Database connected: %s", self.db_path)
 
+    async def _open_readers(self) -> None:
+        """Open read_pool_size read-only connections (after the writer created the file)."""
+        uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+        self._idle_readers = asyncio.Queue()
+        for _ in range(self.read_pool_size):
+            reader = await aiosqlite.connect(uri, uri=True)
+            reader.row_factory = sqlite3.Row
+            await reader.execute("PRAGMA busy_timeout=5000")
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
     async def close(self) -> None:
+        if self._conn:
+            await self.flush()
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
         if self._conn:
             await self._conn.close()
             self._conn = None
 
+    @property
+    def schema_version(self) -> int:
+        """Latest schema version this class migrates to."""
+        return self._migrations[-1].version if self._migrations else 0
+
+    async def _migrate(self) -> None:
+        """Apply pending migrations in one transaction, recording PRAGMA user_version.
+
+        An up-to-date database costs a single PRAGMA read.
+        """
+        conn = self._check_conn()
+        target = self.schema_version
+        if await self._user_version(conn) >= target:
+            return
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock in case another connection migrated first
+            current = await self._user_version(conn)
+            for migration in self._migrations:
+                if migration.version <= current:
+                    continue
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                for table, column, typedef in migration.add_columns:
+                    columns = await conn.execute_fetchall(f"PRAGMA table_info({table})")
+                    if column not in {c["name"] for c in columns}:
+                        await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {typedef}")
+                logger.info("Migrated %s to v%d: %s", self.db_path, migration.version, migration.description)
+            if current < target:
+                await conn.execute(f"PRAGMA user_version = {target}")
+            await conn.execute("COMMIT")
+        except BaseException:
+            await conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    async def _user_version(conn: aiosqlite.Connection) -> int:
+        rows = await conn.execute_fetchall("PRAGMA user_version")
+        return rows[0][0]
+
     def transaction(self) -> _Transaction:
         """Async context manager for BEGIN IMMEDIATE / COMMIT / ROLLBACK."""
         return _Transaction(self)
 
+    @contextlib.asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Check out a connection for a read: an idle pooled reader, else the writer."""
+        conn = self._check_conn()
+        if (self._idle_readers is None or self._in_transaction or self._pending_commit
+                or self._commit_in_flight):
+            yield conn
+            return
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            if self._idle_readers is not None:
+                self._idle_readers.put_nowait(reader)
+
     async def execute(self, sql: str, params: tuple = ()) -> aiosqlite.Cursor:
         conn = self._check_conn()
-        cursor = await conn.execute(sql, params)
-        if not self._in_transaction:
-            await conn.commit()
+        with self._timed(sql):
+            cursor = await conn.execute(sql, params)
+        await self._after_write()
         return cursor
 
     async def executemany(self, sql: str, params_list: list[tuple]) -> aiosqlite.Cursor:
         conn = self._check_conn()
-        cursor = await conn.executemany(sql, params_list)
-        if not self._in_transaction:
-            await conn.commit()
+        with self._timed(sql):
+            cursor = await conn.executemany(sql, params_list)
+        await self._after_write()
         return cursor
 
-    async def fetchone(self, sql: str, params: tuple = ()) -> dict | None:
+    async def execute_returning(
+        self,
+        sql: str,
+        params: tuple = (),
+        select_sql: str = "",
+        select_params: tuple | None = None,
+        columns: str = "*",
+    ) -> dict | None:
+        """Run a single-row write and return the written row (None if nothing matched).
+
+        Appends RETURNING <columns> so the write and the read are one statement
+        and one thread hop; callers that need only a few fields name them, and
+        select_sql should select the same. On SQLite < 3.35 runs the write, then
+        select_sql on the writer; select_params defaults to the inserted rowid.
+        """
+        conn = self._check_conn()
+        if _SUPPORTS_RETURNING:
+            sql = f"{sql} RETURNING {columns}"
+            with self._timed(sql):
+                rows = await conn.execute_fetchall(sql, params)
+            await self._after_write()
+            return dict(rows[0]) if rows else None
+        with self._timed(sql):
+            cursor = await conn.execute(sql, params)
+        await self._after_write()
+        if cursor.rowcount == 0:
+            return None
+        if select_params is None:
+            select_params = (cursor.lastrowid,)
+        with self._timed(select_sql):
+            rows = await conn.execute_fetchall(select_sql, select_params)
+        return dict(rows[0]) if rows else None
+
+    async def run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run fn(raw sqlite3 connection) on the writer's thread as one unit of work.
+
+        Every statement fn issues costs no extra thread hop, and the unit commits
+        once on that same hop (or joins the open group-commit window /
+        transaction()). If fn raises, its statements are rolled back and the
+        exception propagates. fn runs off the event loop: it must not touch
+        asyncio state.
+        """
+        commit = not self._in_transaction and self.group_commit_ms <= 0
+        with self._timed(f"run {getattr(fn, '__qualname__', 'unit')}"):
+            result = await self._on_writer_thread(_run_unit, fn, commit)
+        if commit:
+            self._last_write = time.monotonic()
+        else:
+            await self._after_write()
+        return result
+
+    async def _on_writer_thread(self, fn: Callable[..., T], *args) -> T:
+        """Call fn(raw sqlite3 connection, *args) on the writer's worker thread.
+
+        The call is queued behind statements already sent to the writer, so it
+        sees their effects. aiosqlite has no public API for this: it uses the
+        private Connection._execute (queue a callable on the worker thread)
+        and Connection._conn (the wrapped sqlite3.Connection), as found in
+        aiosqlite 0.20-0.22 (requirements.txt pins that range, and connect()
+        checks both are present). Recheck both when upgrading aiosqlite.
+        """
         conn = self._check_conn()
-        cursor = await conn.execute(sql, params)
-        row = await cursor.fetchone()
+        return await conn._execute(fn, conn._conn, *args)
+
+    # -- Commit handling -------------------------------------------------------
+
+    async def _after_write(self) -> None:
+        """Commit the statement just run, or defer it to the open group-commit window."""
+        self._last_write = time.monotonic()
+        if self._in_transaction:
+            return
+        if self.group_commit_ms <= 0:
+            with self._timed("COMMIT"):
+                await self._check_conn().commit()
+            return
+        self._pending_commit = True
+        if self._commit_timer is None:
+            loop = asyncio.get_running_loop()
+            self._commit_timer = loop.call_later(
+                self.group_commit_ms / 1000, self._on_commit_window_closed,
+            )
+
+    def _on_commit_window_closed(self) -> None:
+        self._commit_timer = None
+        task = asyncio.create_task(self._commit_pending())
+        self._commit_tasks.add(task)
+        task.add_done_callback(self._on_group_commit_done)
+
+    def _on_group_commit_done(self, task: asyncio.Task) -> None:
+        self._commit_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Group commit failed for %s: %s", self.db_path, task.exception())
+
+    async def _commit_pending(self) -> None:
+        async with self._commit_lock:
+            if not self._pending_commit or self._conn is None:
+                return
+            # Writes made during the COMMIT start a new window. Reads stay on the
+            # writer until this COMMIT is done: pooled readers can't see it before
+            self._pending_commit = False
+            self._commit_in_flight = True
+            try:
+                with self._timed("COMMIT"):
+                    await self._conn.commit()
+            finally:
+                self._commit_in_flight = False
+
+    async def flush(self) -> None:
+        """Commit writes still waiting in the group-commit window (durability barrier).
+
+        No-op outside group-commit mode, where every write is already committed.
+        """
+        if self._commit_timer is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
+        await self._commit_pending()
+
+    # -- Maintenance -----------------------------------------------------------
+
+    @property
+    def idle_seconds(self) -> float:
+        """Seconds since the last write went through this database."""
+        return time.monotonic() - self._last_write
+
+    def _contents_replaced(self) -> None:
+        """Hook run after the whole database was replaced (snapshot restore)."""
+
+    async def enforce_retention(self, policy: RetentionPolicy) -> int:
+        """Delete one batch of rows expired under policy. Returns rows deleted."""
+        extra = f" AND ({policy.where})" if policy.where else ""
+        conn = self._check_conn()
+        cursor = await conn.execute(
+            f"DELETE FROM {policy.table} WHERE id IN ("
+            f"SELECT id FROM {policy.table} "
+            f"WHERE id <= (SELECT MAX(id) FROM {policy.table}) - ?{extra} "
+            f"ORDER BY id LIMIT ?)",
+            (policy.keep, policy.batch_size),
+        )
+        deleted = cursor.rowcount
+        if deleted > 0:
+            await self._after_write()
+        elif not self._in_transaction and not self._pending_commit:
+            # Nothing expired: close the DELETE's implicit transaction without
+            # counting it as a write, or the database never looks idle to
+            # compaction and snapshots
+            await conn.commit()
+        return deleted
+
+    async def compact(self, max_pages: int = 256) -> None:
+        """Reclaim up to max_pages free pages and refresh query-planner statistics.
+
+        incremental_vacuum only frees pages on databases created with
+        auto_vacuum=INCREMENTAL; on older files it is a no-op.
+        """
+        await self.flush()
+        conn = self._check_conn()
+        # executescript steps the pragma to completion (execute frees one page)
+        await conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        await conn.execute_fetchall("PRAGMA optimize")
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> dict | None:
+        async with self._reader() as conn:
+            with self._timed(sql):
+                cursor = await conn.execute(sql, params)
+                row = await cursor.fetchone()
+            await cursor.close()
         return dict(row) if row else None
 
     async def fetchall(self, sql: str, params: tuple = ()) -> list[dict]:
-        conn = self._check_conn()
-        cursor = await conn.execute(sql, params)
-        rows = await cursor.fetchall()
+        async with self._reader() as conn:
+            with self._timed(sql):
+                rows = await conn.execute_fetchall(sql, params)
         return [dict(r) for r in rows]
 
+    async def iterate(
+        self,
+        sql: str,
+        params: tuple = (),
+        batch_size: int = ITERATE_BATCH_SIZE,
+        raw: bool = False,
+    ) -> AsyncIterator[dict | sqlite3.Row]:
+        """Stream a query's rows, fetching batch_size at a time.
+
+        Only one batch is held in memory. With raw=True rows are yielded as
+        sqlite3.Row (indexable by name or position) with no per-row dict copy.
+        The connection stays checked out until the iteration finishes.
+        Only the statement's first step (up to the first row) is timed.
+        """
+        async with self._reader() as conn:
+            with self._timed(sql):
+                cursor = await conn.execute(sql, params)
+            try:
+                while rows := await cursor.fetchmany(batch_size):
+                    for row in rows:
+                        yield row if raw else dict(row)
+            finally:
+                await cursor.close()
+
     async def __aenter__(self):
         await self.connect()
         return self
@@ -142,6 +568,49 @@ class _BaseDB:
         await self.close()
 
 
+def _check_aiosqlite_internals(conn: aiosqlite.Connection) -> None:
+    """Fail at connect, not on the first write, if aiosqlite changed what _on_writer_thread uses."""
+    try:
+        usable = callable(conn._execute) and isinstance(conn._conn, sqlite3.Connection)
+    except (AttributeError, ValueError):
+        usable = False
+    if not usable:
+        raise RuntimeError(
+            f"aiosqlite {getattr(aiosqlite, '__version__', '?')} lacks Connection._execute/_conn, "
+            f"which the database layer depends on; install aiosqlite>=0.20,<0.23"
+        )
+
+
+def _run_unit(raw: sqlite3.Connection, fn: Callable[[sqlite3.Connection], T], commit: bool) -> T:
+    """Body of _BaseDB.run(), executed on the aiosqlite worker thread.
+
+    With commit=True (no transaction() or group-commit window to join) the
+    unit commits here, so the whole unit is one thread hop.
+    """
+    if raw.in_transaction:
+        # Nest inside transaction() or pending group-commit writes
+        raw.execute("SAVEPOINT unit_of_work")
+        try:
+            result = fn(raw)
+        except BaseException:
+            raw.execute("ROLLBACK TO unit_of_work")
+            raw.execute("RELEASE unit_of_work")
+            raise
+        raw.execute("RELEASE unit_of_work")
+        if commit:
+            raw.commit()
+        return result
+    raw.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(raw)
+        if commit:
+            raw.commit()
+        return result
+    except BaseException:
+        raw.rollback()
+        raise
+
+
 class _Transaction:
     """BEGIN IMMEDIATE / COMMIT / ROLLBACK wrapper for _BaseDB."""
 
@@ -150,14 +619,25 @@ class _Transaction:
 
     async def __aenter__(self) -> None:
         conn = self._db._check_conn()
-        await conn.execute("BEGIN IMMEDIATE")
+        # Pending group-commit writes hold an implicit transaction open
+        await self._db.flush()
+        stats = self._db.stats
+        if stats is None:
+            await conn.execute("BEGIN IMMEDIATE")
+        else:
+            # BEGIN IMMEDIATE blocks (up to busy_timeout) until the write lock is free
+            start = time.perf_counter()
+            with self._db._timed("BEGIN IMMEDIATE"):
+                await conn.execute("BEGIN IMMEDIATE")
+            stats.record_lock_wait(self._db.name, (time.perf_counter() - start) * 1000)
         self._db._in_transaction = True
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         conn = self._db._check_conn()
         try:
             if exc_type is None:
-                await conn.execute("COMMIT")
+                with self._db._timed("COMMIT"):
+                    await conn.execute("COMMIT")
             else:
                 await conn.execute("ROLLBACK")
         finally:
@@ -166,21 +646,82 @@ class _Transaction:
 
 class TranscriptDB(_BaseDB):
     """Append-only conversation transcript. Hooks write observations, daemon reads for processing."""
-    _schema = TRANSCRIPT_SCHEMA
     _default_path = "/workspace/.os/memory/transcript.db"
+    _migrations = (
+        Migration(1, "baseline schema", _split_sql(TRANSCRIPT_SCHEMA)),
+        Migration(2, "observation processing cursor", _split_sql(PROCESSING_CURSOR_SCHEMA)),
+    )
+    # Keep newest 10k observations, only prune those behind the processing cursor
+    retention_policies = (
+        RetentionPolicy(
+            "observations", keep=10_000,
+            where="id <= (SELECT last_processed_id FROM processing_cursor WHERE id = 1)",
+        ),
+    )
 
-    async def prune_observations(self) -> None:
-        """Keep newest 10k observations, only prune those already processed."""
+    async def pending_observation_count(self) -> int:
+        """Observations above the processing cursor (one-row read, trigger-maintained)."""
+        row = await self.fetchone("SELECT pending_count FROM processing_cursor WHERE id = 1")
+        return row["pending_count"] if row else 0
+
+    async def last_processed_id(self) -> int:
+        row = await self.fetchone("SELECT last_processed_id FROM processing_cursor WHERE id = 1")
+        return row["last_processed_id"] if row else 0
+
+    def iter_pending_observations(
+        self, columns: str = "*", limit: int = -1,
+    ) -> AsyncIterator[dict | sqlite3.Row]:
+        """Stream observations above the processing cursor, oldest first (id range scan)."""
+        return self.iterate(
+            f"SELECT {columns} FROM observations "
+            "WHERE id > (SELECT last_processed_id FROM processing_cursor WHERE id = 1) "
+            "ORDER BY id LIMIT ?",
+            (limit,),
+        )
+
+    async def advance_processing_cursor(self, last_id: int) -> None:
+        """Mark every observation with id <= last_id processed. Never moves backwards."""
         await self.execute(
-            "DELETE FROM observations WHERE processed = 1 AND id NOT IN "
-            "(SELECT id FROM observations ORDER BY id DESC LIMIT 10000)"
+            "UPDATE processing_cursor SET last_processed_id = ? "
+            "WHERE id = 1 AND last_processed_id < ?",
+            (last_id, last_id),
         )
 
+    async def prune_observations(self) -> None:
+        """Enforce the observations retention policy to completion (batch by batch)."""
+        policy = self.retention_policies[0]
+        while await self.enforce_retention(policy) >= policy.batch_size:
+            pass
+
 
 class MemoryDB(_BaseDB):
     """Searchable learnings archive with FTS5. Daemon writes, agent reads via search_memory."""
-    _schema = MEMORY_SCHEMA
     _default_path = "/workspace/.os/memory/memory.db"
+    _migrations = (
+        Migration(1, "baseline schema", _split_sql(MEMORY_SCHEMA)),
+    )
+
+    async def store_extraction(self, learnings: list[tuple], actions: list[tuple]) -> None:
+        """Insert a processor batch's learnings and pending actions atomically, in one hop.
+
+        learnings rows: (created_at, type, content, source_observation_id, confidence)
+        actions rows: (created_at, content, priority, status, source_learning_id)
+        """
+        def store(conn: sqlite3.Connection) -> None:
+            if learnings:
+                conn.executemany(
+                    "INSERT INTO learnings (created_at, type, content, source_observation_id, confidence) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    learnings,
+                )
+            if actions:
+                conn.executemany(
+                    "INSERT INTO pending_actions (created_at, content, priority, status, source_learning_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    actions,
+                )
+
+        await self.run(store)
 
 
 WORKSPACE_SCHEMA = """\
@@ -238,64 +779,93 @@ CREATE TABLE IF NOT EXISTS documents (
 CREATE INDEX IF NOT EXISTS idx_cards_stack_status ON cards(stack_id, status);
 """
 
+# Revisions a client may lag behind and still get a delta state sync
+SYNC_LOG_KEEP = 10_000
+
+# Revision log for delta state sync: every write to a synced row appends
+# (entity, entity_id) under a new monotonic id, the workspace revision.
+# A client that last saw revision N needs the current state of each entity
+# logged above N; rows no longer active are sent as tombstones. Retention
+# trims the oldest entries, after which older revisions get a full sync.
+SYNC_LOG_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS sync_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity TEXT NOT NULL,
+    entity_id TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS sync_stacks_ai AFTER INSERT ON stacks BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('stack', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS sync_stacks_au AFTER UPDATE ON stacks BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('stack', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS sync_stacks_ad AFTER DELETE ON stacks BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('stack', old.id);
+END;
+CREATE TRIGGER IF NOT EXISTS sync_cards_ai AFTER INSERT ON cards BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('card', new.card_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sync_cards_au AFTER UPDATE ON cards BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('card', new.card_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sync_cards_ad AFTER DELETE ON cards BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('card', old.card_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sync_chat_ai AFTER INSERT ON chat_messages BEGIN
+    INSERT INTO sync_log (entity, entity_id) VALUES ('chat', new.id);
+END;
+"""
+
 
 class WorkspaceDB(_BaseDB):
     """Stacks, cards, and chat messages. Gateway writes, agent reads via tools."""
 
-    _schema = WORKSPACE_SCHEMA
     _default_path = "/workspace/.os/workspace.db"
+    _migrations = (
+        Migration(1, "baseline schema", _split_sql(WORKSPACE_SCHEMA)),
+        # CREATE TABLE IF NOT EXISTS leaves pre-versioning cards tables without these
+        Migration(2, "card position columns", add_columns=(
+            ("cards", "position_x", "REAL DEFAULT 0.0"),
+            ("cards", "position_y", "REAL DEFAULT 0.0"),
+            ("cards", "z_index", "INTEGER DEFAULT 0"),
+        )),
+        Migration(3, "card template columns", add_columns=tuple(
+            ("cards", col, "TEXT") for col in (
+                "card_type", "summary", "tags", "color", "type_badge",
+                "date", "value", "trend", "trend_direction", "author",
+                "read_time", "headers", "preview_rows",
+            )
+        )),
+        Migration(4, "sync revision log", _split_sql(SYNC_LOG_SCHEMA)),
+        Migration(5, "document content hash", add_columns=(("documents", "content_hash", "TEXT"),)),
+        # One document per file content; rows from before v5 have NULL hashes, which never collide
+        Migration(6, "unique document content hash", (
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash)",
+        )),
+        # documents doubles as the extraction job queue (see documents.DocumentQueue)
+        Migration(7, "document job queue", (
+            "CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status, created_at)",
+        ), add_columns=(("documents", "attempts", "INTEGER DEFAULT 0"),)),
+    )
+    retention_policies = (
+        RetentionPolicy("chat_messages", keep=5_000),
+        RetentionPolicy("sync_log", keep=SYNC_LOG_KEEP),
+    )
 
-    async def connect(self) -> None:
-        await super().connect()
-        await self._migrate_card_position_columns()
-        await self._migrate_documents_table()
-        await self._migrate_card_template_columns()
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._change_listeners: list[ChangeListener] = []
 
-    async def _migrate_card_position_columns(self) -> None:
-        """Add position columns to existing cards tables (CREATE TABLE IF NOT EXISTS won't)."""
-        conn = self._check_conn()
-        for col, typedef in [
-            ("position_x", "REAL DEFAULT 0.0"),
-            ("position_y", "REAL DEFAULT 0.0"),
-            ("z_index", "INTEGER DEFAULT 0"),
-        ]:
-            try:
-                await conn.execute(f"ALTER TABLE cards ADD COLUMN {col} {typedef}")
-                await conn.commit()
-                logger.info("Migrated cards table: added %s", col)
-            except sqlite3.OperationalError as e:
-                if "duplicate column" not in str(e):
-                    raise
-
-    async def _migrate_card_template_columns(self) -> None:
-        """Add template columns to existing cards tables."""
-        conn = self._check_conn()
-        for col in [
-            "card_type", "summary", "tags", "color", "type_badge",
-            "date", "value", "trend", "trend_direction", "author",
-            "read_time", "headers", "preview_rows",
-        ]:
-            try:
-                await conn.execute(f"ALTER TABLE cards ADD COLUMN {col} TEXT")
-                await conn.commit()
-                logger.info("Migrated cards table: added %s", col)
-            except sqlite3.OperationalError as e:
-                if "duplicate column" not in str(e):
-                    raise
-
-    async def _migrate_documents_table(self) -> None:
-        """Create documents table on existing DBs that predate the schema addition."""
-        conn = self._check_conn()
-        try:
-            await conn.execute(
-                "CREATE TABLE IF NOT EXISTS documents ("
-                "doc_id TEXT PRIMARY KEY, filename TEXT NOT NULL, mime_type TEXT, "
-                "file_path TEXT NOT NULL, card_id TEXT, status TEXT DEFAULT 'processing', "
-                "created_at TEXT DEFAULT (datetime('now')))"
-            )
-            await conn.commit()
-        except sqlite3.OperationalError as e:
-            logger.warning("_migrate_documents_table: %s", e)
+    def add_change_listener(self, listener: ChangeListener) -> None:
+        """Call `listener` after every write to stacks, cards or chat (write-through invalidation)."""
+        self._change_listeners.append(listener)
+
+    def _changed(self, entity: str, stack_id: str | None = None) -> None:
+        for listener in self._change_listeners:
+            listener(entity, stack_id)
+
+    def _contents_replaced(self) -> None:
+        self._changed("all")
 
     # -- Stacks ----------------------------------------------------------------
 
@@ -303,11 +873,13 @@ class WorkspaceDB(_BaseDB):
         self, stack_id: str, name: str, color: str | None = None, sort_order: int = 0
     ) -> dict:
         now = time.time()
-        await self.execute(
+        row = await self.execute_returning(
             "INSERT INTO stacks (id, name, color, sort_order, created_at) VALUES (?, ?, ?, ?, ?)",
             (stack_id, name, color, sort_order, now),
+            "SELECT * FROM stacks WHERE id = ?", (stack_id,),
         )
-        return await self.fetchone("SELECT * FROM stacks WHERE id = ?", (stack_id,))
+        self._changed("stack", stack_id)
+        return row
 
     async def list_stacks(self) -> list[dict]:
         return await self.fetchall(
@@ -319,20 +891,25 @@ class WorkspaceDB(_BaseDB):
 
     async def rename_stack(self, stack_id: str, name: str) -> None:
         await self.execute("UPDATE stacks SET name = ? WHERE id = ?", (name, stack_id))
+        self._changed("stack", stack_id)
 
     async def archive_stack(self, stack_id: str) -> None:
-        """Archive stack and cascade to all its cards (transactional)."""
+        """Archive stack and cascade to all its cards (one unit of work)."""
         now = time.time()
-        async with self.transaction():
-            await self.execute(
+
+        def archive(conn: sqlite3.Connection) -> None:
+            conn.execute(
                 "UPDATE stacks SET status = 'archived', archived_at = ? WHERE id = ?",
                 (now, stack_id),
             )
-            await self.execute(
+            conn.execute(
                 "UPDATE cards SET status = 'archived', archived_at = ? WHERE stack_id = ?",
                 (now, stack_id),
             )
 
+        await self.run(archive)
+        self._changed("stack", stack_id)
+
     async def restore_stack(self, stack_id: str) -> None:
         """Restore stack and all its cards (transactional)."""
         async with self.transaction():
@@ -344,6 +921,7 @@ class WorkspaceDB(_BaseDB):
                 "UPDATE cards SET status = 'active', archived_at = NULL WHERE stack_id = ?",
                 (stack_id,),
             )
+        self._changed("stack", stack_id)
 
     # -- Cards -----------------------------------------------------------------
 
@@ -372,11 +950,11 @@ class WorkspaceDB(_BaseDB):
         preview_rows: list | None = None,
     ) -> dict:
         now = time.time()
-        blocks_json = json.dumps(blocks)
-        tags_json = json.dumps(tags) if tags is not None else None
-        headers_json = json.dumps(headers) if headers is not None else None
-        preview_rows_json = json.dumps(preview_rows) if preview_rows is not None else None
-        await self.execute(
+        blocks_json = _json_column(blocks)
+        tags_json = _json_column(tags) if tags is not None else None
+        headers_json = _json_column(headers) if headers is not None else None
+        preview_rows_json = _json_column(preview_rows) if preview_rows is not None else None
+        row = await self.execute_returning(
             "INSERT INTO cards (card_id, stack_id, title, blocks, size, updated_at, "
             "position_x, position_y, z_index, card_type, summary, tags, color, "
             "type_badge, date, value, trend, trend_direction, author, read_time, "
@@ -397,8 +975,11 @@ class WorkspaceDB(_BaseDB):
              position_x, position_y, z_index, card_type, summary, tags_json, color,
              type_badge, date, value, trend, trend_direction, author, read_time,
              headers_json, preview_rows_json),
+            "SELECT * FROM cards WHERE card_id = ?", (card_id,),
         )
-        return await self.fetchone("SELECT * FROM cards WHERE card_id = ?", (card_id,))
+        # An existing card keeps its stack, so report the row's stack_id
+        self._changed("card", row["stack_id"] if row else stack_id)
+        return row
 
     async def update_card_content(
         self, card_id: str, blocks: list, size: str | None = None
@@ -406,43 +987,77 @@ class WorkspaceDB(_BaseDB):
         """Update only blocks (and optionally size) on an existing card."""
         now = time.time()
         if size:
-            await self.execute(
-                "UPDATE cards SET blocks = ?, size = ?, updated_at = ? WHERE card_id = ?",
-                (json.dumps(blocks), size, now, card_id),
-            )
+            sql = "UPDATE cards SET blocks = ?, size = ?, updated_at = ? WHERE card_id = ?"
+            params: tuple = (_json_column(blocks), size, now, card_id)
         else:
-            await self.execute(
+            sql = "UPDATE cards SET blocks = ?, updated_at = ? WHERE card_id = ?"
+            params = (_json_column(blocks), now, card_id)
+        row = await self.execute_returning(
+            sql, params, "SELECT * FROM cards WHERE card_id = ?", (card_id,),
+        )
+        self._card_changed(row)
+        return row
+
+    async def transform_card_blocks(
+        self, card_id: str, transform: Callable[[list], list],
+    ) -> dict | None:
+        """Read-modify-write a card's blocks in one unit of work.
+
+        transform receives the decoded blocks and returns the new list; it runs
+        on the database thread. Returns the updated row, or None if no such card.
+        """
+        now = time.time()
+
+        def apply(conn: sqlite3.Connection) -> dict | None:
+            row = conn.execute("SELECT blocks FROM cards WHERE card_id = ?", (card_id,)).fetchone()
+            if row is None:
+                return None
+            blocks = json.loads(row["blocks"]) if row["blocks"] else []
+            conn.execute(
                 "UPDATE cards SET blocks = ?, updated_at = ? WHERE card_id = ?",
-                (json.dumps(blocks), now, card_id),
+                (_json_column(transform(blocks)), now, card_id),
             )
-        return await self.fetchone("SELECT * FROM cards WHERE card_id = ?", (card_id,))
+            updated = conn.execute("SELECT * FROM cards WHERE card_id = ?", (card_id,)).fetchone()
+            return dict(updated)
+
+        row = await self.run(apply)
+        self._card_changed(row)
+        return row
 
     async def update_card_position(
         self, card_id: str, position_x: float, position_y: float, z_index: int
     ) -> dict | None:
         """Update only position on an existing card. Returns None if card not found."""
         now = time.time()
-        cursor = await self.execute(
+        row = await self.execute_returning(
             "UPDATE cards SET position_x = ?, position_y = ?, z_index = ?, updated_at = ? "
             "WHERE card_id = ?",
             (position_x, position_y, z_index, now, card_id),
+            "SELECT * FROM cards WHERE card_id = ?", (card_id,),
         )
-        if cursor.rowcount == 0:
-            return None
-        return await self.fetchone("SELECT * FROM cards WHERE card_id = ?", (card_id,))
+        self._card_changed(row)
+        return row
 
     async def archive_card(self, card_id: str) -> None:
         now = time.time()
-        await self.execute(
+        row = await self.execute_returning(
             "UPDATE cards SET status = 'archived', archived_at = ? WHERE card_id = ?",
             (now, card_id),
+            "SELECT stack_id FROM cards WHERE card_id = ?", (card_id,), columns="stack_id",
         )
+        self._card_changed(row)
 
     async def restore_card(self, card_id: str) -> None:
-        await self.execute(
+        row = await self.execute_returning(
             "UPDATE cards SET status = 'active', archived_at = NULL WHERE card_id = ?",
             (card_id,),
+            "SELECT stack_id FROM cards WHERE card_id = ?", (card_id,), columns="stack_id",
         )
+        self._card_changed(row)
+
+    def _card_changed(self, row: dict | None) -> None:
+        if row is not None:
+            self._changed("card", row["stack_id"])
 
     async def get_cards_by_stack(self, stack_id: str) -> list[dict]:
         return await self.fetchall(
@@ -453,21 +1068,98 @@ class WorkspaceDB(_BaseDB):
     async def get_all_cards(self) -> list[dict]:
         return await self.fetchall("SELECT * FROM cards")
 
+    @staticmethod
+    def _active_cards_filter(
+        since_revision: int | None, stack_id: str | None, exclude_stack_id: str | None,
+    ) -> tuple[str, tuple]:
+        sql = ("FROM cards c JOIN stacks s ON s.id = c.stack_id "
+               "WHERE c.status = 'active' AND s.status = 'active'")
+        params: tuple = ()
+        if since_revision is not None:
+            sql += (" AND c.card_id IN "
+                    "(SELECT entity_id FROM sync_log WHERE entity = 'card' AND id > ?)")
+            params += (since_revision,)
+        if stack_id is not None:
+            sql += " AND c.stack_id = ?"
+            params += (stack_id,)
+        if exclude_stack_id is not None:
+            sql += " AND c.stack_id != ?"
+            params += (exclude_stack_id,)
+        return sql, params
+
+    async def iter_active_cards(
+        self,
+        raw: bool = False,
+        since_revision: int | None = None,
+        stack_id: str | None = None,
+        exclude_stack_id: str | None = None,
+    ) -> AsyncIterator[dict | sqlite3.Row]:
+        """Stream active cards of active stacks, grouped in stack sort order.
+
+        With since_revision, only cards written after that revision;
+        stack_id / exclude_stack_id narrow to one stack or all but one.
+
+        Selects the matching ids first, then reads the cards ITERATE_BATCH_SIZE
+        at a time. No connection stays checked out while the caller works on a
+        batch: a chunked state sync awaiting a slow client must not hold a
+        pooled reader. A card changed between batches is read as it is then;
+        the change is in sync_log past the caller's revision either way.
+        """
+        where, params = self._active_cards_filter(since_revision, stack_id, exclude_stack_id)
+        ids = [
+            r[0] async for r in self.iterate(
+                f"SELECT c.card_id {where} ORDER BY s.sort_order, s.rowid, c.rowid", params, raw=True,
+            )
+        ]
+        for start in range(0, len(ids), ITERATE_BATCH_SIZE):
+            batch = ids[start:start + ITERATE_BATCH_SIZE]
+            marks = ", ".join("?" * len(batch))
+            rows = {
+                r["card_id"]: r async for r in self.iterate(
+                    f"SELECT * FROM cards WHERE card_id IN ({marks})", tuple(batch), raw=raw,
+                )
+            }
+            for card_id in batch:
+                if card_id in rows:  # deleted since the ids were read
+                    yield rows[card_id]
+
+    async def count_active_cards(self, since_revision: int | None = None) -> int:
+        where, params = self._active_cards_filter(since_revision, None, None)
+        row = await self.fetchone(f"SELECT COUNT(*) AS n {where}", params)
+        return row["n"]
+
+    async def active_card_ids(self, since_revision: int | None = None) -> set[str]:
+        where, params = self._active_cards_filter(since_revision, None, None)
+        return {r["card_id"] for r in await self.fetchall(f"SELECT c.card_id {where}", params)}
+
+    async def get_card(self, card_id: str) -> dict | None:
+        return await self.fetchone("SELECT * FROM cards WHERE card_id = ?", (card_id,))
+
+    async def get_card_blocks(self, card_id: str) -> str | None:
+        """A card's stored blocks JSON text, undecoded."""
+        row = await self.fetchone("SELECT blocks FROM cards WHERE card_id = ?", (card_id,))
+        return row["blocks"] if row else None
+
+    async def cards_with_inline_documents(self) -> list[str]:
+        """Ids of cards whose document blocks may still embed base64 file data."""
+        rows = await self.fetchall(
+            "SELECT card_id FROM cards "
+            "WHERE blocks LIKE '%\"type\": \"document\"%' AND blocks LIKE '%\"data\": \"%'"
+        )
+        return [r["card_id"] for r in rows]
+
     # -- Chat ------------------------------------------------------------------
 
     async def add_chat_message(self, role: str, content: str) -> dict:
         now = time.time()
-        cursor = await self.execute(
+        row = await self.execute_returning(
             "INSERT INTO chat_messages (role, content, timestamp) VALUES (?, ?, ?)",
             (role, content, now),
+            "SELECT * FROM chat_messages WHERE id = ?",
         )
-        await self.execute(
-            "DELETE FROM chat_messages WHERE id NOT IN "
-            "(SELECT id FROM chat_messages ORDER BY id DESC LIMIT 5000)"
-        )
-        return await self.fetchone(
-            "SELECT * FROM chat_messages WHERE id = ?", (cursor.lastrowid,)
-        )
+        self._changed("chat")
+        # Retention is enforced off the hot path by MaintenanceScheduler
+        return row
 
     async def get_chat_history(self, limit: int = 100) -> list[dict]:
         rows = await self.fetchall(
@@ -477,17 +1169,59 @@ class WorkspaceDB(_BaseDB):
         rows.reverse()
         return rows
 
+    # -- Sync log --------------------------------------------------------------
+
+    async def sync_window(self) -> tuple[int, int | None]:
+        """(current revision, oldest revision still in the log or None if empty)."""
+        row = await self.fetchone(
+            "SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'sync_log') AS revision, "
+            "(SELECT MIN(id) FROM sync_log) AS oldest"
+        )
+        return row["revision"] or 0, row["oldest"]
+
+    async def changed_since(self, revision: int) -> dict[str, set[str]]:
+        """Ids written after `revision`, keyed by entity ('stack', 'card', 'chat')."""
+        changed: dict[str, set[str]] = {}
+        async for entity, entity_id in self.iterate(
+            "SELECT DISTINCT entity, entity_id FROM sync_log WHERE id > ?", (revision,), raw=True,
+        ):
+            changed.setdefault(entity, set()).add(entity_id)
+        return changed
+
     # -- Documents -------------------------------------------------------------
 
     async def create_document(
         self, doc_id: str, filename: str, mime_type: str, file_path: str, card_id: str | None = None
     ) -> dict:
-        await self.execute(
+        return await self.execute_returning(
             "INSERT INTO documents (doc_id, filename, mime_type, file_path, card_id) "
             "VALUES (?, ?, ?, ?, ?)",
             (doc_id, filename, mime_type, file_path, card_id),
+            "SELECT * FROM documents WHERE doc_id = ?", (doc_id,),
         )
-        return await self.fetchone("SELECT * FROM documents WHERE doc_id = ?", (doc_id,))
+
+    async def claim_document(
+        self, doc_id: str, filename: str, mime_type: str, file_path: str, content_hash: str,
+    ) -> dict:
+        """Create a document for `content_hash` unless one exists; return the row that holds it.
+
+        The returned doc_id differs from `doc_id` when the same content was
+        uploaded before. Check and insert are one unit of work, so two
+        concurrent uploads of one file cannot both create a row.
+        """
+        def claim(conn: sqlite3.Connection) -> dict:
+            conn.execute(
+                "INSERT INTO documents (doc_id, filename, mime_type, file_path, content_hash) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(content_hash) DO NOTHING",
+                (doc_id, filename, mime_type, file_path, content_hash),
+            )
+            row = conn.execute("SELECT * FROM documents WHERE content_hash = ?", (content_hash,)).fetchone()
+            return dict(row)
+
+        return await self.run(claim)
+
+    async def update_document_file(self, doc_id: str, file_path: str) -> None:
+        await self.execute("UPDATE documents SET file_path = ? WHERE doc_id = ?", (file_path, doc_id))
 
     async def update_document_status(self, doc_id: str, status: str, card_id: str | None = None) -> None:
         if card_id is not None:
@@ -501,5 +1235,36 @@ class WorkspaceDB(_BaseDB):
                 (status, doc_id),
             )
 
+    async def queue_document(self, doc_id: str) -> dict | None:
+        """Mark a document queued for extraction and return its row."""
+        return await self.execute_returning(
+            "UPDATE documents SET status = 'queued' WHERE doc_id = ?", (doc_id,),
+            "SELECT * FROM documents WHERE doc_id = ?", (doc_id,),
+        )
+
+    async def claim_next_document(self) -> dict | None:
+        """Move the oldest queued document to 'processing' and return it (None if none are queued)."""
+        def claim(conn: sqlite3.Connection) -> dict | None:
+            row = conn.execute(
+                "SELECT doc_id FROM documents WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE documents SET status = 'processing', attempts = COALESCE(attempts, 0) + 1 "
+                "WHERE doc_id = ?",
+                (row["doc_id"],),
+            )
+            return dict(conn.execute("SELECT * FROM documents WHERE doc_id = ?", (row["doc_id"],)).fetchone())
+
+        return await self.run(claim)
+
+    async def requeue_documents(self) -> int:
+        """Queue again documents left 'processing' by a stopped server. Returns how many."""
+        def requeue(conn: sqlite3.Connection) -> int:
+            return conn.execute("UPDATE documents SET status = 'queued' WHERE status = 'processing'").rowcount
+
+        return await self.run(requeue)
+
     async def list_documents(self) -> list[dict]:
         return await self.fetchall("SELECT * FROM documents ORDER BY created_at DESC")
@@ -0,0 +1,212 @@
+"""Durable document-processing queue, worked apart from the chat session.
+
+The documents table is the queue. Once an upload's card exists the
+gateway marks its document 'queued'; a worker claims the oldest queued
+document ('processing', attempts + 1) and leaves it 'completed' or
+'failed'. Each job runs in an agent session of
+its own (AgentRuntime.run_document_session), so EXTRACTION_WORKERS
+documents are read at once without waiting on mission_lock or holding up
+the user's chat.
+
+Workers are server-scoped: a disconnect does not stop them, and what
+they send reaches the browser on whichever connection is current (or is
+picked up from the database by the next state sync). Documents still
+'processing' when the server stopped are queued again by start(); one
+interrupted more than MAX_ATTEMPTS times is marked failed instead.
+
+Progress shows on the document's card (card_id = doc_id), whose badge
+goes Queued -> Processing... -> Ready or Failed.
+
+With a PreExtractor, queueing also starts the document's local
+pre-extraction, and the worker's prompt points the agent at the
+ready-made text instead of asking it to run pdftotext itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from .database import WorkspaceDB
+from .preextract import PreExtractor, Sidecar
+from .protocol import SystemMessage, SystemPayload, _new_id, to_json
+from .runtime import AgentRuntime
+
+logger = logging.getLogger(__name__)
+
+SendFn = Callable[[str], Awaitable[None]]
+
+EXTRACTION_WORKERS = 2  # agent sessions reading documents at once
+MAX_ATTEMPTS = 3        # claims (server restarts mid-job included) before a document is failed
+CLAIM_RETRY_SECONDS = 5.0
+
+
+async def update_card_badge(
+    workspace_db: WorkspaceDB, send_fn: SendFn, card_id: str, badge_text: str, badge_variant: str,
+    detail: str = "",
+) -> None:
+    """Swap the badge on a document's card and optionally append a text block."""
+
+    def swap_badge(blocks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        # Replace first badge block; preserve document + heading blocks
+        updated: list[dict[str, Any]] = []
+        badge_replaced = False
+        for block in blocks:
+            if block.get("type") == "badge" and not badge_replaced:
+                updated.append({"type": "badge", "text": badge_text, "variant": badge_variant})
+                badge_replaced = True
+            else:
+                updated.append(block)
+
+        if not badge_replaced:
+            updated.append({"type": "badge", "text": badge_text, "variant": badge_variant})
+
+        if detail:
+            updated.append({"type": "text", "content": detail})
+        return updated
+
+    # Read, rewrite, and commit the blocks in one database round trip
+    row = await workspace_db.transform_card_blocks(card_id, swap_badge)
+    if not row:
+        return
+    updated = json.loads(row["blocks"])
+
+    msg = {
+        "type": "canvas_update",
+        "id": _new_id(),
+        "timestamp": int(time.time() * 1000),
+        "payload": {
+            "command": "update_card",
+            "card_id": card_id,
+            "blocks": updated,
+        },
+    }
+    await send_fn(json.dumps(msg))
+
+
+def extraction_prompt(doc: dict[str, Any], sidecar: Sidecar | None = None) -> str:
+    if sidecar is not None:
+        how = (
+            f"Its text is already extracted to {sidecar.text_path} ({sidecar.pages} page(s), "
+            f"pages separated by form feeds). Page layout and {sidecar.tables} detected table(s), "
+            f"split into cells, are in {sidecar.layout_path} under \"layout\" and \"tables\". "
+            f"Work from those; open the original only if they are not enough.\n"
+        )
+    else:
+        how = "Read the document using Bash (e.g. pdftotext or python). Do NOT use the Read tool on PDFs.\n"
+    return (
+        f"A file was uploaded and saved to {doc['file_path']}.\n"
+        f"Filename: {doc['filename']}, Type: {doc['mime_type']}\n"
+        f"Its card has card_id: {doc['doc_id']}. Use update_card to add extracted data.\n"
+        f"{how}"
+        f"Finish with a one or two sentence summary of what the document contains."
+    )
+
+
+class DocumentQueue:
+    """Workers that take queued documents from the workspace database and extract them.
+
+    start() once the database is connected; enqueue() after recording or
+    re-queueing a document; close() on shutdown. process() handles one
+    claimed document and is what each worker runs.
+    """
+
+    def __init__(
+        self, workspace_db: WorkspaceDB, runtime: AgentRuntime, workers: int = EXTRACTION_WORKERS,
+        preextractor: PreExtractor | None = None,
+    ) -> None:
+        self._db = workspace_db
+        self._runtime = runtime
+        self._preextractor = preextractor
+        self._worker_count = workers
+        self._workers: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        """Queue again whatever a stopped server left in progress, then start the workers."""
+        requeued = await self._db.requeue_documents()
+        if requeued:
+            logger.info("Resuming %d interrupted document job(s)", requeued)
+        for i in range(self._worker_count):
+            self._workers.append(asyncio.create_task(self._work(), name=f"document-worker-{i}"))
+
+    async def enqueue(self, doc_id: str) -> None:
+        """Mark a recorded document queued, start its pre-extraction and wake a worker for it."""
+        doc = await self._db.queue_document(doc_id)
+        if doc is not None and self._preextractor is not None:
+            self._preextractor.start(doc)
+        self._wake.set()
+
+    async def close(self) -> None:
+        """Stop the workers. Documents they were reading are resumed by the next start()."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def _work(self) -> None:
+        while True:
+            # Cleared before claiming, so an enqueue during the claim is not missed
+            self._wake.clear()
+            try:
+                doc = await self._db.claim_next_document()
+            except Exception:
+                logger.exception("Claiming a queued document failed")
+                await asyncio.sleep(CLAIM_RETRY_SECONDS)
+                continue
+            if doc is None:
+                await self._wake.wait()
+                continue
+            await self.process(doc)
+
+    async def process(self, doc: dict[str, Any]) -> None:
+        """Extract one claimed document and record how it went."""
+        doc_id, filename = doc["doc_id"], doc["filename"]
+        if (doc.get("attempts") or 0) > MAX_ATTEMPTS:
+            logger.warning("Document %s interrupted %d times -- giving up", doc_id, MAX_ATTEMPTS)
+            await self._fail(doc_id, filename)
+            return
+
+        try:
+            await self._send_badge(doc_id, "Processing...", "default")
+            card = await self._db.get_card(doc_id)
+            sidecar = await self._preextractor.sidecar(doc) if self._preextractor else None
+            summary = await self._runtime.run_document_session(
+                extraction_prompt(doc, sidecar), card["stack_id"] if card else None,
+            )
+            await self._db.update_document_status(doc_id, "completed")
+        except Exception as e:
+            logger.error("Extraction failed for %s: %s", filename, e)
+            await self._fail(doc_id, filename)
+            return
+        self.completed += 1
+        logger.info("Extracted %s (%s)", filename, doc_id)
+        try:
+            await update_card_badge(self._db, self._runtime.send_to_client, doc_id, "Ready", "success",
+                                    summary.strip())
+        except Exception as e:
+            logger.warning("Could not update the card of %s: %s", doc_id, e)
+
+    async def _fail(self, doc_id: str, filename: str) -> None:
+        self.failed += 1
+        user_msg = f"We couldn't process {filename}. Please try again or use a different format."
+        try:
+            await self._db.update_document_status(doc_id, "failed")
+            await update_card_badge(self._db, self._runtime.send_to_client, doc_id, "Failed", "destructive",
+                                    user_msg)
+            await self._runtime.send_to_client(to_json(SystemMessage(
+                type="system", payload=SystemPayload(event="error", message=user_msg),
+            )))
+        except Exception as send_err:
+            logger.warning("Could not report failed extraction of %s: %s", doc_id, send_err)
+
+    async def _send_badge(self, doc_id: str, text: str, variant: str) -> None:
+        await update_card_badge(self._db, self._runtime.send_to_client, doc_id, text, variant)
+
+    def stats(self) -> dict[str, int]:
+        return {"workers": len(self._workers), "completed": self.completed, "failed": self.failed}
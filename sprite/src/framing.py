@@ -0,0 +1,217 @@
+"""Wire framing for the Bridge <-> Sprite TCP link.
+
+The link starts as newline-delimited JSON, which every Bridge speaks. On
+connect the Sprite offers length-prefixed framing with the codecs it can
+use, and a Bridge that supports it picks one:
+
+    Sprite -> Bridge   {"type": "link_offer", "framing": 1, "codecs": ["zstd", "deflate"]}
+    Bridge -> Sprite   {"type":"link_select","framing":1,"codec":"deflate"}
+                       ... Bridge output is framed from here on
+    Sprite -> Bridge   {"type": "link_ack", "framing": 1, "codec": "deflate"}
+                       ... Sprite output is framed from here on
+
+Each side keeps sending lines until its own marker line (link_select or
+link_ack), so messages already in flight either way are never misread.
+An older Bridge never answers; it forwards link_offer to the browser,
+which drops unknown message types, and the link stays on lines.
+
+A frame is a 5-byte header (codec id, then payload length as a big-endian
+uint32) followed by the UTF-8 JSON payload, compressed with the selected
+codec when it is at least COMPRESS_MIN_BYTES long.
+
+Outbound messages can be batched: a streamed agent turn emits hundreds of
+small agent_event and canvas_update messages, and writing each one is a
+send syscall. With a batch window, messages sent within it go out in one
+write (still one line or frame each, in order), and callers flush at the
+end of a turn or on an error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FRAMING_VERSION = 1
+MAX_FRAME_BYTES = 50 * 1024 * 1024  # same ceiling as the line reader (33 MB base64 upload)
+COMPRESS_MIN_BYTES = 1024  # smaller payloads are not worth a compressor call
+COMPRESS_SAMPLE_BYTES = 16 * 1024  # larger payloads are compressed only if this prefix shrinks...
+COMPRESS_MAX_RATIO = 0.7           # ...to at most this fraction (base64 of a PDF does not)
+DEFLATE_LEVEL = 1  # several times faster than the default level for a slightly larger output
+BATCH_WINDOW = 0.005  # seconds; one write per window while a turn streams
+BATCH_MAX_BYTES = 64 * 1024  # a batch this large is written without waiting for the window
+
+_HEADER = struct.Struct(">BI")
+_RAW, _DEFLATE, _ZSTD = 0, 1, 2
+_CODEC_IDS = {"deflate": _DEFLATE, "zstd": _ZSTD}
+_SELECT_PREFIX = b'{"type":"link_select"'  # JSON.stringify output from the Bridge
+
+
+class FrameError(ValueError):
+    """A frame from the Bridge is malformed, oversized or uses an unknown codec."""
+
+
+def supported_codecs() -> list[str]:
+    """Codecs this Sprite can use, in order of preference."""
+    return (["zstd"] if zstandard is not None else []) + ["deflate"]
+
+
+def encode_frame(data: bytes, codec: str | None) -> bytes:
+    """Frame `data`, compressed with `codec` when that makes it smaller."""
+    if codec is not None and len(data) >= COMPRESS_MIN_BYTES and _compressible(data, codec):
+        payload = _compress(data, codec)
+        if len(payload) < len(data):
+            return _HEADER.pack(_CODEC_IDS[codec], len(payload)) + payload
+    return _HEADER.pack(_RAW, len(data)) + data
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, DEFLATE_LEVEL)
+
+
+def _compressible(data: bytes, codec: str) -> bool:
+    """Whether a large payload is worth compressing, judged by its first bytes."""
+    if len(data) <= 2 * COMPRESS_SAMPLE_BYTES:
+        return True
+    return len(_compress(data[:COMPRESS_SAMPLE_BYTES], codec)) <= COMPRESS_SAMPLE_BYTES * COMPRESS_MAX_RATIO
+
+
+def decode_payload(codec_id: int, payload: bytes) -> bytes:
+    """Decode one frame payload. Raises FrameError on bad data or an oversized result."""
+    try:
+        if codec_id == _RAW:
+            return payload
+        if codec_id == _DEFLATE:
+            inflater = zlib.decompressobj()
+            data = inflater.decompress(payload, MAX_FRAME_BYTES)
+            if inflater.unconsumed_tail:
+                raise FrameError("Inflated frame exceeds MAX_FRAME_BYTES")
+            return data
+        if codec_id == _ZSTD and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompress(payload, max_output_size=MAX_FRAME_BYTES)
+    except (zlib.error, RuntimeError) as e:  # zstandard.ZstdError subclasses RuntimeError
+        raise FrameError(f"Corrupt frame: {e}") from e
+    raise FrameError(f"Unknown frame codec {codec_id}")
+
+
+class SpriteLink:
+    """One Bridge connection: reads and writes messages in the negotiated mode.
+
+    read() and send() speak newline-delimited JSON until the Bridge
+    selects framing (see module docstring), then length-prefixed frames.
+    With a batch_window (seconds), sent messages are held until the window
+    closes, BATCH_MAX_BYTES accumulate, or flush() is called.
+    """
+
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, batch_window: float = 0.0,
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._batch_window = batch_window
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self.codec: str | None = None
+        self.framed_in = False    # the Bridge's output is framed (link_select received)
+        self.framed_out = False   # our output is framed (link_ack sent)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.writes = 0
+
+    def offer(self) -> None:
+        """Offer framing to the Bridge. Call before anything else is sent."""
+        offer = {"type": "link_offer", "framing": FRAMING_VERSION, "codecs": supported_codecs()}
+        self._write((json.dumps(offer) + "\n").encode())
+
+    async def read(self) -> str | None:
+        """Next message from the Bridge, "" for a consumed link line, None at EOF."""
+        if self.framed_in:
+            try:
+                codec_id, length = _HEADER.unpack(await self._reader.readexactly(_HEADER.size))
+                if length > MAX_FRAME_BYTES:
+                    raise FrameError(f"Frame of {length} bytes exceeds MAX_FRAME_BYTES")
+                payload = await self._reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                return None
+            self.bytes_in += _HEADER.size + length
+            return decode_payload(codec_id, payload).decode("utf-8", errors="replace")
+
+        line = await self._reader.readline()
+        if not line:
+            return None
+        self.bytes_in += len(line)
+        if line.startswith(_SELECT_PREFIX) and self._select(line):
+            return ""
+        return line.decode("utf-8", errors="replace").strip()
+
+    def _select(self, line: bytes) -> bool:
+        """Switch to frames on a valid link_select; False leaves the line to the gateway."""
+        try:
+            select = json.loads(line)
+        except ValueError:
+            return False
+        if not isinstance(select, dict) or select.get("framing") != FRAMING_VERSION:
+            return False
+        codec = select.get("codec")
+        self.codec = codec if codec in supported_codecs() else None
+        self.framed_in = True
+        ack = {"type": "link_ack", "framing": FRAMING_VERSION, "codec": self.codec}
+        self.flush_nowait()  # lines already batched must precede the ack
+        self._write((json.dumps(ack) + "\n").encode())
+        self.framed_out = True
+        logger.info("Bridge link framed (codec=%s)", self.codec)
+        return True
+
+    def send_nowait(self, data: str) -> None:
+        """Queue one message in the current mode; written now or when the batch closes."""
+        raw = data.encode()
+        encoded = encode_frame(raw, self.codec) if self.framed_out else raw + b"\n"
+        self._pending.append(encoded)
+        self._pending_bytes += len(encoded)
+        if self._batch_window <= 0 or self._pending_bytes >= BATCH_MAX_BYTES:
+            self.flush_nowait()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self._batch_window, self.flush_nowait)
+
+    async def send(self, data: str) -> None:
+        self.send_nowait(data)
+        await self._writer.drain()  # returns at once unless the transport is over its high-water mark
+
+    def flush_nowait(self) -> None:
+        """Write every batched message to the transport in one call."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        data = self._pending[0] if len(self._pending) == 1 else b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        if not self._writer.is_closing():
+            self._write(data)
+
+    async def flush(self) -> None:
+        """Write batched messages now (end of a turn, after an error) and wait for drain."""
+        self.flush_nowait()
+        await self._writer.drain()
+
+    async def drain(self) -> None:
+        """Wait until the transport is back under its write buffer limit."""
+        await self._writer.drain()
+
+    def _write(self, data: bytes) -> None:
+        self.bytes_out += len(data)
+        self.writes += 1
+        self._writer.write(data)
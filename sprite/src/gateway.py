@@ -4,18 +4,28 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import hashlib
 import json
 import logging
+import os
 import time
 from pathlib import Path
 from typing import Any, Callable, Awaitable, TYPE_CHECKING
 
-from .protocol import SystemMessage, SystemPayload, _new_id, _now_ms, to_json, is_websocket_message
+from .blobs import BLOB_RANGE_BYTES, BlobStore, document_block
+from .documents import DocumentQueue
+from .protocol import (
+    BlobData, BlobDataPayload, FileUploadAck, FileUploadAckPayload, StatusPayload, StatusUpdate,
+    SystemMessage, SystemPayload,
+    _new_id, _now_ms, to_json, is_websocket_message,
+)
 from .runtime import AgentRuntime
-from .state_sync import send_state_sync
+from .state_sync import StateSyncCache, send_state_sync, send_state_sync_chunked
+from .uploads import CompletedUpload, UploadError, UploadStore
 
 if TYPE_CHECKING:
     from .database import WorkspaceDB, MemoryDB
+    from .query_stats import QueryStats
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +33,82 @@ SendFn = Callable[[str], Awaitable[None]]
 
 _ROUTED_TYPES = frozenset({
     "mission", "file_upload", "canvas_interaction",
-    "heartbeat", "auth", "system", "state_sync_request",
+    "heartbeat", "auth", "system", "state_sync_request", "blob_request",
+    "file_upload_begin", "file_upload_chunk", "file_upload_commit",
 })
 
+# dispatch() lanes: control is answered inline by the read loop, the rest queue
+_CONTROL_TYPES = frozenset({"heartbeat", "auth"})
+_MISSION_TYPES = frozenset({"mission"})
+MISSION_QUEUE_MAX = 8    # missions waiting behind the running one
+CANVAS_QUEUE_MAX = 256   # canvas interactions, syncs, uploads, blob reads
+
+
+class _Lane:
+    """Bounded queue of parsed messages drained in order by one worker task.
+
+    submit() never waits: a full lane rejects the message so the reader
+    keeps serving control traffic. depth/peak/handled/rejected are kept
+    for lane_stats().
+    """
+
+    def __init__(self, name: str, handler: Callable[[dict[str, Any]], Awaitable[None]], maxsize: int) -> None:
+        self.name = name
+        self._handler = handler
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize)
+        self._worker: asyncio.Task | None = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.peak = 0
+        self.handled = 0
+        self.rejected = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, msg: dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(msg)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.peak = max(self.peak, self._queue.qsize())
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._work())
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            msg = await self._queue.get()
+            self._idle.clear()
+            try:
+                await self._handler(msg)
+            except Exception:
+                logger.exception("%s lane: handler failed for %s", self.name, msg.get("type"))
+            finally:
+                self._idle.set()
+                self.handled += 1
+
+    async def close(self, finish_running: bool = False) -> None:
+        """Drop queued messages and stop the worker, optionally after its current message."""
+        dropped = self._queue.qsize()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        if dropped:
+            logger.info("%s lane: dropped %d queued message(s) on close", self.name, dropped)
+        if self._worker is None:
+            return
+        if finish_running:
+            # The worker finishes its message, then blocks on the empty queue
+            await self._idle.wait()
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def stats(self) -> dict[str, int]:
+        return {"depth": self.depth, "peak": self.peak, "handled": self.handled, "rejected": self.rejected}
+
 def _format_canvas_context(canvas_state: list[dict[str, Any]]) -> str:
     """Format canvas state into a readable text block for the agent."""
     if not canvas_state:
@@ -64,8 +147,12 @@ def _format_canvas_context(canvas_state: list[dict[str, Any]]) -> str:
 class SpriteGateway:
     """Routes parsed messages to stub handlers by type.
 
-    mission and heartbeat share an async lock for serial execution.
-    All other types run concurrently.
+    route() handles one message to completion. dispatch() is the read
+    loop's entry point: control messages (ping, heartbeat, auth) are
+    answered inline, everything else goes to a lane so a long mission never
+    stalls the reader. Missions run one at a time under mission_lock (shared
+    across connections); canvas interactions, state syncs, uploads and blob
+    reads run in order on their own lane, concurrently with missions.
     """
 
     def __init__(
@@ -74,35 +161,101 @@ class SpriteGateway:
         runtime: AgentRuntime | None = None,
         workspace_db: WorkspaceDB | None = None,
         mission_lock: asyncio.Lock | None = None,
+        query_stats: QueryStats | None = None,
+        blob_store: BlobStore | None = None,
+        sync_cache: StateSyncCache | None = None,
+        flush_fn: Callable[[], Awaitable[None]] | None = None,
+        upload_store: UploadStore | None = None,
+        document_queue: DocumentQueue | None = None,
     ) -> None:
         self.send = send_fn
+        self._flush_fn = flush_fn
         self.mission_lock = mission_lock or asyncio.Lock()
         self._tasks: set[asyncio.Task] = set()
+        self._welcome_sent = False
         self._workspace_db = workspace_db
+        self._query_stats = query_stats
+        self._blobs = blob_store or BlobStore()
+        self._uploads = upload_store or UploadStore()
+        self._documents = document_queue
+        self._sync_cache = sync_cache
         # Use provided runtime (server-scoped) or create one (tests)
         self.runtime = runtime or AgentRuntime(send_fn=send_fn)
+        self._mission_lane = _Lane("mission", self._run_lane_message, MISSION_QUEUE_MAX)
+        self._canvas_lane = _Lane("canvas", self._run_lane_message, CANVAS_QUEUE_MAX)
+
+    def lane_stats(self) -> dict[str, dict[str, int]]:
+        """Queue depth, peak depth, handled and rejected counts per dispatch lane."""
+        return {lane.name: lane.stats() for lane in (self._mission_lane, self._canvas_lane)}
 
     async def cancel_tasks(self) -> None:
-        """Cancel all tracked background tasks (called on disconnect/shutdown)."""
+        """Cancel all tracked background tasks (called on disconnect/shutdown).
+
+        Queued messages are dropped. A mission already running is allowed
+        to finish, as it did when the read loop awaited it inline.
+        """
+        await self._canvas_lane.close()
+        await self._mission_lane.close(finish_running=True)
         for task in list(self._tasks):
             task.cancel()
         if self._tasks:
             await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
 
+    async def flush(self) -> None:
+        """Write out messages batched on the connection (no-op without a flush_fn)."""
+        if self._flush_fn is None:
+            return
+        try:
+            await self._flush_fn()
+        except Exception as e:
+            logger.warning("Flush failed (connection dead?): %s", e)
+
     async def route(self, raw: str) -> None:
-        """Parse a raw WS message and dispatch to the correct handler."""
+        """Parse a raw WS message, handle it, then flush whatever it sent."""
+        try:
+            parsed = await self._parse(raw)
+            if parsed is not None:
+                await self._handle(parsed)
+        finally:
+            await self.flush()
+
+    async def dispatch(self, raw: str) -> None:
+        """Parse a raw WS message and hand it to its lane without waiting for it to run."""
+        try:
+            parsed = await self._parse(raw)
+            if parsed is None:
+                return
+            msg_type = parsed["type"]
+            if msg_type in _CONTROL_TYPES:
+                await self._handle(parsed)
+                return
+            lane = self._mission_lane if msg_type in _MISSION_TYPES else self._canvas_lane
+            if not lane.submit(parsed):
+                logger.warning("%s lane full (%d queued) -- rejecting %s", lane.name, lane.depth, msg_type)
+                await self._send_error("Server busy, please retry", parsed.get("request_id"))
+        finally:
+            await self.flush()
+
+    async def _run_lane_message(self, msg: dict[str, Any]) -> None:
+        try:
+            await self._handle(msg)
+        finally:
+            await self.flush()
+
+    async def _parse(self, raw: str) -> dict[str, Any] | None:
+        """Validated message dict, or None after answering a ping or reporting an error."""
         try:
             parsed = json.loads(raw)
         except (json.JSONDecodeError, TypeError):
             logger.warning("Unparseable message")
             await self._send_error("Unparseable message")
-            return
+            return None
 
         if not isinstance(parsed, dict):
             logger.warning("Invalid message structure")
             await self._send_error("Invalid message structure")
-            return
+            return None
 
         # Respond to keepalive pings with pong (Bridge uses this to verify server)
         if parsed.get("type") == "ping":
@@ -112,38 +265,43 @@ class SpriteGateway:
                 "timestamp": _now_ms(),
             })
             await self.send(pong)
-            return
+            return None
 
         if not is_websocket_message(parsed):
             logger.warning("Invalid message structure")
             await self._send_error("Invalid message structure")
-            return
+            return None
 
+        if parsed["type"] not in _ROUTED_TYPES:
+            logger.warning("Unknown message type: %s", parsed["type"])
+            await self._send_error(f"Unknown type: {parsed['type']}")
+            return None
+        return parsed
+
+    async def _handle(self, parsed: dict[str, Any]) -> None:
         msg_type = parsed["type"]
         request_id = parsed.get("request_id")
 
-        if msg_type not in _ROUTED_TYPES:
-            logger.warning("Unknown message type: %s", msg_type)
-            await self._send_error(f"Unknown type: {msg_type}")
-            return
-
         match msg_type:
             case "mission":
                 async with self.mission_lock:
                     await self._handle_mission(parsed, request_id)
             case "file_upload":
                 await self._handle_file_upload(parsed, request_id)
+            case "file_upload_begin" | "file_upload_chunk" | "file_upload_commit":
+                await self._handle_chunked_upload(parsed, request_id)
             case "canvas_interaction":
                 await self._handle_canvas(parsed, request_id)
             case "heartbeat":
-                async with self.mission_lock:
-                    await self._handle_heartbeat(parsed, request_id)
+                await self._handle_heartbeat(parsed, request_id)
             case "auth":
                 await self._handle_auth(parsed, request_id)
             case "system":
                 await self._handle_system(parsed, request_id)
             case "state_sync_request":
-                await self._handle_state_sync_request(request_id)
+                await self._handle_state_sync_request(parsed, request_id)
+            case "blob_request":
+                await self._handle_blob_request(parsed, request_id)
 
     # -- Stub handlers (log + ack) -------------------------------------------
 
@@ -188,12 +346,19 @@ class SpriteGateway:
         upload_dir.mkdir(exist_ok=True)
         safe_name = filename.replace("/", "_").replace("..", "_")
         file_path = upload_dir / f"{doc_id}_{safe_name}"
+        def store() -> str:
+            file_path.write_bytes(file_bytes)
+            # The card's preview references the file in the blob store by hash
+            # instead of embedding it; the store links it rather than copying
+            digest = hashlib.sha256(file_bytes).hexdigest()
+            return self._blobs.put_file(file_path, digest)
+
         try:
             file_bytes = base64.b64decode(data_b64)
             if len(file_bytes) > 1_000_000:
-                await asyncio.to_thread(file_path.write_bytes, file_bytes)
+                digest = await asyncio.to_thread(store)
             else:
-                file_path.write_bytes(file_bytes)
+                digest = store()
         except Exception as e:
             logger.error("File upload failed for %s: %s", filename, e)
             try:
@@ -202,35 +367,150 @@ class SpriteGateway:
                 pass
             return
         logger.info("File saved: %s (%d bytes)", file_path, len(file_bytes))
+        await self._register_upload(doc_id, filename, mime_type, file_path, digest, len(file_bytes), req_id)
+
+    async def _register_upload(
+        self, doc_id: str, filename: str, mime_type: str, file_path: Path, digest: str, size: int,
+        req_id: str | None,
+    ) -> None:
+        """Record a saved upload, show its processing card and start extraction.
 
+        Content already uploaded (same SHA-256) reuses the earlier document:
+        its file, its card and the extraction the agent already did.
+        """
         if self._workspace_db:
-            await self._workspace_db.create_document(doc_id, filename, mime_type, str(file_path))
+            doc = await self._workspace_db.claim_document(doc_id, filename, mime_type, str(file_path), digest)
+            if doc["doc_id"] != doc_id:
+                if await self._reuse_document(doc, file_path, filename, req_id):
+                    return
+                # Nothing worth reusing: extract again into the existing document
+                doc_id = doc["doc_id"]
+                await self._workspace_db.update_document_file(doc_id, str(file_path))
 
-        await self._send_canvas_processing_card(doc_id, filename, data_b64, mime_type)
+        await self._send_canvas_processing_card(doc_id, filename, digest, size, mime_type)
         await self._send_ack("file_upload_received", req_id)
+        await self._queue_extraction(doc_id)
 
-        task = asyncio.create_task(
-            self._run_extraction(doc_id, filename, mime_type, str(file_path))
-        )
-        self._tasks.add(task)
-        task.add_done_callback(self._tasks.discard)
+    async def _queue_extraction(self, doc_id: str) -> None:
+        """Hand a recorded document to the server's document queue (not tied to this connection)."""
+        if self._documents is None:
+            logger.warning("No document queue -- %s stays queued until the next start", doc_id)
+            return
+        await self._documents.enqueue(doc_id)
+
+    async def _reuse_document(self, doc: dict[str, Any], file_path: Path, filename: str, req_id: str | None) -> bool:
+        """Point a duplicate upload at the existing document `doc`. False if it must be extracted again."""
+        card = await self._workspace_db.get_card(doc["doc_id"])
+        if card is None or doc["status"] == "failed":
+            logger.info("Duplicate of %s has no usable extraction -- processing again", doc["doc_id"])
+            return False
+
+        # Keep one copy on disk: the agent already knows the original path
+        if Path(doc["file_path"]).exists():
+            await asyncio.to_thread(file_path.unlink, True)
+        else:
+            await self._workspace_db.update_document_file(doc["doc_id"], str(file_path))
+        if card["status"] != "active":
+            await self._workspace_db.restore_card(card["card_id"])
+        logger.info("Duplicate upload %s -> document %s (%s)", filename, doc["doc_id"], doc["status"])
+
+        await self.send(json.dumps({
+            "type": "canvas_update",
+            "id": _new_id(),
+            "timestamp": int(time.time() * 1000),
+            "payload": {
+                "command": "create_card",
+                "card_id": card["card_id"],
+                "title": card["title"],
+                "blocks": json.loads(card["blocks"]) if card["blocks"] else [],
+                "size": card["size"] or "medium",
+            },
+        }))
+        note = ("is still being processed" if doc["status"] in ("queued", "processing")
+                else "was already uploaded, showing its earlier extraction")
+        await self.send(to_json(StatusUpdate(
+            type="status",
+            payload=StatusPayload(document_id=doc["doc_id"], status=doc["status"], message=f"{filename} {note}"),
+        )))
+        await self._send_ack("file_upload_received", req_id)
+        return True
+
+    async def _handle_chunked_upload(self, msg: dict[str, Any], req_id: str | None) -> None:
+        """file_upload_begin/chunk/commit: stream the file to disk one chunk at a time."""
+        payload = msg.get("payload", {})
+        upload_id = payload.get("upload_id")
+        try:
+            match msg["type"]:
+                case "file_upload_begin":
+                    size = payload.get("size")
+                    offset = await asyncio.to_thread(
+                        self._uploads.begin, upload_id, payload.get("filename", "unknown"),
+                        payload.get("mime_type", ""), size,
+                    )
+                    logger.info("Upload %s: %s (%s bytes) from offset %d",
+                                upload_id, payload.get("filename"), size, offset)
+                case "file_upload_chunk":
+                    offset = payload.get("offset")
+                    if not isinstance(offset, int) or isinstance(offset, bool):
+                        raise UploadError("Invalid chunk offset")
+                    offset = await asyncio.to_thread(
+                        self._uploads.write_chunk, upload_id, offset, payload.get("data", ""),
+                    )
+                    size = self._uploads.size(upload_id)
+                case _:
+                    done = await asyncio.to_thread(self._uploads.commit, upload_id, payload.get("sha256"))
+                    offset = size = done.size
+        except UploadError as e:
+            logger.warning("Upload %s rejected: %s", upload_id, e)
+            await self._send_error(f"File upload failed: {e}", req_id)
+            return
+        except OSError as e:
+            logger.error("Upload %s failed: %s", upload_id, e)
+            await self._send_error(f"File upload failed: {e}", req_id)
+            return
+
+        await self.send(to_json(FileUploadAck(
+            type="file_upload_ack",
+            payload=FileUploadAckPayload(upload_id=upload_id, offset=offset, size=size),
+            request_id=req_id,
+        )))
+        if msg["type"] == "file_upload_commit":
+            await self._finish_chunked_upload(upload_id, done, req_id)
+
+    async def _finish_chunked_upload(self, upload_id: str, done: CompletedUpload, req_id: str | None) -> None:
+        doc_id = _new_id()
+        upload_dir = Path("/workspace/uploads")
+        safe_name = done.filename.replace("/", "_").replace("..", "_")
+        file_path = upload_dir / f"{doc_id}_{safe_name}"
+
+        def store() -> None:
+            upload_dir.mkdir(exist_ok=True)
+            os.replace(done.path, file_path)  # atomic: the agent never sees a partial file
+            self._blobs.put_file(file_path, done.digest)
+            self._uploads.discard(upload_id)
+
+        try:
+            await asyncio.to_thread(store)
+        except OSError as e:
+            logger.error("Upload %s could not be stored: %s", upload_id, e)
+            await self._send_error(f"File upload failed: {e}", req_id)
+            return
+        logger.info("File saved: %s (%d bytes, chunked)", file_path, done.size)
+        await self._register_upload(doc_id, done.filename, done.mime_type, file_path, done.digest, done.size, req_id)
 
     async def _send_canvas_processing_card(
-        self, doc_id: str, filename: str, data_b64: str = "", mime_type: str = "",
+        self, doc_id: str, filename: str, blob: str = "", blob_size: int = 0, mime_type: str = "",
     ) -> None:
         blocks: list[dict[str, Any]] = []
         size = "medium"
 
-        # Embed document preview if small enough (< 5MB base64)
-        if data_b64 and len(data_b64) < 5_000_000:
-            blocks.append({
-                "type": "document", "id": _new_id(),
-                "data": data_b64, "mime_type": mime_type, "filename": filename,
-            })
+        # Preview by reference: the browser fetches the bytes with blob_request
+        if blob:
+            blocks.append(document_block(blob, blob_size, mime_type, filename, _new_id()))
             size = "large"
 
         blocks.append({"type": "heading", "text": filename})
-        blocks.append({"type": "badge", "text": "Processing...", "variant": "default"})
+        blocks.append({"type": "badge", "text": "Queued", "variant": "default"})
 
         if self._workspace_db:
             stack_id = self.runtime._active_stack_id
@@ -255,79 +535,6 @@ class SpriteGateway:
         }
         await self.send(json.dumps(msg))
 
-    async def _run_extraction(self, doc_id: str, filename: str, mime_type: str, file_path: str) -> None:
-        """Background task: hand file to agent for reading and extraction."""
-        try:
-            context = (
-                f"A file was just uploaded and saved to {file_path}.\n"
-                f"Filename: {filename}, Type: {mime_type}\n"
-                f"The processing card has card_id: {doc_id}. Use update_card to add extracted data.\n"
-                f"Read the document using Bash (e.g. pdftotext or python). Do NOT use the Read tool on PDFs.\n"
-                f"Give the user a brief summary of what the document contains in chat, "
-                f"then ask how they'd like to proceed."
-            )
-            async with self.mission_lock:
-                await self.runtime.handle_message(context)
-
-            if self._workspace_db:
-                await self._workspace_db.update_document_status(doc_id, "completed")
-                await self._update_card_badge(doc_id, "Ready", "success")
-
-        except Exception as e:
-            logger.error("Extraction failed for %s: %s", filename, e)
-            user_msg = f"We couldn't process {filename}. Please try again or use a different format."
-            try:
-                if self._workspace_db:
-                    await self._workspace_db.update_document_status(doc_id, "failed")
-                    await self._update_card_badge(doc_id, "Failed", "destructive", user_msg)
-                await self._send_error(user_msg)
-            except Exception as send_err:
-                logger.warning("Could not send extraction error (connection dead?): %s", send_err)
-
-    async def _update_card_badge(
-        self, card_id: str, badge_text: str, badge_variant: str, error_detail: str = "",
-    ) -> None:
-        """Swap the badge on a processing card and optionally append an error text block."""
-        if not self._workspace_db:
-            return
-        row = await self._workspace_db.fetchone(
-            "SELECT blocks FROM cards WHERE card_id = ?", (card_id,),
-        )
-        if not row:
-            return
-
-        blocks = json.loads(row["blocks"]) if isinstance(row["blocks"], str) else row["blocks"]
-
-        # Replace first badge block; preserve document + heading blocks
-        updated: list[dict[str, Any]] = []
-        badge_replaced = False
-        for block in blocks:
-            if block.get("type") == "badge" and not badge_replaced:
-                updated.append({"type": "badge", "text": badge_text, "variant": badge_variant})
-                badge_replaced = True
-            else:
-                updated.append(block)
-
-        if not badge_replaced:
-            updated.append({"type": "badge", "text": badge_text, "variant": badge_variant})
-
-        if error_detail:
-            updated.append({"type": "text", "content": error_detail})
-
-        await self._workspace_db.update_card_content(card_id, updated)
-
-        msg = {
-            "type": "canvas_update",
-            "id": _new_id(),
-            "timestamp": int(time.time() * 1000),
-            "payload": {
-                "command": "update_card",
-                "card_id": card_id,
-                "blocks": updated,
-            },
-        }
-        await self.send(json.dumps(msg))
-
     async def _handle_canvas(self, msg: dict[str, Any], req_id: str | None) -> None:
         payload = msg.get("payload", {})
         action = payload.get("action", "")
@@ -365,6 +572,10 @@ class SpriteGateway:
                     return
         except Exception as e:
             logger.error("Canvas %s failed: %s", action, e)
+            # Successful writes invalidate through WorkspaceDB; a failed one may
+            # have stopped after a partial write, so drop the whole cache
+            if self._sync_cache:
+                self._sync_cache.invalidate()
             await self._send_error(f"Canvas operation failed: {e}")
             return
 
@@ -379,28 +590,75 @@ class SpriteGateway:
         await self._send_ack("auth_received", req_id)
 
     async def _handle_system(self, msg: dict[str, Any], req_id: str | None) -> None:
-        logger.info("System message: %s", msg.get("payload", {}).get("event", "?"))
+        event = msg.get("payload", {}).get("event", "?")
+        logger.info("System message: %s", event)
         await self._send_ack("system_received", req_id)
+        if event == "db_stats":
+            await self._send_db_stats(req_id)
+
+    async def _send_db_stats(self, req_id: str | None) -> None:
+        """Reply with the QueryStats snapshot as a JSON string in payload.message."""
+        if self._query_stats is None:
+            await self._send_error("Query stats are disabled")
+            return
+        await self.send(to_json(SystemMessage(
+            type="system",
+            payload=SystemPayload(event="db_stats", message=json.dumps(self._query_stats.snapshot())),
+            request_id=req_id,
+        )))
 
-    async def _handle_state_sync_request(self, req_id: str | None) -> None:
-        logger.info("State sync requested")
+    async def _handle_state_sync_request(self, msg: dict[str, Any], req_id: str | None) -> None:
+        payload = msg.get("payload", {})
+        since = payload.get("since_revision")
+        if not isinstance(since, int) or isinstance(since, bool):
+            since = None
+        chunked = payload.get("chunked") is True
+        logger.info("State sync requested (since revision %s, chunked=%s)", since, chunked)
         if self._workspace_db:
-            await send_state_sync(self._workspace_db, self.send)
+            send = send_state_sync_chunked if chunked else send_state_sync
+            await send(self._workspace_db, self.send, since, req_id, cache=self._sync_cache)
             await self.check_and_send_welcome()
         else:
             await self._send_error("WorkspaceDB not available for state sync")
 
+    async def _handle_blob_request(self, msg: dict[str, Any], req_id: str | None) -> None:
+        payload = msg.get("payload", {})
+        blob = payload.get("blob")
+        offset = payload.get("offset", 0)
+        length = payload.get("length")
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            await self._send_error("Invalid blob offset", req_id)
+            return
+        if not isinstance(length, int) or isinstance(length, bool) or length <= 0:
+            length = BLOB_RANGE_BYTES
+        try:
+            data, total = await asyncio.to_thread(self._blobs.read_range, blob, offset, length)
+        except (ValueError, FileNotFoundError):
+            logger.warning("Blob request for unknown blob %r", blob)
+            await self._send_error("Blob not found", req_id)
+            return
+        await self.send(to_json(BlobData(
+            type="blob_data",
+            payload=BlobDataPayload(
+                blob=blob, offset=offset, data=base64.b64encode(data).decode("ascii"),
+                size=total, final=offset + len(data) >= total,
+            ),
+            request_id=req_id,
+        )))
+
     async def check_and_send_welcome(self) -> None:
         """Fire a welcome message for new users (empty chat history).
 
         Non-blocking: spawns a background task that acquires mission_lock.
         Safe to call on every connect -- existing users (non-empty history) are skipped.
         """
-        if not self._workspace_db or not self.runtime:
+        if not self._workspace_db or not self.runtime or self._welcome_sent:
             return
         history = await self._workspace_db.get_chat_history(limit=1)
         if history:
             return
+        # Every open tab asks for a state sync; greet once per connection
+        self._welcome_sent = True
         task = asyncio.create_task(self._send_welcome_message())
         self._tasks.add(task)
         task.add_done_callback(self._tasks.discard)
@@ -429,9 +687,10 @@ class SpriteGateway:
         )
         await self.send(to_json(ack))
 
-    async def _send_error(self, detail: str) -> None:
+    async def _send_error(self, detail: str, request_id: str | None = None) -> None:
         err = SystemMessage(
             type="system",
             payload=SystemPayload(event="error", message=detail),
+            request_id=request_id,
         )
         await self.send(to_json(err))
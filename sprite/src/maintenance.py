@@ -0,0 +1,116 @@
+"""Background database maintenance -- retention and compaction off the hot path.
+
+Inserts no longer prune their own tables. Instead, a MaintenanceScheduler
+task walks each database's retention policies on a timer, deleting one
+bounded id-watermark batch per table per tick. When a database has seen
+no writes for a while, it runs incremental_vacuum and PRAGMA optimize.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .database import RetentionPolicy, _BaseDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 30.0        # seconds between retention passes
+BACKLOG_INTERVAL = 1.0         # seconds between passes while a table is over its limit
+DEFAULT_IDLE_AFTER = 60.0      # seconds without writes before compaction may run
+DEFAULT_COMPACT_EVERY = 600.0  # minimum seconds between compactions of one database
+COMPACT_MAX_PAGES = 256
+
+
+class MaintenanceScheduler:
+    """Runs retention batches and idle-time compaction for a set of databases.
+
+    Policies default to each database's `retention_policies` and can be
+    inspected or overridden per table via `policies` / `set_policy`.
+    """
+
+    def __init__(
+        self,
+        databases: list[_BaseDB],
+        interval: float = DEFAULT_INTERVAL,
+        idle_after: float = DEFAULT_IDLE_AFTER,
+        compact_every: float = DEFAULT_COMPACT_EVERY,
+    ) -> None:
+        self.interval = interval
+        self.idle_after = idle_after
+        self.compact_every = compact_every
+        self._databases = list(databases)
+        self._policies: dict[tuple[int, str], RetentionPolicy] = {
+            (id(db), p.table): p for db in self._databases for p in db.retention_policies
+        }
+        self._last_compact: dict[int, float] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def policies(self) -> dict[str, RetentionPolicy]:
+        """Active retention policy per table, keyed "<db file>:<table>"."""
+        return {
+            f"{db.db_path}:{p.table}": p
+            for db in self._databases
+            for p in self._policies_for(db)
+        }
+
+    def set_policy(self, db: _BaseDB, table: str, **changes) -> RetentionPolicy:
+        """Override fields (keep, batch_size, where) of one table's policy."""
+        key = (id(db), table)
+        if key not in self._policies:
+            raise KeyError(f"No retention policy for {table} in {db.db_path}")
+        self._policies[key] = replace(self._policies[key], **changes)
+        return self._policies[key]
+
+    def _policies_for(self, db: _BaseDB) -> list[RetentionPolicy]:
+        return [p for (db_id, _), p in self._policies.items() if db_id == id(db)]
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            backlog = False
+            try:
+                backlog = await self.run_once()
+            except Exception:
+                logger.exception("Maintenance pass failed")
+            await asyncio.sleep(BACKLOG_INTERVAL if backlog else self.interval)
+
+    async def run_once(self) -> bool:
+        """One maintenance pass. Returns True if any table still has expired rows."""
+        backlog = False
+        for db in self._databases:
+            for policy in self._policies_for(db):
+                deleted = await db.enforce_retention(policy)
+                if deleted:
+                    logger.info("Retention: deleted %d rows from %s", deleted, policy.table)
+                backlog = backlog or deleted >= policy.batch_size
+            await self._maybe_compact(db)
+        return backlog
+
+    async def _maybe_compact(self, db: _BaseDB) -> None:
+        now = time.monotonic()
+        last = self._last_compact.get(id(db))
+        if db.idle_seconds < self.idle_after:
+            return
+        if last is not None and (now - last < self.compact_every or last >= now - db.idle_seconds):
+            return  # compacted recently, or nothing written since
+        await db.compact(COMPACT_MAX_PAGES)
+        self._last_compact[id(db)] = now
+        logger.info("Compacted %s", db.db_path)
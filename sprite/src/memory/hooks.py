@@ -103,13 +103,8 @@ def create_hook_callbacks(
                 ),
             )
             buffer.clear()
-            # Prune old processed observations to keep table bounded
-            await transcript_db.prune_observations()
-            # Count unprocessed observations from DB (survives process restarts)
-            row = await transcript_db.fetchone(
-                "SELECT COUNT(*) as c FROM observations WHERE processed = 0"
-            )
-            unprocessed = row["c"] if row else 0
+            # Trigger-maintained counter in transcript.db (survives process restarts)
+            unprocessed = await transcript_db.pending_observation_count()
             if unprocessed >= batch_threshold:
                 await processor.flush_all()
         except Exception:
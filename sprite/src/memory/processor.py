@@ -1,6 +1,6 @@
 """Observation batch processor — stateless Haiku calls to extract learnings.
 
-Reads unprocessed observations from transcript.db, sends them with current
+Reads observations above the processing cursor in transcript.db, sends them with current
 memory file state to Haiku, parses the response into learnings/actions/file updates.
 """
 
@@ -16,6 +16,7 @@ logger = logging.getLogger(__name__)
 
 MODEL = "claude-3-5-haiku-latest"
 MAX_TOKENS = 4096
+MAX_OBSERVATIONS_PER_BATCH = 50  # bounds prompt size and rows held in memory
 
 SYSTEM_PROMPT = (
     "You are a memory curator. Extract learnings from these observations. "
@@ -160,13 +161,20 @@ class ObservationProcessor:
         self._client = anthropic_client
         self._memory_dir = memory_dir
 
-    async def process_batch(self) -> None:
-        """Read unprocessed observations, call Haiku, store results."""
-        observations = await self._transcript.fetchall(
-            "SELECT * FROM observations WHERE processed = 0 ORDER BY id"
-        )
+    async def process_batch(self) -> int:
+        """Read up to MAX_OBSERVATIONS_PER_BATCH unprocessed observations, call Haiku, store results.
+
+        Returns the number of observations marked processed (0 if none or the call failed).
+        """
+        # tool_calls_json is never sent to Haiku -- leave it on disk
+        observations = [
+            obs async for obs in self._transcript.iter_pending_observations(
+                "id, sequence_num, user_message, agent_response",
+                limit=MAX_OBSERVATIONS_PER_BATCH,
+            )
+        ]
         if not observations:
-            return
+            return 0
 
         # Read current memory file state
         memory_state = {path: read_safe(path) for path in ALL_MEMORY_FILES}
@@ -182,27 +190,18 @@ class ObservationProcessor:
             )
         except Exception:
             logger.exception("Haiku API call failed — observations will retry next batch")
-            return
+            return 0
 
         response_text = response.content[0].text
         learnings, actions, file_updates = _parse_response(response_text)
 
         obs_ids = [obs["id"] for obs in observations]
 
-        # Store learnings (batch insert for atomicity)
+        # Store learnings + actions atomically in one database round trip
         now = time.time()
-        if learnings:
-            await self._memory.executemany(
-                "INSERT INTO learnings (created_at, type, content, source_observation_id, confidence) "
-                "VALUES (?, ?, ?, ?, ?)",
+        if learnings or actions:
+            await self._memory.store_extraction(
                 [(now, l["type"], l["content"], obs_ids[0], 1.0) for l in learnings],
-            )
-
-        # Store actions (batch insert)
-        if actions:
-            await self._memory.executemany(
-                "INSERT INTO pending_actions (created_at, content, priority, status, source_learning_id) "
-                "VALUES (?, ?, ?, ?, ?)",
                 [(now, a["content"], 1, "pending", None) for a in actions],
             )
 
@@ -211,13 +210,11 @@ class ObservationProcessor:
             if file_path in DAEMON_MANAGED_FILES:
                 file_path.write_text(content)
 
-        # Mark observations as processed
-        placeholders = ",".join("?" for _ in obs_ids)
-        await self._transcript.execute(
-            "UPDATE observations SET processed = 1 WHERE id IN (" + placeholders + ")",
-            tuple(obs_ids),
-        )
+        # Advance the persisted cursor past this batch
+        await self._transcript.advance_processing_cursor(obs_ids[-1])
+        return len(obs_ids)
 
     async def flush_all(self) -> None:
-        """Process all remaining unprocessed observations."""
-        await self.process_batch()
+        """Process all remaining unprocessed observations, one bounded batch at a time."""
+        while await self.process_batch() == MAX_OBSERVATIONS_PER_BATCH:
+            pass
@@ -0,0 +1,273 @@
+"""Per-connection outbound queue drained by a writer task.
+
+Senders (the agent turn, tool callbacks, the gateway lanes) append to the
+queue and return; one writer task per connection hands queued messages
+to the SpriteLink and waits for the transport to drain. A slow Bridge
+link therefore fills the queue instead of stalling the SDK stream.
+
+While messages wait, newer ones can supersede them:
+
+    canvas_update update_card   merged into a still-queued update of the
+                                same card (the browser applies the fields
+                                of both, later ones winning)
+    canvas_update close_card    drops still-queued updates of that card
+    status                      replaces a still-queued status of the
+                                same document
+
+Ordering: messages leave in the order they were sent, except that a
+merged update_card keeps the position of the first update it absorbed.
+Its later fields therefore arrive earlier than they were sent, never
+later; a close_card or replacing status goes where it was sent. An
+update is only merged while it is the newest queued message for its
+card, so messages for one card never overtake each other.
+
+Supersede keys are read from the start of the message (the envelope and
+the payload's command and card_id come first); a message is parsed only
+when an update is actually merged.
+
+The queue is bounded by bytes. A sender that pushes it past
+OUTBOUND_HIGH_WATER waits until the writer brings it back to
+OUTBOUND_LOW_WATER. If that takes longer than SLOW_CONSUMER_SECONDS the
+consumer is marked slow: queued messages are dropped, later sends are
+discarded and on_slow is called (the server closes the connection, and
+the browser recovers with a state_sync delta when it reconnects).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .framing import BATCH_MAX_BYTES, SpriteLink
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_HIGH_WATER = 1024 * 1024  # queued characters (~bytes of JSON) before senders wait
+OUTBOUND_LOW_WATER = 256 * 1024    # senders resume once the writer is back under this
+SLOW_CONSUMER_SECONDS = 30.0       # a sender waiting longer than this marks the consumer slow
+
+_SUPERSEDABLE = ('"canvas_update"', '"status"')  # type is the first key of every message
+_HEAD_CHARS = 512  # where the supersede fields are looked for before falling back to parsing
+_COMMAND = re.compile(r'"command":\s*"(\w+)"')
+_CARD_ID = re.compile(r'"card_id":\s*"((?:[^"\\]|\\.)*)"')
+_DOCUMENT_ID = re.compile(r'"document_id":\s*"((?:[^"\\]|\\.)*)"')
+
+
+@dataclass(slots=True)
+class _Frame:
+    data: str | None                       # None: merged, encode `message` when written
+    size: int
+    key: str | None = None
+    command: str | None = None             # canvas command, or "status"
+    message: dict[str, Any] | None = None  # the merged update_card, once parsed
+    dead: bool = False                     # superseded while queued
+
+
+def _json_string(raw: str) -> str:
+    return json.loads(f'"{raw}"') if "\\" in raw else raw
+
+
+def _supersede_key(data: str) -> tuple[str | None, str | None]:
+    """Key under which `data` can supersede queued messages, and its command."""
+    kind = data[:32]
+    if not any(t in kind for t in _SUPERSEDABLE):
+        return None, None
+    head = data[:_HEAD_CHARS]
+    if '"canvas_update"' in kind:
+        command, card_id = _COMMAND.search(head), _CARD_ID.search(head)
+        if command and card_id:
+            return f"card:{_json_string(card_id[1])}", command[1]
+    else:
+        document_id = _DOCUMENT_ID.search(head)
+        if document_id:
+            return f"status:{_json_string(document_id[1])}", "status"
+    # Fields beyond the head (not how this server encodes them): parse
+    try:
+        message = json.loads(data)
+        payload = message["payload"]
+        if message["type"] == "canvas_update":
+            return f"card:{payload['card_id']}", payload.get("command")
+        if message["type"] == "status":
+            return f"status:{payload['document_id']}", "status"
+    except (ValueError, KeyError, TypeError):
+        pass
+    return None, None
+
+
+class OutboundQueue:
+    """Outbound messages for one connection, written by a dedicated task.
+
+    send() and flush() have the signatures of SpriteLink's, so the runtime
+    and gateway use either. Call close() when the connection ends.
+    """
+
+    def __init__(
+        self,
+        link: SpriteLink,
+        high_water: int = OUTBOUND_HIGH_WATER,
+        low_water: int = OUTBOUND_LOW_WATER,
+        slow_after: float = SLOW_CONSUMER_SECONDS,
+        on_slow: Callable[[], None] | None = None,
+    ) -> None:
+        self._link = link
+        self._high_water = high_water
+        self._low_water = low_water
+        self._slow_after = slow_after
+        self._on_slow = on_slow
+        self._frames: deque[_Frame] = deque()
+        self._queued: dict[str, _Frame] = {}  # newest queued frame per supersede key
+        self._bytes = 0
+        self._wake = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._flush_requested = False
+        self._writer: asyncio.Task | None = None
+        self._closed = False
+        self.slow = False
+        self._peak_bytes = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._waits = 0
+
+    async def send(self, data: str) -> None:
+        """Queue one message. Waits only while the queue is over its high watermark."""
+        if self._closed:
+            return
+        self._enqueue(data)
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+        if self._bytes >= self._high_water:
+            self._room.clear()
+            self._waits += 1
+            try:
+                await asyncio.wait_for(self._room.wait(), timeout=self._slow_after)
+            except asyncio.TimeoutError:
+                self._mark_slow()
+
+    async def flush(self) -> None:
+        """Have the writer send batched messages as soon as the queue is empty; does not wait."""
+        self._flush_requested = True
+        self._wake.set()
+
+    def _enqueue(self, data: str) -> None:
+        key, command = _supersede_key(data)
+        previous = self._queued.get(key) if key is not None else None
+        if previous is not None:
+            if command == "status":
+                self._dropped += 1
+                self._kill(previous)
+            elif previous.command == "update_card" and command == "update_card":
+                self._merge(previous, data)
+                return
+            elif previous.command == "update_card" and command == "close_card":
+                self._dropped += 1
+                self._kill(previous)
+        frame = _Frame(data, len(data), key, command)
+        if key is not None:
+            self._queued[key] = frame
+        self._frames.append(frame)
+        self._bytes += frame.size
+        self._peak_bytes = max(self._peak_bytes, self._bytes)
+        self._wake.set()
+
+    def _merge(self, queued: _Frame, data: str) -> None:
+        """Fold an update_card into the queued update of the same card, where that one stands."""
+        base = queued.message if queued.message is not None else json.loads(queued.data)
+        message = json.loads(data)
+        # Fields of both, later ones winning. Encoded only when written: a card
+        # updated in a loop is merged many times
+        queued.message = {**message, "payload": {**base["payload"], **message["payload"]}}
+        queued.data = None
+        grown = max(len(data), queued.size) - queued.size
+        queued.size += grown
+        self._bytes += grown
+        self._peak_bytes = max(self._peak_bytes, self._bytes)
+        self._coalesced += 1
+
+    def _kill(self, frame: _Frame) -> None:
+        frame.dead = True
+        self._bytes -= frame.size
+
+    def _take(self, limit: int) -> list[str]:
+        """Pop live frames totalling about `limit` characters."""
+        batch: list[str] = []
+        size = 0
+        while self._frames and size < limit:
+            frame = self._frames.popleft()
+            if frame.dead:
+                continue
+            if frame.key is not None and self._queued.get(frame.key) is frame:
+                del self._queued[frame.key]
+            self._bytes -= frame.size
+            size += frame.size
+            batch.append(frame.data if frame.data is not None else json.dumps(frame.message))
+        if self._bytes <= self._low_water:
+            self._room.set()
+        return batch
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                self._wake.clear()
+                batch = self._take(BATCH_MAX_BYTES)
+                if batch:
+                    for data in batch:
+                        self._link.send_nowait(data)
+                    # Blocks while the transport is over its limit; new sends queue up meanwhile
+                    await self._link.drain()
+                    continue
+                if self._flush_requested:
+                    self._flush_requested = False
+                    self._link.flush_nowait()
+                await self._wake.wait()
+        except ConnectionError as exc:
+            logger.info("Outbound writer stopped: %s", exc)
+        except Exception:
+            logger.exception("Outbound writer failed")
+        self._closed = True
+        self._discard()
+
+    def _mark_slow(self) -> None:
+        if self.slow:
+            return
+        self.slow = True
+        logger.warning(
+            "Slow consumer: %d bytes queued for %.0fs -- dropping the connection",
+            self._bytes, self._slow_after,
+        )
+        self._closed = True
+        self._discard()
+        if self._on_slow is not None:
+            self._on_slow()
+
+    def _discard(self) -> None:
+        self._frames.clear()
+        self._queued.clear()
+        self._bytes = 0
+        self._room.set()  # release waiting senders; their messages are gone with the connection
+
+    async def close(self) -> None:
+        """Stop the writer and hand whatever is still queued to the link (without waiting)."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+        if not self._closed:
+            for data in self._take(self._bytes + 1):
+                self._link.send_nowait(data)
+        self._closed = True
+        self._discard()
+        self._link.flush_nowait()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued_bytes": self._bytes, "peak_bytes": self._peak_bytes, "coalesced": self._coalesced,
+            "dropped": self._dropped, "waits": self._waits, "slow": self.slow,
+        }
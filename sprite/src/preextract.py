@@ -0,0 +1,228 @@
+"""Local pre-extraction of uploaded documents, before the agent reads them.
+
+Without it every extraction job spends its first agent turns running
+pdftotext through Bash. Instead, as soon as a document is queued, a
+process pool pulls out what needs no model:
+
+    text      the PDF text layer (pdftotext -layout), pages separated by
+              form feeds; text files are used as they are
+    pages     page count
+    layout    per page, the text blocks with their bounding boxes
+              (pdftotext -bbox-layout)
+    tables    column-aligned runs of lines in the laid-out text, split
+              into cells
+
+and caches it as a sidecar pair keyed by the document's content hash:
+
+    <key>.txt    the text
+    <key>.json   {"version", "pages", "chars", "tables", "layout"}
+
+The extraction prompt then points the agent at the sidecar. A PDF with
+no text layer (a scan) or an unsupported type gets no sidecar, and the
+agent reads the file itself as before.
+
+poppler-utils is installed on every Sprite by the Bridge's bootstrap.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import re
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_DIR = Path("/workspace/.os/extracted")
+SIDECAR_VERSION = 1
+PREEXTRACT_WORKERS = 2
+PDFTOTEXT_TIMEOUT = 60  # seconds per poppler call
+TEXT_MAX_BYTES = 5 * 1024 * 1024  # text files larger than this are left to the agent
+TABLE_MIN_ROWS = 3
+
+_TEXT_TYPES = ("text/", "application/json", "application/csv", "application/xml")
+_CELL_GAP = re.compile(r"\s{2,}")  # pdftotext -layout pads columns with runs of spaces
+_XHTML = "{http://www.w3.org/1999/xhtml}"
+
+
+@dataclass(slots=True, frozen=True)
+class Sidecar:
+    """A document's pre-extracted text and layout on disk."""
+    text_path: Path
+    layout_path: Path
+    pages: int
+    chars: int
+    tables: int
+
+
+# -- Extraction (runs in a pool process) ------------------------------------------
+
+
+def detect_tables(page_text: str, page: int) -> list[dict[str, Any]]:
+    """Tables in one page of `pdftotext -layout` output.
+
+    A table is a run of at least TABLE_MIN_ROWS consecutive lines that
+    each split into two or more cells on runs of spaces, at least two of
+    them with the run's widest column count (a header and a row).
+    """
+    tables: list[dict[str, Any]] = []
+    run: list[list[str]] = []
+    for line in page_text.splitlines() + [""]:
+        cells = [c for c in _CELL_GAP.split(line.strip()) if c]
+        if len(cells) >= 2:
+            run.append(cells)
+            continue
+        if len(run) >= TABLE_MIN_ROWS:
+            columns = max(len(r) for r in run)
+            if sum(len(r) == columns for r in run) >= 2:
+                tables.append({"page": page, "columns": columns, "rows": run})
+        run = []
+    return tables
+
+
+def parse_bbox_layout(xhtml: str) -> list[dict[str, Any]]:
+    """Pages of `pdftotext -bbox-layout` output as blocks of text with bounding boxes."""
+    pages: list[dict[str, Any]] = []
+    root = ET.fromstring(xhtml)
+    for number, page in enumerate(root.iter(f"{_XHTML}page"), start=1):
+        blocks = []
+        for block in page.iter(f"{_XHTML}block"):
+            lines = [
+                " ".join(word.text or "" for word in line.iter(f"{_XHTML}word"))
+                for line in block.iter(f"{_XHTML}line")
+            ]
+            bbox = [round(float(block.get(k, 0)), 1) for k in ("xMin", "yMin", "xMax", "yMax")]
+            blocks.append({"bbox": bbox, "text": "\n".join(lines)})
+        pages.append({
+            "page": number,
+            "width": round(float(page.get("width", 0)), 1),
+            "height": round(float(page.get("height", 0)), 1),
+            "blocks": blocks,
+        })
+    return pages
+
+
+def _pdftotext(path: str, *args: str) -> str:
+    result = subprocess.run(
+        ["pdftotext", *args, path, "-"],
+        capture_output=True, timeout=PDFTOTEXT_TIMEOUT, check=True,
+    )
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+def preextract(file_path: str, mime_type: str, key: str, directory: str) -> dict[str, Any] | None:
+    """Extract one document and write its sidecar. Returns the sidecar's summary, or None.
+
+    Runs in a pool process: arguments and result are plain values.
+    """
+    path = Path(file_path)
+    if mime_type == "application/pdf" or path.suffix.lower() == ".pdf":
+        text = _pdftotext(file_path, "-layout")
+        page_texts = text.split("\f")
+        if page_texts and not page_texts[-1].strip():
+            page_texts.pop()  # pdftotext ends every page, the last one included, with a form feed
+        try:
+            layout = parse_bbox_layout(_pdftotext(file_path, "-bbox-layout"))
+        except (ET.ParseError, subprocess.SubprocessError, ValueError):
+            layout = []
+    elif mime_type.startswith(_TEXT_TYPES) and path.stat().st_size <= TEXT_MAX_BYTES:
+        text = path.read_text(encoding="utf-8", errors="replace")
+        page_texts, layout = [text], []
+    else:
+        return None
+    if not text.strip():
+        return None  # no text layer: a scan, left to the agent
+
+    tables = [t for number, page in enumerate(page_texts, start=1) for t in detect_tables(page, number)]
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    summary = {"version": SIDECAR_VERSION, "pages": len(page_texts), "chars": len(text), "tables": tables}
+    text_path, layout_path = out / f"{key}.txt", out / f"{key}.json"
+    partial = text_path.with_suffix(".txt.partial")
+    partial.write_text(text, encoding="utf-8")
+    partial.replace(text_path)
+    # The .json is written last: its presence marks a complete sidecar
+    partial = layout_path.with_suffix(".json.partial")
+    partial.write_text(json.dumps({**summary, "layout": layout}), encoding="utf-8")
+    partial.replace(layout_path)
+    return {"pages": summary["pages"], "chars": summary["chars"], "tables": len(tables)}
+
+
+# -- Event-loop side ---------------------------------------------------------------
+
+
+class PreExtractor:
+    """Pre-extracts queued documents in a process pool and caches the sidecars.
+
+    start() begins a document's extraction without waiting (right after
+    upload); sidecar() returns its result, from the cache when a sidecar
+    for the same content already exists. Call close() on shutdown.
+    """
+
+    def __init__(self, directory: Path = SIDECAR_DIR, workers: int = PREEXTRACT_WORKERS) -> None:
+        self.directory = Path(directory)
+        self._workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._running: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _key(doc: dict[str, Any]) -> str:
+        return doc.get("content_hash") or doc["doc_id"]
+
+    def start(self, doc: dict[str, Any]) -> None:
+        """Begin extracting `doc` (a documents row) in the pool, unless it is cached or running."""
+        key = self._key(doc)
+        if key not in self._running and not (self.directory / f"{key}.json").exists():
+            self._submit(doc, key)
+
+    def _submit(self, doc: dict[str, Any], key: str) -> asyncio.Future:
+        if self._pool is None:
+            # spawn: forking a process that runs aiosqlite threads is not safe
+            self._pool = ProcessPoolExecutor(self._workers, mp_context=multiprocessing.get_context("spawn"))
+        future = asyncio.get_running_loop().run_in_executor(
+            self._pool, preextract, doc["file_path"], doc.get("mime_type") or "", key, str(self.directory),
+        )
+        self._running[key] = future
+        future.add_done_callback(lambda _: self._running.pop(key, None))
+        return future
+
+    async def sidecar(self, doc: dict[str, Any]) -> Sidecar | None:
+        """The sidecar for `doc`, extracting it now if start() was not called. None if there is none."""
+        key = self._key(doc)
+        cached = await asyncio.to_thread(self._cached, key)
+        if cached is not None:
+            return cached
+        future = self._running.get(key) or self._submit(doc, key)
+        try:
+            summary = await future
+        except Exception as e:
+            logger.warning("Pre-extraction of %s failed: %s", doc["doc_id"], e)
+            return None
+        if summary is None:
+            return None
+        return Sidecar(self.directory / f"{key}.txt", self.directory / f"{key}.json",
+                       summary["pages"], summary["chars"], summary["tables"])
+
+    def _cached(self, key: str) -> Sidecar | None:
+        layout_path = self.directory / f"{key}.json"
+        try:
+            with open(layout_path, encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if info.get("version") != SIDECAR_VERSION:
+            return None
+        return Sidecar(self.directory / f"{key}.txt", layout_path, info["pages"], info["chars"],
+                       len(info["tables"]))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -7,15 +7,28 @@ mirror changes here and to frontend/types/ws-protocol.ts.
 
 Source of truth: bridge/src/protocol.ts
 Frontend copy: frontend/types/ws-protocol.ts
+
+All classes use __slots__ (no per-instance __dict__): state syncs and large
+cards build thousands of them. Browser -> Sprite payloads and small value
+records are also frozen. Blocks, per-row records, Sprite -> Browser payloads
+and message envelopes stay mutable, because a frozen __init__ assigns
+through object.__setattr__ and roughly doubles construction time.
 """
 
 from __future__ import annotations
 
+import copy
+import functools
 import json
 import uuid
 import time
-from dataclasses import asdict, dataclass, field
-from typing import Any, Literal, Optional, Union
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Any, Callable, Literal, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 
 # =============================================================================
@@ -50,6 +63,13 @@ MESSAGE_TYPES = (
     "system",
     "state_sync",
     "state_sync_request",
+    "state_sync_chunk",
+    "blob_request",
+    "blob_data",
+    "file_upload_begin",
+    "file_upload_chunk",
+    "file_upload_commit",
+    "file_upload_ack",
 )
 
 # Type aliases matching TypeScript literal unions
@@ -60,7 +80,9 @@ BlockType = Literal[
 MessageType = Literal[
     "mission", "file_upload", "canvas_interaction", "auth",
     "agent_event", "canvas_update", "heartbeat", "ping", "pong",
-    "status", "system", "state_sync", "state_sync_request",
+    "status", "system", "state_sync", "state_sync_request", "state_sync_chunk",
+    "blob_request", "blob_data",
+    "file_upload_begin", "file_upload_chunk", "file_upload_commit", "file_upload_ack",
 ]
 CanvasAction = Literal[
     "edit_cell", "resize", "move", "close",
@@ -72,8 +94,9 @@ CardType = Literal["document", "metric", "table", "article", "data"]
 TrendDirection = Literal["up", "down"]
 AgentEventType = Literal["text", "tool", "complete", "error"]
 BadgeVariant = Literal["default", "success", "warning", "destructive"]
-DocumentStatus = Literal["processing", "ocr_complete", "completed", "failed"]
-SystemEvent = Literal["connected", "sprite_waking", "sprite_ready", "reconnect_failed", "error"]
+DocumentStatus = Literal["queued", "processing", "ocr_complete", "completed", "failed"]
+SystemEvent = Literal["connected", "sprite_waking", "sprite_ready", "reconnect_failed", "error", "db_stats"]
+SyncMode = Literal["full", "delta"]
 
 
 # =============================================================================
@@ -100,7 +123,7 @@ def _snake_to_camel(name: str) -> str:
 # Block Types (Composable Card System)
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class HeadingBlock:
     """Heading block with optional subtitle."""
     id: str
@@ -109,7 +132,7 @@ class HeadingBlock:
     subtitle: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class StatBlock:
     """Statistic display block."""
     id: str
@@ -119,14 +142,14 @@ class StatBlock:
     trend: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class KeyValuePair:
     """Single key-value pair within a KeyValueBlock."""
     label: str
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class KeyValueBlock:
     """Block displaying key-value pairs."""
     id: str
@@ -134,7 +157,7 @@ class KeyValueBlock:
     pairs: list[KeyValuePair]
 
 
-@dataclass
+@dataclass(slots=True)
 class TableBlock:
     """Table block with column headers and row data."""
     id: str
@@ -143,7 +166,7 @@ class TableBlock:
     rows: list[dict[str, Any]]
 
 
-@dataclass
+@dataclass(slots=True)
 class BadgeBlock:
     """Badge/tag display block."""
     id: str
@@ -152,7 +175,7 @@ class BadgeBlock:
     variant: BadgeVariant
 
 
-@dataclass
+@dataclass(slots=True)
 class ProgressBlock:
     """Progress bar block."""
     id: str
@@ -161,7 +184,7 @@ class ProgressBlock:
     label: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TextBlock:
     """Text block (supports markdown)."""
     id: str
@@ -169,21 +192,28 @@ class TextBlock:
     content: str
 
 
-@dataclass
+@dataclass(slots=True)
 class SeparatorBlock:
     """Visual separator block."""
     id: str
     type: Literal["separator"]
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentBlock:
-    """Embedded document block (PDF preview, etc.)."""
+    """Document block (PDF preview, etc.).
+
+    New blocks reference the file in the blob store by `blob` (SHA-256 hex)
+    and `size`; the browser fetches it with blob_request. `data` (inline
+    base64) only appears on blocks written before the blob store.
+    """
     type: Literal["document"]
     id: str
-    data: str           # base64-encoded file content
     mime_type: str       # e.g. 'application/pdf'
     filename: str
+    blob: Optional[str] = None
+    size: Optional[int] = None
+    data: Optional[str] = None
 
 
 # Union of all block types
@@ -204,7 +234,7 @@ Block = Union[
 # Browser -> Sprite Messages
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CanvasCardSnapshot:
     """Lightweight card snapshot sent with missions for agent context."""
     card_id: str
@@ -212,14 +242,14 @@ class CanvasCardSnapshot:
     blocks: list[dict[str, Any]]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MissionContext:
     """Context sent with a mission to identify the active stack."""
     stack_id: str
     canvas_state: Optional[list[CanvasCardSnapshot]] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MissionPayload:
     """Payload for a user mission (chat message)."""
     text: str
@@ -227,7 +257,7 @@ class MissionPayload:
     context: Optional[MissionContext] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class MissionMessage:
     """User sends a mission (chat message)."""
     type: Literal["mission"]
@@ -237,7 +267,7 @@ class MissionMessage:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FileUploadPayload:
     """Payload for a file upload."""
     filename: str
@@ -245,7 +275,7 @@ class FileUploadPayload:
     data: str  # Base64 encoded, max 25MB
 
 
-@dataclass
+@dataclass(slots=True)
 class FileUploadMessage:
     """File upload message."""
     type: Literal["file_upload"]
@@ -255,7 +285,61 @@ class FileUploadMessage:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class FileUploadBeginPayload:
+    """Start (or resume, with the same upload_id) a chunked upload."""
+    upload_id: str
+    filename: str
+    mime_type: str
+    size: int  # total bytes, max 25MB
+
+
+@dataclass(slots=True)
+class FileUploadBegin:
+    """Chunked upload: announce the file. Answered with file_upload_ack."""
+    type: Literal["file_upload_begin"]
+    payload: FileUploadBeginPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class FileUploadChunkPayload:
+    """Bytes [offset, offset + len(decoded data)) of the file."""
+    upload_id: str
+    offset: int
+    data: str  # Base64 encoded, max 1MB decoded
+
+
+@dataclass(slots=True)
+class FileUploadChunk:
+    """Chunked upload: one piece of the file. Answered with file_upload_ack."""
+    type: Literal["file_upload_chunk"]
+    payload: FileUploadChunkPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class FileUploadCommitPayload:
+    """Finish a chunked upload; sha256 (hex) is checked when given."""
+    upload_id: str
+    sha256: Optional[str] = None
+
+
+@dataclass(slots=True)
+class FileUploadCommit:
+    """Chunked upload: all bytes sent. Handled like a whole-file file_upload."""
+    type: Literal["file_upload_commit"]
+    payload: FileUploadCommitPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
 class CanvasInteractionPayload:
     """Payload for canvas interactions."""
     card_id: str
@@ -264,7 +348,7 @@ class CanvasInteractionPayload:
     block_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CanvasInteraction:
     """Canvas interaction (user edited a cell, moved a card, etc.)."""
     type: Literal["canvas_interaction"]
@@ -274,13 +358,13 @@ class CanvasInteraction:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AuthPayload:
     """Payload for auth connect."""
     token: str
 
 
-@dataclass
+@dataclass(slots=True)
 class AuthConnect:
     """Auth message (sent on connect only)."""
     type: Literal["auth"]
@@ -290,18 +374,57 @@ class AuthConnect:
     request_id: Optional[str] = None
 
 
+@dataclass(slots=True, frozen=True)
+class StateSyncRequestPayload:
+    """Payload for state sync requests. Omit since_revision for a full sync.
+
+    With chunked, the reply's first frame holds stacks, chat and the active
+    stack's card skeletons; the rest follows as state_sync_chunk frames.
+    """
+    since_revision: Optional[int] = None
+    chunked: bool = False
+
+
+@dataclass(slots=True)
+class StateSyncRequest:
+    """Browser asks for workspace state (sent on sprite_ready)."""
+    type: Literal["state_sync_request"]
+    payload: StateSyncRequestPayload = field(default_factory=StateSyncRequestPayload)
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class BlobRequestPayload:
+    """Payload for a blob byte-range request. length is capped by the Sprite."""
+    blob: str
+    offset: int = 0
+    length: Optional[int] = None
+
+
+@dataclass(slots=True)
+class BlobRequest:
+    """Browser asks for a byte range of a stored blob (document preview)."""
+    type: Literal["blob_request"]
+    payload: BlobRequestPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
 # =============================================================================
 # Sprite -> Browser Messages
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AgentEventMeta:
     """Optional metadata for agent events."""
     extraction_id: Optional[str] = None
     session_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentEventPayload:
     """Payload for agent events."""
     event_type: AgentEventType
@@ -309,7 +432,7 @@ class AgentEventPayload:
     meta: Optional[AgentEventMeta] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentEvent:
     """Agent thinking/streaming text."""
     type: Literal["agent_event"]
@@ -319,7 +442,7 @@ class AgentEvent:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CanvasUpdatePayload:
     """Payload for canvas update commands."""
     command: CanvasCommand
@@ -344,7 +467,7 @@ class CanvasUpdatePayload:
     preview_rows: Optional[list[list[Any]]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CanvasUpdate:
     """Canvas commands for the composable card system."""
     type: Literal["canvas_update"]
@@ -354,7 +477,7 @@ class CanvasUpdate:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class StatusPayload:
     """Payload for document status updates."""
     document_id: str
@@ -362,7 +485,7 @@ class StatusPayload:
     message: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class StatusUpdate:
     """Document status updates."""
     type: Literal["status"]
@@ -372,7 +495,7 @@ class StatusUpdate:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StackInfo:
     """Stack metadata for state sync."""
     id: str
@@ -380,14 +503,14 @@ class StackInfo:
     color: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CardPosition:
     """Card position on canvas."""
     x: float
     y: float
 
 
-@dataclass
+@dataclass(slots=True)
 class CardInfo:
     """Card metadata for state sync."""
     id: str
@@ -412,7 +535,7 @@ class CardInfo:
     preview_rows: Optional[list[list[Any]]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessageInfo:
     """Chat message for state sync."""
     id: str
@@ -421,18 +544,63 @@ class ChatMessageInfo:
     timestamp: int
 
 
-@dataclass
+@dataclass(slots=True)
 class StateSyncPayload:
-    """Payload for state sync messages."""
+    """Payload for state sync messages.
+
+    A "full" sync replaces the client's cards. A "delta" sync carries only
+    the cards written after since_revision plus deleted_card_ids (cards
+    deleted or archived since then); stacks and chat_history are always the
+    complete lists, with chat_history left empty when no message was added.
+    revision is the workspace revision the client is now current to.
+    """
     stacks: list[StackInfo]
     active_stack_id: str
     cards: list[CardInfo]
     chat_history: list[ChatMessageInfo]
+    revision: int = 0
+    mode: SyncMode = "full"
+    since_revision: Optional[int] = None
+    deleted_card_ids: Optional[list[str]] = None
+    sync_id: Optional[str] = None       # chunked sync: state_sync_chunk frames follow
+    total_cards: Optional[int] = None   # chunked sync: cards across all frames
+
+
+@dataclass(slots=True)
+class BlockDataPart:
+    """A slice of a document block's data, streamed after its card skeleton."""
+    card_id: str
+    block_id: str
+    offset: int
+    data: str
+    final: bool
+
+
+@dataclass(slots=True)
+class StateSyncChunkPayload:
+    """One bounded frame of a chunked state sync."""
+    sync_id: str
+    seq: int
+    cards: list[CardInfo]
+    cards_sent: int
+    total_cards: int
+    done: bool
+    block_data: Optional[list[BlockDataPart]] = None
+
 
+@dataclass(slots=True)
+class StateSyncChunk:
+    """Follow-up frame of a chunked state_sync (cards, then document block data)."""
+    type: Literal["state_sync_chunk"]
+    payload: StateSyncChunkPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
 
-@dataclass
+
+@dataclass(slots=True)
 class StateSyncMessage:
-    """Full workspace state sent on connect or stack switch."""
+    """Workspace state sent in reply to a state_sync_request."""
     type: Literal["state_sync"]
     payload: StateSyncPayload
     id: str = field(default_factory=_new_id)
@@ -440,14 +608,52 @@ class StateSyncMessage:
     request_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
+class BlobDataPayload:
+    """One byte range of a blob, base64-encoded."""
+    blob: str
+    offset: int
+    data: str
+    size: int     # total blob size in bytes
+    final: bool   # range reaches the end of the blob
+
+
+@dataclass(slots=True)
+class BlobData:
+    """Reply to a blob_request (echoes its request_id)."""
+    type: Literal["blob_data"]
+    payload: BlobDataPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class FileUploadAckPayload:
+    """Bytes of a chunked upload on disk: the offset to send from next."""
+    upload_id: str
+    offset: int
+    size: int
+
+
+@dataclass(slots=True)
+class FileUploadAck:
+    """Reply to file_upload_begin/chunk/commit (echoes its request_id)."""
+    type: Literal["file_upload_ack"]
+    payload: FileUploadAckPayload
+    id: str = field(default_factory=_new_id)
+    timestamp: int = field(default_factory=_now_ms)
+    request_id: Optional[str] = None
+
+
+@dataclass(slots=True)
 class SystemPayload:
     """Payload for system messages."""
     event: SystemEvent
     message: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class SystemMessage:
     """System messages (connection state, errors)."""
     type: Literal["system"]
@@ -466,6 +672,11 @@ BrowserToSpriteMessage = Union[
     FileUploadMessage,
     CanvasInteraction,
     AuthConnect,
+    StateSyncRequest,
+    BlobRequest,
+    FileUploadBegin,
+    FileUploadChunk,
+    FileUploadCommit,
 ]
 
 SpriteToBrowserMessage = Union[
@@ -474,6 +685,9 @@ SpriteToBrowserMessage = Union[
     StatusUpdate,
     SystemMessage,
     StateSyncMessage,
+    StateSyncChunk,
+    BlobData,
+    FileUploadAck,
 ]
 
 ProtocolMessage = Union[BrowserToSpriteMessage, SpriteToBrowserMessage]
@@ -527,6 +741,62 @@ def is_file_upload_message(value: Any) -> bool:
     )
 
 
+def _is_offset(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def is_file_upload_begin(value: Any) -> bool:
+    """Validate a FileUploadBegin dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "file_upload_begin"
+        and isinstance(p.get("upload_id"), str)
+        and isinstance(p.get("filename"), str)
+        and isinstance(p.get("mime_type"), str)
+        and _is_offset(p.get("size"))
+    )
+
+
+def is_file_upload_chunk(value: Any) -> bool:
+    """Validate a FileUploadChunk dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "file_upload_chunk"
+        and isinstance(p.get("upload_id"), str)
+        and _is_offset(p.get("offset"))
+        and isinstance(p.get("data"), str)
+    )
+
+
+def is_file_upload_commit(value: Any) -> bool:
+    """Validate a FileUploadCommit dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "file_upload_commit"
+        and isinstance(p.get("upload_id"), str)
+        and isinstance(p.get("sha256", ""), (str, type(None)))
+    )
+
+
+def is_file_upload_ack(value: Any) -> bool:
+    """Validate a FileUploadAck dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "file_upload_ack"
+        and isinstance(p.get("upload_id"), str)
+        and _is_offset(p.get("offset"))
+        and _is_offset(p.get("size"))
+    )
+
+
 def is_canvas_interaction(value: Any) -> bool:
     """Validate a CanvasInteraction dict."""
     if not is_websocket_message(value) or not _has_payload(value):
@@ -588,7 +858,7 @@ def is_status_update(value: Any) -> bool:
     if not is_websocket_message(value) or not _has_payload(value):
         return False
     p = value["payload"]
-    valid_statuses = ("processing", "ocr_complete", "completed", "failed")
+    valid_statuses = ("queued", "processing", "ocr_complete", "completed", "failed")
     return (
         value["type"] == "status"
         and isinstance(p.get("document_id"), str)
@@ -601,7 +871,7 @@ def is_system_message(value: Any) -> bool:
     if not is_websocket_message(value) or not _has_payload(value):
         return False
     p = value["payload"]
-    valid_events = ("connected", "sprite_waking", "sprite_ready", "reconnect_failed", "error")
+    valid_events = ("connected", "sprite_waking", "sprite_ready", "reconnect_failed", "error", "db_stats")
     return (
         value["type"] == "system"
         and p.get("event") in valid_events
@@ -622,6 +892,47 @@ def is_state_sync(value: Any) -> bool:
     )
 
 
+def is_state_sync_chunk(value: Any) -> bool:
+    """Validate a StateSyncChunk dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "state_sync_chunk"
+        and isinstance(p.get("sync_id"), str)
+        and isinstance(p.get("seq"), int)
+        and isinstance(p.get("cards"), list)
+        and isinstance(p.get("done"), bool)
+    )
+
+
+def is_blob_request(value: Any) -> bool:
+    """Validate a BlobRequest dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "blob_request"
+        and isinstance(p.get("blob"), str)
+        and isinstance(p.get("offset", 0), int)
+    )
+
+
+def is_blob_data(value: Any) -> bool:
+    """Validate a BlobData dict."""
+    if not is_websocket_message(value) or not _has_payload(value):
+        return False
+    p = value["payload"]
+    return (
+        value["type"] == "blob_data"
+        and isinstance(p.get("blob"), str)
+        and isinstance(p.get("offset"), int)
+        and isinstance(p.get("data"), str)
+        and isinstance(p.get("size"), int)
+        and isinstance(p.get("final"), bool)
+    )
+
+
 def is_protocol_message(value: Any) -> bool:
     """Validate any protocol message by dispatching to the correct type guard."""
     if not is_websocket_message(value):
@@ -636,6 +947,13 @@ def is_protocol_message(value: Any) -> bool:
         "status": is_status_update,
         "system": is_system_message,
         "state_sync": is_state_sync,
+        "state_sync_chunk": is_state_sync_chunk,
+        "blob_request": is_blob_request,
+        "blob_data": is_blob_data,
+        "file_upload_begin": is_file_upload_begin,
+        "file_upload_chunk": is_file_upload_chunk,
+        "file_upload_commit": is_file_upload_commit,
+        "file_upload_ack": is_file_upload_ack,
     }
     validator = validators.get(value["type"])
     if validator is None:
@@ -664,64 +982,135 @@ def is_block_list(value: Any) -> bool:
 # Serialization Helpers
 # =============================================================================
 
-def _serialize_block(block: Block) -> dict[str, Any]:
-    """Serialize a Block dataclass to a dict, handling nested dataclasses."""
-    if isinstance(block, KeyValueBlock):
-        return {
-            "id": block.id,
-            "type": block.type,
-            "pairs": [{"label": p.label, "value": p.value} for p in block.pairs],
-        }
-    return asdict(block)
+# Every dataclass gets an encoder, generated once from its fields, that
+# builds the None-stripped dict directly: fields in declaration order,
+# None values dropped, nested dataclasses encoded by their own encoder.
+# This replaces asdict (a deep copy) followed by two _strip_none walks,
+# and produces the same dict, so to_json output is unchanged byte for byte.
+
+_ATOMS = frozenset({str, int, float, bool})
+_ENCODERS: dict[type, Callable[[Any], dict[str, Any]]] = {}
+
+
+def _compile_encoder(cls: type) -> Callable[[Any], dict[str, Any]]:
+    """Generate the encoder for dataclass `cls`."""
+    lines = ["def encode(obj):", "    d = {}"]
+    for f in fields(cls):
+        convert = "_agent_meta(v)" if (cls, f.name) in _FIELD_HOOKS else "_value(v)"
+        lines += [
+            f"    v = obj.{f.name}",
+            "    if v is not None:",
+            f"        d[{f.name!r}] = v if v.__class__ in _ATOMS else {convert}",
+        ]
+        if (cls, f.name) in _FIELD_HOOKS:
+            lines.append(f"        if d[{f.name!r}] == {{}}: del d[{f.name!r}]")
+    lines.append("    return d")
+    namespace = {"_ATOMS": _ATOMS, "_value": _value, "_agent_meta": _agent_meta}
+    exec("\n".join(lines), namespace)  # noqa: S102 -- source built from field names only
+    encode = namespace["encode"]
+    encode.__qualname__ = f"_encode_{cls.__name__}"
+    return encode
+
+
+def _encode(obj: Any) -> dict[str, Any]:
+    """None-stripped dict for any dataclass instance."""
+    encoder = _ENCODERS.get(obj.__class__)
+    if encoder is None:
+        if not is_dataclass(obj) or isinstance(obj, type):
+            raise TypeError("to_dict() should be called on dataclass instances")
+        encoder = _ENCODERS[obj.__class__] = _compile_encoder(obj.__class__)
+    return encoder(obj)
+
+
+def _value(v: Any) -> Any:
+    """Encode a field value, dropping None values from dicts (and dicts in lists)."""
+    cls = v.__class__
+    if cls in _ATOMS:
+        return v
+    encoder = _ENCODERS.get(cls)
+    if encoder is not None:
+        return encoder(v)
+    if isinstance(v, list):
+        return [_plain(x) if isinstance(x, (list, tuple)) else _value(x) for x in v]
+    if isinstance(v, dict):
+        return {k: _value(x) for k, x in v.items() if x is not None}
+    if is_dataclass(v) and not isinstance(v, type):
+        return _encode(v)
+    return _plain(v)
+
+
+def _plain(v: Any) -> Any:
+    """Copy without stripping None (lists nested in lists keep their None values)."""
+    if v.__class__ in _ATOMS:
+        return v
+    if is_dataclass(v) and not isinstance(v, type):
+        return {f.name: _plain(getattr(v, f.name)) for f in fields(v)}
+    if isinstance(v, (list, tuple)):
+        return type(v)(_plain(x) for x in v)
+    if isinstance(v, dict):
+        return {k: _plain(x) for k, x in v.items()}
+    return copy.deepcopy(v)
+
+
+@functools.lru_cache(maxsize=64)
+def _camel_key(key: str) -> str:
+    return _snake_to_camel(key)
+
+
+def _agent_meta(meta: Any) -> Any:
+    """AgentEventMeta goes out with camelCase keys (matches the TS interface)."""
+    encoded = _value(meta)
+    if isinstance(encoded, dict):
+        return {_camel_key(k): x for k, x in encoded.items()}
+    return encoded
+
+
+_FIELD_HOOKS = {(AgentEventPayload, "meta")}
+
+for _cls in list(globals().values()):
+    if isinstance(_cls, type) and is_dataclass(_cls):
+        _ENCODERS[_cls] = _compile_encoder(_cls)
+del _cls
 
 
 def to_dict(message: ProtocolMessage) -> dict[str, Any]:
     """
     Convert a protocol message dataclass to a JSON-serializable dict.
-    Handles nested dataclasses and optional None values (removes them).
+    Optional fields that are None are omitted (matches TS behavior).
     """
-    result = asdict(message)
-    # Clean up None values for optional fields (matches TS behavior)
-    _strip_none(result)
-
-    # Handle CanvasUpdate blocks serialization specifically
-    # (asdict already handles this, but we ensure correct structure)
-    if message.type == "canvas_update" and message.payload.blocks is not None:
-        result["payload"]["blocks"] = [
-            _serialize_block(b) for b in message.payload.blocks
-        ]
+    return _encode(message)
+
+
+def _dumps_json(value: Any) -> str:
+    return json.dumps(value)
 
-    # Convert AgentEventMeta from snake_case to camelCase (matches TS interface)
-    if message.type == "agent_event" and "meta" in result["payload"]:
-        meta = result["payload"]["meta"]
-        if isinstance(meta, dict):
-            converted = {
-                _snake_to_camel(k): v for k, v in meta.items() if v is not None
-            }
-            result["payload"]["meta"] = converted if converted else None
-
-    # Final cleanup of None values after transformations
-    _strip_none(result)
-    return result
-
-
-def _strip_none(d: dict[str, Any]) -> None:
-    """Recursively remove keys with None values from a dict (in place)."""
-    keys_to_remove = [k for k, v in d.items() if v is None]
-    for k in keys_to_remove:
-        del d[k]
-    for v in d.values():
-        if isinstance(v, dict):
-            _strip_none(v)
-        elif isinstance(v, list):
-            for item in v:
-                if isinstance(item, dict):
-                    _strip_none(item)
+
+def _dumps_orjson(value: Any) -> str:
+    try:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:
+        # Integers beyond 64 bits and the like: stdlib json accepts them
+        return json.dumps(value)
+
+
+_dumps: Callable[[Any], str] = _dumps_json
+
+
+def use_orjson(enabled: bool = True) -> bool:
+    """Serialize with orjson when it is installed. Returns whether it is in use.
+
+    Off by default: orjson output is compact and leaves non-ASCII unescaped,
+    so it is the same JSON but not the same bytes as json.dumps (which the
+    stored card columns spliced into state_sync are written with).
+    """
+    global _dumps
+    _dumps = _dumps_orjson if enabled and orjson is not None else _dumps_json
+    return _dumps is _dumps_orjson
 
 
 def to_json(message: ProtocolMessage) -> str:
     """Serialize a protocol message to a JSON string."""
-    return json.dumps(to_dict(message))
+    return _dumps(_encode(message))
 
 
 def parse_message(data: str) -> Optional[dict[str, Any]]:
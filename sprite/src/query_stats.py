@@ -0,0 +1,183 @@
+"""Per-statement query timing for the sprite databases.
+
+A QueryStats instance is shared by TranscriptDB, MemoryDB and WorkspaceDB.
+Each statement's latency lands in a fixed-bucket histogram keyed by
+(database, normalized SQL); statements slower than slow_ms are also kept
+in a bounded slow-query log. SQLITE_BUSY / "database is locked" errors
+and the time spent acquiring the write lock in transaction() are counted
+per database.
+
+Databases without a QueryStats take a no-op path, so instrumentation
+costs one attribute check per statement when disabled.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import re
+import sqlite3
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+DEFAULT_SLOW_MS = 100.0
+SLOW_LOG_SIZE = 100
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse literals, IN-lists and whitespace so one query shape is one key."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def is_busy_error(exc: BaseException) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED surfaced by the sqlite3 module."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(exc)
+    return "locked" in message or "busy" in message
+
+
+class Histogram:
+    """Latency histogram with fixed millisecond buckets."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket containing the pct-th percentile (max_ms for the last)."""
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip([*map(str, BUCKETS_MS), "inf"], self.buckets)),
+        }
+
+
+class _Timer:
+    """Context manager that records one statement into QueryStats."""
+
+    __slots__ = ("_stats", "_db", "_sql", "_start")
+
+    def __init__(self, stats: QueryStats, db: str, sql: str) -> None:
+        self._stats = stats
+        self._db = db
+        self._sql = sql
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ms = (time.perf_counter() - self._start) * 1000
+        self._stats.record(self._db, self._sql, ms)
+        if exc is not None and is_busy_error(exc):
+            self._stats.record_busy(self._db)
+
+
+class QueryStats:
+    """Latency histograms, slow-query log, and lock counters for a set of databases."""
+
+    def __init__(self, slow_ms: float = DEFAULT_SLOW_MS, slow_log_size: int = SLOW_LOG_SIZE) -> None:
+        self.slow_ms = slow_ms
+        self._statements: dict[tuple[str, str], Histogram] = {}
+        self._lock_waits: dict[str, Histogram] = {}
+        self._busy: dict[str, int] = {}
+        self._slow: deque[dict] = deque(maxlen=slow_log_size)
+        self._since = time.time()
+
+    def time(self, db: str, sql: str) -> _Timer:
+        return _Timer(self, db, sql)
+
+    def record(self, db: str, sql: str, ms: float) -> None:
+        key = (db, normalize_sql(sql))
+        hist = self._statements.get(key)
+        if hist is None:
+            hist = self._statements[key] = Histogram()
+        hist.record(ms)
+        if ms >= self.slow_ms:
+            self._slow.append({"db": db, "sql": key[1], "ms": round(ms, 3), "at": time.time()})
+            logger.warning("Slow query on %s (%.1f ms): %s", db, ms, key[1])
+
+    def record_busy(self, db: str) -> None:
+        self._busy[db] = self._busy.get(db, 0) + 1
+
+    def record_lock_wait(self, db: str, ms: float) -> None:
+        hist = self._lock_waits.get(db)
+        if hist is None:
+            hist = self._lock_waits[db] = Histogram()
+        hist.record(ms)
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self._lock_waits.clear()
+        self._busy.clear()
+        self._slow.clear()
+        self._since = time.time()
+
+    def snapshot(self, top: int = 50) -> dict:
+        """JSON-ready dump: per-database statement histograms (slowest total first)."""
+        databases: dict[str, dict] = {}
+        for (db, sql), hist in sorted(
+            self._statements.items(), key=lambda item: item[1].total_ms, reverse=True,
+        ):
+            entry = databases.setdefault(db, {"statements": []})
+            if len(entry["statements"]) < top:
+                entry["statements"].append({"sql": sql, **hist.to_dict()})
+        for db in {*self._busy, *self._lock_waits}:
+            databases.setdefault(db, {"statements": []})
+        for db, entry in databases.items():
+            entry["busy_errors"] = self._busy.get(db, 0)
+            lock_wait = self._lock_waits.get(db)
+            entry["lock_wait"] = lock_wait.to_dict() if lock_wait else Histogram().to_dict()
+        return {
+            "since": self._since,
+            "slow_ms": self.slow_ms,
+            "databases": databases,
+            "slow_queries": list(self._slow),
+        }
@@ -58,6 +58,7 @@ def _classify_error(exc: Exception) -> str:
     return str(exc)
 
 SendFn = Callable[[str], Awaitable[None]]
+FlushFn = Callable[[], Awaitable[None]]
 
 MAX_TURNS = 15
 SDK_QUERY_TIMEOUT = 30  # seconds -- initial query to Anthropic API
@@ -85,6 +86,7 @@ class AgentRuntime:
         workspace_db: WorkspaceDB | None = None,
     ) -> None:
         self._send = send_fn
+        self._flush_fn: FlushFn | None = None
         self._is_connected: bool = False
         self._send_generation: int = 0
         self.last_session_id: str | None = None
@@ -116,6 +118,14 @@ class AgentRuntime:
             return
         await self._send(data)
 
+    async def send_to_client(self, data: str) -> None:
+        """Send on whichever connection is current (dropped while disconnected).
+
+        For server-scoped senders, such as the document queue, that outlive
+        any one connection.
+        """
+        await self._indirect_send(data)
+
     def _build_hooks_dict(self) -> dict | None:
         """Build hooks kwarg for ClaudeAgentOptions, or None if no hooks configured."""
         if not self._hooks:
@@ -143,9 +153,9 @@ class AgentRuntime:
 
     def _build_options(
         self, *, system_prompt: str | None = None, resume: str | None = None,
-        mcp_servers: dict | None = None,
+        mcp_servers: dict | None = None, with_hooks: bool = True,
     ) -> ClaudeAgentOptions:
-        """Construct ClaudeAgentOptions with hooks registered (if available)."""
+        """Construct ClaudeAgentOptions with hooks registered (if available and with_hooks)."""
         kwargs: dict = {
             "max_turns": MAX_TURNS,
             "permission_mode": "bypassPermissions",
@@ -157,19 +167,21 @@ class AgentRuntime:
             kwargs["resume"] = resume
         if mcp_servers:
             kwargs["mcp_servers"] = mcp_servers
-        hooks = self._build_hooks_dict()
+        hooks = self._build_hooks_dict() if with_hooks else None
         if hooks:
             kwargs["hooks"] = hooks
         return ClaudeAgentOptions(**kwargs)
 
-    def update_send_fn(self, send_fn: SendFn) -> None:
+    def update_send_fn(self, send_fn: SendFn, flush_fn: FlushFn | None = None) -> None:
         """Point the runtime at a new connection's send function.
 
         Called when a new TCP connection arrives (reconnect after sleep/wake).
-        The SDK client and conversation context are preserved.
+        The SDK client and conversation context are preserved. flush_fn
+        writes out any batched events and is awaited at the end of each turn.
         """
         self._send_generation += 1
         self._send = send_fn
+        self._flush_fn = flush_fn
         self._is_connected = True
         logger.info("Runtime send_fn updated (gen=%d)", self._send_generation)
 
@@ -187,11 +199,24 @@ class AgentRuntime:
         """Handle a user message — creates client on first call, reuses on subsequent.
 
         This is the single entry point for all user messages from the gateway.
+        Batched events are flushed when the turn completes or fails.
         """
-        if self._client is None:
-            await self._start_session(text, request_id, attachments)
-        else:
-            await self._continue_session(text, request_id)
+        try:
+            if self._client is None:
+                await self._start_session(text, request_id, attachments)
+            else:
+                await self._continue_session(text, request_id)
+        finally:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        """Write out events still batched on the current connection."""
+        if self._flush_fn is None or not self._is_connected:
+            return
+        try:
+            await self._flush_fn()
+        except Exception as exc:
+            logger.warning("Flush failed (connection dead?): %s", exc)
 
     async def _start_session(
         self,
@@ -312,6 +337,46 @@ class AgentRuntime:
             await self._handle_sdk_message(message, request_id)
         logger.info("SDK turn complete: %d messages", msg_count)
 
+    async def run_document_session(self, prompt: str, stack_id: str | None) -> str:
+        """Run `prompt` in a fresh SDK session of its own and return the agent's final text.
+
+        Used by document queue workers: several can run at once, apart from
+        the chat session (no mission_lock, no chat events, no memory hooks).
+        Canvas and extraction tools write to `stack_id` and reach the
+        browser on whichever connection is current.
+        """
+        tools = create_canvas_tools(
+            self._indirect_send, workspace_db=self._workspace_db, stack_id_fn=lambda: stack_id,
+        ) + create_extraction_tools(
+            self._indirect_send, workspace_db=self._workspace_db, stack_id_fn=lambda: stack_id,
+        )
+        options = self._build_options(
+            system_prompt=await load_memory(self._memory_db),
+            mcp_servers={"sprite": create_sdk_mcp_server(name="sprite", tools=tools)},
+            with_hooks=False,
+        )
+
+        async def session() -> str:
+            text = ""
+            async with ClaudeSDKClient(options=options) as client:
+                await asyncio.wait_for(client.query(prompt), timeout=SDK_QUERY_TIMEOUT)
+                response_iter = client.receive_response().__aiter__()
+                while True:
+                    try:
+                        message = await asyncio.wait_for(response_iter.__anext__(), timeout=SDK_MSG_TIMEOUT)
+                    except StopAsyncIteration:
+                        break
+                    if isinstance(message, AssistantMessage):
+                        # Keep the last text: the agent ends with its summary
+                        blocks = [b.text for b in message.content if isinstance(b, TextBlock)]
+                        if blocks:
+                            text = "".join(blocks)
+                    elif isinstance(message, ResultMessage) and message.is_error:
+                        raise RuntimeError(f"Document session ended with an error ({message.subtype})")
+            return text
+
+        return await asyncio.wait_for(session(), timeout=SDK_TURN_TIMEOUT)
+
     async def cleanup(self) -> None:
         """Clean up the persistent client on disconnect."""
         await self._cleanup_client()
@@ -15,11 +15,21 @@ from pathlib import Path
 
 import anthropic
 
+from .blobs import BlobStore, externalize_document_blocks
 from .database import TranscriptDB, MemoryDB, WorkspaceDB
+from .documents import EXTRACTION_WORKERS, DocumentQueue
+from .preextract import PreExtractor
+from .framing import BATCH_WINDOW, MAX_FRAME_BYTES, FrameError, SpriteLink
+from .maintenance import MaintenanceScheduler
+from .outbound import OutboundQueue
+from .query_stats import QueryStats
+from .protocol import use_orjson
+from .snapshot import SnapshotManager
+from .state_sync import StateSyncCache
+from .uploads import UploadStore
 from .memory.processor import ObservationProcessor
 from .gateway import SpriteGateway
 from .runtime import AgentRuntime
-from .state_sync import send_state_sync
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +37,9 @@ HOST = "0.0.0.0"
 PORT = 8765
 MEMORY_DIR = Path("/workspace/.os/memory")
 READLINE_TIMEOUT = 120  # seconds -- detect half-open TCP connections
+WORKSPACE_READ_POOL_SIZE = 2  # read-only connections so state_sync reads don't queue behind writes
+DB_GROUP_COMMIT_MS = 3.0  # one commit per burst of agent-turn writes instead of one per statement
+DB_SLOW_QUERY_MS = 100.0  # statements slower than this go to the slow-query log
 
 
 async def handle_connection(
@@ -35,6 +48,11 @@ async def handle_connection(
     runtime: AgentRuntime,
     workspace_db: WorkspaceDB,
     mission_lock: asyncio.Lock | None = None,
+    query_stats: QueryStats | None = None,
+    blob_store: BlobStore | None = None,
+    sync_cache: StateSyncCache | None = None,
+    upload_store: UploadStore | None = None,
+    document_queue: DocumentQueue | None = None,
 ) -> None:
     """Handle a single TCP connection from the Bridge (via Sprites TCP Proxy).
 
@@ -44,42 +62,60 @@ async def handle_connection(
     remote = writer.get_extra_info("peername")
     logger.info("Connection opened: %s", remote)
 
-    async def send_fn(data: str) -> None:
-        writer.write((data + "\n").encode())
-        await writer.drain()
+    # Newline-delimited JSON until the Bridge negotiates length-prefixed frames;
+    # sends are batched per BATCH_WINDOW and flushed at the end of each turn
+    link = SpriteLink(reader, writer, batch_window=BATCH_WINDOW)
+    link.offer()
+
+    # A writer task owns the socket, so a slow Bridge never blocks the agent
+    # turn; a consumer too slow to keep up is disconnected and resyncs
+    outbound = OutboundQueue(link, on_slow=writer.transport.abort)
+    send_fn = outbound.send
 
     # Point the runtime at the new connection's send_fn
-    runtime.update_send_fn(send_fn)
+    runtime.update_send_fn(send_fn, flush_fn=outbound.flush)
 
     gateway = SpriteGateway(
         send_fn=send_fn, runtime=runtime, workspace_db=workspace_db,
-        mission_lock=mission_lock,
+        mission_lock=mission_lock, query_stats=query_stats, blob_store=blob_store,
+        sync_cache=sync_cache, flush_fn=outbound.flush, upload_store=upload_store,
+        document_queue=document_queue,
     )
 
-    await send_state_sync(workspace_db, send_fn)
-    await gateway.check_and_send_welcome()
+    # No state push or welcome here: the browser sends state_sync_request on
+    # sprite_ready with its last revision (so reconnects get a delta), and
+    # the gateway greets new users after answering it
 
     try:
         while True:
             try:
-                line = await asyncio.wait_for(reader.readline(), timeout=READLINE_TIMEOUT)
+                raw = await asyncio.wait_for(link.read(), timeout=READLINE_TIMEOUT)
             except asyncio.TimeoutError:
                 logger.warning("readline timeout (%ds) -- closing connection", READLINE_TIMEOUT)
                 break
-            if not line:
+            if raw is None:
                 break
-            raw = line.decode("utf-8", errors="replace").strip()
             if raw:
-                await gateway.route(raw)
+                # Returns once the message is queued: missions run on their own
+                # lane, so pings keep flowing and the read timeout stays honest
+                await gateway.dispatch(raw)
     except asyncio.CancelledError:
         pass
+    except FrameError as e:
+        logger.warning("Bad frame from Bridge -- closing connection: %s", e)
     except Exception:
         logger.exception("Unhandled error in connection handler")
     finally:
         await gateway.cancel_tasks()
+        logger.info("Dispatch lanes: %s", gateway.lane_stats())
         runtime.mark_disconnected()
+        await outbound.close()
+        logger.info("Outbound queue: %s", outbound.stats())
         writer.close()
-        logger.info("Connection ended: %s", remote)
+        logger.info(
+            "Connection ended: %s (%d bytes in, %d out in %d writes)",
+            remote, link.bytes_in, link.bytes_out, link.writes,
+        )
 
 
 async def main() -> None:
@@ -92,14 +128,43 @@ async def main() -> None:
             sig, lambda: stop.set_result(None) if not stop.done() else None
         )
 
-    # Initialize databases
-    transcript_db = TranscriptDB()
-    memory_db = MemoryDB()
-    workspace_db = WorkspaceDB()
+    # orjson, when installed, serializes outbound messages (same JSON, compact bytes)
+    if use_orjson():
+        logger.info("Serializing protocol messages with orjson")
+
+    # Initialize databases (one QueryStats shared so a dump covers all three)
+    query_stats = QueryStats(slow_ms=DB_SLOW_QUERY_MS)
+    transcript_db = TranscriptDB(group_commit_ms=DB_GROUP_COMMIT_MS, stats=query_stats)
+    memory_db = MemoryDB(stats=query_stats)
+    workspace_db = WorkspaceDB(
+        read_pool_size=WORKSPACE_READ_POOL_SIZE, group_commit_ms=DB_GROUP_COMMIT_MS,
+        stats=query_stats,
+    )
     await transcript_db.connect()
     await memory_db.connect()
     await workspace_db.connect()
 
+    # Uploaded files live in the blob store; cards reference them by hash
+    blob_store = BlobStore()
+    try:
+        await externalize_document_blocks(workspace_db, blob_store)
+    except Exception:
+        logger.exception("Moving embedded documents into the blob store failed")
+
+    # Chunked uploads in progress; shared so one can resume on a new connection
+    upload_store = UploadStore()
+
+    # Serialized state_sync shared by every connection; WorkspaceDB writes invalidate it
+    sync_cache = StateSyncCache(workspace_db)
+
+    # Retention + compaction run in the background, not on every insert
+    maintenance = MaintenanceScheduler([transcript_db, memory_db, workspace_db])
+    maintenance.start()
+
+    # Point-in-time copies of the user's desktop and learnings
+    snapshots = SnapshotManager([workspace_db, memory_db])
+    snapshots.start()
+
     # Anthropic client for batch processor (reads ANTHROPIC_API_KEY / ANTHROPIC_BASE_URL from env)
     anthropic_client = anthropic.AsyncAnthropic()
 
@@ -123,18 +188,28 @@ async def main() -> None:
         workspace_db=workspace_db,
     )
 
+    # Uploaded documents are read by their own agent sessions, apart from chat;
+    # jobs interrupted by the last shutdown resume here. Text, layout and tables
+    # are pulled out locally first, in a process pool
+    preextractor = PreExtractor()
+    document_queue = DocumentQueue(workspace_db, runtime, workers=EXTRACTION_WORKERS, preextractor=preextractor)
+    await document_queue.start()
+
     _handlers: set[asyncio.Task] = set()
 
     def _on_connect(r: asyncio.StreamReader, w: asyncio.StreamWriter) -> None:
         task = asyncio.create_task(
             handle_connection(r, w, runtime=runtime, workspace_db=workspace_db,
-                              mission_lock=mission_lock)
+                              mission_lock=mission_lock, query_stats=query_stats,
+                              blob_store=blob_store, sync_cache=sync_cache,
+                              upload_store=upload_store, document_queue=document_queue)
         )
         _handlers.add(task)
         task.add_done_callback(_handlers.discard)
 
-    # 50MB limit for StreamReader -- file_upload messages carry base64 data (25MB file ~ 33MB base64)
-    server = await asyncio.start_server(_on_connect, HOST, PORT, limit=50 * 1024 * 1024)
+    # 50MB line limit for StreamReader -- a whole-file file_upload carries base64 data (25MB file ~ 33MB
+    # base64); chunked uploads (file_upload_begin/chunk/commit) stay under 1.4MB per message
+    server = await asyncio.start_server(_on_connect, HOST, PORT, limit=MAX_FRAME_BYTES)
     logger.info("Sprite server listening on tcp://%s:%d", HOST, PORT)
     await stop
 
@@ -146,7 +221,11 @@ async def main() -> None:
 
     server.close()
     await server.wait_closed()
+    await document_queue.close()
+    preextractor.close()
     await runtime.cleanup()
+    await maintenance.stop()
+    await snapshots.stop()
     await transcript_db.close()
     await memory_db.close()
     await workspace_db.close()
@@ -0,0 +1,199 @@
+"""Online snapshots of the sprite databases via the SQLite backup API.
+
+A snapshot copies a live database into /workspace/.os/snapshots without
+blocking the gateway. The copy runs on a worker thread through its own
+read-only connection, a few hundred pages per backup step. That
+connection holds one WAL read transaction for the whole copy, so
+concurrent writes neither wait for it nor force the backup to restart,
+and the result is a consistent point-in-time image.
+
+SnapshotManager takes snapshots on a timer (skipping databases with no
+writes since their last snapshot), keeps the newest `keep` per database,
+and restores a database in place from any of them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .database import _BaseDB
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path("/workspace/.os/snapshots")
+DEFAULT_INTERVAL = 3600.0  # seconds between scheduled snapshots
+DEFAULT_KEEP = 24          # snapshots retained per database
+PAGES_PER_STEP = 256       # pages copied per backup step (1 MB at 4 KB pages)
+STEP_SLEEP = 0.002         # seconds between steps, leaves I/O headroom for the writer
+
+_SUFFIX = ".db"
+_PARTIAL = ".partial"
+
+
+def _backup_to_file(source: str, target: Path, pages: int, sleep: float) -> None:
+    """Copy `source` into `target` from one read snapshot. Runs on a worker thread."""
+    uri = Path(source).absolute().as_uri() + "?mode=ro"
+    src = sqlite3.connect(uri, uri=True, isolation_level=None)
+    dst = sqlite3.connect(str(target))
+    # The target is a private .partial file: skip its rollback journal and
+    # per-page syncing; _publish syncs it once before it becomes a snapshot.
+    dst.execute("PRAGMA journal_mode=OFF")
+    dst.execute("PRAGMA synchronous=OFF")
+    try:
+        # Pin a read snapshot: without it, every commit on the live DB restarts the copy
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        src.backup(dst, pages=pages, sleep=sleep)
+        src.execute("COMMIT")
+    finally:
+        dst.close()
+        src.close()
+
+
+def _publish(partial: Path, target: Path) -> None:
+    """Durably rename a finished copy into place. Runs on a worker thread.
+
+    Without the fsyncs a crash could leave a torn file under a completed
+    snapshot's name, and pruning would then delete a good snapshot for it.
+    """
+    fd = os.open(partial, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(partial, target)
+    fd = os.open(target.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _restore_from_file(target: sqlite3.Connection, snapshot: Path, pages: int) -> None:
+    """Overwrite `target` with `snapshot`. Runs on the target connection's thread."""
+    src = sqlite3.connect(snapshot.absolute().as_uri() + "?mode=ro", uri=True)
+    try:
+        result = src.execute("PRAGMA quick_check").fetchone()[0]
+        if result != "ok":
+            raise sqlite3.DatabaseError(f"Snapshot {snapshot.name} failed quick_check: {result}")
+        src.backup(target, pages=pages, sleep=0)
+    finally:
+        src.close()
+
+
+class SnapshotManager:
+    """Scheduled online snapshots with bounded retention, plus restore.
+
+    Snapshot files are named "<db name>-<UTC timestamp>.db" under
+    `directory`; a copy in progress is written as ".partial" and renamed
+    into place only once complete.
+    """
+
+    def __init__(
+        self,
+        databases: list[_BaseDB],
+        directory: Path = SNAPSHOT_DIR,
+        interval: float = DEFAULT_INTERVAL,
+        keep: int = DEFAULT_KEEP,
+        pages_per_step: int = PAGES_PER_STEP,
+    ) -> None:
+        self.directory = Path(directory)
+        self.interval = interval
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self._databases = list(databases)
+        self._last_snapshot: dict[int, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def snapshots(self, db: _BaseDB) -> list[Path]:
+        """Completed snapshots of `db`, oldest first."""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{db.name}-*{_SUFFIX}"))
+
+    async def snapshot(self, db: _BaseDB, force: bool = False) -> Path | None:
+        """Take one snapshot of `db`. Returns its path, or None if skipped as unchanged."""
+        last = self._last_snapshot.get(id(db))
+        if not force and last is not None and db.idle_seconds >= time.monotonic() - last:
+            return None
+        # Group-commit writes still in their window belong in the snapshot
+        await db.flush()
+        started = time.monotonic()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        target = self.directory / f"{db.name}-{stamp}{_SUFFIX}"
+        partial = target.with_name(target.name + _PARTIAL)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            await asyncio.to_thread(
+                _backup_to_file, db.db_path, partial, self.pages_per_step, STEP_SLEEP,
+            )
+            await asyncio.to_thread(_publish, partial, target)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        self._last_snapshot[id(db)] = started
+        logger.info("Snapshot of %s written to %s in %.2fs",
+                    db.name, target.name, time.monotonic() - started)
+        self._prune(db)
+        return target
+
+    def _prune(self, db: _BaseDB) -> None:
+        existing = self.snapshots(db)
+        for old in existing[:max(len(existing) - self.keep, 0)]:
+            old.unlink(missing_ok=True)
+            logger.info("Snapshot expired: %s", old.name)
+
+    async def restore(self, db: _BaseDB, snapshot: Path) -> None:
+        """Replace the live contents of `db` with `snapshot`.
+
+        Runs on the writer connection, so writes queue behind the restore
+        and pooled readers see the restored data once it completes.
+        """
+        snapshot = Path(snapshot)
+        if not snapshot.exists():
+            raise FileNotFoundError(snapshot)
+        await db.flush()
+        await db._on_writer_thread(_restore_from_file, snapshot, self.pages_per_step)
+        # A snapshot taken before a schema upgrade comes back at its old version
+        await db._migrate()
+        db._contents_replaced()
+        logger.info("Restored %s from %s", db.name, snapshot.name)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    async def run_once(self) -> list[Path]:
+        """Snapshot every database that changed since its last snapshot."""
+        taken: list[Path] = []
+        for db in self._databases:
+            try:
+                path = await self.snapshot(db)
+            except Exception:
+                logger.exception("Snapshot of %s failed", db.name)
+                continue
+            if path is not None:
+                taken.append(path)
+        return taken
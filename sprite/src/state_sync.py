@@ -1,11 +1,31 @@
-"""State sync -- send full workspace state to browser on new connections."""
+"""State sync -- send workspace state to the browser when it asks.
+
+The browser sends state_sync_request on every sprite_ready with the
+revision of its last sync. When the revision log still covers that
+revision the reply is a delta (changed cards plus tombstones), otherwise
+a full sync.
+
+The wire message is built by build_state_sync_json in one pass over a
+single joined cards query. Card columns that already hold JSON text
+(blocks, tags, headers, preview_rows) are spliced into the output
+verbatim instead of being decoded into CardInfo and re-encoded.
+build_state_sync_message returns the same state as decoded dataclasses.
+
+A StateSyncCache keeps the serialized pieces of the full state (stacks,
+chat window, and card JSON per stack) between syncs. WorkspaceDB's
+mutators report every write to it, and a write drops only the pieces it
+touched, so a repeat sync with no writes in between costs no query and
+no encoding.
+"""
 
 from __future__ import annotations
 
 import json
 import logging
+import sqlite3
 import uuid
-from typing import Callable, Awaitable
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable
 
 from .database import WorkspaceDB
 from .protocol import (
@@ -15,88 +35,573 @@ from .protocol import (
     StackInfo,
     StateSyncMessage,
     StateSyncPayload,
-    to_json,
+    _new_id,
+    _now_ms,
 )
 
 logger = logging.getLogger(__name__)
 
 SendFn = Callable[[str], Awaitable[None]]
 
+CHAT_HISTORY_LIMIT = 50
 
-async def build_state_sync_message(db: WorkspaceDB) -> StateSyncMessage:
-    """Build a StateSyncMessage from current DB state.
+# Target size of one chunked-sync frame; a single card skeleton larger than
+# this still goes out whole, document block data is sliced to fit
+SYNC_FRAME_BYTES = 256 * 1024
 
-    If no stacks exist, creates a default "My Stack" so the frontend
-    always has at least one workspace to render.
+# Blocks text is written by json.dumps, so a document block contains this
+_DOCUMENT_BLOCK = '"type": "document"'
+
+_dumps = json.dumps
+
+
+def _loads(value: str | None):
+    return json.loads(value) if value else None
+
+
+def _card_info(r: sqlite3.Row) -> CardInfo:
+    return CardInfo(
+        id=r["card_id"],
+        stack_id=r["stack_id"],
+        title=r["title"],
+        blocks=_loads(r["blocks"]) or [],
+        size=r["size"] or "medium",
+        position=CardPosition(x=r["position_x"], y=r["position_y"]),
+        z_index=r["z_index"],
+        card_type=r["card_type"],
+        summary=r["summary"],
+        tags=_loads(r["tags"]),
+        color=r["color"],
+        type_badge=r["type_badge"],
+        date=r["date"],
+        value=r["value"],
+        trend=r["trend"],
+        trend_direction=r["trend_direction"],
+        author=r["author"],
+        read_time=r["read_time"],
+        headers=_loads(r["headers"]),
+        preview_rows=_loads(r["preview_rows"]),
+    )
+
+
+# CardInfo's optional fields in declaration order: (column, holds JSON text)
+_OPTIONAL_CARD_COLUMNS = (
+    ("card_type", False), ("summary", False), ("tags", True), ("color", False),
+    ("type_badge", False), ("date", False), ("value", False), ("trend", False),
+    ("trend_direction", False), ("author", False), ("read_time", False),
+    ("headers", True), ("preview_rows", True),
+)
+
+
+def _card_json(r: sqlite3.Row, blocks: str | None = None) -> str:
+    """Encode one card row exactly as to_json encodes its CardInfo.
+
+    WorkspaceDB writes the JSON columns with None keys already dropped,
+    so their stored text is already the wire encoding. `blocks` overrides
+    the stored blocks text.
     """
-    stacks = await db.list_stacks()
+    parts = [
+        '{"id": ', _dumps(r["card_id"]),
+        ', "stack_id": ', _dumps(r["stack_id"]),
+        ', "title": ', _dumps(r["title"]),
+        ', "blocks": ', blocks or r["blocks"] or "[]",
+        ', "size": ', _dumps(r["size"] or "medium"),
+    ]
+    x, y = r["position_x"], r["position_y"]
+    position = [f'"x": {_dumps(x)}'] if x is not None else []
+    if y is not None:
+        position.append(f'"y": {_dumps(y)}')
+    parts += (', "position": {', ", ".join(position), "}")
+    if r["z_index"] is not None:
+        parts += (', "z_index": ', _dumps(r["z_index"]))
+    for column, is_json in _OPTIONAL_CARD_COLUMNS:
+        value = r[column]
+        if value is not None:
+            parts += (', "', column, '": ', value if is_json else _dumps(value))
+    parts.append("}")
+    return "".join(parts)
+
+
+@dataclass
+class _SyncPlan:
+    """What one state_sync covers, read before any card rows."""
+    revision: int
+    since_revision: int | None  # None for a full sync
+    stacks: list[dict]
+    changed: dict[str, set[str]]
+
+    @property
+    def mode(self) -> str:
+        return "full" if self.since_revision is None else "delta"
+
+    def cards(self, db: WorkspaceDB) -> AsyncIterator[sqlite3.Row]:
+        # Stream so only one fetch batch of raw rows is live at a time
+        return db.iter_active_cards(raw=True, since_revision=self.since_revision)
+
+    def deleted_card_ids(self, live: set[str]) -> list[str] | None:
+        if self.since_revision is None:
+            return None
+        return sorted(self.changed.get("card", set()) - live)
+
+    async def chat_rows(self, db: WorkspaceDB) -> list[dict]:
+        if self.since_revision is not None and "chat" not in self.changed:
+            return []
+        return await db.get_chat_history(limit=CHAT_HISTORY_LIMIT)
+
 
+async def _active_stacks(db: WorkspaceDB) -> list[dict]:
+    stacks = await db.list_stacks()
     if not stacks:
         default_id = str(uuid.uuid4())
         await db.create_stack(stack_id=default_id, name="My Stack")
         stacks = await db.list_stacks()
+    return stacks
 
-    stack_infos = [
-        StackInfo(id=s["id"], name=s["name"], color=s.get("color"))
-        for s in stacks
-    ]
 
-    # Gather active cards across all active stacks
-    cards: list[CardInfo] = []
-    for s in stacks:
-        rows = await db.get_cards_by_stack(s["id"])
-        for r in rows:
-            blocks = json.loads(r["blocks"]) if r["blocks"] else []
-            cards.append(CardInfo(
-                id=r["card_id"],
-                stack_id=r["stack_id"],
-                title=r["title"],
-                blocks=blocks,
-                size=r["size"] or "medium",
-                position=CardPosition(x=r["position_x"], y=r["position_y"]),
-                z_index=r["z_index"],
-                card_type=r.get("card_type"),
-                summary=r.get("summary"),
-                tags=json.loads(r["tags"]) if r.get("tags") else None,
-                color=r.get("color"),
-                type_badge=r.get("type_badge"),
-                date=r.get("date"),
-                value=r.get("value"),
-                trend=r.get("trend"),
-                trend_direction=r.get("trend_direction"),
-                author=r.get("author"),
-                read_time=r.get("read_time"),
-                headers=json.loads(r["headers"]) if r.get("headers") else None,
-                preview_rows=json.loads(r["preview_rows"]) if r.get("preview_rows") else None,
-            ))
-
-    # Last 50 chat messages, converting seconds->ms and int->str id
-    chat_rows = await db.get_chat_history(limit=50)
-    chat_history = [
-        ChatMessageInfo(
-            id=str(r["id"]),
-            role=r["role"],
-            content=r["content"],
-            timestamp=int(r["timestamp"] * 1000),
-        )
-        for r in chat_rows
-    ]
+async def _plan(db: WorkspaceDB, since_revision: int | None) -> _SyncPlan:
+    """Pick full or delta and load the stacks.
+
+    With since_revision, plans a delta against that revision unless the
+    sync log no longer reaches back to it (trimmed by retention, or the
+    revision comes from a different database), in which case it falls
+    back to a full sync.
+
+    If no stacks exist, creates a default "My Stack" so the frontend
+    always has at least one workspace to render.
+    """
+    # Read the revision first: anything written after it is re-sent next time
+    revision, oldest = await db.sync_window()
+    delta = since_revision is not None and since_revision <= revision and (
+        since_revision == revision or (oldest is not None and oldest <= since_revision + 1)
+    )
+
+    stacks = await _active_stacks(db)
+    if not delta:
+        return _SyncPlan(revision, None, stacks, {})
+    return _SyncPlan(revision, since_revision, stacks, await db.changed_since(since_revision))
+
+
+def _chat_info(r: dict) -> dict[str, Any]:
+    # Seconds -> ms and int -> str id, as the frontend expects
+    return {"id": str(r["id"]), "role": r["role"], "content": r["content"],
+            "timestamp": int(r["timestamp"] * 1000)}
+
 
+async def build_state_sync_message(
+    db: WorkspaceDB, since_revision: int | None = None,
+) -> StateSyncMessage:
+    """Build a StateSyncMessage (decoded dataclasses) from current DB state."""
+    plan = await _plan(db, since_revision)
+    cards = [_card_info(r) async for r in plan.cards(db)]
     return StateSyncMessage(
         type="state_sync",
         payload=StateSyncPayload(
-            stacks=stack_infos,
-            active_stack_id=stacks[0]["id"],
+            stacks=[StackInfo(id=s["id"], name=s["name"], color=s.get("color")) for s in plan.stacks],
+            active_stack_id=plan.stacks[0]["id"],
             cards=cards,
-            chat_history=chat_history,
+            chat_history=[ChatMessageInfo(**_chat_info(r)) for r in await plan.chat_rows(db)],
+            revision=plan.revision,
+            mode=plan.mode,
+            since_revision=plan.since_revision,
+            deleted_card_ids=plan.deleted_card_ids({c.id for c in cards}),
         ),
     )
 
 
-async def send_state_sync(db: WorkspaceDB, send_fn: SendFn) -> None:
+def _envelope(msg_type: str, payload: list[str], request_id: str | None) -> str:
+    # Same key order and separators as to_json on the message dataclass
+    parts = ['{"type": "', msg_type, '", "payload": {', *payload,
+             '}, "id": ', _dumps(_new_id()), ', "timestamp": ', str(_now_ms())]
+    if request_id is not None:
+        parts += (', "request_id": ', _dumps(request_id))
+    parts.append("}")
+    return "".join(parts)
+
+
+def _state_sync_json(
+    plan: _SyncPlan, cards: list[str], deleted: list[str] | None, chat: list[dict],
+    request_id: str | None, sync_id: str | None = None, total_cards: int | None = None,
+) -> str:
+    body = _state_sync_body(plan, cards, deleted, chat, sync_id, total_cards)
+    return _envelope("state_sync", [body], request_id)
+
+
+def _state_sync_body(
+    plan: _SyncPlan, cards: list[str], deleted: list[str] | None, chat: list[dict],
+    sync_id: str | None = None, total_cards: int | None = None,
+) -> str:
+    stacks = [
+        {"id": s["id"], "name": s["name"], "color": s["color"]} if s.get("color") is not None
+        else {"id": s["id"], "name": s["name"]}
+        for s in plan.stacks
+    ]
+    payload = [
+        '"stacks": ', _dumps(stacks),
+        ', "active_stack_id": ', _dumps(plan.stacks[0]["id"]),
+        ', "cards": [', ", ".join(cards),
+        '], "chat_history": ', _dumps(chat),
+        ', "revision": ', str(plan.revision),
+        ', "mode": "', plan.mode, '"',
+    ]
+    if plan.since_revision is not None:
+        payload += (', "since_revision": ', str(plan.since_revision))
+    if deleted is not None:
+        payload += (', "deleted_card_ids": ', _dumps(deleted))
+    if sync_id is not None:
+        payload += (', "sync_id": ', _dumps(sync_id), ', "total_cards": ', str(total_cards))
+    return "".join(payload)
+
+
+async def _encode_state_sync(
+    db: WorkspaceDB, since_revision: int | None, request_id: str | None,
+) -> tuple[str, tuple]:
+    plan = await _plan(db, since_revision)
+    cards: list[str] = []
+    live: set[str] = set()
+    async for r in plan.cards(db):
+        cards.append(_card_json(r))
+        live.add(r["card_id"])
+    deleted = plan.deleted_card_ids(live)
+    chat = [_chat_info(r) for r in await plan.chat_rows(db)]
+    data = _state_sync_json(plan, cards, deleted, chat, request_id)
+    summary = (plan.mode, plan.revision, len(plan.stacks), len(cards), len(deleted or ()), len(chat))
+    return data, summary
+
+
+async def build_state_sync_json(
+    db: WorkspaceDB, since_revision: int | None = None, request_id: str | None = None,
+    cache: StateSyncCache | None = None,
+) -> str:
+    """Build the state_sync wire message directly from rows (stored JSON spliced as-is)."""
+    state = await _cached_state(cache, since_revision)
+    if state is not None:
+        return _cached_state_sync_json(state, since_revision, request_id)
+    data, _ = await _encode_state_sync(db, since_revision, request_id)
+    return data
+
+
+async def send_state_sync(
+    db: WorkspaceDB, send_fn: SendFn,
+    since_revision: int | None = None, request_id: str | None = None,
+    cache: StateSyncCache | None = None,
+) -> None:
     """Build and send state_sync message over the connection."""
-    msg = await build_state_sync_message(db)
-    await send_fn(to_json(msg))
-    logger.info("Sent state_sync: %d stacks, %d cards, %d messages",
-                len(msg.payload.stacks), len(msg.payload.cards),
-                len(msg.payload.chat_history))
+    state = await _cached_state(cache, since_revision)
+    if state is not None:
+        await send_fn(_cached_state_sync_json(state, since_revision, request_id))
+        logger.info("Sent state_sync at revision %d from cache", state.revision)
+        return
+    data, summary = await _encode_state_sync(db, since_revision, request_id)
+    await send_fn(data)
+    logger.info("Sent %s state_sync at revision %d: %d stacks, %d cards, %d deleted, %d messages",
+                *summary)
+
+
+# -- Cache -----------------------------------------------------------------------
+
+
+@dataclass
+class _CachedCard:
+    card_id: str
+    json: str
+    skeleton: str     # json with document block data blanked, for chunked sync
+    heavy: list[str]  # ids of the blanked document blocks
+
+
+def _cached_card(r: sqlite3.Row) -> _CachedCard:
+    skeleton, heavy = _skeleton(r)
+    return _CachedCard(r["card_id"], _card_json(r) if heavy else skeleton, skeleton, heavy)
+
+
+@dataclass
+class _FullState:
+    """The complete workspace state at one revision, as serialized pieces."""
+    revision: int
+    stacks: list[dict]
+    chat: list[dict]
+    cards: dict[str, list[_CachedCard]]  # stack id -> its cards in sync order
+    body: str | None = None              # assembled full-sync payload, built once
+
+    def plan(self, since_revision: int | None = None) -> _SyncPlan:
+        return _SyncPlan(self.revision, since_revision, self.stacks, {})
+
+    def stack_cards(self, stacks: list[dict]) -> list[_CachedCard]:
+        return [c for s in stacks for c in self.cards.get(s["id"], ())]
+
+    def full_body(self) -> str:
+        if self.body is None:
+            cards = [c.json for c in self.stack_cards(self.stacks)]
+            self.body = _state_sync_body(self.plan(), cards, None, self.chat)
+        return self.body
+
+
+class StateSyncCache:
+    """Serialized full state of one WorkspaceDB, kept between syncs.
+
+    Registers itself as a change listener on `db`, so every write through
+    WorkspaceDB's mutators invalidates it: a card write drops that card's
+    stack, a stack write drops the stack list and that stack's cards, a
+    chat message drops the chat window, and any write drops the assembled
+    payload (the revision moved). The next sync re-reads only what was
+    dropped. A build that overlapped a write is served but not kept.
+    """
+
+    def __init__(self, db: WorkspaceDB) -> None:
+        self.db = db
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._state: _FullState | None = None
+        self._stacks: list[dict] | None = None
+        self._chat: list[dict] | None = None
+        self._cards: dict[str, list[_CachedCard]] = {}
+        db.add_change_listener(self.invalidate)
+
+    @property
+    def current(self) -> _FullState | None:
+        """The cached state if nothing was written since it was built."""
+        return self._state
+
+    def invalidate(self, entity: str = "all", stack_id: str | None = None) -> None:
+        self._generation += 1
+        self._state = None
+        if entity == "chat":
+            self._chat = None
+        elif entity == "stack":
+            self._stacks = None
+            self._cards.pop(stack_id, None)
+        elif entity == "card" and stack_id is not None:
+            self._cards.pop(stack_id, None)
+        else:
+            self._stacks = self._chat = None
+            self._cards.clear()
+
+    async def state(self) -> _FullState:
+        """The full state, rebuilding whatever writes have dropped."""
+        if self._state is not None:
+            self.hits += 1
+            return self._state
+        self.misses += 1
+        generation = self._generation
+        # Revision first, as in _plan: anything written after it is re-sent next time
+        revision, _ = await self.db.sync_window()
+        stacks = self._stacks if self._stacks is not None else await _active_stacks(self.db)
+        chat = self._chat
+        if chat is None:
+            chat = [_chat_info(r) for r in await self.db.get_chat_history(limit=CHAT_HISTORY_LIMIT)]
+
+        cards = {s["id"]: self._cards[s["id"]] for s in stacks if s["id"] in self._cards}
+        missing = [s["id"] for s in stacks if s["id"] not in cards]
+        if missing and len(missing) == len(stacks):
+            # Cold: one joined query, split by stack
+            cards = {sid: [] for sid in missing}
+            async for r in self.db.iter_active_cards(raw=True):
+                cards[r["stack_id"]].append(_cached_card(r))
+        else:
+            for sid in missing:
+                cards[sid] = [_cached_card(r) async for r in self.db.iter_active_cards(raw=True, stack_id=sid)]
+
+        state = _FullState(revision, stacks, chat, cards)
+        if generation == self._generation:
+            self._state, self._stacks, self._chat, self._cards = state, stacks, chat, dict(cards)
+        return state
+
+
+async def _cached_state(cache: StateSyncCache | None, since_revision: int | None) -> _FullState | None:
+    """Cached state that can answer this request: any full sync, or a delta
+    from the cached revision (or a revision ahead of it, answered in full).
+    Older deltas read the revision log instead.
+    """
+    if cache is None:
+        return None
+    if since_revision is None:
+        return await cache.state()
+    state = cache.current
+    if state is not None and since_revision >= state.revision:
+        cache.hits += 1
+        return state
+    return None
+
+
+def _cached_state_sync_json(state: _FullState, since_revision: int | None, request_id: str | None) -> str:
+    if since_revision == state.revision:
+        # Client is current: an empty delta
+        return _state_sync_json(state.plan(since_revision), [], [], [], request_id)
+    return _envelope("state_sync", [state.full_body()], request_id)
+
+
+# -- Chunked sync ----------------------------------------------------------------
+
+
+def _skeleton(r: sqlite3.Row) -> tuple[str, list[str]]:
+    """Card JSON with document block data blanked, and the ids of the blanked blocks."""
+    blocks_text = r["blocks"]
+    if not blocks_text or _DOCUMENT_BLOCK not in blocks_text:
+        return _card_json(r), []
+    blocks = json.loads(blocks_text)
+    heavy: list[str] = []
+    for block in blocks:
+        if block.get("type") == "document" and block.get("data"):
+            heavy.append(block["id"])
+            block["data"] = ""
+    if not heavy:
+        return _card_json(r), []
+    return _card_json(r, _dumps(blocks)), heavy
+
+
+class _ChunkWriter:
+    """Packs card skeletons and block data slices into bounded state_sync_chunk frames."""
+
+    def __init__(self, send_fn: SendFn, sync_id: str, total_cards: int,
+                 frame_bytes: int, request_id: str | None) -> None:
+        self._send = send_fn
+        self.sync_id = sync_id
+        self.total_cards = total_cards
+        self.frame_bytes = frame_bytes
+        self.request_id = request_id
+        self.cards_sent = 0
+        self.frames = 0
+        self._cards: list[str] = []
+        self._block_data: list[str] = []
+        self._size = 0
+
+    async def add_card(self, card_json: str) -> None:
+        if self._size and self._size + len(card_json) > self.frame_bytes:
+            await self.flush()
+        self._cards.append(card_json)
+        self._size += len(card_json)
+
+    async def add_block_data(self, card_id: str, block_id: str, data: str) -> None:
+        """Slice `data` across as many frames as it needs."""
+        offset = 0
+        while True:
+            room = max(self.frame_bytes - self._size, 0)
+            if room < min(len(data) - offset, self.frame_bytes // 4):
+                await self.flush()
+                room = self.frame_bytes
+            piece = data[offset:offset + room]
+            offset += len(piece)
+            final = offset >= len(data)
+            part = {"card_id": card_id, "block_id": block_id, "offset": offset - len(piece),
+                    "data": piece, "final": final}
+            self._block_data.append(_dumps(part))
+            self._size += len(piece)
+            if final:
+                return
+
+    async def flush(self, done: bool = False) -> None:
+        if not (self._cards or self._block_data or done):
+            return
+        self.cards_sent += len(self._cards)
+        payload = [
+            '"sync_id": ', _dumps(self.sync_id),
+            ', "seq": ', str(self.frames),
+            ', "cards": [', ", ".join(self._cards),
+            '], "cards_sent": ', str(self.cards_sent),
+            ', "total_cards": ', str(self.total_cards),
+            ', "done": ', "true" if done else "false",
+        ]
+        if self._block_data:
+            payload += (', "block_data": [', ", ".join(self._block_data), "]")
+        self._cards, self._block_data, self._size = [], [], 0
+        self.frames += 1
+        await self._send(_envelope("state_sync_chunk", payload, self.request_id))
+
+
+async def _send_block_data(db: WorkspaceDB, writer: _ChunkWriter, heavy: list[tuple[str, list[str]]]) -> None:
+    # Re-read each heavy card so at most one card's document data is in memory
+    for card_id, block_ids in heavy:
+        blocks_text = await db.get_card_blocks(card_id)
+        if not blocks_text:
+            continue
+        wanted = set(block_ids)
+        for block in json.loads(blocks_text):
+            if block.get("id") in wanted and block.get("type") == "document":
+                await writer.add_block_data(card_id, block["id"], block.get("data") or "")
+
+
+async def send_state_sync_chunked(
+    db: WorkspaceDB, send_fn: SendFn,
+    since_revision: int | None = None, request_id: str | None = None,
+    frame_bytes: int = SYNC_FRAME_BYTES, cache: StateSyncCache | None = None,
+) -> None:
+    """Send workspace state as a prioritized series of bounded frames.
+
+    1. state_sync: stacks, chat, tombstones and the active stack's card
+       skeletons (document block data blanked) -- enough to paint, and
+       independent of how many cards the other stacks hold.
+    2. state_sync_chunk frames: the active stack's document data, then the
+       other stacks' skeletons, then their document data. The last frame
+       has done=true; the client adopts the revision only then.
+    """
+    state = await _cached_state(cache, since_revision)
+    if state is not None:
+        await _send_cached_chunked(db, send_fn, state, since_revision, request_id, frame_bytes)
+        return
+
+    plan = await _plan(db, since_revision)
+    active = plan.stacks[0]["id"]
+    total = await db.count_active_cards(plan.since_revision)
+    sync_id = _new_id()
+
+    first: list[str] = []
+    live: set[str] = set()
+    active_heavy: list[tuple[str, list[str]]] = []
+    async for r in db.iter_active_cards(raw=True, since_revision=plan.since_revision, stack_id=active):
+        card, heavy = _skeleton(r)
+        first.append(card)
+        live.add(r["card_id"])
+        if heavy:
+            active_heavy.append((r["card_id"], heavy))
+
+    # Tombstones need the full live set before the other stacks are streamed
+    deleted = None
+    if plan.since_revision is not None:
+        deleted = plan.deleted_card_ids(await db.active_card_ids(plan.since_revision))
+    chat = [_chat_info(r) for r in await plan.chat_rows(db)]
+    await send_fn(_state_sync_json(plan, first, deleted, chat, request_id, sync_id, total))
+
+    writer = _ChunkWriter(send_fn, sync_id, total, frame_bytes, request_id)
+    writer.cards_sent = len(first)
+    await _send_block_data(db, writer, active_heavy)
+
+    other_heavy: list[tuple[str, list[str]]] = []
+    async for r in db.iter_active_cards(raw=True, since_revision=plan.since_revision, exclude_stack_id=active):
+        card, heavy = _skeleton(r)
+        await writer.add_card(card)
+        if heavy:
+            other_heavy.append((r["card_id"], heavy))
+    await _send_block_data(db, writer, other_heavy)
+    await writer.flush(done=True)
+
+    logger.info("Sent chunked %s state_sync at revision %d: %d cards (%d in first frame), %d frames",
+                plan.mode, plan.revision, writer.cards_sent, len(first), writer.frames + 1)
+
+
+
+async def _send_cached_chunked(
+    db: WorkspaceDB, send_fn: SendFn, state: _FullState,
+    since_revision: int | None, request_id: str | None, frame_bytes: int,
+) -> None:
+    """send_state_sync_chunked's frames, built from cached card skeletons."""
+    current = since_revision == state.revision
+    plan = state.plan(since_revision if current else None)
+    first = [] if current else state.stack_cards(plan.stacks[:1])
+    others = [] if current else state.stack_cards(plan.stacks[1:])
+    total = len(first) + len(others)
+    sync_id = _new_id()
+
+    await send_fn(_state_sync_json(
+        plan, [c.skeleton for c in first], [] if current else None,
+        [] if current else state.chat, request_id, sync_id, total,
+    ))
+    writer = _ChunkWriter(send_fn, sync_id, total, frame_bytes, request_id)
+    writer.cards_sent = len(first)
+    await _send_block_data(db, writer, [(c.card_id, c.heavy) for c in first if c.heavy])
+    for card in others:
+        await writer.add_card(card.skeleton)
+    await _send_block_data(db, writer, [(c.card_id, c.heavy) for c in others if c.heavy])
+    await writer.flush(done=True)
+
+    logger.info("Sent chunked %s state_sync at revision %d from cache: %d cards, %d frames",
+                plan.mode, plan.revision, total, writer.frames + 1)
@@ -0,0 +1,194 @@
+"""Chunked, resumable file uploads streamed to disk.
+
+A whole-file file_upload line holds the file four times over on the
+Sprite (the raw line, the parsed dict, the base64 string and the decoded
+bytes). The chunked protocol keeps one chunk in memory at a time:
+
+    file_upload_begin   {upload_id, filename, mime_type, size}  -> ack {offset}
+    file_upload_chunk   {upload_id, offset, data}               -> ack {offset}
+    file_upload_commit  {upload_id, sha256?}                    -> ack {offset: size}
+
+Each chunk is base64-decoded and appended to a ".part" file beside a
+small JSON record of the upload, and fed to a running SHA-256. Every ack
+carries the number of bytes written to disk, so after a reconnect the
+browser sends begin again with the same upload_id and continues from the
+acked offset. Commit checks the size (and the hash, if given) and hands
+back the finished file for an atomic rename into place.
+
+Partial uploads untouched for UPLOAD_TTL_SECONDS are removed on the next
+begin.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("/workspace/.os/uploads")
+UPLOAD_MAX_BYTES = 25 * 1024 * 1024     # same ceiling as a whole-file file_upload
+UPLOAD_CHUNK_MAX_BYTES = 1024 * 1024     # decoded bytes accepted per chunk (browser sends 256 KiB)
+UPLOAD_TTL_SECONDS = 24 * 60 * 60
+
+_UPLOAD_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class UploadError(ValueError):
+    """An upload message is invalid for the upload's current state."""
+
+
+@dataclass(slots=True)
+class _Upload:
+    filename: str
+    mime_type: str
+    size: int
+    offset: int = 0
+    hasher: Any = field(default_factory=hashlib.sha256)
+
+
+@dataclass(slots=True, frozen=True)
+class CompletedUpload:
+    """A committed upload: the finished file (still in the upload directory) and its digest."""
+    path: Path
+    filename: str
+    mime_type: str
+    size: int
+    digest: str
+
+
+class UploadStore:
+    """In-progress uploads under `directory`, shared by every connection.
+
+    Methods do blocking file I/O; call them through asyncio.to_thread from
+    the event loop. Hash state lives in memory; after a restart it is
+    rebuilt from the .part file when the upload resumes.
+    """
+
+    def __init__(self, directory: Path | None = None) -> None:
+        self.directory = Path(directory if directory is not None else UPLOAD_DIR)
+        self._uploads: dict[str, _Upload] = {}
+
+    def _paths(self, upload_id: str) -> tuple[Path, Path]:
+        if not isinstance(upload_id, str) or not _UPLOAD_ID.fullmatch(upload_id):
+            raise UploadError(f"Invalid upload id: {upload_id!r}")
+        return self.directory / f"{upload_id}.part", self.directory / f"{upload_id}.json"
+
+    def begin(self, upload_id: str, filename: str, mime_type: str, size: int) -> int:
+        """Start or resume an upload. Returns the offset to send from."""
+        if not isinstance(size, int) or isinstance(size, bool) or not 0 <= size <= UPLOAD_MAX_BYTES:
+            raise UploadError(f"Upload size must be between 0 and {UPLOAD_MAX_BYTES} bytes")
+        part, meta = self._paths(upload_id)
+        upload = self._uploads.get(upload_id) or self._restore(upload_id)
+        if upload is not None and (upload.filename, upload.size) == (filename, size):
+            return upload.offset
+
+        self.prune()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        part.write_bytes(b"")
+        meta.write_text(json.dumps({"filename": filename, "mime_type": mime_type, "size": size}))
+        self._uploads[upload_id] = _Upload(filename, mime_type, size)
+        return 0
+
+    def _restore(self, upload_id: str) -> _Upload | None:
+        """Rebuild an upload's state from disk (hash included) after a restart."""
+        part, meta = self._paths(upload_id)
+        try:
+            info = json.loads(meta.read_text())
+            upload = _Upload(info["filename"], info["mime_type"], info["size"])
+            with open(part, "rb") as f:
+                while chunk := f.read(UPLOAD_CHUNK_MAX_BYTES):
+                    upload.hasher.update(chunk)
+                    upload.offset += len(chunk)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if upload.offset > upload.size:
+            return None
+        self._uploads[upload_id] = upload
+        return upload
+
+    def write_chunk(self, upload_id: str, offset: int, data_b64: str) -> int:
+        """Append one base64 chunk at `offset`. Returns the new offset.
+
+        A chunk for an offset that is already on disk (a resend after a lost
+        ack) is ignored and the current offset returned, so the sender can
+        carry on from there.
+        """
+        part, _ = self._paths(upload_id)
+        upload = self._uploads.get(upload_id) or self._restore(upload_id)
+        if upload is None:
+            raise UploadError("Unknown upload, send file_upload_begin first")
+        if offset != upload.offset:
+            if offset < upload.offset:
+                return upload.offset
+            raise UploadError(f"Chunk at {offset} but upload is at {upload.offset}")
+        if len(data_b64) > UPLOAD_CHUNK_MAX_BYTES * 4 // 3 + 4:
+            raise UploadError("Chunk too large")
+        try:
+            data = base64.b64decode(data_b64, validate=True)
+        except binascii.Error as e:
+            raise UploadError(f"Chunk is not valid base64: {e}") from e
+        if upload.offset + len(data) > upload.size:
+            raise UploadError("Chunk runs past the declared upload size")
+        with open(part, "r+b") as f:
+            f.seek(upload.offset)
+            f.write(data)
+            f.truncate()
+        upload.hasher.update(data)
+        upload.offset += len(data)
+        return upload.offset
+
+    def size(self, upload_id: str) -> int:
+        """Declared size of an upload in progress (0 if unknown)."""
+        upload = self._uploads.get(upload_id)
+        return upload.size if upload else 0
+
+    def commit(self, upload_id: str, sha256: str | None = None) -> CompletedUpload:
+        """Finish an upload. The caller moves `path` into place and must then call discard()."""
+        part, _ = self._paths(upload_id)
+        if sha256 is not None and not isinstance(sha256, str):
+            raise UploadError("Upload checksum must be a hex SHA-256 string")
+        upload = self._uploads.get(upload_id) or self._restore(upload_id)
+        if upload is None:
+            raise UploadError("Unknown upload, send file_upload_begin first")
+        if upload.offset != upload.size:
+            raise UploadError(f"Upload incomplete: {upload.offset} of {upload.size} bytes")
+        digest = upload.hasher.hexdigest()
+        if sha256 is not None and sha256.lower() != digest:
+            self.discard(upload_id)
+            raise UploadError("Upload checksum mismatch, please upload the file again")
+        return CompletedUpload(part, upload.filename, upload.mime_type, upload.size, digest)
+
+    def discard(self, upload_id: str) -> None:
+        """Forget an upload and delete whatever of it is left on disk."""
+        part, meta = self._paths(upload_id)
+        self._uploads.pop(upload_id, None)
+        part.unlink(missing_ok=True)
+        meta.unlink(missing_ok=True)
+
+    def prune(self, max_age: float = UPLOAD_TTL_SECONDS) -> int:
+        """Delete partial uploads untouched for `max_age` seconds. Returns how many."""
+        if not self.directory.is_dir():
+            return 0
+        cutoff = time.time() - max_age
+        pruned = 0
+        for meta in self.directory.glob("*.json"):
+            part = meta.with_suffix(".part")
+            try:
+                newest = max(meta.stat().st_mtime, part.stat().st_mtime if part.exists() else 0)
+            except OSError:
+                continue
+            if newest < cutoff:
+                self.discard(meta.stem)
+                pruned += 1
+        if pruned:
+            logger.info("Pruned %d abandoned partial upload(s)", pruned)
+        return pruned
@@ -9,6 +9,8 @@ import sys
 from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+import pytest
+
 # Only install the mock if the real SDK isn't available
 try:
     import claude_agent_sdk  # noqa: F401
@@ -42,3 +44,16 @@ except ImportError:
         create_sdk_mcp_server=MagicMock,
     )
     sys.modules["claude_agent_sdk"] = mock_sdk
+
+
+@pytest.fixture(autouse=True)
+def _file_stores_in_tmp_path(tmp_path, monkeypatch):
+    """Point the default blob and upload-staging directories into tmp_path.
+
+    Gateways built without an explicit blob_store/upload_store must not
+    write to the real /workspace/.os.
+    """
+    from src import blobs, uploads
+
+    monkeypatch.setattr(blobs, "BLOB_DIR", tmp_path / "default-blobs")
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", tmp_path / "default-uploads")
@@ -0,0 +1,199 @@
+"""Tests for the content-addressed blob store and blob_request serving."""
+
+from __future__ import annotations
+
+import base64
+import errno
+import hashlib
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.blobs import BLOB_RANGE_BYTES, BlobStore, externalize_document_blocks
+from src.database import WorkspaceDB
+from src.gateway import SpriteGateway
+from src.protocol import is_blob_data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(tmp_path / "blobs")
+
+
+@pytest.fixture
+async def workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"))
+    await db.connect()
+    yield db
+    await db.close()
+
+
+def _sent(send: AsyncMock) -> list[dict]:
+    return [json.loads(c.args[0]) for c in send.call_args_list]
+
+
+# -- BlobStore -----------------------------------------------------------------
+
+
+def test_put_is_content_addressed_and_idempotent(store):
+    data = b"%PDF-1.7 hello"
+
+    digest = store.put(data)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert store.path(digest) == store.directory / digest[:2] / digest
+    assert store.put(data) == digest
+    assert store.size(digest) == len(data)
+    assert not list(store.directory.rglob("*.partial"))
+
+
+def test_concurrent_put_file_uses_separate_temp_files(store, tmp_path, monkeypatch):
+    data = b"%PDF-1.7 same content"
+    sources = []
+    for name in ("a.pdf", "b.pdf"):
+        sources.append(tmp_path / name)
+        sources[-1].write_bytes(data)
+    digest = hashlib.sha256(data).hexdigest()
+    linked = []
+    real_link = os.link
+
+    def link(source, partial):
+        linked.append(partial)
+        real_link(source, partial)
+
+    monkeypatch.setattr("src.blobs.os.link", link)
+    # Both see the blob missing, as two uploads racing in worker threads do
+    monkeypatch.setattr("pathlib.Path.exists", lambda self: False)
+    for source in sources:
+        store.put_file(source, digest)
+
+    assert linked[0] != linked[1]
+    assert all(source.read_bytes() == data for source in sources)
+    assert store.path(digest).read_bytes() == data
+
+
+def test_put_file_copies_only_across_filesystems(store, tmp_path, monkeypatch):
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"content")
+    digest = hashlib.sha256(b"content").hexdigest()
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr("src.blobs.os.link", cross_device)
+    store.put_file(source, digest)
+    assert store.path(digest).read_bytes() == b"content"
+    assert store.path(digest).stat().st_ino != source.stat().st_ino
+
+    def denied(src, dst):
+        raise PermissionError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr("src.blobs.os.link", denied)
+    other = hashlib.sha256(b"other").hexdigest()
+    with pytest.raises(PermissionError):
+        store.put_file(source, other)
+    assert not list(store.directory.rglob("*.partial"))
+
+
+def test_read_range_is_capped(store):
+    data = bytes(range(256)) * (BLOB_RANGE_BYTES // 128)
+    digest = store.put(data)
+
+    chunk, total = store.read_range(digest, 10, 20)
+    assert chunk == data[10:30] and total == len(data)
+
+    chunk, _ = store.read_range(digest, 0, len(data))
+    assert len(chunk) == BLOB_RANGE_BYTES
+
+
+@pytest.mark.parametrize("digest", ["../../etc/passwd", "ab", "A" * 64, None])
+def test_malformed_digest_rejected(store, digest):
+    with pytest.raises(ValueError):
+        store.path(digest)
+
+
+# -- Gateway -----------------------------------------------------------------
+
+
+async def test_upload_card_references_blob(tmp_path, store, workspace_db):
+    await workspace_db.create_stack("s1", "Stack")
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), workspace_db=workspace_db, blob_store=store,
+                            document_queue=AsyncMock())
+    gateway.runtime._active_stack_id = "s1"
+    pdf = b"%PDF-1.7 " + b"x" * 5000
+
+    with patch("src.gateway.Path", return_value=tmp_path):
+        await gateway._handle_file_upload({"payload": {
+            "filename": "a.pdf", "mime_type": "application/pdf",
+            "data": base64.b64encode(pdf).decode(),
+        }}, "req1")
+
+    create = next(m for m in _sent(send) if m["type"] == "canvas_update")
+    doc = create["payload"]["blocks"][0]
+    assert doc["type"] == "document" and "data" not in doc
+    assert doc["blob"] == hashlib.sha256(pdf).hexdigest() and doc["size"] == len(pdf)
+    stored = await workspace_db.get_card_blocks(create["payload"]["card_id"])
+    assert doc["blob"] in stored and len(stored) < 500
+    assert store.path(doc["blob"]).read_bytes() == pdf
+    # One copy on disk: the upload and the blob are the same file
+    [saved] = tmp_path.glob("*_a.pdf")
+    assert saved.stat().st_ino == store.path(doc["blob"]).stat().st_ino
+
+
+async def test_blob_request_serves_range(store):
+    data = b"0123456789" * 100
+    digest = store.put(data)
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), blob_store=store)
+
+    await gateway.route(json.dumps({
+        "type": "blob_request", "id": "m1", "timestamp": 0, "request_id": "r1",
+        "payload": {"blob": digest, "offset": 990, "length": 64},
+    }))
+
+    [reply] = _sent(send)
+    assert is_blob_data(reply) and reply["request_id"] == "r1"
+    assert base64.b64decode(reply["payload"]["data"]) == data[990:]
+    assert reply["payload"]["size"] == len(data) and reply["payload"]["final"] is True
+
+
+@pytest.mark.parametrize("blob", ["0" * 64, "../escape"])
+async def test_blob_request_unknown_blob_errors(store, blob):
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), blob_store=store)
+
+    await gateway.route(json.dumps({
+        "type": "blob_request", "id": "m1", "timestamp": 0, "request_id": "r2",
+        "payload": {"blob": blob},
+    }))
+
+    [reply] = _sent(send)
+    assert reply["payload"]["event"] == "error" and reply["request_id"] == "r2"
+
+
+# -- Legacy cards --------------------------------------------------------------
+
+
+async def test_externalize_moves_inline_documents(store, workspace_db):
+    await workspace_db.create_stack("s1", "Stack")
+    pdf = b"%PDF legacy" * 100
+    await workspace_db.upsert_card("c1", "s1", "Old", [
+        {"type": "document", "id": "d1", "data": base64.b64encode(pdf).decode(),
+         "mime_type": "application/pdf", "filename": "old.pdf"},
+        {"type": "heading", "id": "h1", "text": "Old"},
+    ])
+    await workspace_db.upsert_card("c2", "s1", "Plain", [{"type": "text", "id": "t1", "content": "hi"}])
+
+    assert await externalize_document_blocks(workspace_db, store) == 1
+
+    blocks = json.loads(await workspace_db.get_card_blocks("c1"))
+    assert blocks[0] == {
+        "type": "document", "id": "d1", "blob": hashlib.sha256(pdf).hexdigest(),
+        "size": len(pdf), "mime_type": "application/pdf", "filename": "old.pdf",
+    }
+    assert blocks[1]["type"] == "heading"
+    assert await workspace_db.cards_with_inline_documents() == []
+    assert await externalize_document_blocks(workspace_db, store) == 0
@@ -7,10 +7,11 @@ import json
 import os
 import sqlite3
 import time
+from types import SimpleNamespace
 
 import pytest
 
-from src.database import TranscriptDB, MemoryDB, WorkspaceDB
+from src.database import TranscriptDB, MemoryDB, WorkspaceDB, _check_aiosqlite_internals
 
 
 # -- Fixtures ----------------------------------------------------------------
@@ -285,6 +286,327 @@ async def test_concurrent_reads_transcript(transcript_db):
     assert all(r["session_id"] == "sess-c" for r in results)
 
 
+# -- Reader pool (pooled mode) -----------------------------------------------
+
+@pytest.fixture
+async def pooled_workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "pooled.db"), read_pool_size=2)
+    await db.connect()
+    yield db
+    await db.close()
+
+
+async def test_pooled_mode_opens_readers(pooled_workspace_db):
+    assert len(pooled_workspace_db._readers) == 2
+    assert pooled_workspace_db._idle_readers.qsize() == 2
+
+
+async def test_pooled_reads_see_committed_writes(pooled_workspace_db):
+    await pooled_workspace_db.create_stack("s1", "Stack")
+    await pooled_workspace_db.upsert_card("c1", "s1", "Card", [])
+    cards = await pooled_workspace_db.get_cards_by_stack("s1")
+    assert [c["card_id"] for c in cards] == ["c1"]
+    # Readers are returned to the pool after each read
+    assert pooled_workspace_db._idle_readers.qsize() == 2
+
+
+async def test_pooled_readers_are_read_only(pooled_workspace_db):
+    async with pooled_workspace_db._reader() as reader:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            await reader.execute("INSERT INTO stacks (id, name) VALUES ('x', 'X')")
+
+
+async def test_pooled_reads_inside_transaction_use_writer(pooled_workspace_db):
+    await pooled_workspace_db.create_stack("s1", "Stack")
+    async with pooled_workspace_db.transaction():
+        await pooled_workspace_db.execute(
+            "INSERT INTO cards (card_id, stack_id, title, blocks) VALUES ('c1', 's1', 'T', '[]')"
+        )
+        row = await pooled_workspace_db.fetchone("SELECT * FROM cards WHERE card_id = 'c1'")
+        assert row is not None
+
+
+async def test_pooled_concurrent_reads(pooled_workspace_db):
+    await pooled_workspace_db.create_stack("s1", "Stack")
+    results = await asyncio.gather(*[pooled_workspace_db.list_stacks() for _ in range(10)])
+    assert all(len(r) == 1 for r in results)
+
+
+async def test_pooled_close_releases_readers(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "pooled_close.db"), read_pool_size=1)
+    await db.connect()
+    await db.close()
+    assert db._readers == []
+    with pytest.raises(RuntimeError, match="Database not connected"):
+        await db.fetchall("SELECT 1")
+
+
+# -- Unit of work: run() ----------------------------------------------------
+
+async def _count_hops_and_commits(db) -> dict[str, int]:
+    """Count aiosqlite thread hops and COMMITs on the writer connection."""
+    counts = {"hops": 0, "commits": 0}
+    conn = db._check_conn()
+    original_execute = conn._execute
+    await conn._execute(
+        conn._conn.set_trace_callback,
+        lambda sql: counts.__setitem__("commits", counts["commits"] + (sql == "COMMIT")),
+    )
+
+    async def counting_execute(fn, *args, **kwargs):
+        counts["hops"] += 1
+        return await original_execute(fn, *args, **kwargs)
+
+    conn._execute = counting_execute
+    return counts
+
+
+def test_connect_rejects_aiosqlite_without_internals():
+    with pytest.raises(RuntimeError, match="aiosqlite"):
+        _check_aiosqlite_internals(SimpleNamespace())
+
+
+async def test_run_executes_unit_in_one_hop(transcript_db):
+    counts = await _count_hops_and_commits(transcript_db)
+
+    def insert_two(conn):
+        conn.execute("INSERT INTO sessions (id) VALUES ('a')")
+        conn.execute("INSERT INTO sessions (id) VALUES ('b')")
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    assert await transcript_db.run(insert_two) == 2
+    assert counts["hops"] == 1  # the unit commits on the same hop
+    assert counts["commits"] == 1
+
+
+async def test_run_defers_commit_to_group_commit_window(tmp_path):
+    db = TranscriptDB(db_path=str(tmp_path / "grouped.db"), group_commit_ms=1000)
+    await db.connect()
+    try:
+        counts = await _count_hops_and_commits(db)
+        await db.run(lambda conn: conn.execute("INSERT INTO sessions (id) VALUES ('a')"))
+        assert counts["commits"] == 0 and db._pending_commit
+        await db.flush()
+        assert counts["commits"] == 1
+    finally:
+        await db.close()
+
+
+async def test_run_rolls_back_on_error(transcript_db):
+    def half_then_fail(conn):
+        conn.execute("INSERT INTO sessions (id) VALUES ('a')")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await transcript_db.run(half_then_fail)
+    assert await transcript_db.fetchall("SELECT * FROM sessions") == []
+
+
+async def test_run_nests_inside_transaction(transcript_db):
+    def insert(conn):
+        conn.execute("INSERT INTO sessions (id) VALUES ('inner')")
+
+    def fail(conn):
+        conn.execute("INSERT INTO sessions (id) VALUES ('discarded')")
+        raise ValueError("boom")
+
+    async with transcript_db.transaction():
+        await transcript_db.execute("INSERT INTO sessions (id) VALUES ('outer')")
+        await transcript_db.run(insert)
+        with pytest.raises(ValueError):
+            await transcript_db.run(fail)
+    rows = await transcript_db.fetchall("SELECT id FROM sessions ORDER BY id")
+    assert [r["id"] for r in rows] == ["inner", "outer"]
+
+
+async def test_archive_stack_single_commit(workspace_db):
+    await workspace_db.create_stack("s1", "Test")
+    await workspace_db.upsert_card("c1", "s1", "Card", [])
+    counts = await _count_hops_and_commits(workspace_db)
+    await workspace_db.archive_stack("s1")
+    assert counts == {"hops": 1, "commits": 1}
+
+
+async def test_transform_card_blocks(workspace_db):
+    await workspace_db.create_stack("s1", "Test")
+    await workspace_db.upsert_card("c1", "s1", "Card", [{"type": "badge", "text": "Processing"}])
+
+    row = await workspace_db.transform_card_blocks("c1", lambda b: b + [{"type": "text", "content": "x"}])
+    assert json.loads(row["blocks"])[-1] == {"type": "text", "content": "x"}
+    assert await workspace_db.transform_card_blocks("missing", lambda b: b) is None
+
+
+async def test_claim_document_dedupes_by_content_hash(workspace_db):
+    first = await workspace_db.claim_document("d1", "a.pdf", "application/pdf", "/u/d1_a.pdf", "h1")
+    again = await asyncio.gather(*(
+        workspace_db.claim_document(f"d{i}", "copy.pdf", "application/pdf", f"/u/d{i}.pdf", "h1")
+        for i in range(2, 6)
+    ))
+    assert first["doc_id"] == "d1"
+    assert {doc["doc_id"] for doc in again} == {"d1"}
+    assert len(await workspace_db.list_documents()) == 1
+    other = await workspace_db.claim_document("d9", "b.pdf", "application/pdf", "/u/d9_b.pdf", "h2")
+    assert other["doc_id"] == "d9"
+
+
+# -- Streaming iterate() ----------------------------------------------------
+
+async def test_iterate_streams_all_rows_in_order(transcript_db):
+    await transcript_db.executemany(
+        "INSERT INTO observations (timestamp, sequence_num) VALUES (?, ?)",
+        [(time.time(), i) for i in range(25)],
+    )
+    rows = [r async for r in transcript_db.iterate(
+        "SELECT sequence_num FROM observations ORDER BY id", batch_size=7,
+    )]
+    assert rows == [{"sequence_num": i} for i in range(25)]
+
+
+async def test_iterate_raw_yields_sqlite_rows(transcript_db):
+    await transcript_db.execute(
+        "INSERT INTO observations (timestamp, sequence_num) VALUES (?, ?)", (1.0, 42),
+    )
+    rows = [r async for r in transcript_db.iterate(
+        "SELECT id, sequence_num FROM observations", raw=True,
+    )]
+    assert isinstance(rows[0], sqlite3.Row)
+    assert rows[0]["sequence_num"] == 42
+    assert tuple(rows[0]) == (1, 42)
+
+
+async def test_iterate_empty_result(transcript_db):
+    assert [r async for r in transcript_db.iterate("SELECT * FROM observations")] == []
+
+
+async def test_iterate_releases_pooled_reader_on_early_exit(pooled_workspace_db):
+    for i in range(5):
+        await pooled_workspace_db.create_stack(f"s{i}", f"Stack {i}")
+
+    rows = pooled_workspace_db.iterate("SELECT * FROM stacks", batch_size=2)
+    async for _ in rows:
+        assert pooled_workspace_db._idle_readers.qsize() == 1
+        break
+    await rows.aclose()
+    assert pooled_workspace_db._idle_readers.qsize() == 2
+
+
+# -- Group commit ------------------------------------------------------------
+
+def _committed_stack_count(path: str) -> int:
+    """Count stacks as seen by an independent connection (committed rows only)."""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM stacks").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+async def grouped_workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "grouped.db"), read_pool_size=1, group_commit_ms=50)
+    await db.connect()
+    yield db
+    await db.close()
+
+
+async def test_group_commit_defers_commit(grouped_workspace_db):
+    await grouped_workspace_db.execute("INSERT INTO stacks (id, name) VALUES ('s1', 'A')")
+    assert _committed_stack_count(grouped_workspace_db.db_path) == 0
+    # Reads on the same DB see the pending write (routed to the writer)
+    assert len(await grouped_workspace_db.list_stacks()) == 1
+
+
+async def test_group_commit_commits_after_window(grouped_workspace_db):
+    await grouped_workspace_db.execute("INSERT INTO stacks (id, name) VALUES ('s1', 'A')")
+    await asyncio.sleep(0.2)
+    assert _committed_stack_count(grouped_workspace_db.db_path) == 1
+    assert not grouped_workspace_db._pending_commit
+
+
+async def test_group_commit_batches_concurrent_writers(grouped_workspace_db):
+    commits = 0
+    conn = grouped_workspace_db._check_conn()
+    original = conn.commit
+
+    async def counting_commit():
+        nonlocal commits
+        commits += 1
+        await original()
+
+    conn.commit = counting_commit
+    await asyncio.gather(*[
+        grouped_workspace_db.execute("INSERT INTO stacks (id, name) VALUES (?, ?)", (f"s{i}", "S"))
+        for i in range(20)
+    ])
+    await grouped_workspace_db.flush()
+    assert commits == 1
+    assert _committed_stack_count(grouped_workspace_db.db_path) == 20
+
+
+async def test_reads_stay_on_writer_while_commit_in_flight(grouped_workspace_db):
+    db = grouped_workspace_db
+    conn = db._check_conn()
+    original = conn.commit
+    release = asyncio.Event()
+
+    async def slow_commit():
+        await release.wait()
+        await original()
+
+    conn.commit = slow_commit
+    await db.execute("INSERT INTO stacks (id, name) VALUES ('s1', 'A')")
+    commit = asyncio.create_task(db.flush())
+    try:
+        await asyncio.sleep(0)
+        assert not db._pending_commit
+        # A pooled reader can't see the row until the COMMIT lands
+        assert len(await db.list_stacks()) == 1
+    finally:
+        release.set()
+        await commit
+    assert not db._commit_in_flight
+
+
+async def test_read_after_write_under_short_group_commit(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "busy.db"), read_pool_size=2, group_commit_ms=1)
+    await db.connect()
+    try:
+        await db.create_stack("s1", "Stack")
+        for i in range(300):
+            await db.upsert_card(f"c{i}", "s1", "Card", [])
+            assert await db.get_card(f"c{i}") is not None
+    finally:
+        await db.close()
+
+
+async def test_flush_commits_immediately(grouped_workspace_db):
+    await grouped_workspace_db.execute("INSERT INTO stacks (id, name) VALUES ('s1', 'A')")
+    await grouped_workspace_db.flush()
+    assert _committed_stack_count(grouped_workspace_db.db_path) == 1
+
+
+async def test_flush_is_noop_without_group_commit(workspace_db):
+    await workspace_db.create_stack("s1", "A")
+    await workspace_db.flush()
+    assert _committed_stack_count(workspace_db.db_path) == 1
+
+
+async def test_transaction_after_pending_group_writes(grouped_workspace_db):
+    await grouped_workspace_db.execute("INSERT INTO stacks (id, name) VALUES ('s1', 'A')")
+    async with grouped_workspace_db.transaction():
+        await grouped_workspace_db.execute("INSERT INTO stacks (id, name) VALUES ('s2', 'B')")
+    assert _committed_stack_count(grouped_workspace_db.db_path) == 2
+
+
+async def test_close_flushes_pending_group_writes(tmp_path):
+    path = str(tmp_path / "grouped_close.db")
+    db = WorkspaceDB(db_path=path, group_commit_ms=10_000)
+    await db.connect()
+    await db.create_stack("s1", "A")
+    await db.close()
+    assert _committed_stack_count(path) == 1
+
+
 # -- WorkspaceDB fixtures --------------------------------------------------
 
 @pytest.fixture
@@ -585,6 +907,87 @@ async def test_position_columns_migration(tmp_path):
     await db.close()
 
 
+async def test_iter_active_cards_skips_archived(workspace_db):
+    await workspace_db.create_stack("s1", "First")
+    await workspace_db.create_stack("s2", "Second")
+    await workspace_db.upsert_card("c1", "s1", "One", [])
+    await workspace_db.upsert_card("c2", "s2", "Two", [])
+    await workspace_db.upsert_card("c3", "s1", "Three", [])
+    await workspace_db.archive_card("c3")
+    await workspace_db.archive_stack("s2")
+
+    ids = [r["card_id"] async for r in workspace_db.iter_active_cards(raw=True)]
+    assert ids == ["c1"]
+
+
+# -- Single-statement mutators (RETURNING + fallback) ------------------------
+
+@pytest.fixture(params=[True, False], ids=["returning", "fallback"])
+async def mutator_db(request, tmp_path, monkeypatch):
+    """WorkspaceDB exercised with and without SQLite RETURNING support."""
+    import src.database as database
+    monkeypatch.setattr(database, "_SUPPORTS_RETURNING", request.param)
+    db = WorkspaceDB(db_path=str(tmp_path / "mutators.db"))
+    await db.connect()
+    yield db
+    await db.close()
+
+
+async def test_mutators_return_written_rows(mutator_db):
+    stack = await mutator_db.create_stack("s1", "Stack", color="blue")
+    assert stack["id"] == "s1" and stack["color"] == "blue"
+
+    card = await mutator_db.upsert_card("c1", "s1", "Card", [{"type": "text"}])
+    assert card["title"] == "Card"
+    assert json.loads(card["blocks"]) == [{"type": "text"}]
+
+    card = await mutator_db.update_card_content("c1", [], size="large")
+    assert card["size"] == "large" and card["blocks"] == "[]"
+
+    card = await mutator_db.update_card_position("c1", 10.0, 20.0, 3)
+    assert (card["position_x"], card["position_y"], card["z_index"]) == (10.0, 20.0, 3)
+
+    msg = await mutator_db.add_chat_message("user", "hi")
+    assert msg["content"] == "hi" and msg["id"] is not None
+
+    doc = await mutator_db.create_document("d1", "a.pdf", "application/pdf", "/tmp/a.pdf")
+    assert doc["status"] == "processing"
+
+
+async def test_mutators_return_none_for_missing_card(mutator_db):
+    assert await mutator_db.update_card_content("missing", []) is None
+    assert await mutator_db.update_card_position("missing", 0.0, 0.0, 0) is None
+
+
+async def test_returning_mutator_uses_single_statement(workspace_db):
+    """With RETURNING support, a mutation never issues a follow-up SELECT."""
+    await workspace_db.create_stack("s1", "Stack")
+    statements: list[str] = []
+    conn = workspace_db._check_conn()
+    await conn.set_trace_callback(statements.append)
+    await workspace_db.update_card_position("c1", 1.0, 1.0, 1)
+    await workspace_db.upsert_card("c1", "s1", "Card", [])
+    await conn.set_trace_callback(None)
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
+
+
+async def test_archive_and_restore_return_only_stack_id(mutator_db):
+    await mutator_db.create_stack("s1", "Stack")
+    await mutator_db.upsert_card("c1", "s1", "Card", [{"type": "text", "content": "x" * 1000}])
+    changes: list[tuple] = []
+    mutator_db.add_change_listener(lambda entity, stack_id: changes.append((entity, stack_id)))
+    statements: list[str] = []
+    conn = mutator_db._check_conn()
+    await conn.set_trace_callback(statements.append)
+
+    await mutator_db.archive_card("c1")
+    await mutator_db.restore_card("c1")
+    await conn.set_trace_callback(None)
+
+    assert changes == [("card", "s1"), ("card", "s1")]
+    assert not any("RETURNING *" in s or "SELECT *" in s for s in statements)
+
+
 # -- WorkspaceDB chat CRUD -------------------------------------------------
 
 async def test_add_chat_message_persists(workspace_db):
@@ -729,14 +1132,77 @@ async def test_upsert_card_update_preserves_template_fields(workspace_db):
     assert json.loads(row["tags"]) == ["b", "c"]
 
 
-# -- T7.1: Index on observations.processed -----------------------------------
+# -- Processing cursor (replaces the observations.processed index) ----------
 
-async def test_index_exists_on_observations_processed(transcript_db):
-    """T7.1: idx_observations_processed exists in sqlite_master."""
+async def test_processed_index_dropped(transcript_db):
+    """The processing cursor replaces idx_observations_processed."""
     rows = await transcript_db.fetchall(
         "SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_observations_processed'"
     )
-    assert len(rows) == 1
+    assert rows == []
+
+
+async def _insert_observations(db, n):
+    await db.executemany(
+        "INSERT INTO observations (timestamp, session_id, sequence_num, user_message, agent_response) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(time.time(), "s1", i, f"msg-{i}", f"resp-{i}") for i in range(n)],
+    )
+
+
+async def test_pending_count_tracks_inserts_and_cursor(transcript_db):
+    assert await transcript_db.pending_observation_count() == 0
+    await _insert_observations(transcript_db, 7)
+    assert await transcript_db.pending_observation_count() == 7
+
+    await transcript_db.advance_processing_cursor(4)
+    assert await transcript_db.last_processed_id() == 4
+    assert await transcript_db.pending_observation_count() == 3
+    rows = await transcript_db.fetchall("SELECT id FROM observations WHERE processed = 1 ORDER BY id")
+    assert [r["id"] for r in rows] == [1, 2, 3, 4]
+
+
+async def test_cursor_never_moves_backwards(transcript_db):
+    await _insert_observations(transcript_db, 5)
+    await transcript_db.advance_processing_cursor(5)
+    await transcript_db.advance_processing_cursor(2)
+    assert await transcript_db.last_processed_id() == 5
+    assert await transcript_db.pending_observation_count() == 0
+
+
+async def test_iter_pending_observations_is_id_range(transcript_db):
+    await _insert_observations(transcript_db, 6)
+    await transcript_db.advance_processing_cursor(2)
+    ids = [r["id"] async for r in transcript_db.iter_pending_observations("id", limit=3)]
+    assert ids == [3, 4, 5]
+
+
+async def test_cursor_survives_restart(tmp_path):
+    path = str(tmp_path / "transcript.db")
+    async with TranscriptDB(db_path=path) as db:
+        await _insert_observations(db, 5)
+        await db.advance_processing_cursor(3)
+    async with TranscriptDB(db_path=path) as db:
+        assert await db.last_processed_id() == 3
+        assert await db.pending_observation_count() == 2
+
+
+async def test_cursor_backfilled_from_processed_flag(tmp_path):
+    """Pre-cursor transcript.db files start the watermark below the oldest unprocessed row."""
+    path = str(tmp_path / "transcript.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE observations (id INTEGER PRIMARY KEY, timestamp REAL, session_id TEXT,
+            sequence_num INTEGER, user_message TEXT, tool_calls_json TEXT,
+            agent_response TEXT, processed INTEGER DEFAULT 0);
+        CREATE INDEX idx_observations_processed ON observations(processed);
+        INSERT INTO observations (processed) VALUES (1), (1), (1), (0), (0);
+        PRAGMA user_version = 1;
+    """)
+    conn.close()
+    async with TranscriptDB(db_path=path) as db:
+        assert await db.last_processed_id() == 3
+        assert await db.pending_observation_count() == 2
 
 
 # -- T7.2: Composite index on cards(stack_id, status) -------------------------
@@ -868,17 +1334,19 @@ async def test_get_chat_history_cursor_based(workspace_db):
 # -- T7.8: Data retention (prune on insert) -----------------------------------
 
 async def test_chat_messages_pruned_to_5k(workspace_db):
-    """T7.8: chat_messages pruned to 5000, newest preserved."""
+    """T7.8: chat_messages pruned to 5000 by the retention policy, newest preserved."""
     # Insert 5002 messages (bulk for speed)
     await workspace_db.executemany(
         "INSERT INTO chat_messages (role, content, timestamp) VALUES (?, ?, ?)",
         [("user", f"msg-{i}", time.time()) for i in range(5002)],
     )
+    await workspace_db.add_chat_message("user", "newest-msg")
+    # Inserts no longer prune inline -- retention runs in the background
     count_before = await workspace_db.fetchone("SELECT COUNT(*) as c FROM chat_messages")
-    assert count_before["c"] == 5002
+    assert count_before["c"] == 5003
 
-    # add_chat_message triggers prune
-    await workspace_db.add_chat_message("user", "newest-msg")
+    deleted = await workspace_db.enforce_retention(WorkspaceDB.retention_policies[0])
+    assert deleted == 3
 
     count_after = await workspace_db.fetchone("SELECT COUNT(*) as c FROM chat_messages")
     assert count_after["c"] == 5000
@@ -892,53 +1360,29 @@ async def test_chat_messages_pruned_to_5k(workspace_db):
 
 async def test_observations_pruned_to_10k_processed_only(transcript_db):
     """T7.8: prune_observations removes processed rows beyond 10k window."""
-    # Insert 10005 processed observations (ids 1-10005)
-    await transcript_db.executemany(
-        "INSERT INTO observations (timestamp, session_id, sequence_num, user_message, agent_response, processed) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        [(time.time(), "s1", i, f"msg-{i}", f"resp-{i}", 1) for i in range(10005)],
-    )
-    # Insert 3 unprocessed observations (ids 10006-10008, inside top 10k)
-    await transcript_db.executemany(
-        "INSERT INTO observations (timestamp, session_id, sequence_num, user_message, agent_response, processed) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        [(time.time(), "s1", 20000 + i, f"unproc-{i}", f"resp-{i}", 0) for i in range(3)],
-    )
+    # 10008 observations, the first 10005 behind the processing cursor
+    await _insert_observations(transcript_db, 10008)
+    await transcript_db.advance_processing_cursor(10005)
 
     await transcript_db.prune_observations()
 
     # Top 10000 by id DESC = ids 10008..9. That leaves ids 1-8 outside the window.
-    # All 8 are processed=1, so all 8 get deleted. Total = 10008 - 8 = 10000.
+    # All 8 are processed, so all 8 get deleted. Total = 10008 - 8 = 10000.
     total = await transcript_db.fetchone("SELECT COUNT(*) as c FROM observations")
     assert total["c"] == 10000
 
     # Unprocessed observations are protected (they have the highest IDs)
-    unprocessed = await transcript_db.fetchone(
-        "SELECT COUNT(*) as c FROM observations WHERE processed = 0"
-    )
-    assert unprocessed["c"] == 3
+    assert await transcript_db.pending_observation_count() == 3
 
 
 async def test_unprocessed_observations_never_pruned(transcript_db):
     """T7.8: Unprocessed observations outside the 10k window are NOT deleted."""
-    # Insert 5 unprocessed observations (low IDs)
-    await transcript_db.executemany(
-        "INSERT INTO observations (timestamp, session_id, sequence_num, user_message, agent_response, processed) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        [(time.time(), "s1", i, f"unproc-{i}", f"resp-{i}", 0) for i in range(5)],
-    )
-    # Insert 10005 processed observations (high IDs, fill the 10k window)
-    await transcript_db.executemany(
-        "INSERT INTO observations (timestamp, session_id, sequence_num, user_message, agent_response, processed) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        [(time.time(), "s1", 100 + i, f"msg-{i}", f"resp-{i}", 1) for i in range(10005)],
-    )
+    await _insert_observations(transcript_db, 10010)
+    # Only ids 1-3 are behind the cursor; ids 1-10 are outside the window
+    await transcript_db.advance_processing_cursor(3)
 
     await transcript_db.prune_observations()
 
-    # The 5 unprocessed obs have ids 1-5, outside the top 10000 window (ids 10010..11).
-    # But processed=0 so the WHERE clause protects them.
-    unprocessed = await transcript_db.fetchone(
-        "SELECT COUNT(*) as c FROM observations WHERE processed = 0"
-    )
-    assert unprocessed["c"] == 5
+    total = await transcript_db.fetchone("SELECT COUNT(*) as c FROM observations")
+    assert total["c"] == 10007
+    assert await transcript_db.pending_observation_count() == 10007
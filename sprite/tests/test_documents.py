@@ -0,0 +1,225 @@
+"""Tests for the durable document-processing queue."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, TextBlock
+
+from src.database import WorkspaceDB
+from src.documents import MAX_ATTEMPTS, DocumentQueue
+from src.gateway import SpriteGateway
+from src.runtime import AgentRuntime
+
+
+@pytest.fixture
+async def workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"))
+    await db.connect()
+    await db.create_stack("s1", "Stack")
+    yield db
+    await db.close()
+
+
+@pytest.fixture
+def runtime():
+    rt = MagicMock()
+    rt.send_to_client = AsyncMock()
+    rt.run_document_session = AsyncMock(return_value="An invoice from Acme for $120.")
+    return rt
+
+
+@pytest.fixture
+def queue(workspace_db, runtime):
+    return DocumentQueue(workspace_db, runtime, workers=2)
+
+
+async def _upload(db: WorkspaceDB, doc_id: str, filename: str = "invoice.pdf") -> None:
+    """What the gateway records for an upload: the document and its Queued card."""
+    await db.create_document(doc_id, filename, "application/pdf", f"/workspace/uploads/{doc_id}_{filename}")
+    await db.upsert_card(doc_id, "s1", filename, [
+        {"type": "heading", "text": filename},
+        {"type": "badge", "text": "Queued", "variant": "default"},
+    ])
+    await db.update_document_status(doc_id, "queued")
+
+
+def _sent(runtime) -> list[dict]:
+    return [json.loads(c.args[0]) for c in runtime.send_to_client.call_args_list]
+
+
+async def _blocks(db: WorkspaceDB, card_id: str) -> list[dict]:
+    return json.loads(await db.get_card_blocks(card_id))
+
+
+# -- One job -------------------------------------------------------------------
+
+
+async def test_process_runs_own_session_and_completes(queue, workspace_db, runtime):
+    await _upload(workspace_db, "doc-123")
+    doc = await workspace_db.claim_next_document()
+    assert doc["doc_id"] == "doc-123" and doc["status"] == "processing" and doc["attempts"] == 1
+
+    await queue.process(doc)
+
+    prompt, stack_id = runtime.run_document_session.call_args.args
+    assert "/workspace/uploads/doc-123_invoice.pdf" in prompt
+    assert "card_id: doc-123" in prompt and "update_card" in prompt
+    assert stack_id == "s1"
+    row = await workspace_db.fetchone("SELECT status FROM documents WHERE doc_id = ?", ("doc-123",))
+    assert row["status"] == "completed"
+
+    # Badge went Processing... -> Ready, with the agent's summary on the card
+    badges = [b["text"] for m in _sent(runtime) for b in m["payload"]["blocks"] if b["type"] == "badge"]
+    assert badges == ["Processing...", "Ready"]
+    blocks = await _blocks(workspace_db, "doc-123")
+    assert blocks[1] == {"type": "badge", "text": "Ready", "variant": "success"}
+    assert blocks[-1] == {"type": "text", "content": "An invoice from Acme for $120."}
+
+
+async def test_failure_swaps_badge_and_tells_user(queue, workspace_db, runtime):
+    runtime.run_document_session.side_effect = RuntimeError("parse error")
+    await _upload(workspace_db, "doc-bad", "bad.pdf")
+
+    await queue.process(await workspace_db.claim_next_document())
+
+    row = await workspace_db.fetchone("SELECT status FROM documents WHERE doc_id = ?", ("doc-bad",))
+    assert row["status"] == "failed"
+    blocks = await _blocks(workspace_db, "doc-bad")
+    assert blocks[0]["type"] == "heading"
+    assert blocks[1] == {"type": "badge", "text": "Failed", "variant": "destructive"}
+    assert "bad.pdf" in blocks[2]["content"]
+    errors = [m for m in _sent(runtime) if m["type"] == "system"]
+    assert errors and "bad.pdf" in errors[0]["payload"]["message"]
+
+
+async def test_failure_on_dead_connection_is_logged_not_raised(queue, workspace_db, runtime):
+    runtime.run_document_session.side_effect = RuntimeError("boom")
+    runtime.send_to_client.side_effect = ConnectionResetError("connection dead")
+    await _upload(workspace_db, "doc-1")
+
+    await queue.process(await workspace_db.claim_next_document())
+    assert queue.stats()["failed"] == 1
+
+
+async def test_document_interrupted_too_often_fails(queue, workspace_db, runtime):
+    await _upload(workspace_db, "doc-1")
+    for _ in range(MAX_ATTEMPTS):
+        await workspace_db.claim_next_document()
+        await workspace_db.requeue_documents()  # server stopped mid-job
+
+    await queue.process(await workspace_db.claim_next_document())
+    runtime.run_document_session.assert_not_called()
+    row = await workspace_db.fetchone("SELECT status FROM documents WHERE doc_id = ?", ("doc-1",))
+    assert row["status"] == "failed"
+
+
+# -- Workers -------------------------------------------------------------------
+
+
+async def test_workers_run_in_parallel_without_mission_lock(queue, workspace_db, runtime):
+    release = asyncio.Event()
+    running: list[str] = []
+
+    async def session(prompt, stack_id):
+        running.append(prompt)
+        await release.wait()
+        return "done"
+
+    runtime.run_document_session.side_effect = session
+    await queue.start()
+    for i in range(3):
+        await _upload(workspace_db, f"doc-{i}", f"invoice-{i}.pdf")
+        await queue.enqueue(f"doc-{i}")
+    await asyncio.sleep(0.05)
+    assert len(running) == 2  # two workers, the third document waits its turn
+
+    release.set()
+    for _ in range(100):
+        if queue.stats()["completed"] == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert queue.stats()["completed"] == 3
+    await queue.close()
+
+
+async def test_interrupted_jobs_resume_on_start(workspace_db, runtime):
+    await _upload(workspace_db, "doc-1")
+    await workspace_db.claim_next_document()  # a worker had it when the server stopped
+
+    restarted = DocumentQueue(workspace_db, runtime, workers=1)
+    await restarted.start()
+    for _ in range(100):
+        if restarted.stats()["completed"]:
+            break
+        await asyncio.sleep(0.01)
+    await restarted.close()
+
+    runtime.run_document_session.assert_called_once()
+    row = await workspace_db.fetchone("SELECT status, attempts FROM documents WHERE doc_id = ?", ("doc-1",))
+    assert (row["status"], row["attempts"]) == ("completed", 2)
+
+
+async def test_disconnect_does_not_stop_extraction(queue, workspace_db, runtime):
+    release = asyncio.Event()
+
+    async def session(prompt, stack_id):
+        await release.wait()
+        return "done"
+
+    runtime.run_document_session.side_effect = session
+    await queue.start()
+    gateway = SpriteGateway(send_fn=AsyncMock(), runtime=runtime, workspace_db=workspace_db,
+                            document_queue=queue)
+    await _upload(workspace_db, "doc-1")
+    await gateway._queue_extraction("doc-1")
+    await asyncio.sleep(0.01)
+
+    await gateway.cancel_tasks()  # the connection closed
+    release.set()
+    for _ in range(100):
+        if queue.stats()["completed"]:
+            break
+        await asyncio.sleep(0.01)
+    assert queue.stats()["completed"] == 1
+    await queue.close()
+
+
+# -- Agent session ---------------------------------------------------------------
+
+
+async def test_document_session_is_separate_from_chat():
+    clients = []
+
+    class FakeClient:
+        def __init__(self, options):
+            self.options = options
+            self.query = AsyncMock()
+            clients.append(self)
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return None
+
+        async def receive_response(self):
+            yield AssistantMessage(content=[TextBlock("Reading it now.")], model="m")
+            yield AssistantMessage(content=[TextBlock("A lease for 12 months.")], model="m")
+            yield ResultMessage(subtype="success", duration_ms=1, duration_api_ms=1, is_error=False,
+                                num_turns=2, session_id="doc-session")
+
+    with patch("src.runtime.ensure_templates"):
+        rt = AgentRuntime(send_fn=AsyncMock(), transcript_db=MagicMock(), processor=MagicMock())
+    with patch("src.runtime.ClaudeSDKClient", FakeClient), \
+         patch("src.runtime.load_memory", AsyncMock(return_value="system")):
+        summary = await rt.run_document_session("Read /workspace/uploads/a.pdf", "s1")
+
+    assert summary == "A lease for 12 months."
+    assert clients[0].query.call_args.args == ("Read /workspace/uploads/a.pdf",)
+    assert clients[0].options.hooks is None  # the chat's memory hooks stay out of it
+    assert rt._client is None and rt.last_session_id is None
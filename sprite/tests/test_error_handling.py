@@ -2,6 +2,7 @@
 
 import asyncio
 import base64
+import hashlib
 import json
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -63,41 +64,39 @@ class TestClassifyError:
 
 
 # ---------------------------------------------------------------------------
-# T6.10: Guard _send_error on dead connection
+# T6.10: Guard error reporting on dead connection
 # ---------------------------------------------------------------------------
 
 
 class TestExtractionErrorGuard:
-    """_send_error failure in extraction path does not cause unhandled exception."""
+    """A failed extraction's error report failing does not raise out of the worker."""
 
     @pytest.fixture
-    def gateway(self):
-        from src.gateway import SpriteGateway
+    def queue(self):
+        from src.documents import DocumentQueue
 
-        send_fn = AsyncMock()
         runtime = MagicMock()
-        runtime.handle_message = AsyncMock()
-        gw = SpriteGateway(send_fn=send_fn, runtime=runtime)
-        gw._workspace_db = AsyncMock()
-        return gw
+        runtime.run_document_session = AsyncMock(side_effect=Exception("extraction boom"))
+        runtime.send_to_client = AsyncMock()
+        db = AsyncMock()
+        db.transform_card_blocks.return_value = {"blocks": "[]"}
+        return DocumentQueue(db, runtime)
 
-    async def test_send_error_on_dead_connection(self, gateway):
+    async def test_send_error_on_dead_connection(self, queue):
         """When extraction fails and connection is dead, error is logged, not raised."""
-        gateway.runtime.handle_message.side_effect = Exception("extraction boom")
-        gateway.send = AsyncMock(side_effect=ConnectionResetError("connection dead"))
+        queue._runtime.send_to_client.side_effect = ConnectionResetError("connection dead")
 
         # Should NOT raise -- the error guard catches the ConnectionResetError
-        await gateway._run_extraction("doc1", "test.pdf", "application/pdf", "/tmp/test.pdf")
+        await queue.process({"doc_id": "doc1", "filename": "test.pdf", "mime_type": "application/pdf",
+                             "file_path": "/tmp/test.pdf", "attempts": 1})
 
-    async def test_send_error_on_live_connection(self, gateway):
+    async def test_send_error_on_live_connection(self, queue):
         """When extraction fails and connection is live, error is sent to user."""
-        gateway.runtime.handle_message.side_effect = Exception("extraction boom")
-        gateway.send = AsyncMock()
-
-        await gateway._run_extraction("doc1", "test.pdf", "application/pdf", "/tmp/test.pdf")
+        await queue.process({"doc_id": "doc1", "filename": "test.pdf", "mime_type": "application/pdf",
+                             "file_path": "/tmp/test.pdf", "attempts": 1})
 
-        # _send_error should have been called (sends a system error message)
-        calls = [c for c in gateway.send.call_args_list if "error" in str(c)]
+        # An error system message is sent to the user
+        calls = [c for c in queue._runtime.send_to_client.call_args_list if "error" in str(c)]
         assert len(calls) > 0
 
 
@@ -115,9 +114,11 @@ class TestLargeFileOffload:
 
         send_fn = AsyncMock()
         runtime = MagicMock()
-        gw = SpriteGateway(send_fn=send_fn, runtime=runtime)
+        gw = SpriteGateway(send_fn=send_fn, runtime=runtime, blob_store=MagicMock())
         gw._workspace_db = AsyncMock()
         gw._send_canvas_processing_card = AsyncMock()
+        # Every upload is new content: the claimed document is the one just created
+        gw._workspace_db.claim_document.side_effect = lambda doc_id, *args: {"doc_id": doc_id}
         gw._send_ack = AsyncMock()
         return gw
 
@@ -142,7 +143,13 @@ class TestLargeFileOffload:
             with patch("src.gateway.base64.b64decode", return_value=large_data):
                 await gateway._handle_file_upload(msg, "req1")
 
-            mock_thread.assert_called_once_with(mock_file_path.write_bytes, large_data)
+            # Writing the file and linking it into the blob store is one thread hop
+            store = mock_thread.call_args_list[0].args[0]
+            store()
+            mock_file_path.write_bytes.assert_called_once_with(large_data)
+            gateway._blobs.put_file.assert_called_once_with(
+                mock_file_path, hashlib.sha256(large_data).hexdigest(),
+            )
 
     async def test_small_file_no_thread(self, gateway, tmp_path):
         """Files <=1MB are written synchronously."""
@@ -182,7 +189,7 @@ class TestUploadErrorHandling:
 
         send_fn = AsyncMock()
         runtime = MagicMock()
-        gw = SpriteGateway(send_fn=send_fn, runtime=runtime)
+        gw = SpriteGateway(send_fn=send_fn, runtime=runtime, blob_store=MagicMock())
         gw._workspace_db = AsyncMock()
         gw._send_canvas_processing_card = AsyncMock()
         gw._send_ack = AsyncMock()
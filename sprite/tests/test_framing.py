@@ -0,0 +1,185 @@
+"""Tests for link framing negotiation and length-prefixed frames."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import struct
+import zlib
+
+import pytest
+
+from unittest.mock import MagicMock
+
+from src import framing
+from src.framing import COMPRESS_MIN_BYTES, FrameError, SpriteLink, decode_payload, encode_frame
+from src.gateway import SpriteGateway
+
+
+@pytest.fixture
+async def link_server():
+    """Echo server: every message read through SpriteLink is sent back."""
+    links: list[SpriteLink] = []
+
+    async def handle(reader, writer):
+        link = SpriteLink(reader, writer)
+        links.append(link)
+        link.offer()
+        try:
+            while (raw := await link.read()) is not None:
+                if raw:
+                    await link.send(raw)
+        except FrameError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield port, links
+    server.close()
+    await server.wait_closed()
+
+
+class _RecordingWriter:
+    """StreamWriter stand-in that records each write() call."""
+
+    def __init__(self) -> None:
+        self.writes: list[bytes] = []
+
+    def write(self, data: bytes) -> None:
+        self.writes.append(data)
+
+    async def drain(self) -> None:
+        pass
+
+    def is_closing(self) -> bool:
+        return False
+
+
+def _batched_link(window: float = 60.0) -> tuple[SpriteLink, _RecordingWriter]:
+    writer = _RecordingWriter()
+    return SpriteLink(asyncio.StreamReader(), writer, batch_window=window), writer
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    codec_id, length = struct.unpack(">BI", await reader.readexactly(5))
+    return codec_id, await reader.readexactly(length)
+
+
+def test_frame_round_trip():
+    small = b'{"type":"ping"}'
+    big = json.dumps({"rows": [{"a": i} for i in range(500)]}).encode()
+
+    assert encode_frame(small, "deflate")[0] == 0
+    framed = encode_frame(big, "deflate")
+    assert framed[0] == 1 and len(framed) < len(big)
+    assert decode_payload(framed[0], framed[5:]) == big
+    assert encode_frame(big, None)[5:] == big
+
+
+def test_incompressible_payload_sent_raw():
+    noise = os.urandom(COMPRESS_MIN_BYTES * 4)
+    assert encode_frame(noise, "deflate")[0] == 0
+    # base64 shrinks by ~25%: not worth compressing a whole upload for
+    upload = base64.b64encode(os.urandom(200_000))
+    assert encode_frame(upload, "deflate")[0] == 0
+
+
+def test_inflate_bomb_rejected(monkeypatch):
+    monkeypatch.setattr(framing, "MAX_FRAME_BYTES", 1000)
+    with pytest.raises(FrameError):
+        decode_payload(1, zlib.compress(b"0" * 5000))
+    with pytest.raises(FrameError):
+        decode_payload(9, b"")
+
+
+async def test_negotiated_link_uses_frames(link_server):
+    port, links = link_server
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    offer = json.loads(await reader.readline())
+    assert offer["type"] == "link_offer" and "deflate" in offer["codecs"]
+
+    writer.write(b'{"type":"link_select","framing":1,"codec":"deflate"}\n')
+    ack = json.loads(await reader.readline())
+    assert ack == {"type": "link_ack", "framing": 1, "codec": "deflate"}
+
+    big = json.dumps({"type": "mission", "payload": {"text": "x" * 10_000}})
+    writer.write(encode_frame(big.encode(), "deflate"))
+    codec_id, payload = await _read_frame(reader)
+
+    assert codec_id == 1 and len(payload) < len(big)
+    assert decode_payload(codec_id, payload).decode() == big
+    assert links[0].framed_in and links[0].framed_out
+    writer.close()
+
+
+async def test_line_client_ignores_offer(link_server):
+    port, links = link_server
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readline()  # link_offer, which an old Bridge passes along
+
+    writer.write(b'{"type":"ping","id":"1"}\n')
+    assert await reader.readline() == b'{"type":"ping","id":"1"}\n'
+    assert not links[0].framed_out
+    writer.close()
+
+
+async def test_oversized_frame_closes_link(link_server, monkeypatch):
+    monkeypatch.setattr(framing, "MAX_FRAME_BYTES", 100)
+    port, _ = link_server
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readline()
+    writer.write(b'{"type":"link_select","framing":1,"codec":null}\n')
+    await reader.readline()
+
+    writer.write(struct.pack(">BI", 0, 1000) + b"x" * 10)
+    assert await reader.read() == b""
+    writer.close()
+
+
+async def test_batched_sends_share_one_write():
+    link, writer = _batched_link(window=0.01)
+    for i in range(50):
+        await link.send(json.dumps({"type": "agent_event", "n": i}))
+    assert writer.writes == []
+
+    await asyncio.sleep(0.05)
+    assert len(writer.writes) == 1
+    lines = writer.writes[0].splitlines()
+    assert [json.loads(line)["n"] for line in lines] == list(range(50))
+
+
+async def test_batch_written_at_size_cap(monkeypatch):
+    monkeypatch.setattr(framing, "BATCH_MAX_BYTES", 100)
+    link, writer = _batched_link()
+    await link.send("x" * 60)
+    assert writer.writes == []
+    await link.send("y" * 60)
+    assert writer.writes == [b"x" * 60 + b"\n" + b"y" * 60 + b"\n"]
+
+
+async def test_link_ack_follows_batched_lines():
+    link, writer = _batched_link()
+    await link.send('{"type":"agent_event"}')
+    assert link._select(b'{"type":"link_select","framing":1,"codec":null}\n')
+    await link.send('{"type":"pong"}')
+    await link.flush()
+
+    assert writer.writes[0] == b'{"type":"agent_event"}\n'
+    assert json.loads(writer.writes[1])["type"] == "link_ack"
+    assert decode_payload(0, writer.writes[2][5:]) == b'{"type":"pong"}'
+
+
+async def test_gateway_flushes_after_each_message():
+    link, writer = _batched_link()
+    gateway = SpriteGateway(send_fn=link.send, runtime=MagicMock(), flush_fn=link.flush)
+
+    await gateway.route('{"type":"ping","id":"p1"}')
+    assert json.loads(writer.writes[0])["id"] == "p1"
+
+    await gateway.route("not json")  # error replies go out before route returns too
+    assert json.loads(writer.writes[1])["payload"]["event"] == "error"
@@ -198,79 +198,24 @@ async def test_gateway_move_invalid_card_returns_error(gateway, workspace_db, mo
     assert parsed["payload"]["event"] == "error"
 
 
-# -- Extraction tests ----------------------------------------------------------
-
-
-@pytest.mark.asyncio
-async def test_run_extraction_calls_runtime_and_completes(gateway, workspace_db):
-    """_run_extraction sends context to runtime and marks doc completed."""
-    gateway.runtime.handle_message = AsyncMock()
-
-    doc_id = "doc-123"
-    filename = "invoice.pdf"
-    await workspace_db.create_document(doc_id, filename, "application/pdf", "/workspace/uploads/doc-123_invoice.pdf")
-
-    await gateway._run_extraction(doc_id, filename, "application/pdf", "/workspace/uploads/doc-123_invoice.pdf")
-
-    gateway.runtime.handle_message.assert_called_once()
-    context_arg = gateway.runtime.handle_message.call_args[0][0]
-    assert "invoice.pdf" in context_arg
-    assert "/workspace/uploads/doc-123_invoice.pdf" in context_arg
-
-    row = await workspace_db.fetchone("SELECT * FROM documents WHERE doc_id = ?", (doc_id,))
-    assert row["status"] == "completed"
-
-
-@pytest.mark.asyncio
-async def test_run_extraction_marks_failed_on_error(gateway, workspace_db):
-    """_run_extraction marks doc failed when runtime raises."""
-    gateway.runtime.handle_message = AsyncMock(side_effect=RuntimeError("agent crashed"))
-
-    doc_id = "doc-456"
-    await workspace_db.create_document(doc_id, "bad.pdf", "application/pdf", "/workspace/uploads/doc-456_bad.pdf")
-
-    await gateway._run_extraction(doc_id, "bad.pdf", "application/pdf", "/workspace/uploads/doc-456_bad.pdf")
-
-    row = await workspace_db.fetchone("SELECT * FROM documents WHERE doc_id = ?", (doc_id,))
-    assert row["status"] == "failed"
-
-
-@pytest.mark.asyncio
-async def test_run_extraction_acquires_mission_lock(gateway, workspace_db):
-    """_run_extraction holds mission_lock during runtime call to prevent concurrent SDK access."""
-    lock_was_held = False
-
-    async def check_lock(*args, **kwargs):
-        nonlocal lock_was_held
-        lock_was_held = gateway.mission_lock.locked()
-
-    gateway.runtime.handle_message = AsyncMock(side_effect=check_lock)
-
-    doc_id = "doc-789"
-    await workspace_db.create_document(doc_id, "test.pdf", "application/pdf", "/tmp/test.pdf")
-
-    await gateway._run_extraction(doc_id, "test.pdf", "application/pdf", "/tmp/test.pdf")
-
-    assert lock_was_held, "mission_lock should be held during runtime.handle_message()"
-
-
 # -- Processing card PDF embed tests -------------------------------------------
 
 
 @pytest.mark.asyncio
-async def test_processing_card_embeds_document_block(gateway, workspace_db, mock_send):
-    """Processing card includes document block when data_b64 is provided and under 5MB."""
+async def test_processing_card_references_document_blob(gateway, workspace_db, mock_send):
+    """Processing card's document block references the blob store instead of embedding data."""
     await workspace_db.create_stack("s1", "Stack")
     gateway.runtime._active_stack_id = "s1"
 
-    data_b64 = "AAAA"  # small base64 payload
-    await gateway._send_canvas_processing_card("doc-1", "test.pdf", data_b64, "application/pdf")
+    digest = "ab" * 32
+    await gateway._send_canvas_processing_card("doc-1", "test.pdf", digest, 1234, "application/pdf")
 
     sent = json.loads(mock_send.call_args[0][0])
     blocks = sent["payload"]["blocks"]
     assert sent["payload"]["size"] == "large"
     assert blocks[0]["type"] == "document"
-    assert blocks[0]["data"] == data_b64
+    assert blocks[0]["blob"] == digest and blocks[0]["size"] == 1234
+    assert "data" not in blocks[0]
     assert blocks[0]["mime_type"] == "application/pdf"
     assert blocks[0]["filename"] == "test.pdf"
     assert blocks[1]["type"] == "heading"
@@ -278,22 +223,20 @@ async def test_processing_card_embeds_document_block(gateway, workspace_db, mock
 
 
 @pytest.mark.asyncio
-async def test_processing_card_skips_document_block_for_large_files(mock_send):
-    """Processing card omits document block when data_b64 >= 5MB."""
+async def test_processing_card_references_large_files(mock_send):
+    """A reference costs the same for any file size, so large files keep their preview."""
     gw = SpriteGateway(send_fn=mock_send, runtime=MagicMock())
-    data_b64 = "A" * 5_000_000  # exactly at the limit
-    await gw._send_canvas_processing_card("doc-2", "huge.pdf", data_b64, "application/pdf")
+    await gw._send_canvas_processing_card("doc-2", "huge.pdf", "cd" * 32, 25_000_000, "application/pdf")
 
     sent = json.loads(mock_send.call_args[0][0])
-    blocks = sent["payload"]["blocks"]
-    assert sent["payload"]["size"] == "medium"
-    assert blocks[0]["type"] == "heading"
-    assert all(b["type"] != "document" for b in blocks)
+    assert sent["payload"]["size"] == "large"
+    assert sent["payload"]["blocks"][0]["size"] == 25_000_000
+    assert len(mock_send.call_args[0][0]) < 1000
 
 
 @pytest.mark.asyncio
 async def test_processing_card_no_document_block_without_data(mock_send):
-    """Processing card has no document block when data_b64 is empty."""
+    """Processing card has no document block without a stored blob."""
     gw = SpriteGateway(send_fn=mock_send, runtime=MagicMock())
     await gw._send_canvas_processing_card("doc-3", "no-data.pdf")
 
@@ -304,91 +247,6 @@ async def test_processing_card_no_document_block_without_data(mock_send):
     assert sent["payload"]["size"] == "medium"
 
 
-# -- Extraction card lifecycle tests -------------------------------------------
-
-
-@pytest.mark.asyncio
-async def test_extraction_success_swaps_badge_to_ready(gateway, workspace_db, mock_send):
-    """Successful extraction swaps badge from Processing to Ready."""
-    gateway.runtime.handle_message = AsyncMock()
-    await workspace_db.create_stack("s1", "Stack")
-    gateway.runtime._active_stack_id = "s1"
-
-    doc_id = "doc-badge-ok"
-    await workspace_db.create_document(doc_id, "invoice.pdf", "application/pdf", "/tmp/invoice.pdf")
-    await workspace_db.upsert_card(doc_id, "s1", "invoice.pdf", [
-        {"type": "heading", "text": "invoice.pdf"},
-        {"type": "badge", "text": "Processing...", "variant": "default"},
-    ])
-
-    await gateway._run_extraction(doc_id, "invoice.pdf", "application/pdf", "/tmp/invoice.pdf")
-
-    row = await workspace_db.fetchone("SELECT blocks FROM cards WHERE card_id = ?", (doc_id,))
-    blocks = json.loads(row["blocks"])
-    badge = next(b for b in blocks if b["type"] == "badge")
-    assert badge["text"] == "Ready"
-    assert badge["variant"] == "success"
-
-    # canvas_update sent to frontend
-    last_sent = json.loads(mock_send.call_args[0][0])
-    assert last_sent["type"] == "canvas_update"
-    assert last_sent["payload"]["command"] == "update_card"
-
-
-@pytest.mark.asyncio
-async def test_extraction_failure_swaps_badge_to_failed_with_error(gateway, workspace_db, mock_send):
-    """Failed extraction swaps badge to Failed + appends error text block."""
-    gateway.runtime.handle_message = AsyncMock(side_effect=RuntimeError("parse error"))
-    await workspace_db.create_stack("s1", "Stack")
-    gateway.runtime._active_stack_id = "s1"
-
-    doc_id = "doc-badge-fail"
-    await workspace_db.create_document(doc_id, "bad.pdf", "application/pdf", "/tmp/bad.pdf")
-    await workspace_db.upsert_card(doc_id, "s1", "bad.pdf", [
-        {"type": "document", "id": "d1", "data": "AAAA", "mime_type": "application/pdf", "filename": "bad.pdf"},
-        {"type": "heading", "text": "bad.pdf"},
-        {"type": "badge", "text": "Processing...", "variant": "default"},
-    ])
-
-    await gateway._run_extraction(doc_id, "bad.pdf", "application/pdf", "/tmp/bad.pdf")
-
-    row = await workspace_db.fetchone("SELECT blocks FROM cards WHERE card_id = ?", (doc_id,))
-    blocks = json.loads(row["blocks"])
-
-    # Document block preserved
-    assert blocks[0]["type"] == "document"
-    # Heading preserved
-    assert blocks[1]["type"] == "heading"
-    # Badge swapped to Failed
-    badge = next(b for b in blocks if b["type"] == "badge")
-    assert badge["text"] == "Failed"
-    assert badge["variant"] == "destructive"
-    # Error text appended
-    error_block = next(b for b in blocks if b["type"] == "text")
-    assert "bad.pdf" in error_block["content"]
-
-    # Error message sent to user
-    calls = [json.loads(c[0][0]) for c in mock_send.call_args_list]
-    error_msgs = [c for c in calls if c.get("type") == "system" and c.get("payload", {}).get("event") == "error"]
-    assert any("bad.pdf" in m["payload"]["message"] for m in error_msgs)
-
-
-@pytest.mark.asyncio
-async def test_extraction_prompt_includes_doc_id(gateway, workspace_db):
-    """Extraction context string includes the doc_id so agent can reference the card."""
-    gateway.runtime.handle_message = AsyncMock()
-
-    doc_id = "doc-prompt-check"
-    await workspace_db.create_document(doc_id, "test.pdf", "application/pdf", "/tmp/test.pdf")
-
-    await gateway._run_extraction(doc_id, "test.pdf", "application/pdf", "/tmp/test.pdf")
-
-    context_arg = gateway.runtime.handle_message.call_args[0][0]
-    assert doc_id in context_arg
-    assert "card_id" in context_arg
-    assert "update_card" in context_arg
-
-
 # -- Canvas context formatting tests ------------------------------------------
 
 
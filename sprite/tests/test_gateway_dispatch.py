@@ -0,0 +1,124 @@
+"""Tests for the gateway's per-lane dispatcher."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import gateway as gateway_module
+from src.gateway import SpriteGateway
+
+
+def _msg(msg_type: str, payload: dict | None = None) -> str:
+    return json.dumps({
+        "id": str(uuid.uuid4()),
+        "type": msg_type,
+        "timestamp": int(time.time() * 1000),
+        "payload": payload or {},
+    })
+
+
+@pytest.fixture
+def sent() -> list[dict]:
+    return []
+
+
+@pytest.fixture
+def gateway(sent):
+    async def send(data: str) -> None:
+        sent.append(json.loads(data))
+
+    return SpriteGateway(send_fn=send, runtime=MagicMock())
+
+
+def _block_missions(gw: SpriteGateway) -> tuple[asyncio.Event, list[str]]:
+    """Make missions record their text and wait for the returned event."""
+    release = asyncio.Event()
+    started: list[str] = []
+
+    async def mission(msg, req_id):
+        started.append(msg["payload"]["text"])
+        await release.wait()
+
+    gw._handle_mission = mission
+    return release, started
+
+
+async def test_ping_and_canvas_answered_during_mission(gateway, sent):
+    release, started = _block_missions(gateway)
+    handled = asyncio.Event()
+
+    async def canvas(msg, req_id):
+        handled.set()
+
+    gateway._handle_canvas = canvas
+
+    await asyncio.wait_for(gateway.dispatch(_msg("mission", {"text": "long"})), timeout=1)
+    await asyncio.sleep(0)
+    assert started == ["long"]
+
+    await asyncio.wait_for(gateway.dispatch('{"type":"ping","id":"p1"}'), timeout=1)
+    assert sent[-1] == {"type": "pong", "id": "p1", "timestamp": sent[-1]["timestamp"]}
+    await gateway.dispatch(_msg("canvas_interaction", {"card_id": "c1", "action": "move"}))
+    await asyncio.wait_for(handled.wait(), timeout=1)
+
+    release.set()
+    await gateway.cancel_tasks()
+
+
+async def test_missions_run_one_at_a_time_in_order(gateway):
+    release, started = _block_missions(gateway)
+    for text in ("first", "second", "third"):
+        await gateway.dispatch(_msg("mission", {"text": text}))
+    await asyncio.sleep(0.01)
+    assert started == ["first"]
+    assert gateway.lane_stats()["mission"]["depth"] == 2
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert started == ["first", "second", "third"]
+    assert gateway.lane_stats()["mission"] == {"depth": 0, "peak": 3, "handled": 3, "rejected": 0}
+    await gateway.cancel_tasks()
+
+
+async def test_full_lane_rejects_with_error(gateway, sent, monkeypatch):
+    monkeypatch.setattr(gateway_module, "MISSION_QUEUE_MAX", 1)
+    gw = SpriteGateway(send_fn=gateway.send, runtime=MagicMock())
+    release, started = _block_missions(gw)
+
+    await gw.dispatch(_msg("mission", {"text": "running"}))
+    await asyncio.sleep(0)
+    await gw.dispatch(_msg("mission", {"text": "queued"}))
+    await gw.dispatch(_msg("mission", {"text": "rejected"}))
+
+    assert sent[-1]["payload"] == {"event": "error", "message": "Server busy, please retry"}
+    assert gw.lane_stats()["mission"]["rejected"] == 1
+    release.set()
+    await gw.cancel_tasks()
+
+
+async def test_cancel_tasks_finishes_running_mission(gateway):
+    release, started = _block_missions(gateway)
+    finished = []
+    blocked = gateway._handle_mission
+
+    async def mission(msg, req_id):
+        await blocked(msg, req_id)
+        finished.append(msg["payload"]["text"])
+
+    gateway._handle_mission = mission
+    await gateway.dispatch(_msg("mission", {"text": "running"}))
+    await gateway.dispatch(_msg("mission", {"text": "queued"}))
+    await asyncio.sleep(0)
+
+    closing = asyncio.create_task(gateway.cancel_tasks())
+    await asyncio.sleep(0.01)
+    assert not closing.done()
+    release.set()
+    await asyncio.wait_for(closing, timeout=1)
+    assert finished == ["running"]
@@ -0,0 +1,175 @@
+"""Tests for watermark retention and the background MaintenanceScheduler."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from src.database import RetentionPolicy, TranscriptDB, WorkspaceDB
+from src.maintenance import MaintenanceScheduler
+
+
+@pytest.fixture
+async def workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"))
+    await db.connect()
+    yield db
+    await db.close()
+
+
+@pytest.fixture
+async def transcript_db(tmp_path):
+    db = TranscriptDB(db_path=str(tmp_path / "transcript.db"))
+    await db.connect()
+    yield db
+    await db.close()
+
+
+async def _insert_chat(db: WorkspaceDB, n: int) -> None:
+    await db.executemany(
+        "INSERT INTO chat_messages (role, content, timestamp) VALUES (?, ?, ?)",
+        [("user", f"msg-{i}", time.time()) for i in range(n)],
+    )
+
+
+async def _chat_count(db: WorkspaceDB) -> int:
+    row = await db.fetchone("SELECT COUNT(*) AS c FROM chat_messages")
+    return row["c"]
+
+
+# -- enforce_retention -------------------------------------------------------
+
+async def test_retention_deletes_one_bounded_batch(workspace_db):
+    await _insert_chat(workspace_db, 100)
+    policy = RetentionPolicy("chat_messages", keep=10, batch_size=25)
+
+    assert await workspace_db.enforce_retention(policy) == 25
+    assert await _chat_count(workspace_db) == 75
+
+
+async def test_retention_deletes_oldest_ids_first(workspace_db):
+    await _insert_chat(workspace_db, 30)
+    policy = RetentionPolicy("chat_messages", keep=10, batch_size=100)
+
+    assert await workspace_db.enforce_retention(policy) == 20
+    rows = await workspace_db.fetchall("SELECT content FROM chat_messages ORDER BY id")
+    assert rows[0]["content"] == "msg-20"
+    assert rows[-1]["content"] == "msg-29"
+
+
+async def test_retention_noop_under_limit(workspace_db):
+    await _insert_chat(workspace_db, 5)
+    policy = RetentionPolicy("chat_messages", keep=10)
+    assert await workspace_db.enforce_retention(policy) == 0
+
+
+async def test_retention_noop_on_empty_table(workspace_db):
+    assert await workspace_db.enforce_retention(WorkspaceDB.retention_policies[0]) == 0
+
+
+async def test_retention_where_predicate_protects_rows(transcript_db):
+    await transcript_db.executemany(
+        "INSERT INTO observations (timestamp, sequence_num, processed) VALUES (?, ?, ?)",
+        [(time.time(), i, i % 2) for i in range(20)],
+    )
+    policy = RetentionPolicy("observations", keep=0, where="processed = 1")
+    assert await transcript_db.enforce_retention(policy) == 10
+    row = await transcript_db.fetchone("SELECT COUNT(*) AS c FROM observations WHERE processed = 0")
+    assert row["c"] == 10
+
+
+async def test_add_chat_message_does_not_prune(workspace_db):
+    await _insert_chat(workspace_db, 5001)
+    await workspace_db.add_chat_message("user", "newest")
+    assert await _chat_count(workspace_db) == 5002
+
+
+# -- MaintenanceScheduler ----------------------------------------------------
+
+async def test_scheduler_exposes_policies_per_table(workspace_db, transcript_db):
+    scheduler = MaintenanceScheduler([transcript_db, workspace_db])
+    policies = scheduler.policies
+    assert policies[f"{workspace_db.db_path}:chat_messages"].keep == 5_000
+    assert "processing_cursor" in policies[f"{transcript_db.db_path}:observations"].where
+
+
+async def test_scheduler_set_policy_overrides_one_table(workspace_db):
+    scheduler = MaintenanceScheduler([workspace_db])
+    updated = scheduler.set_policy(workspace_db, "chat_messages", keep=3, batch_size=2)
+    assert (updated.keep, updated.batch_size) == (3, 2)
+    # Class-level default is untouched
+    assert WorkspaceDB.retention_policies[0].keep == 5_000
+
+    with pytest.raises(KeyError):
+        scheduler.set_policy(workspace_db, "cards", keep=1)
+
+
+async def test_scheduler_run_once_amortizes_backlog(workspace_db):
+    await _insert_chat(workspace_db, 20)
+    scheduler = MaintenanceScheduler([workspace_db], idle_after=3600)
+    scheduler.set_policy(workspace_db, "chat_messages", keep=5, batch_size=10)
+
+    assert await scheduler.run_once() is True   # full batch -> more pending
+    assert await _chat_count(workspace_db) == 10
+    assert await scheduler.run_once() is False  # remaining 5 expired rows
+    assert await _chat_count(workspace_db) == 5
+
+
+async def test_scheduler_compacts_only_when_idle(workspace_db, monkeypatch):
+    calls = []
+
+    async def fake_compact(max_pages=256):
+        calls.append(max_pages)
+
+    monkeypatch.setattr(workspace_db, "compact", fake_compact)
+    scheduler = MaintenanceScheduler([workspace_db], idle_after=3600)
+    await workspace_db.add_chat_message("user", "hi")
+    await scheduler.run_once()
+    assert calls == []
+
+    scheduler.idle_after = 0
+    await scheduler.run_once()
+    assert len(calls) == 1
+    # No writes since the last compaction -> skipped
+    await scheduler.run_once()
+    assert len(calls) == 1
+
+
+async def test_scheduler_compacts_idle_database_with_default_timings(workspace_db, monkeypatch):
+    calls = []
+
+    async def fake_compact(max_pages=256):
+        calls.append(max_pages)
+
+    monkeypatch.setattr(workspace_db, "compact", fake_compact)
+    scheduler = MaintenanceScheduler([workspace_db])
+    assert scheduler.interval < scheduler.idle_after
+    # Last user write was longer ago than idle_after; retention has nothing to delete
+    workspace_db._last_write = time.monotonic() - scheduler.idle_after - 1
+    idle_before = workspace_db.idle_seconds
+
+    await scheduler.run_once()
+    assert workspace_db.idle_seconds >= idle_before  # no-op retention is not a write
+    assert len(calls) == 1
+
+
+async def test_compact_runs_on_real_database(workspace_db):
+    await _insert_chat(workspace_db, 50)
+    await workspace_db.enforce_retention(RetentionPolicy("chat_messages", keep=0))
+    await workspace_db.compact()
+    row = await workspace_db.fetchone("PRAGMA auto_vacuum")
+    assert row["auto_vacuum"] == 2  # INCREMENTAL on new databases
+    row = await workspace_db.fetchone("PRAGMA freelist_count")
+    assert row["freelist_count"] == 0
+
+
+async def test_scheduler_start_stop(workspace_db):
+    scheduler = MaintenanceScheduler([workspace_db], interval=0.01)
+    scheduler.set_policy(workspace_db, "chat_messages", keep=1)
+    await _insert_chat(workspace_db, 5)
+    scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+    assert await _chat_count(workspace_db) == 1
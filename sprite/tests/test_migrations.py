@@ -0,0 +1,158 @@
+"""Tests for PRAGMA user_version schema migrations across all three databases."""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.database import Migration, MemoryDB, TranscriptDB, WorkspaceDB
+
+BOOTSTRAP_TS = Path(__file__).resolve().parents[2] / "bridge" / "src" / "bootstrap.ts"
+
+
+def _user_version(path) -> int:
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# -- Fresh databases ---------------------------------------------------------
+
+@pytest.mark.parametrize("db_cls", [TranscriptDB, MemoryDB, WorkspaceDB])
+async def test_fresh_db_stamped_with_latest_version(tmp_path, db_cls):
+    path = tmp_path / "fresh.db"
+    async with db_cls(db_path=str(path)) as db:
+        assert db.schema_version == db_cls._migrations[-1].version
+    assert _user_version(path) == db_cls._migrations[-1].version
+
+
+@pytest.mark.parametrize("db_cls", [TranscriptDB, MemoryDB, WorkspaceDB])
+async def test_up_to_date_connect_runs_no_migrations(tmp_path, db_cls, caplog):
+    path = str(tmp_path / "current.db")
+    async with db_cls(db_path=path):
+        pass
+
+    caplog.clear()
+    with caplog.at_level("INFO", logger="src.database"):
+        async with db_cls(db_path=path) as db:
+            assert db.schema_version == _user_version(path)
+    assert not [r for r in caplog.records if r.getMessage().startswith("Migrated")]
+
+
+# -- Upgrades ------------------------------------------------------------------
+
+async def test_legacy_workspace_db_upgrades_in_place(tmp_path):
+    """A pre-versioning cards table (user_version 0) gains the v2/v3 columns."""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE stacks (id TEXT PRIMARY KEY, name TEXT NOT NULL, color TEXT,
+            sort_order INTEGER DEFAULT 0, status TEXT NOT NULL DEFAULT 'active',
+            created_at REAL NOT NULL, updated_at REAL NOT NULL);
+        CREATE TABLE cards (card_id TEXT PRIMARY KEY, stack_id TEXT NOT NULL,
+            title TEXT NOT NULL, blocks TEXT NOT NULL, size TEXT DEFAULT 'medium',
+            status TEXT NOT NULL DEFAULT 'active', created_at REAL NOT NULL,
+            updated_at REAL NOT NULL);
+        INSERT INTO stacks VALUES ('s1', 'Legacy', NULL, 0, 'active', 0, 0);
+        INSERT INTO cards (card_id, stack_id, title, blocks, created_at, updated_at)
+            VALUES ('c1', 's1', 'Old', '[]', 0, 0);
+    """)
+    conn.close()
+
+    async with WorkspaceDB(db_path=str(path)) as db:
+        cols = {r["name"] for r in await db.fetchall("PRAGMA table_info(cards)")}
+        assert {"position_x", "z_index", "card_type", "preview_rows"} <= cols
+        card = await db.fetchone("SELECT * FROM cards WHERE card_id = 'c1'")
+        assert card["title"] == "Old"
+        assert card["position_x"] == 0.0
+    assert _user_version(path) == WorkspaceDB._migrations[-1].version
+
+
+async def test_only_pending_migrations_run(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / "workspace.db")
+    async with WorkspaceDB(db_path=path):
+        pass
+
+    latest = WorkspaceDB._migrations[-1].version
+    monkeypatch.setattr(WorkspaceDB, "_migrations", WorkspaceDB._migrations + (
+        Migration(latest + 1, "notes table", ("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)",)),
+    ))
+    caplog.clear()
+    with caplog.at_level("INFO", logger="src.database"):
+        async with WorkspaceDB(db_path=path) as db:
+            row = await db.fetchone("SELECT COUNT(*) AS c FROM notes")
+            assert row["c"] == 0
+    migrated = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Migrated")]
+    assert migrated == [f"Migrated {path} to v{latest + 1}: notes table"]
+    assert _user_version(path) == latest + 1
+
+
+async def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "workspace.db")
+    async with WorkspaceDB(db_path=path):
+        pass
+
+    latest = WorkspaceDB._migrations[-1].version
+    monkeypatch.setattr(WorkspaceDB, "_migrations", WorkspaceDB._migrations + (
+        Migration(latest + 1, "half applied", (
+            "CREATE TABLE notes (id INTEGER PRIMARY KEY)",
+            "INSERT INTO missing_table VALUES (1)",
+        )),
+    ))
+    db = WorkspaceDB(db_path=path)
+    with pytest.raises(sqlite3.OperationalError):
+        await db.connect()
+    await db.close()
+
+    assert _user_version(path) == latest
+    conn = sqlite3.connect(path)
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+    assert "notes" not in tables
+
+
+# -- Bridge bootstrap parity -------------------------------------------------
+
+def _bootstrap_script(tmp_path) -> str:
+    source = BOOTSTRAP_TS.read_text()
+    match = re.search(r"const INIT_DB_SCRIPT = `(.*?)`", source, re.DOTALL)
+    assert match, "INIT_DB_SCRIPT not found in bootstrap.ts"
+    return match.group(1).replace("/workspace/.os/memory", str(tmp_path))
+
+
+@pytest.mark.parametrize("db_cls,filename", [
+    (TranscriptDB, "transcript.db"),
+    (MemoryDB, "memory.db"),
+])
+async def test_bootstrap_schema_matches_baseline(tmp_path, db_cls, filename, monkeypatch):
+    """Bridge-created DBs are stamped v1 and match the sprite's own v1 schema."""
+    boot_dir = tmp_path / "boot"
+    boot_dir.mkdir()
+    exec(compile(_bootstrap_script(boot_dir), "INIT_DB_SCRIPT", "exec"), {})
+
+    fresh = tmp_path / filename
+    monkeypatch.setattr(db_cls, "_migrations", db_cls._migrations[:1])
+    async with db_cls(db_path=str(fresh)):
+        pass
+
+    def schema(path):
+        conn = sqlite3.connect(str(path))
+        try:
+            return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall())
+        finally:
+            conn.close()
+
+    assert _user_version(boot_dir / filename) == 1
+    assert schema(boot_dir / filename) == schema(fresh)
+
+
+async def test_bootstrap_db_upgrades_to_latest(tmp_path):
+    exec(compile(_bootstrap_script(tmp_path), "INIT_DB_SCRIPT", "exec"), {})
+    async with TranscriptDB(db_path=str(tmp_path / "transcript.db")) as db:
+        assert await db.pending_observation_count() == 0
+    assert _user_version(tmp_path / "transcript.db") == TranscriptDB._migrations[-1].version
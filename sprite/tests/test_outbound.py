@@ -0,0 +1,171 @@
+"""Tests for the per-connection outbound queue and its writer task."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+from src.outbound import OutboundQueue
+
+
+class _Link:
+    """Stands in for SpriteLink; drain() blocks while `stalled` is clear."""
+
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+        self.flushes = 0
+        self.stalled = asyncio.Event()
+        self.stalled.set()
+
+    def send_nowait(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+    def flush_nowait(self) -> None:
+        self.flushes += 1
+
+    async def drain(self) -> None:
+        await self.stalled.wait()
+
+
+def _card(command: str, card_id: str, **fields) -> str:
+    return json.dumps({"type": "canvas_update", "id": "x", "timestamp": 0,
+                       "payload": {"command": command, "card_id": card_id, **fields}})
+
+
+def _status(doc_id: str, status: str) -> str:
+    return json.dumps({"type": "status", "id": "x", "timestamp": 0,
+                       "payload": {"document_id": doc_id, "status": status}})
+
+
+def _text(content: str) -> str:
+    return json.dumps({"type": "agent_event", "id": "x", "timestamp": 0,
+                       "payload": {"event_type": "text", "content": content}})
+
+
+async def _stall(link: _Link, queue: OutboundQueue) -> None:
+    """Get the writer parked in drain() so later sends stay queued."""
+    link.stalled.clear()
+    await queue.send(_text("first"))
+    await asyncio.sleep(0)
+
+
+async def test_send_returns_before_the_write_and_keeps_order():
+    link = _Link()
+    queue = OutboundQueue(link)
+    await _stall(link, queue)
+    for i in range(5):
+        await asyncio.wait_for(queue.send(_text(str(i))), timeout=0.1)  # link is stalled
+    assert [m["payload"]["content"] for m in link.sent] == ["first"]
+
+    link.stalled.set()
+    await asyncio.sleep(0.01)
+    assert [m["payload"]["content"] for m in link.sent] == ["first", "0", "1", "2", "3", "4"]
+    await queue.close()
+
+
+async def test_queued_card_updates_and_statuses_are_superseded():
+    link = _Link()
+    queue = OutboundQueue(link)
+    await _stall(link, queue)
+    await queue.send(_card("update_card", "c1", title="Invoice"))
+    await queue.send(_status("d1", "processing"))
+    await queue.send(_text("between"))
+    await queue.send(_card("update_card", "c1", blocks=[{"type": "text", "content": "x"}]))
+    await queue.send(_card("update_card", "c2", title="Gone"))
+    await queue.send(_card("close_card", "c2"))
+    await queue.send(_status("d1", "completed"))
+
+    link.stalled.set()
+    await asyncio.sleep(0.01)
+    # The merged update keeps the first update's place, ahead of the text sent between them
+    assert [(m["type"], m["payload"].get("command")) for m in link.sent[1:]] == [
+        ("canvas_update", "update_card"), ("agent_event", None), ("canvas_update", "close_card"), ("status", None),
+    ]
+    merged = link.sent[1]["payload"]
+    assert merged["title"] == "Invoice" and merged["blocks"] == [{"type": "text", "content": "x"}]
+    assert link.sent[-1]["payload"]["status"] == "completed"
+    assert queue.stats()["coalesced"] == 1 and queue.stats()["dropped"] == 2
+    await queue.close()
+
+
+async def test_update_is_not_merged_into_a_queued_create():
+    link = _Link()
+    queue = OutboundQueue(link)
+    await _stall(link, queue)
+    await queue.send(_card("create_card", "c1", title="New"))
+    await queue.send(_card("update_card", "c1", title="Renamed"))
+    await queue.send(_card("update_card", "c1", size="large"))
+
+    link.stalled.set()
+    await asyncio.sleep(0.01)
+    assert [m["payload"]["command"] for m in link.sent[1:]] == ["create_card", "update_card"]
+    assert link.sent[-1]["payload"] == {"command": "update_card", "card_id": "c1", "title": "Renamed",
+                                        "size": "large"}
+    await queue.close()
+
+
+async def test_only_merged_updates_are_parsed(monkeypatch):
+    link = _Link()
+    queue = OutboundQueue(link)
+    await _stall(link, queue)
+    parsed = []
+    real_loads = json.loads
+    monkeypatch.setattr("src.outbound.json.loads", lambda data: parsed.append(data) or real_loads(data))
+    table = [{"type": "table", "rows": [[str(i)] * 8 for i in range(500)]}]
+    await queue.send(_card("create_card", "c1", title="Big", blocks=table))
+    await queue.send(_card("update_card", "c1", blocks=table))
+    await queue.send(_card("close_card", "c1"))
+    await queue.send(_status("d1", "processing"))
+    await queue.send(_status("d1", "completed"))
+    assert parsed == []
+
+    await queue.send(_card("update_card", "c2", title="A"))
+    await queue.send(_card("update_card", "c2", size="large"))
+    assert len(parsed) == 2
+    await queue.close()
+
+
+async def test_sender_waits_above_high_watermark_until_low():
+    link = _Link()
+    queue = OutboundQueue(link, high_water=300, low_water=100)
+    await _stall(link, queue)
+    await queue.send(_text("a" * 100))
+    blocked = asyncio.create_task(queue.send(_text("b" * 200)))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    link.stalled.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    assert queue.stats()["waits"] == 1 and not queue.slow
+    await queue.close()
+
+
+async def test_slow_consumer_is_signalled_and_dropped():
+    link = _Link()
+    dropped = []
+    queue = OutboundQueue(link, high_water=100, low_water=10, slow_after=0.05,
+                          on_slow=lambda: dropped.append(True))
+    await _stall(link, queue)
+    await asyncio.wait_for(queue.send(_text("x" * 200)), timeout=1)
+
+    assert queue.slow and dropped == [True]
+    assert queue.stats()["queued_bytes"] == 0
+    await queue.send(_text("after"))  # discarded, returns at once
+    link.stalled.set()
+    await queue.close()
+    assert [m["payload"]["content"] for m in link.sent] == ["first"]
+
+
+async def test_flush_waits_for_the_queue_to_empty():
+    link = _Link()
+    queue = OutboundQueue(link)
+    await _stall(link, queue)
+    await queue.send(_text("queued"))
+    await queue.flush()
+    await asyncio.sleep(0)
+    assert link.flushes == 0  # still behind the stalled write
+
+    link.stalled.set()
+    await asyncio.sleep(0.01)
+    assert link.flushes == 1 and link.sent[-1]["payload"]["content"] == "queued"
+    await queue.close()
@@ -0,0 +1,135 @@
+"""Tests for local pre-extraction of uploaded documents."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from src import preextract as preextract_module
+from src.database import WorkspaceDB
+from src.documents import DocumentQueue
+from src.preextract import PreExtractor, detect_tables, parse_bbox_layout, preextract
+
+INVOICE_PAGE = """\
+ACME Pty Ltd                                        Invoice INV-0042
+12 Harbour St, Sydney                               Date: 2026-09-30
+
+Description                 Qty      Unit price      Amount
+Widget, large                 4          $25.00     $100.00
+Delivery                      1          $20.00      $20.00
+                                         Total      $120.00
+
+Thank you for your business.
+"""
+
+BBOX_LAYOUT = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
+"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title></title></head>
+<body>
+<doc>
+  <page width="595.276000" height="841.890000">
+    <flow>
+      <block xMin="56.7" yMin="57.1" xMax="160.2" yMax="84.3">
+        <line xMin="56.7" yMin="57.1" xMax="160.2" yMax="69.1">
+          <word xMin="56.7" yMin="57.1" xMax="90.1" yMax="69.1">ACME</word>
+          <word xMin="93.0" yMin="57.1" xMax="110.0" yMax="69.1">Pty</word>
+          <word xMin="113.0" yMin="57.1" xMax="130.0" yMax="69.1">Ltd</word>
+        </line>
+        <line xMin="56.7" yMin="72.3" xMax="160.2" yMax="84.3">
+          <word xMin="56.7" yMin="72.3" xMax="70.0" yMax="84.3">12</word>
+          <word xMin="73.0" yMin="72.3" xMax="120.0" yMax="84.3">Harbour &amp; Co</word>
+        </line>
+      </block>
+    </flow>
+  </page>
+  <page width="595.276000" height="841.890000"></page>
+</doc>
+</body>
+</html>
+"""
+
+
+def test_detect_tables_finds_column_aligned_rows():
+    [table] = detect_tables(INVOICE_PAGE, page=1)
+    assert table["page"] == 1 and table["columns"] == 4
+    assert table["rows"][0] == ["Description", "Qty", "Unit price", "Amount"]
+    assert table["rows"][1] == ["Widget, large", "4", "$25.00", "$100.00"]
+    assert table["rows"][-1] == ["Total", "$120.00"]
+
+
+def test_detect_tables_ignores_prose():
+    assert detect_tables("Dear customer,\nThanks for the order.\n\nRegards", page=1) == []
+
+
+def test_parse_bbox_layout():
+    first, second = parse_bbox_layout(BBOX_LAYOUT)
+    assert (first["page"], first["width"], first["height"]) == (1, 595.3, 841.9)
+    assert first["blocks"] == [{"bbox": [56.7, 57.1, 160.2, 84.3], "text": "ACME Pty Ltd\n12 Harbour & Co"}]
+    assert second["page"] == 2 and second["blocks"] == []
+
+
+def test_pdf_sidecar(tmp_path, monkeypatch):
+    def fake_pdftotext(path, *args):
+        return BBOX_LAYOUT if "-bbox-layout" in args else INVOICE_PAGE + "\f" + "Page two\n\f"
+
+    monkeypatch.setattr(preextract_module, "_pdftotext", fake_pdftotext)
+    summary = preextract(str(tmp_path / "a.pdf"), "application/pdf", "h1", str(tmp_path / "out"))
+
+    assert summary == {"pages": 2, "chars": len(INVOICE_PAGE) + 11, "tables": 1}
+    assert (tmp_path / "out" / "h1.txt").read_text().startswith("ACME Pty Ltd")
+    layout = json.loads((tmp_path / "out" / "h1.json").read_text())
+    assert layout["pages"] == 2 and layout["tables"][0]["columns"] == 4
+    assert layout["layout"][0]["blocks"][0]["text"].startswith("ACME")
+    assert not list((tmp_path / "out").glob("*.partial"))
+
+
+def test_scan_without_text_layer_has_no_sidecar(tmp_path, monkeypatch):
+    monkeypatch.setattr(preextract_module, "_pdftotext", lambda path, *args: "\f\f")
+    assert preextract(str(tmp_path / "scan.pdf"), "application/pdf", "h1", str(tmp_path)) is None
+    assert preextract(str(tmp_path / "photo.png"), "image/png", "h2", str(tmp_path)) is None
+    assert not list(tmp_path.iterdir())
+
+
+async def test_pool_extracts_once_per_content(tmp_path):
+    source = tmp_path / "rows.csv"
+    source.write_text("name,amount\nwidget,100\n")
+    doc = {"doc_id": "d1", "file_path": str(source), "mime_type": "text/csv", "content_hash": "h1"}
+    extractor = PreExtractor(tmp_path / "sidecars", workers=1)
+    try:
+        extractor.start(doc)
+        sidecar = await extractor.sidecar(doc)
+        assert sidecar.text_path.read_text() == source.read_text()
+        assert (sidecar.pages, sidecar.chars, sidecar.tables) == (1, len(source.read_text()), 0)
+
+        # Same content uploaded again: the cached sidecar, no pool round trip
+        extractor.close()
+        again = await extractor.sidecar({**doc, "doc_id": "d2"})
+        assert again == sidecar and extractor._pool is None
+    finally:
+        extractor.close()
+
+
+async def test_prompt_points_at_sidecar(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"))
+    await db.connect()
+    try:
+        source = tmp_path / "notes.txt"
+        source.write_text("Lease term: 12 months\n")
+        await db.create_document("d1", "notes.txt", "text/plain", str(source))
+        runtime = MagicMock()
+        runtime.send_to_client = AsyncMock()
+        runtime.run_document_session = AsyncMock(return_value="A lease.")
+        extractor = PreExtractor(tmp_path / "sidecars", workers=1)
+        queue = DocumentQueue(db, runtime, workers=1, preextractor=extractor)
+
+        await queue.enqueue("d1")
+        await queue.process(await db.claim_next_document())
+        extractor.close()
+
+        prompt = runtime.run_document_session.call_args.args[0]
+        assert str(tmp_path / "sidecars" / "d1.txt") in prompt
+        assert "pdftotext" not in prompt
+    finally:
+        await db.close()
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import sqlite3
 import time
 from pathlib import Path
 from unittest.mock import AsyncMock
@@ -246,6 +247,26 @@ async def test_flush_all_processes_everything(transcript_db, memory_db, memory_d
     assert len(rows) == 1
 
 
+async def test_flush_all_processes_in_bounded_batches(transcript_db, memory_db, memory_dir, monkeypatch):
+    """Large backlogs are split into MAX_OBSERVATIONS_PER_BATCH-sized Haiku calls."""
+    import src.memory.processor as proc_mod
+    monkeypatch.setattr(proc_mod, "MAX_OBSERVATIONS_PER_BATCH", 4)
+
+    client = _mock_client("NONE")
+    proc = ObservationProcessor(transcript_db, memory_db, client, memory_dir)
+    for i in range(10):
+        await _insert_observation(transcript_db, seq=i + 1, user_msg=f"msg {i}")
+
+    assert await proc.process_batch() == 4
+    await proc.flush_all()
+
+    assert client.messages.create.call_count == 3  # 4 + 4 + 2
+    unprocessed = await transcript_db.fetchall(
+        "SELECT * FROM observations WHERE processed = 0"
+    )
+    assert unprocessed == []
+
+
 # -- Test: Empty batch is a no-op -------------------------------------------
 
 async def test_empty_batch_is_noop(transcript_db, memory_db, memory_dir):
@@ -368,26 +389,20 @@ async def test_batch_insert_uses_executemany(transcript_db, memory_db, memory_di
 
 
 async def test_batch_insert_crash_no_duplicates(transcript_db, memory_db, memory_dir):
-    """T7.5: Simulated crash mid-batch does not produce partial learnings."""
+    """T7.5: A failure mid-batch does not produce partial learnings."""
     response = "FACT: Should not persist"
     client = _mock_client(response)
     proc = ObservationProcessor(transcript_db, memory_db, client, memory_dir)
 
     await _insert_observation(transcript_db)
 
-    # Monkey-patch executemany to fail after being called
-    original_executemany = memory_db.executemany
-    async def failing_executemany(sql, params):
-        raise RuntimeError("simulated crash")
-    memory_db.executemany = failing_executemany
+    # Learnings insert succeeds, then the actions insert fails in the same unit of work
+    client.messages.create.return_value = _make_message("FACT: Should not persist\nACTION: Follow up")
+    await memory_db.execute("DROP TABLE pending_actions")
 
-    # process_batch should not raise (it logs and returns on API errors,
-    # but executemany failure will propagate). Catch it here.
-    with pytest.raises(RuntimeError, match="simulated crash"):
+    with pytest.raises(sqlite3.OperationalError, match="pending_actions"):
         await proc.process_batch()
 
-    memory_db.executemany = original_executemany
-
     # No learnings should have been persisted
     rows = await memory_db.fetchall("SELECT * FROM learnings")
     assert len(rows) == 0
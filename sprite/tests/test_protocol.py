@@ -1,6 +1,8 @@
 """Tests for protocol type guards — state_sync, expanded canvas actions, optional fields."""
 
 import json
+from dataclasses import asdict
+
 import pytest
 
 from src.protocol import (
@@ -13,9 +15,36 @@ from src.protocol import (
     is_state_sync,
     parse_message,
     to_dict,
+    to_json,
+    use_orjson,
     AgentEvent,
     AgentEventPayload,
     AgentEventMeta,
+    BadgeBlock,
+    BlockDataPart,
+    CanvasCardSnapshot,
+    CanvasUpdate,
+    CanvasUpdatePayload,
+    CardInfo,
+    CardPosition,
+    ChatMessageInfo,
+    DocumentBlock,
+    HeadingBlock,
+    KeyValueBlock,
+    KeyValuePair,
+    MissionContext,
+    MissionMessage,
+    MissionPayload,
+    ProgressBlock,
+    SeparatorBlock,
+    StackInfo,
+    StateSyncChunk,
+    StateSyncChunkPayload,
+    StateSyncMessage,
+    StateSyncPayload,
+    SystemMessage,
+    SystemPayload,
+    TableBlock,
 )
 
 
@@ -228,3 +257,140 @@ class TestAgentEventMetaSerialization:
         )
         d = to_dict(event)
         assert "meta" not in d["payload"]
+
+
+# =============================================================================
+# Compiled encoders: byte-for-byte parity with the asdict-based serializer
+# =============================================================================
+
+def _legacy_strip_none(d):
+    for k in [k for k, v in d.items() if v is None]:
+        del d[k]
+    for v in d.values():
+        if isinstance(v, dict):
+            _legacy_strip_none(v)
+        elif isinstance(v, list):
+            for item in v:
+                if isinstance(item, dict):
+                    _legacy_strip_none(item)
+
+
+def _legacy_to_json(message) -> str:
+    """The serializer the compiled encoders replaced, kept as the reference."""
+    result = asdict(message)
+    _legacy_strip_none(result)
+    if message.type == "canvas_update" and message.payload.blocks is not None:
+        result["payload"]["blocks"] = [asdict(b) for b in message.payload.blocks]
+    if message.type == "agent_event" and "meta" in result["payload"]:
+        meta = result["payload"]["meta"]
+        if isinstance(meta, dict):
+            converted = {_snake_to_camel(k): v for k, v in meta.items() if v is not None}
+            result["payload"]["meta"] = converted if converted else None
+    _legacy_strip_none(result)
+    return json.dumps(result)
+
+
+def _blocks():
+    return [
+        HeadingBlock(id="h1", type="heading", text="Invoice — №42"),
+        KeyValueBlock(id="k1", type="key-value", pairs=[KeyValuePair("Vendor", "Ацме"), KeyValuePair("Total", "$1.5")]),
+        TableBlock(id="t1", type="table", columns=["a", "b"],
+                   rows=[{"a": 1, "b": None, "c": {"d": None, "e": [None, {"f": None}]}}]),
+        BadgeBlock(id="b1", type="badge", text="ok", variant="success"),
+        ProgressBlock(id="p1", type="progress", value=0.1 + 0.2),
+        SeparatorBlock(id="s1", type="separator"),
+        DocumentBlock(type="document", id="d1", mime_type="application/pdf", filename="a.pdf", blob="ab" * 32, size=9),
+    ]
+
+
+GOLDEN_MESSAGES = [
+    AgentEvent(type="agent_event", payload=AgentEventPayload(event_type="text", content="chunk \"quoted\"\n")),
+    AgentEvent(type="agent_event", payload=AgentEventPayload(
+        event_type="tool", content="x", meta=AgentEventMeta(extraction_id="e1")), request_id="r1"),
+    AgentEvent(type="agent_event", payload=AgentEventPayload(
+        event_type="text", content="x", meta=AgentEventMeta())),
+    CanvasUpdate(type="canvas_update", payload=CanvasUpdatePayload(
+        command="create_card", card_id="c1", title="Card", blocks=_blocks(), size="large",
+        tags=["a", "b"], headers=["x"], preview_rows=[["r", None, 1.5, {"k": None}]])),
+    CanvasUpdate(type="canvas_update", payload=CanvasUpdatePayload(command="close_card", card_id="c1")),
+    StateSyncMessage(type="state_sync", payload=StateSyncPayload(
+        stacks=[StackInfo(id="s1", name="One"), StackInfo(id="s2", name="Two", color="red")],
+        active_stack_id="s1",
+        cards=[
+            CardInfo(id="c1", stack_id="s1", title="T", blocks=_blocks(), size="medium",
+                     position=CardPosition(x=1.0, y=-2.5), z_index=3, summary="s", preview_rows=[[None]]),
+            CardInfo(id="c2", stack_id="s1", title="Stored", size="small",
+                     blocks=[{"id": "h", "type": "heading", "text": "t", "subtitle": None}],
+                     position=CardPosition(x=0, y=0), z_index=0),
+        ],
+        chat_history=[ChatMessageInfo(id="m1", role="user", content="hi", timestamp=1)],
+        revision=7, mode="delta", since_revision=5, deleted_card_ids=["c9"])),
+    StateSyncChunk(type="state_sync_chunk", payload=StateSyncChunkPayload(
+        sync_id="x", seq=1, cards=[], cards_sent=0, total_cards=0, done=True,
+        block_data=[BlockDataPart(card_id="c", block_id="d", offset=0, data="QUJD", final=True)])),
+    MissionMessage(type="mission", payload=MissionPayload(text="go", context=MissionContext(
+        stack_id="s1", canvas_state=[CanvasCardSnapshot(card_id="c", title="t", blocks=[{"a": None}])]))),
+    SystemMessage(type="system", payload=SystemPayload(event="error", message=None)),
+]
+
+
+class TestCompiledEncoders:
+    """to_json output is byte-identical to the asdict + _strip_none serializer."""
+
+    @pytest.mark.parametrize("message", GOLDEN_MESSAGES, ids=lambda m: m.type)
+    def test_byte_parity(self, message):
+        assert to_json(message) == _legacy_to_json(message)
+
+    def test_golden_agent_event(self):
+        event = AgentEvent(
+            type="agent_event", id="m1", timestamp=5,
+            payload=AgentEventPayload(event_type="text", content="é", meta=AgentEventMeta(session_id="s")),
+        )
+        assert to_json(event) == (
+            '{"type": "agent_event", "payload": {"event_type": "text", "content": "\\u00e9", '
+            '"meta": {"sessionId": "s"}}, "id": "m1", "timestamp": 5}'
+        )
+
+    def test_to_dict_returns_fresh_containers(self):
+        rows = [{"a": [1]}]
+        block = TableBlock(id="t", type="table", columns=["a"], rows=rows)
+        msg = CanvasUpdate(type="canvas_update", payload=CanvasUpdatePayload(
+            command="update_card", card_id="c", blocks=[block]))
+
+        to_dict(msg)["payload"]["blocks"][0]["rows"][0]["a"].append(2)
+
+        assert rows == [{"a": [1]}]
+
+    def test_non_dataclass_rejected(self):
+        with pytest.raises(TypeError):
+            to_dict({"type": "system"})
+
+    @pytest.mark.parametrize("message", GOLDEN_MESSAGES, ids=lambda m: m.type)
+    def test_orjson_same_json(self, message):
+        pytest.importorskip("orjson")
+        try:
+            assert use_orjson() is True
+            assert json.loads(to_json(message)) == json.loads(_legacy_to_json(message))
+        finally:
+            use_orjson(False)
+        assert to_json(message) == _legacy_to_json(message)
+
+
+class TestSlottedModel:
+    """Protocol classes carry no per-instance __dict__; value records are frozen."""
+
+    def test_no_instance_dict(self):
+        pair = KeyValuePair(label="a", value="b")
+        assert not hasattr(pair, "__dict__")
+        with pytest.raises(AttributeError):
+            pair.extra = 1
+
+    def test_frozen_records(self):
+        meta = AgentEventMeta(session_id="s")
+        with pytest.raises(AttributeError):
+            meta.session_id = "t"
+
+    def test_envelope_stays_mutable(self):
+        msg = SystemMessage(type="system", payload=SystemPayload(event="connected"))
+        msg.request_id = "r1"
+        assert is_protocol_message(to_dict(msg)) and to_dict(msg)["request_id"] == "r1"
@@ -0,0 +1,135 @@
+"""Tests for QueryStats instrumentation and the db_stats system message."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.database import WorkspaceDB, _NO_TIMER
+from src.gateway import SpriteGateway
+from src.query_stats import Histogram, QueryStats, is_busy_error, normalize_sql
+
+
+@pytest.fixture
+async def stats_db(tmp_path):
+    stats = QueryStats(slow_ms=10_000)
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"), stats=stats)
+    await db.connect()
+    yield db
+    await db.close()
+
+
+def _statements(stats: QueryStats, db: str = "workspace") -> dict[str, dict]:
+    return {s["sql"]: s for s in stats.snapshot()["databases"][db]["statements"]}
+
+
+# -- Normalization and histograms ---------------------------------------------
+
+def test_normalize_collapses_literals_and_in_lists():
+    a = normalize_sql("SELECT *  FROM cards\n WHERE card_id IN (?, ?, ?) AND size = 'large' LIMIT 10")
+    b = normalize_sql("SELECT * FROM cards WHERE card_id IN (?,?) AND size = 'small' LIMIT 5")
+    assert a == b == "SELECT * FROM cards WHERE card_id IN (?, ...) AND size = ? LIMIT ?"
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = Histogram()
+    for ms in (0.05, 0.3, 0.3, 4.0, 2000.0):
+        hist.record(ms)
+    d = hist.to_dict()
+    assert d["count"] == 5
+    assert d["buckets"]["0.1"] == 1
+    assert d["buckets"]["0.5"] == 2
+    assert d["buckets"]["inf"] == 1
+    assert d["p50_ms"] == 0.5
+    assert d["p99_ms"] == 2000.0
+
+
+def test_slow_queries_logged_above_threshold():
+    stats = QueryStats(slow_ms=50)
+    stats.record("memory", "SELECT 1", 10)
+    stats.record("memory", "SELECT 2", 75)
+    slow = stats.snapshot()["slow_queries"]
+    assert [(q["db"], q["sql"], q["ms"]) for q in slow] == [("memory", "SELECT ?", 75)]
+
+
+def test_busy_error_detection():
+    assert is_busy_error(sqlite3.OperationalError("database is locked"))
+    assert not is_busy_error(sqlite3.OperationalError("no such table: x"))
+    assert not is_busy_error(ValueError("locked"))
+
+
+# -- _BaseDB integration ------------------------------------------------------
+
+async def test_statements_recorded_per_database(stats_db):
+    await stats_db.create_stack("s1", "One")
+    await stats_db.create_stack("s2", "Two")
+    await stats_db.list_stacks()
+
+    statements = _statements(stats_db.stats)
+    inserts = [s for sql, s in statements.items() if sql.startswith("INSERT INTO stacks")]
+    assert inserts and inserts[0]["count"] == 2
+    assert statements["SELECT * FROM stacks WHERE status = ? ORDER BY sort_order"]["count"] == 1
+    assert statements["COMMIT"]["count"] >= 2
+
+
+async def test_transaction_records_lock_wait(stats_db):
+    async with stats_db.transaction():
+        await stats_db.execute("INSERT INTO chat_messages (role, content, timestamp) VALUES ('user', 'x', 0)")
+    entry = stats_db.stats.snapshot()["databases"]["workspace"]
+    assert entry["lock_wait"]["count"] == 1
+    assert "BEGIN IMMEDIATE" in _statements(stats_db.stats)
+
+
+async def test_busy_errors_counted(tmp_path):
+    path = str(tmp_path / "workspace.db")
+    stats = QueryStats()
+    async with WorkspaceDB(db_path=path, stats=stats) as db:
+        await db.execute("PRAGMA busy_timeout=0")
+        blocker = sqlite3.connect(path)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                await db.execute("INSERT INTO chat_messages (role, content, timestamp) VALUES ('user', 'x', 0)")
+        finally:
+            blocker.rollback()
+            blocker.close()
+    assert stats.snapshot()["databases"]["workspace"]["busy_errors"] == 1
+
+
+async def test_disabled_stats_use_shared_noop_timer(tmp_path):
+    async with WorkspaceDB(db_path=str(tmp_path / "workspace.db")) as db:
+        assert db.stats is None
+        assert db._timed("SELECT 1") is _NO_TIMER
+        await db.list_stacks()
+
+
+# -- db_stats over the system channel ----------------------------------------
+
+async def test_gateway_replies_to_db_stats(stats_db):
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), query_stats=stats_db.stats)
+    await stats_db.list_stacks()
+
+    await gateway.route(json.dumps({
+        "type": "system", "id": "m1", "timestamp": 0, "request_id": "req-1", "payload": {"event": "db_stats"},
+    }))
+
+    replies = [json.loads(c.args[0]) for c in send.call_args_list]
+    stats_reply = [r for r in replies if r["payload"].get("event") == "db_stats"]
+    assert len(stats_reply) == 1
+    assert stats_reply[0]["request_id"] == "req-1"
+    dump = json.loads(stats_reply[0]["payload"]["message"])
+    assert "workspace" in dump["databases"]
+
+
+async def test_gateway_db_stats_disabled_sends_error():
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock())
+    await gateway.route(json.dumps({
+        "type": "system", "id": "req-2", "timestamp": 0, "payload": {"event": "db_stats"},
+    }))
+    replies = [json.loads(c.args[0]) for c in send.call_args_list]
+    assert replies[-1]["payload"]["event"] == "error"
@@ -202,41 +202,26 @@ async def test_gateway_handle_message_called_for_each_mission():
     assert mock_runtime.handle_message.await_count == 2
 
 
-async def test_heartbeat_shares_mission_lock():
-    """Heartbeat and mission share the same lock -- they serialize."""
-    events: list[tuple[str, str, float]] = []
+async def test_heartbeat_does_not_wait_for_mission():
+    """Heartbeat is control traffic: it is answered while a mission holds the lock."""
     sent: list[str] = []
 
     async def mock_send(msg: str) -> None:
         sent.append(msg)
 
     gw = SpriteGateway(send_fn=mock_send)
+    release = asyncio.Event()
 
-    original_mission = gw._handle_mission
-    original_heartbeat = gw._handle_heartbeat
+    async def blocked_mission(msg, req_id):
+        await release.wait()
 
-    async def slow_mission(msg, req_id):
-        events.append(("mission", "start", asyncio.get_event_loop().time()))
-        await asyncio.sleep(0.1)
-        await original_mission(msg, req_id)
-        events.append(("mission", "end", asyncio.get_event_loop().time()))
+    gw._handle_mission = blocked_mission
+    mission = asyncio.create_task(gw.route(_msg("mission", {"text": "do work"})))
+    await asyncio.sleep(0)
+    assert gw.mission_lock.locked()
 
-    async def slow_heartbeat(msg, req_id):
-        events.append(("heartbeat", "start", asyncio.get_event_loop().time()))
-        await asyncio.sleep(0.05)
-        await original_heartbeat(msg, req_id)
-        events.append(("heartbeat", "end", asyncio.get_event_loop().time()))
-
-    gw._handle_mission = slow_mission
-    gw._handle_heartbeat = slow_heartbeat
+    await asyncio.wait_for(gw.route(_msg("heartbeat", {})), timeout=1)
+    assert json.loads(sent[-1])["payload"]["message"] == "heartbeat_received"
 
-    mission_msg = _msg("mission", {"text": "do work"})
-    heartbeat_msg = _msg("heartbeat", {})
-
-    await asyncio.gather(gw.route(mission_msg), gw.route(heartbeat_msg))
-
-    assert len(events) == 4
-    # Second handler starts after first ends
-    first_end = events[1][2]
-    second_start = events[2][2]
-    assert second_start >= first_end, "Heartbeat and mission did not serialize"
+    release.set()
+    await mission
@@ -0,0 +1,144 @@
+"""Tests for online snapshots (SQLite backup API) and restore."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from src.database import MemoryDB, WorkspaceDB
+from src.snapshot import SnapshotManager
+
+
+@pytest.fixture
+async def workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"), read_pool_size=1, group_commit_ms=5)
+    await db.connect()
+    yield db
+    await db.close()
+
+
+@pytest.fixture
+def manager(tmp_path, workspace_db):
+    return SnapshotManager([workspace_db], directory=tmp_path / "snapshots", keep=2)
+
+
+def _stack_names(path) -> list[str]:
+    conn = sqlite3.connect(str(path))
+    try:
+        return [r[0] for r in conn.execute("SELECT name FROM stacks ORDER BY name")]
+    finally:
+        conn.close()
+
+
+async def test_snapshot_copies_committed_and_pending_writes(workspace_db, manager):
+    await workspace_db.create_stack("s1", "Alpha")  # still in the group-commit window
+
+    path = await manager.snapshot(workspace_db)
+
+    assert path is not None and path.name.startswith("workspace-")
+    assert _stack_names(path) == ["Alpha"]
+    conn = sqlite3.connect(str(path))
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    conn.close()
+    assert not list(manager.directory.glob("*.partial"))
+
+
+async def test_snapshot_skipped_when_unchanged(workspace_db, manager):
+    await workspace_db.create_stack("s1", "Alpha")
+    assert await manager.snapshot(workspace_db) is not None
+    assert await manager.snapshot(workspace_db) is None
+    assert await manager.snapshot(workspace_db, force=True) is not None
+
+    await workspace_db.create_stack("s2", "Beta")
+    assert await manager.run_once() != []
+
+
+async def test_retention_keeps_newest(workspace_db, manager):
+    taken = [await manager.snapshot(workspace_db, force=True) for _ in range(4)]
+    assert manager.snapshots(workspace_db) == taken[-2:]
+
+
+async def test_writes_proceed_during_snapshot(tmp_path, workspace_db):
+    await workspace_db.executemany(
+        "INSERT INTO chat_messages (role, content, timestamp) VALUES (?, ?, ?)",
+        [("user", "x" * 2000, 0.0) for _ in range(3000)],
+    )
+    await workspace_db.flush()
+    manager = SnapshotManager([workspace_db], directory=tmp_path / "snaps", pages_per_step=8)
+
+    snapshot = asyncio.create_task(manager.snapshot(workspace_db))
+    writes = 0
+    while not snapshot.done():
+        await workspace_db.add_chat_message("agent", "during snapshot")
+        writes += 1
+        await asyncio.sleep(0)
+    path = await snapshot
+
+    assert writes > 1
+    conn = sqlite3.connect(str(path))
+    count = conn.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0]
+    conn.close()
+    assert 3000 <= count <= 3000 + writes
+
+
+async def test_restore_replaces_live_contents(workspace_db, manager):
+    await workspace_db.create_stack("s1", "Alpha")
+    path = await manager.snapshot(workspace_db)
+    await workspace_db.create_stack("s2", "Beta")
+    await workspace_db.rename_stack("s1", "Renamed")
+    await workspace_db.flush()
+
+    await manager.restore(workspace_db, path)
+
+    stacks = await workspace_db.list_all_stacks()  # served by the pooled reader
+    assert [s["name"] for s in stacks] == ["Alpha"]
+    await workspace_db.create_stack("s3", "Gamma")
+    assert len(await workspace_db.list_all_stacks()) == 2
+
+
+async def test_snapshot_is_synced_before_rename(workspace_db, manager, monkeypatch):
+    events = []
+    monkeypatch.setattr("src.snapshot.os.fsync", lambda fd: events.append("fsync"))
+    real_replace = os.replace
+    monkeypatch.setattr("src.snapshot.os.replace", lambda a, b: events.append("replace") or real_replace(a, b))
+
+    await manager.snapshot(workspace_db, force=True)
+    assert events == ["fsync", "replace", "fsync"]  # the file, the rename, then its directory
+
+
+async def test_restore_migrates_older_snapshot(tmp_path, workspace_db, manager):
+    class OldWorkspaceDB(WorkspaceDB):
+        _migrations = tuple(m for m in WorkspaceDB._migrations if m.version <= 4)
+
+    async with OldWorkspaceDB(db_path=str(tmp_path / "old.db")) as old:
+        await old.create_stack("s1", "Alpha")
+        path = await SnapshotManager([old], directory=tmp_path / "old-snapshots").snapshot(old)
+
+    await manager.restore(workspace_db, path)
+
+    columns = {c["name"] for c in await workspace_db.fetchall("PRAGMA table_info(documents)")}
+    assert {"content_hash", "attempts"} <= columns
+    row = await workspace_db.fetchone("PRAGMA user_version")
+    assert row["user_version"] == workspace_db.schema_version
+    assert [s["name"] for s in await workspace_db.list_all_stacks()] == ["Alpha"]
+
+
+async def test_restore_rejects_missing_snapshot(workspace_db, manager, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        await manager.restore(workspace_db, tmp_path / "nope.db")
+
+
+async def test_snapshot_memory_db_with_fts(tmp_path):
+    async with MemoryDB(db_path=str(tmp_path / "memory.db")) as db:
+        await db.execute(
+            "INSERT INTO learnings (created_at, type, content) VALUES (0, 'FACT', 'likes tea')",
+        )
+        manager = SnapshotManager([db], directory=tmp_path / "snaps")
+        path = await manager.snapshot(db)
+    conn = sqlite3.connect(str(path))
+    hits = conn.execute("SELECT content FROM learnings_fts WHERE learnings_fts MATCH 'tea'").fetchall()
+    conn.close()
+    assert hits == [("likes tea",)]
@@ -1,13 +1,21 @@
-"""Tests for sprite state_sync — workspace state sent on new connections."""
+"""Tests for sprite state_sync — full, delta, chunked and cached workspace state for the browser."""
 
 import json
 import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from src.database import WorkspaceDB
-from src.protocol import is_state_sync, to_dict
-from src.state_sync import build_state_sync_message, send_state_sync
+from src.gateway import SpriteGateway
+from src.protocol import is_state_sync, is_state_sync_chunk, to_dict, to_json
+from src.state_sync import (
+    StateSyncCache,
+    build_state_sync_json,
+    build_state_sync_message,
+    send_state_sync,
+    send_state_sync_chunked,
+)
 
 
 @pytest.fixture
@@ -306,3 +314,448 @@ async def test_state_sync_template_fields_none_when_absent(workspace_db):
     assert card.tags is None
     assert card.headers is None
     assert card.preview_rows is None
+
+
+# -- Delta sync against the revision log ---------------------------------------
+
+
+async def test_full_sync_reports_revision(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=1)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=2)
+
+    msg = await build_state_sync_message(workspace_db)
+
+    assert msg.payload.mode == "full"
+    assert msg.payload.revision == (await workspace_db.sync_window())[0] > 0
+    assert msg.payload.deleted_card_ids is None
+
+
+async def test_delta_sync_returns_only_changed_cards(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=1)
+    cards = await _seed_cards(workspace_db, stacks[0]["id"], count=3)
+    first = await build_state_sync_message(workspace_db)
+
+    await workspace_db.update_card_content(cards[0]["card_id"], [{"id": "b", "type": "text", "content": "new"}])
+    await workspace_db.archive_card(cards[1]["card_id"])
+    msg = await build_state_sync_message(workspace_db, since_revision=first.payload.revision)
+
+    assert msg.payload.mode == "delta"
+    assert msg.payload.since_revision == first.payload.revision
+    assert msg.payload.revision > first.payload.revision
+    assert [c.id for c in msg.payload.cards] == [cards[0]["card_id"]]
+    assert msg.payload.cards[0].blocks[0]["content"] == "new"
+    assert msg.payload.deleted_card_ids == [cards[1]["card_id"]]
+    assert [s.id for s in msg.payload.stacks] == [stacks[0]["id"]]
+    assert msg.payload.chat_history == []
+    assert is_state_sync(to_dict(msg))
+
+
+async def test_delta_sync_at_current_revision_is_empty(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=1)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=2)
+    first = await build_state_sync_message(workspace_db)
+
+    msg = await build_state_sync_message(workspace_db, since_revision=first.payload.revision)
+
+    assert msg.payload.mode == "delta"
+    assert msg.payload.revision == first.payload.revision
+    assert msg.payload.cards == [] and msg.payload.deleted_card_ids == []
+
+
+async def test_delta_sync_archived_stack_tombstones_its_cards(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=2)
+    doomed = await _seed_cards(workspace_db, stacks[1]["id"], count=2)
+    first = await build_state_sync_message(workspace_db)
+
+    await workspace_db.archive_stack(stacks[1]["id"])
+    msg = await build_state_sync_message(workspace_db, since_revision=first.payload.revision)
+
+    assert [s.id for s in msg.payload.stacks] == [stacks[0]["id"]]
+    assert msg.payload.deleted_card_ids == sorted(c["card_id"] for c in doomed)
+
+
+async def test_delta_sync_resends_chat_window_when_chat_changed(workspace_db):
+    await _seed_stacks(workspace_db, count=1)
+    await _seed_chat(workspace_db, count=3)
+    first = await build_state_sync_message(workspace_db)
+
+    await workspace_db.add_chat_message("user", "after sync")
+    msg = await build_state_sync_message(workspace_db, since_revision=first.payload.revision)
+
+    assert [m.content for m in msg.payload.chat_history][-1] == "after sync"
+    assert len(msg.payload.chat_history) == 4
+
+
+async def test_compacted_log_falls_back_to_full_sync(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=1)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=3)
+    first = await build_state_sync_message(workspace_db)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=2)
+
+    # Trim the log past the client's revision
+    await workspace_db.execute("DELETE FROM sync_log WHERE id <= ?", (first.payload.revision + 1,))
+    msg = await build_state_sync_message(workspace_db, since_revision=first.payload.revision)
+
+    assert msg.payload.mode == "full"
+    assert len(msg.payload.cards) == 5
+
+
+async def test_revision_ahead_of_database_falls_back_to_full_sync(workspace_db):
+    """A revision from another database (e.g. before a restore) gets a full sync."""
+    stacks = await _seed_stacks(workspace_db, count=1)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=1)
+
+    msg = await build_state_sync_message(workspace_db, since_revision=10_000)
+
+    assert msg.payload.mode == "full"
+    assert len(msg.payload.cards) == 1
+
+
+async def test_send_state_sync_echoes_request_id(workspace_db):
+    sent = []
+
+    async def mock_send(data: str) -> None:
+        sent.append(json.loads(data))
+
+    await send_state_sync(workspace_db, mock_send, since_revision=0, request_id="req-9")
+
+    assert sent[0]["request_id"] == "req-9"
+    assert sent[0]["payload"]["mode"] == "delta"
+
+
+# -- Raw JSON pass-through -----------------------------------------------------
+
+
+async def _seed_varied_cards(db: WorkspaceDB) -> str:
+    stacks = await _seed_stacks(db, count=2)
+    await _seed_cards(db, stacks[1]["id"], count=2)
+    await db.upsert_card(
+        card_id="full-card", stack_id=stacks[0]["id"], title='Quotes " and \\ ünïcode',
+        blocks=[{"id": "h", "type": "heading", "text": "Invoice", "subtitle": None},
+                {"id": "t", "type": "table", "columns": ["a"], "rows": [[1.5, None]]}],
+        size="large", position_x=12.25, position_y=-3.0, z_index=4,
+        card_type="table", summary="s", tags=["x", "y"], color="#fff",
+        type_badge="Invoice", date="2026-01-01", value="$1", trend="+2%",
+        trend_direction="up", author="a", read_time="1 min",
+        headers=["h1"], preview_rows=[["r", None]],
+    )
+    await _seed_chat(db, count=3)
+    return stacks[0]["id"]
+
+
+@pytest.mark.parametrize("delta", [False, True])
+async def test_json_builder_matches_dataclass_encoding(workspace_db, delta):
+    await _seed_varied_cards(workspace_db)
+    since = None
+    if delta:
+        since = (await build_state_sync_message(workspace_db)).payload.revision
+        await workspace_db.update_card_position("full-card", 1.0, 2.0, 9)
+        await workspace_db.add_chat_message("user", "later")
+
+    expected = to_dict(await build_state_sync_message(workspace_db, since))
+    actual = json.loads(await build_state_sync_json(workspace_db, since, request_id="r1"))
+
+    assert actual["request_id"] == "r1"
+    assert is_state_sync(actual)
+    for key in ("id", "timestamp", "request_id"):
+        expected.pop(key, None)
+        actual.pop(key)
+    assert actual == expected
+
+
+async def test_json_builder_is_byte_identical_to_to_json(workspace_db):
+    await _seed_varied_cards(workspace_db)
+
+    msg = await build_state_sync_message(workspace_db)
+    raw = await build_state_sync_json(workspace_db)
+    msg.id, msg.timestamp = json.loads(raw)["id"], json.loads(raw)["timestamp"]
+
+    assert raw == to_json(msg)
+
+
+async def test_json_builder_splices_stored_blocks(workspace_db):
+    stack_id = await _seed_varied_cards(workspace_db)
+    stored = await workspace_db.fetchone("SELECT blocks FROM cards WHERE card_id = 'full-card'")
+
+    raw = await build_state_sync_json(workspace_db)
+
+    assert stored["blocks"] in raw
+    assert "subtitle" not in stored["blocks"]  # None keys dropped on write
+    assert stack_id in raw
+
+
+# -- Chunked sync ----------------------------------------------------------------
+
+
+async def _chunked_frames(db: WorkspaceDB, **kwargs) -> list[dict]:
+    sent: list[str] = []
+
+    async def capture(data: str) -> None:
+        sent.append(data)
+
+    await send_state_sync_chunked(db, capture, **kwargs)
+    return [json.loads(d) for d in sent]
+
+
+async def test_chunked_send_holds_no_pooled_reader(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "pooled.db"), read_pool_size=1)
+    await db.connect()
+    try:
+        stacks = await _seed_stacks(db, 3)
+        for stack in stacks:
+            await _seed_cards(db, stack["id"], 5)
+        idle_during_send: list[int] = []
+
+        async def slow_client(data: str) -> None:
+            idle_during_send.append(db._idle_readers.qsize())
+
+        await send_state_sync_chunked(db, slow_client, frame_bytes=512)
+        assert len(idle_during_send) > 2
+        assert set(idle_during_send) == {1}  # the reader is back in the pool at every send
+    finally:
+        await db.close()
+
+
+def _reassemble(frames: list[dict]) -> dict[str, dict]:
+    """Apply frames the way the frontend does; returns cards by id."""
+    cards = {c["id"]: c for c in frames[0]["payload"]["cards"]}
+    data: dict[tuple[str, str], str] = {}
+    for frame in frames[1:]:
+        for c in frame["payload"]["cards"]:
+            cards[c["id"]] = c
+        for part in frame["payload"].get("block_data", []):
+            key = (part["card_id"], part["block_id"])
+            assert part["offset"] == len(data.get(key, ""))
+            data[key] = data.get(key, "") + part["data"]
+    for (card_id, block_id), value in data.items():
+        for block in cards[card_id]["blocks"]:
+            if block["id"] == block_id:
+                block["data"] = value
+    return cards
+
+
+async def _seed_document_cards(db: WorkspaceDB, others: int = 5) -> list[dict]:
+    stacks = await _seed_stacks(db, count=2)
+    await db.upsert_card(
+        card_id="active-doc", stack_id=stacks[0]["id"], title="Active doc",
+        blocks=[{"id": "d1", "type": "document", "data": "A" * 10_000,
+                 "mime_type": "application/pdf", "filename": "a.pdf"}],
+    )
+    await _seed_cards(db, stacks[0]["id"], count=2)
+    for i in range(others):
+        await db.upsert_card(
+            card_id=f"other-{i}", stack_id=stacks[1]["id"], title=f"Other {i}",
+            blocks=[{"id": f"d{i}", "type": "document", "data": "B" * 3_000,
+                     "mime_type": "application/pdf", "filename": f"{i}.pdf"}],
+        )
+    return stacks
+
+
+async def test_chunked_first_frame_holds_active_stack_skeletons(workspace_db):
+    stacks = await _seed_document_cards(workspace_db)
+
+    frames = await _chunked_frames(workspace_db, frame_bytes=2048)
+
+    first = frames[0]
+    assert is_state_sync(first)
+    assert first["payload"]["total_cards"] == 8
+    assert {c["stack_id"] for c in first["payload"]["cards"]} == {stacks[0]["id"]}
+    doc = next(c for c in first["payload"]["cards"] if c["id"] == "active-doc")
+    assert doc["blocks"][0]["data"] == ""
+    assert len(frames[0]["payload"]["cards"]) == 3
+
+
+async def test_chunked_frames_reassemble_to_full_state(workspace_db):
+    await _seed_document_cards(workspace_db)
+
+    frames = await _chunked_frames(workspace_db, frame_bytes=2048, request_id="req-1")
+
+    chunks = frames[1:]
+    assert all(is_state_sync_chunk(f) for f in chunks)
+    assert [f["payload"]["seq"] for f in chunks] == list(range(len(chunks)))
+    assert [f["payload"]["done"] for f in chunks] == [False] * (len(chunks) - 1) + [True]
+    assert chunks[-1]["payload"]["cards_sent"] == 8
+    assert all(f["request_id"] == "req-1" for f in frames)
+    # Block data is sliced to the frame budget
+    assert all(len(json.dumps(f["payload"])) < 2048 + 512 for f in chunks)
+
+    expected = json.loads(await build_state_sync_json(workspace_db))["payload"]["cards"]
+    assert _reassemble(frames) == {c["id"]: c for c in expected}
+
+
+async def test_chunked_first_frame_independent_of_other_stacks(workspace_db, tmp_path):
+    await _seed_document_cards(workspace_db, others=3)
+    small = (await _chunked_frames(workspace_db))[0]
+
+    async with WorkspaceDB(db_path=str(tmp_path / "big.db")) as big_db:
+        await _seed_document_cards(big_db, others=200)
+        big = (await _chunked_frames(big_db))[0]
+
+    assert [c["title"] for c in small["payload"]["cards"]] == [c["title"] for c in big["payload"]["cards"]]
+    assert abs(len(json.dumps(small)) - len(json.dumps(big))) < 200
+
+
+async def test_chunked_delta_sends_tombstones_in_first_frame(workspace_db):
+    await _seed_document_cards(workspace_db)
+    since = (await build_state_sync_message(workspace_db)).payload.revision
+    await workspace_db.archive_card("other-1")
+    await workspace_db.update_card_position("other-2", 5.0, 5.0, 1)
+
+    frames = await _chunked_frames(workspace_db, since_revision=since)
+
+    first = frames[0]["payload"]
+    assert first["mode"] == "delta"
+    assert first["deleted_card_ids"] == ["other-1"]
+    assert first["total_cards"] == 1 and first["cards"] == []
+    assert [c["id"] for c in frames[1]["payload"]["cards"]] == ["other-2"]
+    assert frames[-1]["payload"]["done"] is True
+
+
+async def test_gateway_serves_chunked_request(workspace_db):
+    await _seed_document_cards(workspace_db)
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), workspace_db=workspace_db)
+    await workspace_db.add_chat_message("user", "hi")  # skip the welcome
+
+    await gateway.route(json.dumps({
+        "type": "state_sync_request", "id": "m1", "timestamp": 0, "request_id": "r1",
+        "payload": {"chunked": True},
+    }))
+
+    sent = [json.loads(c.args[0]) for c in send.call_args_list]
+    assert sent[0]["type"] == "state_sync" and sent[0]["payload"]["sync_id"]
+    assert sent[-1]["type"] == "state_sync_chunk" and sent[-1]["payload"]["done"] is True
+
+
+# -- Serialized state cache ----------------------------------------------------
+
+
+def _without_envelope(data: str) -> dict:
+    msg = json.loads(data)
+    del msg["id"], msg["timestamp"]
+    return msg
+
+
+def _no_reads(db: WorkspaceDB):
+    """Patch every WorkspaceDB read path to fail the test if touched."""
+    boom = MagicMock(side_effect=AssertionError("cache hit touched the database"))
+    return patch.multiple(db, fetchone=boom, fetchall=boom, iterate=boom)
+
+
+async def test_cached_full_sync_matches_uncached(workspace_db):
+    await _seed_varied_cards(workspace_db)
+    await _seed_document_cards(workspace_db)
+    await _seed_chat(workspace_db, count=3)
+    cache = StateSyncCache(workspace_db)
+
+    cached = await build_state_sync_json(workspace_db, cache=cache)
+    uncached = await build_state_sync_json(workspace_db)
+
+    assert _without_envelope(cached) == _without_envelope(uncached)
+    assert cache.misses == 1
+
+
+async def test_repeat_sync_without_writes_skips_database(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=2)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=3)
+    cache = StateSyncCache(workspace_db)
+    first = await build_state_sync_json(workspace_db, cache=cache)
+    revision = json.loads(first)["payload"]["revision"]
+
+    with _no_reads(workspace_db):
+        again = await build_state_sync_json(workspace_db, cache=cache, request_id="r2")
+        current = await build_state_sync_json(workspace_db, since_revision=revision, cache=cache)
+
+    assert _without_envelope(again)["payload"] == _without_envelope(first)["payload"]
+    delta = json.loads(current)["payload"]
+    assert delta["mode"] == "delta" and delta["cards"] == [] and delta["deleted_card_ids"] == []
+    assert cache.hits == 2 and cache.misses == 1
+
+
+async def test_card_write_rebuilds_only_its_stack(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=2)
+    cards = await _seed_cards(workspace_db, stacks[0]["id"], count=2)
+    await _seed_cards(workspace_db, stacks[1]["id"], count=2)
+    cache = StateSyncCache(workspace_db)
+    before = await cache.state()
+
+    await workspace_db.update_card_content(cards[0]["card_id"], [{"id": "b", "type": "text", "content": "new"}])
+    assert cache.current is None
+    after = await cache.state()
+
+    assert after.cards[stacks[1]["id"]] is before.cards[stacks[1]["id"]]
+    assert after.cards[stacks[0]["id"]] is not before.cards[stacks[0]["id"]]
+    assert after.chat is before.chat and after.stacks is before.stacks
+    assert after.revision > before.revision
+    assert '"new"' in await build_state_sync_json(workspace_db, cache=cache)
+
+
+async def test_chat_and_stack_writes_invalidate_their_pieces(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=2)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=1)
+    cache = StateSyncCache(workspace_db)
+    before = await cache.state()
+
+    await workspace_db.add_chat_message("user", "fresh")
+    mid = await cache.state()
+    assert mid.chat[-1]["content"] == "fresh"
+    assert mid.cards[stacks[0]["id"]] is before.cards[stacks[0]["id"]]
+
+    await workspace_db.archive_stack(stacks[0]["id"])
+    after = await cache.state()
+    assert [s["id"] for s in after.stacks] == [stacks[1]["id"]]
+    assert after.chat is mid.chat
+
+
+async def test_archive_card_invalidates(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=1)
+    cards = await _seed_cards(workspace_db, stacks[0]["id"], count=2)
+    cache = StateSyncCache(workspace_db)
+    await cache.state()
+
+    await workspace_db.archive_card(cards[0]["card_id"])
+    payload = json.loads(await build_state_sync_json(workspace_db, cache=cache))["payload"]
+
+    assert [c["id"] for c in payload["cards"]] == [cards[1]["card_id"]]
+
+
+async def test_write_during_build_is_not_cached(workspace_db):
+    stacks = await _seed_stacks(workspace_db, count=1)
+    await _seed_cards(workspace_db, stacks[0]["id"], count=1)
+    cache = StateSyncCache(workspace_db)
+    real_history = workspace_db.get_chat_history
+
+    async def history_then_write(limit: int = 100):
+        rows = await real_history(limit)
+        await workspace_db.upsert_card("late", stacks[0]["id"], "Late", [])
+        return rows
+
+    with patch.object(workspace_db, "get_chat_history", history_then_write):
+        await cache.state()
+
+    assert cache.current is None
+    assert "late" in {c.card_id for c in (await cache.state()).cards[stacks[0]["id"]]}
+
+
+async def test_cached_chunked_frames_match_uncached(workspace_db):
+    await _seed_document_cards(workspace_db)
+    cache = StateSyncCache(workspace_db)
+    await cache.state()
+
+    with patch.object(workspace_db, "iterate", MagicMock(side_effect=AssertionError("scanned cards"))):
+        cached = await _chunked_frames(workspace_db, frame_bytes=4096, cache=cache)
+    uncached = await _chunked_frames(workspace_db, frame_bytes=4096)
+
+    assert _reassemble(cached) == _reassemble(uncached)
+    assert cached[0]["payload"]["cards"] == uncached[0]["payload"]["cards"]
+    assert cached[-1]["payload"]["done"] is True
+
+
+async def test_snapshot_restore_invalidates(workspace_db):
+    await _seed_stacks(workspace_db, count=1)
+    cache = StateSyncCache(workspace_db)
+    await cache.state()
+
+    workspace_db._contents_replaced()
+
+    assert cache.current is None and cache._cards == {}
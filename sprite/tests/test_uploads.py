@@ -0,0 +1,239 @@
+"""Tests for chunked, resumable uploads (file_upload_begin/chunk/commit)."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import tracemalloc
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.blobs import BlobStore
+from src.database import WorkspaceDB
+from src.gateway import SpriteGateway
+from src.protocol import is_file_upload_ack
+from src.uploads import UploadError, UploadStore
+
+CHUNK = 256 * 1024
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    return UploadStore(tmp_path / "partial")
+
+
+@pytest.fixture
+async def workspace_db(tmp_path):
+    db = WorkspaceDB(db_path=str(tmp_path / "workspace.db"))
+    await db.connect()
+    await db.create_stack("s1", "Stack")
+    yield db
+    await db.close()
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def _sent(send: AsyncMock) -> list[dict]:
+    return [json.loads(c.args[0]) for c in send.call_args_list]
+
+
+def _msg(msg_type: str, request_id: str, **payload) -> str:
+    return json.dumps({"type": msg_type, "id": request_id, "timestamp": 0, "request_id": request_id,
+                       "payload": payload})
+
+
+# -- UploadStore -----------------------------------------------------------------
+
+
+def test_chunks_stream_to_disk_and_hash(uploads):
+    data = os.urandom(3 * CHUNK + 100)
+    assert uploads.begin("u1", "a.pdf", "application/pdf", len(data)) == 0
+    offset = 0
+    while offset < len(data):
+        offset = uploads.write_chunk("u1", offset, _b64(data[offset:offset + CHUNK]))
+
+    done = uploads.commit("u1", hashlib.sha256(data).hexdigest())
+    assert done.digest == hashlib.sha256(data).hexdigest() and done.size == len(data)
+    assert done.path.read_bytes() == data
+
+
+def test_resend_of_acked_chunk_is_ignored(uploads):
+    uploads.begin("u1", "a.pdf", "application/pdf", 10)
+    assert uploads.write_chunk("u1", 0, _b64(b"01234")) == 5
+    assert uploads.write_chunk("u1", 0, _b64(b"01234")) == 5  # ack was lost, browser resent
+    with pytest.raises(UploadError):
+        uploads.write_chunk("u1", 7, _b64(b"789"))
+    assert uploads.write_chunk("u1", 5, _b64(b"56789")) == 10
+
+
+def test_resume_after_restart_rebuilds_hash(tmp_path, uploads):
+    data = b"x" * 1000 + b"y" * 1000
+    uploads.begin("u1", "a.pdf", "application/pdf", len(data))
+    uploads.write_chunk("u1", 0, _b64(data[:1000]))
+
+    restarted = UploadStore(uploads.directory)
+    assert restarted.begin("u1", "a.pdf", "application/pdf", len(data)) == 1000
+    restarted.write_chunk("u1", 1000, _b64(data[1000:]))
+    assert restarted.commit("u1").digest == hashlib.sha256(data).hexdigest()
+
+
+def test_rejects_bad_input(uploads):
+    with pytest.raises(UploadError):
+        uploads.begin("../escape", "a.pdf", "application/pdf", 10)
+    with pytest.raises(UploadError):
+        uploads.begin("u1", "a.pdf", "application/pdf", 100 * 1024 * 1024)
+    uploads.begin("u1", "a.pdf", "application/pdf", 4)
+    with pytest.raises(UploadError):
+        uploads.write_chunk("u1", 0, "!!not base64!!")
+    with pytest.raises(UploadError):
+        uploads.write_chunk("u1", 0, _b64(b"too long"))
+    with pytest.raises(UploadError):
+        uploads.commit("u1")  # incomplete
+    uploads.write_chunk("u1", 0, _b64(b"abcd"))
+    with pytest.raises(UploadError):
+        uploads.commit("u1", 1234)  # not a string: rejected, the upload is kept
+    with pytest.raises(UploadError):
+        uploads.commit("u1", "0" * 64)
+    assert not list(uploads.directory.iterdir())  # checksum mismatch discards the upload
+
+
+def test_prune_removes_abandoned_uploads(uploads):
+    uploads.begin("old", "a.pdf", "application/pdf", 10)
+    uploads.begin("new", "b.pdf", "application/pdf", 10)
+    stale = os.path.getmtime(uploads.directory / "old.json") - 3 * 86400
+    for name in ("old.json", "old.part"):
+        os.utime(uploads.directory / name, (stale, stale))
+
+    assert uploads.prune() == 1
+    assert sorted(p.name for p in uploads.directory.iterdir()) == ["new.json", "new.part"]
+
+
+def test_peak_memory_is_one_chunk(uploads):
+    data = os.urandom(8 * 1024 * 1024)
+    uploads.begin("u1", "big.pdf", "application/pdf", len(data))
+    chunks = [_b64(data[i:i + CHUNK]) for i in range(0, len(data), CHUNK)]
+
+    tracemalloc.start()
+    offset = 0
+    for chunk in chunks:
+        offset = uploads.write_chunk("u1", offset, chunk)
+    uploads.commit("u1")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # One chunk's base64 plus its decoded bytes, however large the file
+    assert peak < 3 * CHUNK
+
+
+# -- Gateway -----------------------------------------------------------------
+
+
+async def test_chunked_upload_resumes_on_new_connection(tmp_path, uploads, workspace_db):
+    data = os.urandom(2 * CHUNK + 17)
+    blobs = BlobStore(tmp_path / "blobs")
+    first = SpriteGateway(send_fn=AsyncMock(), runtime=MagicMock(), workspace_db=workspace_db,
+                          blob_store=blobs, upload_store=uploads)
+    await first.route(_msg("file_upload_begin", "b1", upload_id="u1", filename="a.pdf",
+                           mime_type="application/pdf", size=len(data)))
+    await first.route(_msg("file_upload_chunk", "c1", upload_id="u1", offset=0, data=_b64(data[:CHUNK])))
+    [begin_ack, chunk_ack] = _sent(first.send)
+    assert is_file_upload_ack(chunk_ack) and chunk_ack["request_id"] == "c1"
+    assert chunk_ack["payload"] == {"upload_id": "u1", "offset": CHUNK, "size": len(data)}
+
+    # Connection dropped; the browser reconnects and begins again with the same id
+    send = AsyncMock()
+    documents = AsyncMock()
+    second = SpriteGateway(send_fn=send, runtime=MagicMock(), workspace_db=workspace_db,
+                           blob_store=blobs, upload_store=uploads, document_queue=documents)
+    second.runtime._active_stack_id = "s1"
+    await second.route(_msg("file_upload_begin", "b2", upload_id="u1", filename="a.pdf",
+                            mime_type="application/pdf", size=len(data)))
+    offset = _sent(send)[-1]["payload"]["offset"]
+    assert offset == CHUNK
+    while offset < len(data):
+        await second.route(_msg("file_upload_chunk", "c", upload_id="u1", offset=offset,
+                                data=_b64(data[offset:offset + CHUNK])))
+        offset = _sent(send)[-1]["payload"]["offset"]
+    with patch("src.gateway.Path", return_value=tmp_path):
+        await second.route(_msg("file_upload_commit", "done", upload_id="u1",
+                                sha256=hashlib.sha256(data).hexdigest()))
+
+    replies = _sent(send)
+    card = next(m for m in replies if m["type"] == "canvas_update")
+    assert card["payload"]["blocks"][0]["blob"] == hashlib.sha256(data).hexdigest()
+    assert replies[-1]["payload"]["message"] == "file_upload_received"
+    [saved] = tmp_path.glob("*_a.pdf")
+    assert saved.read_bytes() == data
+    assert blobs.path(hashlib.sha256(data).hexdigest()).stat().st_ino == saved.stat().st_ino
+    assert not list(uploads.directory.iterdir())
+    documents.enqueue.assert_called_once()
+
+
+async def test_chunk_without_begin_is_an_error(uploads):
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), upload_store=uploads)
+    await gateway.route(_msg("file_upload_chunk", "c1", upload_id="nope", offset=0, data=_b64(b"x")))
+
+    [err] = _sent(send)
+    assert err["payload"]["event"] == "error" and err["request_id"] == "c1"
+
+
+async def test_commit_with_non_string_checksum_is_an_error(uploads):
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), upload_store=uploads)
+    await gateway.route(_msg("file_upload_begin", "b1", upload_id="u1", filename="a.pdf",
+                             mime_type="application/pdf", size=1))
+    await gateway.route(_msg("file_upload_chunk", "c1", upload_id="u1", offset=0, data=_b64(b"x")))
+    await gateway.route(_msg("file_upload_commit", "done", upload_id="u1", sha256=42))
+
+    err = _sent(send)[-1]
+    assert err["payload"]["event"] == "error" and err["request_id"] == "done"
+
+
+async def _upload_twice(tmp_path, workspace_db, data: bytes) -> tuple[SpriteGateway, list[dict]]:
+    """Upload `data` as a.pdf, then again as b.pdf; return the gateway and the second upload's replies."""
+    send = AsyncMock()
+    gateway = SpriteGateway(send_fn=send, runtime=MagicMock(), workspace_db=workspace_db,
+                            blob_store=BlobStore(tmp_path / "blobs"), document_queue=AsyncMock())
+    gateway.runtime._active_stack_id = "s1"
+    with patch("src.gateway.Path", return_value=tmp_path):
+        await gateway.route(_msg("file_upload", "f1", filename="a.pdf", mime_type="application/pdf",
+                                 data=_b64(data)))
+        await asyncio.sleep(0)
+        first = len(send.call_args_list)
+        await gateway.route(_msg("file_upload", "f2", filename="b.pdf", mime_type="application/pdf",
+                                 data=_b64(data)))
+    return gateway, _sent(send)[first:]
+
+
+async def test_duplicate_upload_reuses_earlier_document(tmp_path, workspace_db):
+    gateway, replies = await _upload_twice(tmp_path, workspace_db, b"%PDF same bytes")
+
+    [doc] = await workspace_db.list_documents()
+    doc_id = doc["doc_id"]
+    assert [p.name for p in tmp_path.glob("*.pdf")] == [f"{doc_id}_a.pdf"]  # second copy removed
+    gateway._documents.enqueue.assert_called_once()  # the agent is not asked again
+
+    card, status, ack = replies
+    assert card["payload"]["command"] == "create_card" and card["payload"]["card_id"] == doc_id
+    assert status["payload"] == {"document_id": doc_id, "status": "processing",
+                                 "message": "b.pdf is still being processed"}
+    assert ack["payload"]["message"] == "file_upload_received" and ack["request_id"] == "f2"
+
+
+async def test_duplicate_of_failed_upload_is_extracted_again(tmp_path, workspace_db):
+    data = b"%PDF failed once"
+    with patch.object(WorkspaceDB, "get_card", AsyncMock(return_value=None)):
+        gateway, replies = await _upload_twice(tmp_path, workspace_db, data)
+
+    [doc] = await workspace_db.list_documents()
+    assert doc["file_path"].endswith("_b.pdf")
+    assert gateway._documents.enqueue.call_count == 2
+    assert gateway._documents.enqueue.call_args.args[0] == doc["doc_id"]
+    assert replies[0]["payload"]["card_id"] == doc["doc_id"]
@@ -127,3 +127,14 @@ async def test_welcome_no_crash_without_db(mock_send):
     gw = SpriteGateway(send_fn=mock_send, runtime=MagicMock())
     await gw.check_and_send_welcome()
     assert len(gw._tasks) == 0
+
+
+@pytest.mark.asyncio
+async def test_welcome_sent_once_per_connection(gateway, workspace_db):
+    """Every tab sends state_sync_request; only the first triggers a welcome."""
+    await gateway.check_and_send_welcome()
+    await gateway.check_and_send_welcome()
+    if gateway._tasks:
+        await asyncio.gather(*gateway._tasks, return_exceptions=True)
+
+    gateway.runtime.handle_message.assert_called_once()